@@ -57,6 +57,12 @@ class OperationsAgentConfig(BaseSettings):
     # CLASIFICADOR DE INTENCIONES
     # ========================================================================
     intent_confidence_threshold: float = 0.7
+    # Clasificador local (utils/local_classifier.py) antes del LLM: por
+    # debajo de este umbral se consulta al LLM. Calibrar con
+    # scripts/eval_intenciones_operador.py; no bajarlo de
+    # intent_confidence_threshold (route_by_intent pediría aclaración).
+    local_classifier_enabled: bool = True
+    local_classifier_threshold: float = 0.7
 
     # ========================================================================
     # BASE DE DATOS
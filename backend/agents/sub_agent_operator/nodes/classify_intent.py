@@ -2,7 +2,10 @@
 Nodo: Clasificar Intención
 ==========================
 
-Clasifica la intención del mensaje del usuario usando Claude Haiku 3.
+Clasifica la intención del mensaje del usuario en dos etapas: el
+clasificador local (utils/local_classifier.py) responde en milisegundos y
+Claude Haiku 3 solo se consulta cuando la confianza local queda por debajo
+de config.local_classifier_threshold.
 """
 
 import os
@@ -14,6 +17,8 @@ from langchain_anthropic import ChatAnthropic
 
 from ..state import OperationsAgentState
 from ..config import config, SYSTEM_PROMPT_CLASSIFIER
+from ..utils.entity_extractor import extract_entities, merge_entities
+from ..utils.local_classifier import get_local_classifier
 
 load_dotenv()
 
@@ -43,6 +48,26 @@ async def classify_intent_node(state: OperationsAgentState) -> Dict:
 
     logger.info(f"[{session_id}] Clasificando intención...")
 
+    # Etapa 1: clasificador local
+    if config.local_classifier_enabled:
+        try:
+            intent, confidence = get_local_classifier().predict(current_message)
+            if confidence >= config.local_classifier_threshold:
+                logger.info(
+                    f"[{session_id}] Intención clasificada localmente: {intent} "
+                    f"(confianza: {confidence:.2f})"
+                )
+                return {
+                    **state,
+                    "intent": intent,
+                    "confidence": confidence,
+                    "entities": extract_entities(current_message),
+                    "intent_source": "local",
+                }
+        except Exception as e:
+            logger.warning(f"[{session_id}] Clasificador local no disponible: {e}")
+
+    # Etapa 2: LLM
     try:
         # Construir prompt
         messages = [
@@ -71,11 +96,16 @@ async def classify_intent_node(state: OperationsAgentState) -> Dict:
             f"(confianza: {confidence:.2f})"
         )
 
+        # Las fechas con año dudoso las decide el LLM
+        ambiguas = set()
+        locales = extract_entities(current_message, ambiguas=ambiguas)
+
         return {
             **state,
             "intent": intent,
             "confidence": confidence,
-            "entities": entities,
+            "entities": merge_entities(locales, entities, ambiguas),
+            "intent_source": "llm",
         }
 
     except Exception as e:
@@ -85,5 +115,6 @@ async def classify_intent_node(state: OperationsAgentState) -> Dict:
             "intent": "otro",
             "confidence": 0.0,
             "entities": {},
+            "intent_source": "llm",
             "error": str(e),
         }
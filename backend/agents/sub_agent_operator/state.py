@@ -49,6 +49,9 @@ class OperationsAgentState(TypedDict, total=False):
     entities: Dict[str, Any]
     """Entidades extraídas del mensaje"""
 
+    intent_source: str
+    """Etapa que clasificó el mensaje (local o llm)"""
+
     # ========================================================================
     # CONTEXTO
     # ========================================================================
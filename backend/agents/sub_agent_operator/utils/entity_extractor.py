@@ -0,0 +1,359 @@
+"""
+Extractor de Entidades
+======================
+
+Extrae con expresiones regulares las entidades que usan los nodos (fecha,
+hora, rango de fechas, estado, tratamiento, ids, nombre, teléfono, correo)
+cuando el clasificador local resuelve la intención sin llamar al LLM.
+"""
+
+import re
+import unicodedata
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Set, Tuple
+
+# Nombres propios: palabras capitalizadas que no abren la oración
+NAME_PATTERN = re.compile(
+    r"(?<=[\wÁÉÍÓÚÑáéíóúñ,] )[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+(?: (?:de la |del |de )?[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+)*"
+)
+
+# Palabras capitalizadas que no son nombres
+_NO_NOMBRES = {
+    "lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo",
+    "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+    "septiembre", "octubre", "noviembre", "diciembre", "cita", "citas", "paciente",
+    "doctor", "doctora", "hoy", "mañana",
+}
+
+_DIAS = {"lunes": 0, "martes": 1, "miercoles": 2, "jueves": 3, "viernes": 4, "sabado": 5, "domingo": 6}
+
+_MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+}
+
+# Valores de citas.estado
+_ESTADOS = [
+    (re.compile(r"\bno[ -]?asisti|\bno[ -]?shows?\b|\bfaltaron\b|\binasistencia"), "No_Asistio"),
+    (re.compile(r"\bcancelad[ao]s?\b"), "Cancelada"),
+    (re.compile(r"\bconfirmad[ao]s?\b"), "Confirmada"),
+    (re.compile(r"\bpendientes?\b"), "Pendiente"),
+    (re.compile(r"\ben curso\b"), "En_Curso"),
+    (re.compile(r"\b(?:completad|atendid)[ao]s?\b"), "Completada"),
+]
+
+_TRATAMIENTOS = [
+    (re.compile(r"\bonicomicosis\b"), "Onicomicosis"),
+    (re.compile(r"\bu[ñn]as? encarnadas?\b"), "Uña encarnada"),
+    (re.compile(r"\bpie diabetico\b"), "Pie diabético"),
+    (re.compile(r"\bpedicure\b"), "Pedicure"),
+    (re.compile(r"\bplantillas?\b"), "Plantillas"),
+    (re.compile(r"\bverrugas?\b"), "Verruga plantar"),
+]
+
+_FECHA_NUMERICA = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_FECHA_ISO = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_FECHA_TEXTO = re.compile(r"\b(\d{1,2}) de (" + "|".join(_MESES) + r")(?: (?:de|del) (\d{4}))?\b")
+_DIA_SEMANA = re.compile(r"\b(" + "|".join(_DIAS) + r")\b")
+
+# Rangos explícitos: "del 1 al 15 de marzo", "entre el 3 y el 10 de
+# noviembre", "del 01/09 al 30/09"
+_DESDE = r"\b(?:(?:del?|entre(?: el)?) )?"
+_HASTA = r" (?:al|a|hasta el|y el|y) "
+_MES_TEXTO = r"(" + "|".join(_MESES) + r")"
+_ANIO_TEXTO = r"(?: (?:de|del) (\d{4}))?"
+_RANGO_ISO = re.compile(_DESDE + r"(\d{4})-(\d{2})-(\d{2})" + _HASTA + r"(\d{4})-(\d{2})-(\d{2})\b")
+_RANGO_NUMERICO = re.compile(
+    _DESDE + r"(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?" + _HASTA + r"(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b"
+)
+_RANGO_TEXTO = re.compile(
+    r"\b(?:del?|entre(?: el)?) (\d{1,2})(?: de " + _MES_TEXTO + _ANIO_TEXTO + r")?"
+    + _HASTA + r"(\d{1,2}) de " + _MES_TEXTO + _ANIO_TEXTO + r"\b"
+)
+
+# Una fecha sin año a más de estos días de hoy puede ser del año anterior
+# o del siguiente: el año deducido no es fiable
+_DIAS_SIN_AMBIGUEDAD = 120
+
+_HORA_AMPM = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s?m\b\.?")
+_HORA_RELOJ = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+_HORA_LAS = re.compile(
+    r"\b(?:a|de) la(?:s)? (\d{1,2})(?: y (media|cuarto))?(?: de la (mañana|tarde|noche))?\b"
+)
+
+_CITA_ID = re.compile(r"#\s?(\d+)|\bcita (?:n(?:umero|o)\.? ?)?(\d+)\b(?!:|/| ?[ap]\.?\s?m\b)")
+_PACIENTE_ID = re.compile(r"\b(?:paciente|expediente) (?:n(?:umero|o)\.? ?)?(\d+)\b")
+_TELEFONO = re.compile(r"(?<!\d)(\d{3})[ -]?(\d{3})[ -]?(\d{4})(?!\d)")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_DURACION = re.compile(r"\b(\d{2,3}) ?min(?:utos)?\b")
+
+
+def _normalizar(text: str) -> str:
+    """Minúsculas y sin acentos (la ñ se conserva)."""
+    text = unicodedata.normalize("NFKD", text.lower().replace("ñ", "\0"))
+    return "".join(c for c in text if not unicodedata.combining(c)).replace("\0", "ñ")
+
+
+def _siguiente_dia(today: date, weekday: int) -> date:
+    """Próxima fecha (hoy incluido) que cae en ese día de la semana."""
+    return today + timedelta(days=(weekday - today.weekday()) % 7)
+
+
+def _anio(year: str) -> int:
+    return int(year) + 2000 if len(year) == 2 else int(year)
+
+
+def _mas_cercana(today: date, dia: int, mes: int) -> Tuple[date, bool]:
+    """
+    Fecha sin año: la aparición de ese día y mes más cercana a hoy ("15 de
+    enero" en diciembre es el año siguiente; "1 de septiembre" en octubre,
+    este año). Devuelve también si el año es ambiguo.
+    """
+    candidatas = []
+    for year in (today.year - 1, today.year, today.year + 1):
+        try:
+            candidatas.append(date(year, mes, dia))
+        except ValueError:
+            pass  # 29/02 fuera de año bisiesto
+    if not candidatas:
+        raise ValueError(f"fecha inválida: {dia}/{mes}")
+    fecha = min(candidatas, key=lambda d: (abs((d - today).days), d < today))
+    return fecha, abs((fecha - today).days) > _DIAS_SIN_AMBIGUEDAD
+
+
+def _dia_mes(today: date, dia: int, mes: int, year: Optional[str]) -> Tuple[date, bool]:
+    if year:
+        return date(_anio(year), mes, dia), False
+    return _mas_cercana(today, dia, mes)
+
+
+def _fecha(text: str, today: date) -> Optional[Tuple[date, bool]]:
+    m = _FECHA_ISO.search(text)
+    if m:
+        return date(int(m.group(1)), int(m.group(2)), int(m.group(3))), False
+
+    m = _FECHA_NUMERICA.search(text)
+    if m:
+        return _dia_mes(today, int(m.group(1)), int(m.group(2)), m.group(3))
+
+    m = _FECHA_TEXTO.search(text)
+    if m:
+        return _dia_mes(today, int(m.group(1)), _MESES[m.group(2)], m.group(3))
+
+    if re.search(r"\bpasado mañana\b", text):
+        return today + timedelta(days=2), False
+    if re.search(r"\bmañana\b", text) and not re.search(r"\b(?:en|por|de) la mañana\b", text):
+        return today + timedelta(days=1), False
+    if re.search(r"\bayer\b", text):
+        return today - timedelta(days=1), False
+    if re.search(r"\bhoy\b", text):
+        return today, False
+
+    m = _DIA_SEMANA.search(text)
+    if m:
+        return _siguiente_dia(today, _DIAS[m.group(1)]), False
+    return None
+
+
+def _entre(
+    today: date,
+    dia_inicio: int, mes_inicio: int, anio_inicio: Optional[str],
+    dia_fin: int, mes_fin: int, anio_fin: Optional[str],
+) -> Tuple[date, date, bool]:
+    """Rango explícito; el año que falte se deduce igual que en _dia_mes."""
+    if anio_inicio and anio_fin:
+        return date(_anio(anio_inicio), mes_inicio, dia_inicio), date(_anio(anio_fin), mes_fin, dia_fin), False
+    if anio_fin:
+        fin = date(_anio(anio_fin), mes_fin, dia_fin)
+        inicio = date(fin.year, mes_inicio, dia_inicio)
+        # "del 20 de diciembre al 10 de enero de 2027"
+        if inicio > fin:
+            inicio = inicio.replace(year=fin.year - 1)
+        return inicio, fin, False
+
+    inicio, ambiguo = _dia_mes(today, dia_inicio, mes_inicio, anio_inicio)
+    fin = date(inicio.year, mes_fin, dia_fin)
+    if fin < inicio:
+        fin = fin.replace(year=inicio.year + 1)
+    return inicio, fin, ambiguo
+
+
+def _rango(text: str, today: date) -> Optional[Tuple[date, date, bool]]:
+    m = _RANGO_ISO.search(text)
+    if m:
+        g = [int(x) for x in m.groups()]
+        return date(g[0], g[1], g[2]), date(g[3], g[4], g[5]), False
+
+    m = _RANGO_NUMERICO.search(text)
+    if m:
+        return _entre(
+            today, int(m.group(1)), int(m.group(2)), m.group(3), int(m.group(4)), int(m.group(5)), m.group(6)
+        )
+
+    m = _RANGO_TEXTO.search(text)
+    if m:
+        mes_fin = _MESES[m.group(5)]
+        mes_inicio = _MESES[m.group(2)] if m.group(2) else mes_fin
+        return _entre(today, int(m.group(1)), mes_inicio, m.group(3), int(m.group(4)), mes_fin, m.group(6))
+
+    lunes = today - timedelta(days=today.weekday())
+    if re.search(r"\bsemana pasada\b", text):
+        return lunes - timedelta(days=7), lunes - timedelta(days=1), False
+    if re.search(r"\b(?:proxima|siguiente) semana\b|\bsemana que viene\b", text):
+        return lunes + timedelta(days=7), lunes + timedelta(days=13), False
+    if re.search(r"\besta semana\b|\bla semana\b|\bsemanal\b", text):
+        return lunes, lunes + timedelta(days=6), False
+
+    inicio_mes = today.replace(day=1)
+    siguiente_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+    if re.search(r"\beste mes\b|\bdel mes\b|\bmensual\b", text):
+        return inicio_mes, siguiente_mes - timedelta(days=1), False
+    if re.search(r"\bmes pasado\b|\bmes anterior\b", text):
+        fin = inicio_mes - timedelta(days=1)
+        return fin.replace(day=1), fin, False
+    if re.search(r"\beste año\b", text):
+        return date(today.year, 1, 1), date(today.year, 12, 31), False
+
+    m = re.search(r"\ben " + _MES_TEXTO + r"\b", text)
+    if m:
+        inicio, ambiguo = _mas_cercana(today, 1, _MESES[m.group(1)])
+        return inicio, (inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1), ambiguo
+    return None
+
+
+def _hora(text: str) -> Optional[str]:
+    m = _HORA_AMPM.search(text)
+    if m:
+        hora, minutos = int(m.group(1)) % 12, int(m.group(2) or 0)
+        if m.group(3) == "p":
+            hora += 12
+        return f"{hora:02d}:{minutos:02d}"
+
+    m = _HORA_RELOJ.search(text)
+    if m and int(m.group(1)) < 24 and int(m.group(2)) < 60:
+        return f"{int(m.group(1)):02d}:{m.group(2)}"
+
+    m = _HORA_LAS.search(text)
+    if m:
+        hora = int(m.group(1))
+        minutos = {"media": 30, "cuarto": 15}.get(m.group(2), 0)
+        # La clínica atiende de 8:30 a 18:30: "a las 3" es de la tarde
+        if m.group(3) in ("tarde", "noche") or (m.group(3) is None and 1 <= hora <= 7):
+            hora = hora + 12 if hora < 12 else hora
+        return f"{hora:02d}:{minutos:02d}"
+    return None
+
+
+def _nombre(original: str) -> Optional[str]:
+    for m in NAME_PATTERN.finditer(original):
+        partes = m.group(0).split(" ")
+        # Quitar días, meses y palabras del dominio al inicio
+        while partes and _normalizar(partes[0]) in _NO_NOMBRES:
+            partes = partes[1:]
+        if partes and partes[0] not in ("de", "del"):
+            return " ".join(partes)
+    return None
+
+
+def extract_entities(
+    text: str, today: Optional[date] = None, ambiguas: Optional[Set[str]] = None
+) -> Dict[str, Any]:
+    """
+    Extrae las entidades de un mensaje del operador.
+
+    Args:
+        text: Mensaje del usuario
+        today: Fecha de referencia para "hoy", "mañana", "el lunes"...
+        ambiguas: Si se pasa, recibe las claves de fecha cuyo año se
+            dedujo sin certeza (ver merge_entities)
+
+    Returns:
+        Diccionario con las entidades encontradas (fechas en YYYY-MM-DD,
+        horas en HH:MM, estado con los valores de citas.estado)
+    """
+    today = today or date.today()
+    normalizado = _normalizar(text)
+    entities: Dict[str, Any] = {}
+
+    ambiguas = set() if ambiguas is None else ambiguas
+
+    # 31/02 y similares se ignoran
+    try:
+        rango = _rango(normalizado, today)
+    except ValueError:
+        rango = None
+    try:
+        fecha = None if rango else _fecha(normalizado, today)
+    except ValueError:
+        fecha = None
+
+    if rango:
+        inicio, fin, ambiguo = rango
+        entities["start_date"], entities["end_date"] = inicio.isoformat(), fin.isoformat()
+        if ambiguo:
+            ambiguas.update(("start_date", "end_date"))
+    elif fecha:
+        entities["date"] = fecha[0].isoformat()
+        if fecha[1]:
+            ambiguas.add("date")
+
+    hora = _hora(normalizado)
+    if hora:
+        entities["time"] = hora
+
+    for patron, estado in _ESTADOS:
+        if patron.search(normalizado):
+            entities["status"] = estado
+            break
+
+    for patron, tratamiento in _TRATAMIENTOS:
+        if patron.search(normalizado):
+            entities["treatment"] = tratamiento
+            break
+
+    m = _CITA_ID.search(normalizado)
+    if m:
+        entities["appointment_id"] = int(m.group(1) or m.group(2))
+
+    m = _PACIENTE_ID.search(normalizado)
+    if m:
+        entities["patient_id"] = int(m.group(1))
+
+    m = _DURACION.search(normalizado)
+    if m:
+        entities["duration"] = int(m.group(1))
+
+    m = _EMAIL.search(text)
+    if m:
+        entities["email"] = m.group(0)
+
+    m = _TELEFONO.search(text)
+    if m:
+        entities["telefono"] = "".join(m.groups())
+
+    nombre = _nombre(text)
+    if nombre:
+        entities["patient_name"] = nombre
+
+    return entities
+
+
+def merge_entities(
+    local: Dict[str, Any], llm: Dict[str, Any], ambiguas: Set[str] = frozenset()
+) -> Dict[str, Any]:
+    """
+    Combina las entidades del extractor con las del LLM.
+
+    Las fechas y horas calculadas localmente ganan (el LLM no conoce la
+    fecha de hoy) salvo las de `ambiguas`, cuyo año es una suposición; para
+    el resto gana el LLM, que entiende nombres en minúsculas y referencias
+    indirectas.
+    """
+    merged = {**local, **(llm or {})}
+    for key in ("date", "time", "start_date", "end_date"):
+        if key in local and key not in ambiguas:
+            merged[key] = local[key]
+    # Con un rango en el mensaje, la fecha suelta del LLM es un extremo
+    if "start_date" in local:
+        merged.pop("date", None)
+    return merged
@@ -0,0 +1,93 @@
+"""
+Clasificador Local de Intenciones
+=================================
+
+Primera etapa de la clasificación: un modelo lineal (TF-IDF de n-gramas de
+caracteres + regresión logística) entrenado con los ejemplos etiquetados de
+``data/intent_examples.jsonl``. Responde en milisegundos con la intención y
+su probabilidad; el nodo classify_intent solo llama al LLM cuando la
+probabilidad queda por debajo de ``config.local_classifier_threshold``.
+
+Para agregar ejemplos basta con añadir líneas ``{"texto", "intent"}`` al
+archivo; el modelo se entrena al primer uso (menos de un segundo).
+"""
+
+import json
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from .entity_extractor import NAME_PATTERN
+
+logger = logging.getLogger(__name__)
+
+EXAMPLES_PATH = Path(__file__).resolve().parent.parent / "data" / "intent_examples.jsonl"
+
+_DIGITOS = re.compile(r"\d")
+
+
+def normalize_text(text: str) -> str:
+    """Nombres propios enmascarados, minúsculas, sin acentos y con los
+    dígitos colapsados: "Agenda a Juan a las 3pm" == "Agenda a Ana a las 4pm"."""
+    text = NAME_PATTERN.sub("N", text)
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _DIGITOS.sub("0", text)
+
+
+def load_examples(path: Path = EXAMPLES_PATH) -> List[Tuple[str, str]]:
+    """Lee los pares (texto, intención) del archivo JSONL."""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                examples.append((row["texto"], row["intent"]))
+    return examples
+
+
+def build_model() -> Pipeline:
+    """Pipeline sin entrenar: n-gramas de caracteres dentro de cada palabra
+    (tolera errores de dedo y conjugaciones: cancela/cancelar/cancelen)."""
+    return Pipeline([
+        ("features", TfidfVectorizer(
+            preprocessor=normalize_text, analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True,
+        )),
+        ("clf", LogisticRegression(C=50.0, max_iter=2000)),
+    ])
+
+
+class LocalIntentClassifier:
+    """Modelo local entrenado con los ejemplos etiquetados."""
+
+    def __init__(self, examples: Optional[Sequence[Tuple[str, str]]] = None):
+        if examples is None:
+            examples = load_examples()
+        texts, intents = zip(*examples)
+        self.model = build_model().fit(list(texts), list(intents))
+        self.intents = list(self.model.classes_)
+
+    def predict_many(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """(intención, probabilidad) para cada texto."""
+        probabilities = self.model.predict_proba(list(texts))
+        best = probabilities.argmax(axis=1)
+        return [(self.intents[i], float(p[i])) for i, p in zip(best, probabilities)]
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """(intención, probabilidad) del mensaje."""
+        return self.predict_many([text])[0]
+
+
+@lru_cache(maxsize=1)
+def get_local_classifier() -> LocalIntentClassifier:
+    """Instancia compartida; se entrena en la primera llamada."""
+    classifier = LocalIntentClassifier()
+    logger.info(f"Clasificador local entrenado con {len(classifier.intents)} intenciones")
+    return classifier
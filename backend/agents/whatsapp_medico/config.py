@@ -12,6 +12,8 @@ from langgraph.checkpoint.postgres import PostgresSaver
 from langchain_anthropic import ChatAnthropic
 from sentence_transformers import SentenceTransformer
 
+from .utils.embeddings import MODELO_VECTORES_AGENTE
+
 logger = logging.getLogger(__name__)
 
 # Configuración de base de datos
@@ -70,10 +72,11 @@ llm = ChatAnthropic(
 logger.info(f"✅ LLM configured: {LLM_MODEL} (temp={LLM_TEMPERATURE})")
 
 # Configurar Embedder Local (all-MiniLM-L6-v2)
-# Ligero (80MB), rápido en CPU, 384 dimensiones
+# Ligero (80MB), rápido en CPU, 384 dimensiones. Fijo: codifica los vectores
+# pgvector de aprendizajes_agente, que el indexador no recalcula
 try:
-    embedder = SentenceTransformer("all-MiniLM-L6-v2")
-    logger.info("✅ Embedder loaded: all-MiniLM-L6-v2 (384 dims)")
+    embedder = SentenceTransformer(MODELO_VECTORES_AGENTE)
+    logger.info(f"✅ Embedder loaded: {MODELO_VECTORES_AGENTE} (384 dims)")
 except Exception as e:
     logger.error(f"❌ Failed to load embedder: {e}")
     embedder = None
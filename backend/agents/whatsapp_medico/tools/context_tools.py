@@ -18,6 +18,7 @@ import pickle
 import json
 
 from db import get_pool
+from whatsapp_management.resumenes_conversaciones import resumenes_conversaciones
 from ..utils.embeddings import get_embeddings_service
 
 logger = logging.getLogger(__name__)
@@ -43,7 +44,7 @@ async def buscar_conversaciones_previas(
     Returns:
         JSON string con conversaciones similares o mensaje vacío
     """
-    pool = await get_pool()
+    pool = get_pool()
     embeddings_service = get_embeddings_service()
     
     logger.info(f"🔍 [Context Tool] Buscando contexto del contacto {contact_id}")
@@ -101,12 +102,8 @@ async def buscar_conversaciones_previas(
         if results:
             logger.info(f"✅ [Context Tool] {len(results)} conversaciones similares encontradas")
             
-            # Actualizar última consulta
-            for r in results:
-                await pool.execute(
-                    "UPDATE conversaciones_embeddings SET fecha_ultima_consulta = NOW() WHERE id_conversacion = $1",
-                    r['conversacion_id']
-                )
+            # Última consulta: se escribe por lotes fuera del camino del agente
+            resumenes_conversaciones.registrar_consulta(r['conversacion_id'] for r in results)
             
             return json.dumps({
                 "encontrado": True,
@@ -139,7 +136,10 @@ async def guardar_resumen_conversacion(
     metadata: Annotated[dict, "Metadata adicional"]
 ) -> str:
     """
-    Guarda resumen de conversación con embedding para futuras búsquedas.
+    Encola el resumen de conversación para futuras búsquedas.
+    
+    El embedding y el upsert los hace el pipeline de resúmenes en segundo
+    plano (whatsapp_management/resumenes_conversaciones.py), por lotes.
     
     Args:
         contact_id: ID del contacto (aislamiento)
@@ -150,30 +150,10 @@ async def guardar_resumen_conversacion(
     Returns:
         Mensaje de confirmación
     """
-    pool = await get_pool()
-    embeddings_service = get_embeddings_service()
-    
     try:
-        # Generar embedding del resumen
-        embedding = embeddings_service.embed_query(resumen)
-        embedding_bytes = pickle.dumps(embedding)
-        
-        # Insertar en BD
-        await pool.execute(
-            """
-            INSERT INTO conversaciones_embeddings 
-            (id_contacto, id_conversacion, resumen_conversacion, embedding, metadata)
-            VALUES ($1, $2, $3, $4, $5)
-            ON CONFLICT (id_conversacion) 
-            DO UPDATE SET 
-                resumen_conversacion = EXCLUDED.resumen_conversacion,
-                embedding = EXCLUDED.embedding,
-                metadata = EXCLUDED.metadata
-            """,
-            contact_id, conversation_id, resumen, embedding_bytes, json.dumps(metadata)
-        )
+        resumenes_conversaciones.encolar_resumen(contact_id, conversation_id, resumen, metadata)
         
-        logger.info(f"✅ [Context Tool] Resumen guardado para conversación {conversation_id}")
+        logger.info(f"✅ [Context Tool] Resumen encolado para conversación {conversation_id}")
         return "Resumen de conversación guardado correctamente."
     
     except Exception as e:
@@ -18,7 +18,7 @@ import pickle
 import json
 
 from db import get_pool
-from ..utils.embeddings import get_embeddings_service
+from ..utils.embeddings import MODEL_NAME, get_embeddings_service
 
 logger = logging.getLogger(__name__)
 
@@ -50,7 +50,8 @@ async def buscar_knowledge_base_validada(
         # Generar embedding de la consulta
         query_embedding = embeddings_service.embed_query(query)
         
-        # Buscar en KB (cosine similarity)
+        # Buscar en KB (cosine similarity); solo filas codificadas con el
+        # mismo modelo (las demás esperan al indexador de embeddings)
         sql_query = """
             SELECT 
                 id,
@@ -64,11 +65,12 @@ async def buscar_knowledge_base_validada(
             WHERE aprobado = true
             AND contiene_datos_operativos = false
             AND categoria IN ('FAQ_Proceso', 'Politica_Clinica', 'Informacion_General', 'Procedimiento_Medico')
+            AND pregunta_embedding_modelo = $1
             ORDER BY fecha_creacion DESC
             LIMIT 50
         """
         
-        rows = await pool.fetch(sql_query)
+        rows = await pool.fetch(sql_query, MODEL_NAME)
         
         if not rows:
             logger.warning("⚠️ No hay entries en knowledge base validada")
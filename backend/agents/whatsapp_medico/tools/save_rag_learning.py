@@ -5,8 +5,10 @@ Tool: Save RAG Learning
 Guarda nuevo conocimiento en la base de datos para auto-aprendizaje.
 """
 
+import asyncio
 import logging
 from db import get_pool
+from whatsapp_management.indexador_embeddings import indexador_embeddings
 from ..config import embedder
 
 logger = logging.getLogger(__name__)
@@ -43,9 +45,9 @@ async def save_rag_learning(
             logger.error("Embedder no disponible para auto-aprendizaje")
             return {"success": False, "error": "Embedder no disponible"}
 
-        # Generar embeddings
-        trigger_embedding = embedder.encode(pregunta).tolist()
-        response_embedding = embedder.encode(respuesta).tolist()
+        # Generar ambos embeddings en una sola pasada, fuera del event loop
+        embeddings = await asyncio.to_thread(embedder.encode, [pregunta, respuesta], batch_size=2)
+        trigger_embedding, response_embedding = embeddings.tolist()
 
         async with pool.acquire() as conn:
             # Insertar aprendizaje
@@ -88,11 +90,14 @@ async def save_rag_learning(
             aprendizaje_id = result["id"]
             logger.info(f"✅ Aprendizaje guardado: ID {aprendizaje_id}")
 
-            return {
-                "success": True,
-                "aprendizaje_id": aprendizaje_id,
-                "message": "Aprendizaje guardado exitosamente",
-            }
+        # pregunta_embedding y duplicado_de los calcula el indexador por lotes
+        indexador_embeddings.solicitar(tablas=["aprendizajes_agente"])
+
+        return {
+            "success": True,
+            "aprendizaje_id": aprendizaje_id,
+            "message": "Aprendizaje guardado exitosamente",
+        }
 
     except Exception as e:
         logger.error(f"Error guardando aprendizaje: {e}", exc_info=True)
@@ -10,12 +10,20 @@ Referencias:
 
 from sentence_transformers import SentenceTransformer
 import logging
+import os
 import pickle
 
 logger = logging.getLogger(__name__)
 
-# Modelo all-MiniLM-L6-v2 (384 dimensions, rápido y eficiente)
-MODEL_NAME = "all-MiniLM-L6-v2"
+# Modelo all-MiniLM-L6-v2 (384 dimensions, rápido y eficiente).
+# Al cambiarlo, whatsapp_management/indexador_embeddings.py recalcula los
+# embeddings guardados con el modelo anterior.
+MODEL_NAME = os.getenv("EMBEDDINGS_MODELO", "all-MiniLM-L6-v2")
+
+# Modelo de los vectores pgvector de aprendizajes_agente (embedding_trigger,
+# embedding_respuesta). El indexador no los recalcula, así que no sigue a
+# EMBEDDINGS_MODELO: cambiarlo exige re-codificar esas columnas antes.
+MODELO_VECTORES_AGENTE = "all-MiniLM-L6-v2"
 
 
 class EmbeddingsService:
@@ -39,17 +47,20 @@ class EmbeddingsService:
         embedding = self.model.encode(text, convert_to_numpy=True)
         return embedding.tolist()
     
-    def embed_documents(self, texts: list[str]) -> list[list]:
+    def embed_documents(self, texts: list[str], batch_size: int = 32) -> list[list]:
         """
-        Genera embeddings para múltiples textos.
+        Genera embeddings para múltiples textos en una sola llamada al modelo.
         
         Args:
             texts: Lista de textos
+            batch_size: Textos por pasada del modelo
             
         Returns:
             Lista de embeddings
         """
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
+        embeddings = self.model.encode(
+            texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False
+        )
         return embeddings.tolist()
     
     def embed_to_bytes(self, text: str) -> bytes:
@@ -0,0 +1,83 @@
+"""
+Consumo de inventario agregado en SQL
+=====================================
+Las alertas de reorden solo necesitan, por producto, la suma y la suma de
+cuadrados del consumo diario de la ventana. Esa agregación se hace en
+PostgreSQL:
+
+- ``consumo_diario_productos`` (data/migrations/23_consumo_diario_productos.sql)
+  se mantiene por trigger a medida que llegan movimientos, así que la
+  consulta lee a lo sumo ``ventana`` filas por producto.
+- Si la migración no está aplicada se agrega directamente sobre
+  ``stock_movements``.
+
+En ambos casos a Python llega una fila por producto y no una por movimiento.
+"""
+
+import logging
+
+import asyncpg
+import pandas as pd
+
+from analytics.predictor import VENTANA_CONSUMO_DIAS
+
+logger = logging.getLogger(__name__)
+
+
+_CONSUMO_DESDE_DIARIO = """
+    SELECT
+        producto_id,
+        SUM(cantidad) AS total,
+        SUM(cantidad * cantidad) AS suma_cuadrados
+    FROM consumo_diario_productos
+    WHERE fecha > CURRENT_DATE - $1::int
+    GROUP BY producto_id
+"""
+
+_CONSUMO_DESDE_MOVIMIENTOS = """
+    SELECT
+        producto_id,
+        SUM(cantidad) AS total,
+        SUM(cantidad * cantidad) AS suma_cuadrados
+    FROM (
+        SELECT
+            producto_id,
+            fecha_movimiento::date AS fecha,
+            SUM(ABS(cantidad_movimiento)) AS cantidad
+        FROM stock_movements
+        WHERE tipo_movimiento = 'salida'
+          AND fecha_movimiento >= NOW() - make_interval(days => $1::int)
+        GROUP BY producto_id, fecha_movimiento::date
+    ) diario
+    GROUP BY producto_id
+"""
+
+
+async def consumo_por_producto(
+    conn: asyncpg.Connection,
+    ventana_dias: int = VENTANA_CONSUMO_DIAS,
+) -> pd.DataFrame:
+    """
+    Consumo agregado por producto en la ventana.
+
+    Args:
+        conn: Conexión a la BD
+        ventana_dias: Días hacia atrás a considerar
+
+    Returns:
+        DataFrame indexado por producto_id con columnas {total, suma_cuadrados},
+        el formato que espera InventoryAnalyzer.evaluar_reorden
+    """
+    try:
+        filas = await conn.fetch(_CONSUMO_DESDE_DIARIO, ventana_dias)
+    except asyncpg.UndefinedTableError:
+        logger.debug("consumo_diario_productos no existe; agregando stock_movements")
+        filas = await conn.fetch(_CONSUMO_DESDE_MOVIMIENTOS, ventana_dias)
+
+    return pd.DataFrame(
+        {
+            'total': [float(f['total']) for f in filas],
+            'suma_cuadrados': [float(f['suma_cuadrados']) for f in filas],
+        },
+        index=pd.Index([f['producto_id'] for f in filas], name='producto_id'),
+    )
@@ -3,32 +3,275 @@ Módulo de análisis predictivo con Machine Learning
 Usa scikit-learn para predicciones de demanda y forecasting
 """
 
+import asyncio
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple, Optional
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import r2_score
 from sklearn.preprocessing import StandardScaler
 import warnings
+
+from cache import SingleFlightCache
 warnings.filterwarnings('ignore')
 
 
+# ============================================================================
+# EJECUCIÓN FUERA DEL EVENT LOOP
+# ============================================================================
+# El entrenamiento y la inferencia son CPU-bound: se ejecutan en un pool de
+# procesos para no bloquear el event loop de FastAPI. Las funciones que
+# corren en el pool son de nivel de módulo para poder serializarse.
+
+ANALYTICS_ML_WORKERS = int(os.getenv("ANALYTICS_ML_WORKERS", "2"))
+ANALYTICS_RF_N_JOBS = int(os.getenv("ANALYTICS_RF_N_JOBS", "1"))
+ANALYTICS_MODEL_CACHE_SIZE = int(os.getenv("ANALYTICS_MODEL_CACHE_SIZE", "64"))
+ANALYTICS_MODEL_TTL_SECONDS = float(os.getenv("ANALYTICS_MODEL_TTL_SECONDS", "86400"))
+
+_ml_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_ml_executor() -> ProcessPoolExecutor:
+    """Retorna el pool de procesos de ML (se crea al primer uso)."""
+    global _ml_executor
+    if _ml_executor is None:
+        _ml_executor = ProcessPoolExecutor(
+            max_workers=ANALYTICS_ML_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _ml_executor
+
+
+def shutdown_ml_executor() -> None:
+    """Cierra el pool de procesos (llamado en el shutdown de la app)."""
+    global _ml_executor
+    if _ml_executor is not None:
+        _ml_executor.shutdown(wait=False, cancel_futures=True)
+        _ml_executor = None
+
+
+async def _run_in_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_ml_executor(), fn, *args)
+
+
+def huella_datos(datos_historicos: List[Dict[str, Any]]) -> str:
+    """
+    Huella de una serie mensual: cambia solo cuando cambian los datos.
+
+    Args:
+        datos_historicos: Lista de dicts con {fecha, cantidad, ...}
+
+    Returns:
+        Hash hexadecimal de la serie ordenada por fecha
+    """
+    h = hashlib.sha1()
+    for d in sorted(datos_historicos, key=lambda d: str(d['fecha'])):
+        h.update(f"{d['fecha']}|{d['cantidad']};".encode())
+    return h.hexdigest()
+
+
+def _features_demanda(datos_historicos: List[Dict[str, Any]]) -> pd.DataFrame:
+    df = pd.DataFrame(datos_historicos)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    df = df.sort_values('fecha').reset_index(drop=True)
+
+    # Feature engineering
+    df['mes_numero'] = df['fecha'].dt.month
+    df['anio'] = df['fecha'].dt.year
+    df['mes_indice'] = range(len(df))
+    df['tendencia'] = df['cantidad'].rolling(window=3, min_periods=1).mean()
+    df['estacionalidad'] = df.groupby('mes_numero')['cantidad'].transform('mean')
+    return df
+
+
+_FEATURES_DEMANDA = ['mes_indice', 'mes_numero', 'tendencia', 'estacionalidad']
+
+
+def _features_demanda_lote(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Features de demanda para varias series en una sola pasada.
+
+    Mismo cálculo que ``_features_demanda`` pero agrupado por la columna
+    ``clave`` con operaciones vectorizadas de groupby.
+
+    Args:
+        df: DataFrame largo con columnas {clave, fecha, cantidad}
+    """
+    df = df.copy()
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    df = df.sort_values(['clave', 'fecha']).reset_index(drop=True)
+
+    grupos = df.groupby('clave', sort=False)
+    df['mes_numero'] = df['fecha'].dt.month
+    df['anio'] = df['fecha'].dt.year
+    df['mes_indice'] = grupos.cumcount()
+    df['tendencia'] = (
+        grupos['cantidad'].rolling(window=3, min_periods=1).mean()
+        .reset_index(level=0, drop=True)
+    )
+    df['estacionalidad'] = df.groupby(['clave', 'mes_numero'])['cantidad'].transform('mean')
+    return df
+
+
+def _ajustar_modelos(df: pd.DataFrame) -> Dict[str, Any]:
+    X = df[_FEATURES_DEMANDA].values
+    y = df['cantidad'].values
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    model_linear = LinearRegression()
+    model_rf = RandomForestRegressor(
+        n_estimators=100, random_state=42, n_jobs=ANALYTICS_RF_N_JOBS
+    )
+    model_linear.fit(X_scaled, y)
+    model_rf.fit(X_scaled, y)
+
+    return {
+        'scaler': scaler,
+        'model_linear': model_linear,
+        'model_rf': model_rf,
+        'df': df,
+    }
+
+
+def _entrenar_modelos_demanda(datos_historicos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Entrena LinearRegression + RandomForest sobre una serie mensual.
+
+    Corre en el pool de procesos.
+
+    Returns:
+        Dict con scaler, modelos y el DataFrame de features
+    """
+    return _ajustar_modelos(_features_demanda(datos_historicos))
+
+
+def _predecir_demanda(modelos: Dict[str, Any], meses_adelante: int) -> Dict[str, Any]:
+    """
+    Genera predicciones y métricas con modelos ya entrenados.
+
+    Corre en el pool de procesos.
+    """
+    df = modelos['df']
+    scaler = modelos['scaler']
+    model_linear = modelos['model_linear']
+    model_rf = modelos['model_rf']
+
+    X = df[_FEATURES_DEMANDA].values
+    y = df['cantidad'].values
+    X_scaled = scaler.transform(X)
+
+    # Features de todos los meses futuros en una sola matriz
+    ultima_fecha = df['fecha'].max()
+    pasos = np.arange(1, meses_adelante + 1)
+    fechas_futuras = [ultima_fecha + pd.DateOffset(months=int(i)) for i in pasos]
+    meses_numero = np.array([f.month for f in fechas_futuras])
+
+    # Estacionalidad: promedio histórico del mismo mes, o promedio general
+    promedio_por_mes = df.groupby('mes_numero')['cantidad'].mean()
+    estacionalidad_proy = (
+        promedio_por_mes.reindex(meses_numero).fillna(df['cantidad'].mean()).to_numpy()
+    )
+    tendencia_proy = df['cantidad'].tail(3).mean()
+
+    X_futuro = np.column_stack([
+        len(df) + pasos - 1,
+        meses_numero,
+        np.full(meses_adelante, tendencia_proy),
+        estacionalidad_proy,
+    ])
+    X_futuro_scaled = scaler.transform(X_futuro)
+
+    # Promedio ponderado (RF tiene más peso)
+    preds = 0.3 * model_linear.predict(X_futuro_scaled) + 0.7 * model_rf.predict(X_futuro_scaled)
+
+    predicciones = []
+    for fecha_futura, pred_final in zip(fechas_futuras, preds):
+        # Calcular intervalo de confianza (±15% empírico)
+        intervalo_inferior = max(0, pred_final * 0.85)
+        intervalo_superior = pred_final * 1.15
+
+        predicciones.append({
+            'fecha': fecha_futura.strftime('%Y-%m-%d'),
+            'mes': fecha_futura.strftime('%B %Y'),
+            'cantidad_predicha': round(float(pred_final), 1),
+            'intervalo_inferior': round(float(intervalo_inferior), 1),
+            'intervalo_superior': round(float(intervalo_superior), 1),
+            'confianza': 0.85  # 85% de confianza empírica
+        })
+
+    # Calcular métricas de calidad del modelo
+    y_pred_train = 0.3 * model_linear.predict(X_scaled) + 0.7 * model_rf.predict(X_scaled)
+    mae = np.mean(np.abs(y - y_pred_train))
+    mse = np.mean((y - y_pred_train) ** 2)
+    rmse = np.sqrt(mse)
+
+    # R² Score
+    r2 = r2_score(y, y_pred_train)
+
+    return {
+        'predicciones': predicciones,
+        'datos_historicos_usados': len(df),
+        'metricas': {
+            'mae': round(mae, 2),
+            'rmse': round(rmse, 2),
+            'r2_score': round(r2, 3),
+            'precision_estimada': f"{max(0, min(100, (1 - mae / y.mean()) * 100)):.1f}%"
+        },
+        'tendencia': 'creciente' if df['cantidad'].iloc[-1] > df['cantidad'].mean() else 'decreciente'
+    }
+
+
+def _pronosticar_lote(registros: List[Dict[str, Any]], meses_adelante: int) -> Dict[Any, Dict[str, Any]]:
+    """
+    Entrena y predice varias series en un solo proceso del pool.
+
+    Args:
+        registros: Filas {clave, fecha, cantidad} de todas las series del lote
+        meses_adelante: Número de meses a predecir
+
+    Returns:
+        Dict clave -> resultado con el mismo formato que predecir_demanda_servicio
+    """
+    df = _features_demanda_lote(pd.DataFrame(registros))
+
+    resultados = {}
+    for clave, serie in df.groupby('clave', sort=False):
+        if len(serie) < 3:
+            resultados[clave] = {
+                'error': 'Insuficientes datos históricos (mínimo 3 meses)',
+                'predicciones': []
+            }
+            continue
+        modelos = _ajustar_modelos(serie.reset_index(drop=True))
+        resultados[clave] = _predecir_demanda(modelos, meses_adelante)
+    return resultados
+
+
 class DemandPredictor:
     """
     Predictor de demanda de servicios usando ML
+
+    Los modelos entrenados se cachean por (clave_modelo, huella de datos):
+    solo se reentrena cuando aparece un mes nuevo o cambia la serie.
     """
     
     def __init__(self):
-        self.model_linear = LinearRegression()
-        self.model_rf = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.scaler = StandardScaler()
-        self.is_trained = False
+        self._modelos = SingleFlightCache(max_entries=ANALYTICS_MODEL_CACHE_SIZE)
     
     async def predecir_demanda_servicio(
         self, 
         datos_historicos: List[Dict[str, Any]], 
-        meses_adelante: int = 3
+        meses_adelante: int = 3,
+        clave_modelo: str = "TODOS_LOS_SERVICIOS",
     ) -> Dict[str, Any]:
         """
         Predice la demanda de un servicio para los próximos N meses
@@ -36,6 +279,7 @@ class DemandPredictor:
         Args:
             datos_historicos: Lista de dicts con {fecha, cantidad, ingresos}
             meses_adelante: Número de meses a predecir
+            clave_modelo: Identificador de la serie (ej. "servicio:12")
             
         Returns:
             Dict con predicciones, intervalos de confianza y métricas
@@ -46,87 +290,157 @@ class DemandPredictor:
                 'predicciones': []
             }
         
-        # Convertir a DataFrame
-        df = pd.DataFrame(datos_historicos)
-        df['fecha'] = pd.to_datetime(df['fecha'])
-        df = df.sort_values('fecha')
-        
-        # Feature engineering
-        df['mes_numero'] = df['fecha'].dt.month
-        df['anio'] = df['fecha'].dt.year
-        df['mes_indice'] = range(len(df))
-        df['tendencia'] = df['cantidad'].rolling(window=3, min_periods=1).mean()
-        df['estacionalidad'] = df.groupby('mes_numero')['cantidad'].transform('mean')
+        modelos = await self._modelos.get_or_compute(
+            (clave_modelo, huella_datos(datos_historicos)),
+            lambda: _run_in_pool(_entrenar_modelos_demanda, datos_historicos),
+            ttl=ANALYTICS_MODEL_TTL_SECONDS,
+        )
         
-        # Preparar datos de entrenamiento
-        X = df[['mes_indice', 'mes_numero', 'tendencia', 'estacionalidad']].values
-        y = df['cantidad'].values
+        return await _run_in_pool(_predecir_demanda, modelos, meses_adelante)
+
+    def cache_info(self) -> Dict[str, Any]:
+        """Contadores del caché de modelos (entrenamientos = misses)."""
+        return self._modelos.info()
+
+    async def predecir_demanda_lote(
+        self,
+        registros: List[Dict[str, Any]],
+        meses_adelante: int = 3,
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        Predice la demanda de muchas series en paralelo.
+
+        Las series se reparten en tantos lotes como workers tenga el pool;
+        cada lote calcula sus features con un solo groupby y ajusta sus
+        modelos dentro del mismo proceso.
+
+        Args:
+            registros: Filas {clave, fecha, cantidad} de todas las series
+            meses_adelante: Número de meses a predecir
+
+        Returns:
+            Dict clave -> resultado de predecir_demanda_servicio
+        """
+        if not registros:
+            return {}
+
+        claves = list(dict.fromkeys(r['clave'] for r in registros))
+        num_lotes = max(1, min(ANALYTICS_ML_WORKERS, len(claves)))
+        lote_de = {clave: i % num_lotes for i, clave in enumerate(claves)}
+
+        lotes: List[List[Dict[str, Any]]] = [[] for _ in range(num_lotes)]
+        for r in registros:
+            lotes[lote_de[r['clave']]].append(r)
+
+        parciales = await asyncio.gather(*(
+            _run_in_pool(_pronosticar_lote, lote, meses_adelante) for lote in lotes
+        ))
+
+        resultados: Dict[Any, Dict[str, Any]] = {}
+        for parcial in parciales:
+            resultados.update(parcial)
+        return resultados
+
+
+def _forecast_ingresos_sync(
+    datos_historicos: List[Dict[str, Any]],
+    meses_adelante: int
+) -> Dict[str, Any]:
+    """Implementación CPU-bound de FinancialForecaster.forecast_ingresos."""
+    if len(datos_historicos) < 6:
+        return {
+            'error': 'Insuficientes datos (mínimo 6 meses)',
+            'forecast': []
+        }
+    
+    # Convertir a DataFrame
+    df = pd.DataFrame(datos_historicos)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    df = df.sort_values('fecha')
+    
+    # Calcular utilidad neta histórica
+    df['utilidad_neta'] = df['ingresos'] - df['gastos']
+    df['margen_utilidad'] = (df['utilidad_neta'] / df['ingresos']) * 100
+    
+    # Feature engineering temporal
+    df['mes_indice'] = range(len(df))
+    df['mes_numero'] = df['fecha'].dt.month
+    df['ingresos_ma3'] = df['ingresos'].rolling(window=3, min_periods=1).mean()
+    df['gastos_ma3'] = df['gastos'].rolling(window=3, min_periods=1).mean()
+    
+    # Modelo de regresión lineal para ingresos
+    X = df[['mes_indice', 'mes_numero']].values
+    y_ingresos = df['ingresos'].values
+    y_gastos = df['gastos'].values
+    
+    model_ingresos = LinearRegression()
+    model_gastos = LinearRegression()
+    
+    model_ingresos.fit(X, y_ingresos)
+    model_gastos.fit(X, y_gastos)
+    
+    # Generar forecast
+    ultima_fecha = df['fecha'].max()
+    forecast = []
+    
+    for i in range(1, meses_adelante + 1):
+        fecha_futura = ultima_fecha + pd.DateOffset(months=i)
+        mes_numero = fecha_futura.month
+        mes_indice = len(df) + i - 1
         
-        # Normalizar features
-        X_scaled = self.scaler.fit_transform(X)
+        X_futuro = np.array([[mes_indice, mes_numero]])
         
-        # Entrenar modelos
-        self.model_linear.fit(X_scaled, y)
-        self.model_rf.fit(X_scaled, y)
+        # Predicción base
+        ingresos_pred = model_ingresos.predict(X_futuro)[0]
+        gastos_pred = model_gastos.predict(X_futuro)[0]
         
-        # Generar predicciones para los próximos meses
-        ultima_fecha = df['fecha'].max()
-        predicciones = []
+        # Ajuste por estacionalidad
+        factor_estacional_ing = df[df['mes_numero'] == mes_numero]['ingresos'].mean() / df['ingresos'].mean() if len(df[df['mes_numero'] == mes_numero]) > 0 else 1.0
+        factor_estacional_gas = df[df['mes_numero'] == mes_numero]['gastos'].mean() / df['gastos'].mean() if len(df[df['mes_numero'] == mes_numero]) > 0 else 1.0
         
-        for i in range(1, meses_adelante + 1):
-            fecha_futura = ultima_fecha + pd.DateOffset(months=i)
-            mes_numero = fecha_futura.month
-            mes_indice = len(df) + i - 1
-            
-            # Calcular tendencia y estacionalidad proyectadas
-            tendencia_proy = df['cantidad'].tail(3).mean()
-            estacionalidad_proy = df[df['mes_numero'] == mes_numero]['cantidad'].mean() if len(df[df['mes_numero'] == mes_numero]) > 0 else df['cantidad'].mean()
-            
-            # Feature vector
-            X_futuro = np.array([[mes_indice, mes_numero, tendencia_proy, estacionalidad_proy]])
-            X_futuro_scaled = self.scaler.transform(X_futuro)
-            
-            # Predicción con ambos modelos
-            pred_linear = self.model_linear.predict(X_futuro_scaled)[0]
-            pred_rf = self.model_rf.predict(X_futuro_scaled)[0]
-            
-            # Promedio ponderado (RF tiene más peso)
-            pred_final = 0.3 * pred_linear + 0.7 * pred_rf
-            
-            # Calcular intervalo de confianza (±15% empírico)
-            intervalo_inferior = max(0, pred_final * 0.85)
-            intervalo_superior = pred_final * 1.15
-            
-            predicciones.append({
-                'fecha': fecha_futura.strftime('%Y-%m-%d'),
-                'mes': fecha_futura.strftime('%B %Y'),
-                'cantidad_predicha': round(pred_final, 1),
-                'intervalo_inferior': round(intervalo_inferior, 1),
-                'intervalo_superior': round(intervalo_superior, 1),
-                'confianza': 0.85  # 85% de confianza empírica
-            })
+        ingresos_pred *= factor_estacional_ing
+        gastos_pred *= factor_estacional_gas
         
-        # Calcular métricas de calidad del modelo
-        y_pred_train = 0.3 * self.model_linear.predict(X_scaled) + 0.7 * self.model_rf.predict(X_scaled)
-        mae = np.mean(np.abs(y - y_pred_train))
-        mse = np.mean((y - y_pred_train) ** 2)
-        rmse = np.sqrt(mse)
+        # Asegurar valores positivos
+        ingresos_pred = max(0, ingresos_pred)
+        gastos_pred = max(0, gastos_pred)
         
-        # R² Score
-        from sklearn.metrics import r2_score
-        r2 = r2_score(y, y_pred_train)
+        utilidad_pred = ingresos_pred - gastos_pred
+        margen_pred = (utilidad_pred / ingresos_pred * 100) if ingresos_pred > 0 else 0
         
-        return {
-            'predicciones': predicciones,
-            'datos_historicos_usados': len(df),
-            'metricas': {
-                'mae': round(mae, 2),
-                'rmse': round(rmse, 2),
-                'r2_score': round(r2, 3),
-                'precision_estimada': f"{max(0, min(100, (1 - mae / y.mean()) * 100)):.1f}%"
-            },
-            'tendencia': 'creciente' if df['cantidad'].iloc[-1] > df['cantidad'].mean() else 'decreciente'
+        forecast.append({
+            'fecha': fecha_futura.strftime('%Y-%m-%d'),
+            'mes': fecha_futura.strftime('%B %Y'),
+            'ingresos_predichos': round(ingresos_pred, 2),
+            'gastos_predichos': round(gastos_pred, 2),
+            'utilidad_neta_predicha': round(utilidad_pred, 2),
+            'margen_utilidad_predicho': round(margen_pred, 2),
+            'intervalo_ingresos': {
+                'inferior': round(ingresos_pred * 0.90, 2),
+                'superior': round(ingresos_pred * 1.10, 2)
+            }
+        })
+    
+    # Métricas del modelo
+    y_pred_ing = model_ingresos.predict(X)
+    mae_ingresos = np.mean(np.abs(y_ingresos - y_pred_ing))
+    
+    return {
+        'forecast': forecast,
+        'metricas': {
+            'datos_historicos': len(df),
+            'mae_ingresos': round(mae_ingresos, 2),
+            'tendencia_ingresos': 'creciente' if df['ingresos'].iloc[-1] > df['ingresos'].mean() else 'decreciente',
+            'promedio_margen_utilidad': round(df['margen_utilidad'].mean(), 2)
+        },
+        'resumen_historico': {
+            'ingresos_promedio': round(df['ingresos'].mean(), 2),
+            'gastos_promedio': round(df['gastos'].mean(), 2),
+            'utilidad_promedio': round(df['utilidad_neta'].mean(), 2),
+            'mejor_mes': df.loc[df['ingresos'].idxmax(), 'fecha'].strftime('%B %Y'),
+            'peor_mes': df.loc[df['ingresos'].idxmin(), 'fecha'].strftime('%B %Y')
         }
+    }
 
 
 class FinancialForecaster:
@@ -149,105 +463,59 @@ class FinancialForecaster:
         Returns:
             Dict con forecast de ingresos, gastos y utilidad neta
         """
-        if len(datos_historicos) < 6:
-            return {
-                'error': 'Insuficientes datos (mínimo 6 meses)',
-                'forecast': []
-            }
-        
-        # Convertir a DataFrame
-        df = pd.DataFrame(datos_historicos)
-        df['fecha'] = pd.to_datetime(df['fecha'])
-        df = df.sort_values('fecha')
-        
-        # Calcular utilidad neta histórica
-        df['utilidad_neta'] = df['ingresos'] - df['gastos']
-        df['margen_utilidad'] = (df['utilidad_neta'] / df['ingresos']) * 100
-        
-        # Feature engineering temporal
-        df['mes_indice'] = range(len(df))
-        df['mes_numero'] = df['fecha'].dt.month
-        df['ingresos_ma3'] = df['ingresos'].rolling(window=3, min_periods=1).mean()
-        df['gastos_ma3'] = df['gastos'].rolling(window=3, min_periods=1).mean()
-        
-        # Modelo de regresión lineal para ingresos
-        X = df[['mes_indice', 'mes_numero']].values
-        y_ingresos = df['ingresos'].values
-        y_gastos = df['gastos'].values
-        
-        model_ingresos = LinearRegression()
-        model_gastos = LinearRegression()
-        
-        model_ingresos.fit(X, y_ingresos)
-        model_gastos.fit(X, y_gastos)
-        
-        # Generar forecast
-        ultima_fecha = df['fecha'].max()
-        forecast = []
-        
-        for i in range(1, meses_adelante + 1):
-            fecha_futura = ultima_fecha + pd.DateOffset(months=i)
-            mes_numero = fecha_futura.month
-            mes_indice = len(df) + i - 1
-            
-            X_futuro = np.array([[mes_indice, mes_numero]])
-            
-            # Predicción base
-            ingresos_pred = model_ingresos.predict(X_futuro)[0]
-            gastos_pred = model_gastos.predict(X_futuro)[0]
-            
-            # Ajuste por estacionalidad
-            factor_estacional_ing = df[df['mes_numero'] == mes_numero]['ingresos'].mean() / df['ingresos'].mean() if len(df[df['mes_numero'] == mes_numero]) > 0 else 1.0
-            factor_estacional_gas = df[df['mes_numero'] == mes_numero]['gastos'].mean() / df['gastos'].mean() if len(df[df['mes_numero'] == mes_numero]) > 0 else 1.0
-            
-            ingresos_pred *= factor_estacional_ing
-            gastos_pred *= factor_estacional_gas
-            
-            # Asegurar valores positivos
-            ingresos_pred = max(0, ingresos_pred)
-            gastos_pred = max(0, gastos_pred)
-            
-            utilidad_pred = ingresos_pred - gastos_pred
-            margen_pred = (utilidad_pred / ingresos_pred * 100) if ingresos_pred > 0 else 0
-            
-            forecast.append({
-                'fecha': fecha_futura.strftime('%Y-%m-%d'),
-                'mes': fecha_futura.strftime('%B %Y'),
-                'ingresos_predichos': round(ingresos_pred, 2),
-                'gastos_predichos': round(gastos_pred, 2),
-                'utilidad_neta_predicha': round(utilidad_pred, 2),
-                'margen_utilidad_predicho': round(margen_pred, 2),
-                'intervalo_ingresos': {
-                    'inferior': round(ingresos_pred * 0.90, 2),
-                    'superior': round(ingresos_pred * 1.10, 2)
-                }
-            })
-        
-        # Métricas del modelo
-        y_pred_ing = model_ingresos.predict(X)
-        mae_ingresos = np.mean(np.abs(y_ingresos - y_pred_ing))
-        
-        return {
-            'forecast': forecast,
-            'metricas': {
-                'datos_historicos': len(df),
-                'mae_ingresos': round(mae_ingresos, 2),
-                'tendencia_ingresos': 'creciente' if df['ingresos'].iloc[-1] > df['ingresos'].mean() else 'decreciente',
-                'promedio_margen_utilidad': round(df['margen_utilidad'].mean(), 2)
-            },
-            'resumen_historico': {
-                'ingresos_promedio': round(df['ingresos'].mean(), 2),
-                'gastos_promedio': round(df['gastos'].mean(), 2),
-                'utilidad_promedio': round(df['utilidad_neta'].mean(), 2),
-                'mejor_mes': df.loc[df['ingresos'].idxmax(), 'fecha'].strftime('%B %Y'),
-                'peor_mes': df.loc[df['ingresos'].idxmin(), 'fecha'].strftime('%B %Y')
-            }
-        }
+        return await _run_in_pool(
+            _forecast_ingresos_sync, datos_historicos, meses_adelante
+        )
+
+
+# Ventana de consumo y nivel de servicio para el stock de seguridad
+VENTANA_CONSUMO_DIAS = 30
+INVENTARIO_Z_SERVICIO = float(os.getenv("INVENTARIO_Z_SERVICIO", "1.65"))  # ~95%
+
+
+def consumo_desde_movimientos(
+    historial_movimientos: List[Dict[str, Any]],
+    ventana_dias: int = VENTANA_CONSUMO_DIAS,
+) -> pd.DataFrame:
+    """
+    Agrega salidas de inventario por producto.
+
+    Primero suma por (producto, día) y luego por producto, igual que la
+    consulta sobre ``consumo_diario_productos``.
+
+    Args:
+        historial_movimientos: Lista de dicts con {producto_id, fecha, cantidad}
+        ventana_dias: Días hacia atrás a considerar
+
+    Returns:
+        DataFrame indexado por producto_id con columnas {total, suma_cuadrados}
+    """
+    if not historial_movimientos:
+        return pd.DataFrame(columns=['total', 'suma_cuadrados'])
+
+    df = pd.DataFrame(historial_movimientos, columns=['producto_id', 'fecha', 'cantidad'])
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    df = df[df['fecha'] >= datetime.now() - timedelta(days=ventana_dias)]
+
+    diario = df.groupby(['producto_id', df['fecha'].dt.normalize()])['cantidad'].sum()
+    por_producto = diario.groupby(level=0)
+    return pd.DataFrame({
+        'total': por_producto.sum(),
+        'suma_cuadrados': (diario ** 2).groupby(level=0).sum(),
+    })
+
+
+def _valor(x):
+    """numpy -> tipo nativo para la respuesta JSON."""
+    return x.item() if hasattr(x, 'item') else x
 
 
 class InventoryAnalyzer:
     """
     Analizador de inventario para alertas de reorden
+
+    Todos los productos se evalúan con operaciones vectorizadas sobre
+    arreglos; solo los productos con alerta se convierten a dict.
     """
     
     async def analizar_puntos_reorden(
@@ -265,96 +533,133 @@ class InventoryAnalyzer:
         Returns:
             Dict con alertas, recomendaciones y análisis
         """
-        alertas = []
-        recomendaciones = []
-        
-        # Crear DataFrame de movimientos
-        if historial_movimientos:
-            df_mov = pd.DataFrame(historial_movimientos)
-            df_mov['fecha'] = pd.to_datetime(df_mov['fecha'])
-            
-            # Calcular consumo promedio por producto (últimos 30 días)
-            fecha_limite = datetime.now() - timedelta(days=30)
-            df_reciente = df_mov[df_mov['fecha'] >= fecha_limite]
-            
-            consumo_diario = df_reciente.groupby('producto_id')['cantidad'].sum() / 30
-            consumo_dict = consumo_diario.to_dict()
-        else:
-            consumo_dict = {}
-        
-        # Analizar cada producto
-        for producto in productos:
-            producto_id = producto['producto_id']
-            stock_actual = producto['stock_actual']
-            stock_minimo = producto['stock_minimo']
-            stock_maximo = producto['stock_maximo']
-            tiempo_reposicion = producto.get('tiempo_reposicion_dias', 7)
-            
-            # Punto de reorden = stock_minimo * 1.2
-            punto_reorden = stock_minimo * 1.2
-            
-            # Calcular días de inventario restantes
-            consumo_diario_producto = consumo_dict.get(producto_id, 0)
-            if consumo_diario_producto > 0:
-                dias_restantes = stock_actual / consumo_diario_producto
-                cantidad_optima = consumo_diario_producto * (tiempo_reposicion + 7)  # Lead time + 1 semana buffer
-            else:
-                dias_restantes = float('inf')
-                cantidad_optima = stock_maximo
-            
-            # Generar alertas según nivel de criticidad
-            if stock_actual <= stock_minimo:
-                alertas.append({
-                    'producto_id': producto_id,
-                    'codigo': producto['codigo_producto'],
-                    'nombre': producto['nombre'],
-                    'nivel': 'CRITICO',
-                    'stock_actual': stock_actual,
-                    'stock_minimo': stock_minimo,
-                    'deficit': stock_minimo - stock_actual,
-                    'dias_restantes': round(dias_restantes, 1) if dias_restantes != float('inf') else 'N/A',
-                    'accion': 'ORDENAR INMEDIATAMENTE',
-                    'cantidad_sugerida': max(stock_maximo - stock_actual, cantidad_optima)
-                })
-            elif stock_actual <= punto_reorden:
-                alertas.append({
-                    'producto_id': producto_id,
-                    'codigo': producto['codigo_producto'],
-                    'nombre': producto['nombre'],
-                    'nivel': 'ADVERTENCIA',
-                    'stock_actual': stock_actual,
-                    'punto_reorden': punto_reorden,
-                    'dias_restantes': round(dias_restantes, 1) if dias_restantes != float('inf') else 'N/A',
-                    'accion': 'Planificar pedido pronto',
-                    'cantidad_sugerida': cantidad_optima
-                })
-            
-            # Generar recomendaciones de optimización
-            if stock_actual > stock_maximo * 1.5:
-                recomendaciones.append({
-                    'producto_id': producto_id,
-                    'nombre': producto['nombre'],
-                    'tipo': 'EXCESO',
-                    'stock_actual': stock_actual,
-                    'stock_maximo': stock_maximo,
-                    'exceso': stock_actual - stock_maximo,
-                    'recomendacion': 'Reducir pedidos futuros o promocionar',
-                    'costo_oportunidad': round((stock_actual - stock_maximo) * producto.get('costo_unitario', 0), 2)
-                })
-        
-        # Ordenar alertas por nivel de criticidad
-        alertas_criticas = [a for a in alertas if a['nivel'] == 'CRITICO']
-        alertas_advertencia = [a for a in alertas if a['nivel'] == 'ADVERTENCIA']
-        
+        return self.evaluar_reorden(productos, consumo_desde_movimientos(historial_movimientos))
+
+    def evaluar_reorden(
+        self,
+        productos: List[Dict[str, Any]],
+        consumo: pd.DataFrame,
+        ventana_dias: int = VENTANA_CONSUMO_DIAS,
+    ) -> Dict[str, Any]:
+        """
+        Evalúa puntos de reorden a partir del consumo ya agregado.
+
+        - consumo_diario = total / ventana
+        - desviación = sqrt(E[x²] - E[x]²) del consumo diario (días sin
+          salidas cuentan como 0)
+        - stock_seguridad = z * desviación * sqrt(tiempo de reposición)
+        - punto_reorden = max(stock_minimo * 1.2,
+                              consumo_diario * reposición + stock_seguridad)
+
+        Args:
+            productos: Lista de productos con stock actual, mínimo, máximo
+            consumo: DataFrame indexado por producto_id con {total, suma_cuadrados}
+            ventana_dias: Días que cubre ``consumo``
+
+        Returns:
+            Dict con alertas, recomendaciones y análisis
+        """
+        if not productos:
+            return self._respuesta([], [], [], 0)
+
+        dfp = pd.DataFrame(productos)
+        if 'tiempo_reposicion_dias' not in dfp:
+            dfp['tiempo_reposicion_dias'] = 7
+        if 'costo_unitario' not in dfp:
+            dfp['costo_unitario'] = 0
+
+        agregado = consumo.reindex(dfp['producto_id']).fillna(0)
+        consumo_diario = agregado['total'].to_numpy(dtype=float) / ventana_dias
+        varianza = agregado['suma_cuadrados'].to_numpy(dtype=float) / ventana_dias - consumo_diario ** 2
+        desviacion = np.sqrt(np.maximum(varianza, 0))
+
+        stock_actual = dfp['stock_actual'].to_numpy(dtype=float)
+        stock_minimo = dfp['stock_minimo'].to_numpy(dtype=float)
+        stock_maximo = dfp['stock_maximo'].to_numpy(dtype=float)
+        reposicion = dfp['tiempo_reposicion_dias'].fillna(7).to_numpy(dtype=float)
+        costo = dfp['costo_unitario'].fillna(0).to_numpy(dtype=float)
+
+        stock_seguridad = INVENTARIO_Z_SERVICIO * desviacion * np.sqrt(reposicion)
+        punto_reorden = np.maximum(stock_minimo * 1.2, consumo_diario * reposicion + stock_seguridad)
+
+        con_consumo = consumo_diario > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dias_restantes = np.where(con_consumo, stock_actual / consumo_diario, np.inf)
+        # Lead time + 1 semana buffer
+        cantidad_optima = np.where(con_consumo, consumo_diario * (reposicion + 7), stock_maximo)
+
+        criticos = np.flatnonzero(stock_actual <= stock_minimo)
+        advertencias = np.flatnonzero((stock_actual > stock_minimo) & (stock_actual <= punto_reorden))
+        excesos = np.flatnonzero(stock_actual > stock_maximo * 1.5)
+
+        ids = dfp['producto_id'].to_numpy()
+        codigos = dfp['codigo_producto'].to_numpy()
+        nombres = dfp['nombre'].to_numpy()
+
+        def dias(i):
+            return round(float(dias_restantes[i]), 1) if np.isfinite(dias_restantes[i]) else 'N/A'
+
+        alertas_criticas = [
+            {
+                'producto_id': _valor(ids[i]),
+                'codigo': codigos[i],
+                'nombre': nombres[i],
+                'nivel': 'CRITICO',
+                'stock_actual': float(stock_actual[i]),
+                'stock_minimo': float(stock_minimo[i]),
+                'deficit': float(stock_minimo[i] - stock_actual[i]),
+                'dias_restantes': dias(i),
+                'consumo_diario': round(float(consumo_diario[i]), 3),
+                'stock_seguridad': round(float(stock_seguridad[i]), 2),
+                'accion': 'ORDENAR INMEDIATAMENTE',
+                'cantidad_sugerida': float(max(stock_maximo[i] - stock_actual[i], cantidad_optima[i]))
+            }
+            for i in criticos
+        ]
+        alertas_advertencia = [
+            {
+                'producto_id': _valor(ids[i]),
+                'codigo': codigos[i],
+                'nombre': nombres[i],
+                'nivel': 'ADVERTENCIA',
+                'stock_actual': float(stock_actual[i]),
+                'punto_reorden': round(float(punto_reorden[i]), 2),
+                'dias_restantes': dias(i),
+                'consumo_diario': round(float(consumo_diario[i]), 3),
+                'stock_seguridad': round(float(stock_seguridad[i]), 2),
+                'accion': 'Planificar pedido pronto',
+                'cantidad_sugerida': float(cantidad_optima[i])
+            }
+            for i in advertencias
+        ]
+        # Generar recomendaciones de optimización
+        recomendaciones = [
+            {
+                'producto_id': _valor(ids[i]),
+                'nombre': nombres[i],
+                'tipo': 'EXCESO',
+                'stock_actual': float(stock_actual[i]),
+                'stock_maximo': float(stock_maximo[i]),
+                'exceso': float(stock_actual[i] - stock_maximo[i]),
+                'recomendacion': 'Reducir pedidos futuros o promocionar',
+                'costo_oportunidad': round(float((stock_actual[i] - stock_maximo[i]) * costo[i]), 2)
+            }
+            for i in excesos
+        ]
+
+        return self._respuesta(alertas_criticas, alertas_advertencia, recomendaciones, len(dfp))
+
+    @staticmethod
+    def _respuesta(alertas_criticas, alertas_advertencia, recomendaciones, productos_analizados):
         return {
             'alertas_criticas': alertas_criticas,
             'alertas_advertencia': alertas_advertencia,
             'recomendaciones': recomendaciones,
             'resumen': {
-                'total_alertas': len(alertas),
+                'total_alertas': len(alertas_criticas) + len(alertas_advertencia),
                 'criticos': len(alertas_criticas),
                 'advertencias': len(alertas_advertencia),
-                'productos_analizados': len(productos),
+                'productos_analizados': productos_analizados,
                 'necesitan_reorden': len(alertas_criticas) + len(alertas_advertencia)
             }
         }
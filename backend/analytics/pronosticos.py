@@ -0,0 +1,194 @@
+"""
+Pronósticos de demanda por lote
+===============================
+Pronostica todos los servicios en una sola pasada:
+
+1. Una consulta agrupada trae la serie mensual de cada servicio.
+2. DemandPredictor.predecir_demanda_lote reparte las series en el pool de
+   procesos y calcula las features con groupby vectorizado.
+3. La tarea periódica tasks.pronosticos.generar_pronosticos_demanda guarda
+   los resultados en ``pronosticos_demanda``
+   (data/migrations/22_pronosticos_demanda.sql) y /metricas-predictivas
+   los reutiliza mientras no superen PRONOSTICOS_MAX_AGE_HOURS. El GET
+   /predicciones-demanda/lote solo calcula y responde.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+import asyncpg
+
+from db import get_pool
+from analytics.predictor import _pronosticar_lote, demand_predictor
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+PRONOSTICOS_MAX_AGE_HOURS = float(os.getenv("PRONOSTICOS_MAX_AGE_HOURS", "24"))
+
+
+_SERIES_SERVICIOS = """
+    SELECT
+        c.tratamiento_id AS servicio_id,
+        DATE_TRUNC('month', c.fecha_cita) AS fecha,
+        COUNT(*) AS cantidad
+    FROM citas c
+    WHERE c.tratamiento_id IS NOT NULL
+      AND c.fecha_cita >= NOW() - INTERVAL '12 months'
+    GROUP BY c.tratamiento_id, DATE_TRUNC('month', c.fecha_cita)
+    ORDER BY c.tratamiento_id, fecha
+"""
+
+# catalogo_servicios tiene id (data/10_catalogo_servicios.sql) o servicio_id
+# según la instalación, y categoria o categoria_servicio: to_jsonb tolera
+# todas las variantes
+_INFO_SERVICIOS = """
+    SELECT servicio_id, datos->>'nombre' AS nombre,
+           COALESCE(datos->>'categoria', datos->>'categoria_servicio') AS categoria
+    FROM (
+        SELECT COALESCE(to_jsonb(cs)->>'servicio_id', to_jsonb(cs)->>'id')::int AS servicio_id,
+               to_jsonb(cs) AS datos
+        FROM catalogo_servicios cs
+    ) s
+    WHERE servicio_id = ANY($1::int[])
+"""
+
+
+async def _registros(conn) -> List[Dict[str, Any]]:
+    """Serie mensual de todos los servicios en una sola consulta."""
+    filas = await conn.fetch(_SERIES_SERVICIOS)
+    return [
+        {'clave': f['servicio_id'], 'fecha': f['fecha'], 'cantidad': int(f['cantidad'])}
+        for f in filas
+    ]
+
+
+async def _info_servicios(conn, servicio_ids: List[int]) -> Dict[int, Any]:
+    """Nombre y categoría de cada servicio ({} si el catálogo no existe)."""
+    try:
+        filas = await conn.fetch(_INFO_SERVICIOS, servicio_ids)
+    except asyncpg.PostgresError as e:
+        logger.warning(f"Catálogo de servicios no disponible para los pronósticos: {e}")
+        return {}
+    return {f['servicio_id']: f for f in filas}
+
+
+async def pronosticar_todos_los_servicios(meses_adelante: int = 3) -> Dict[str, Any]:
+    """
+    Genera el pronóstico de demanda de todos los servicios (sin guardarlo;
+    la tarea de Celery tasks.pronosticos lo persiste).
+
+    Args:
+        meses_adelante: Número de meses a predecir
+
+    Returns:
+        Dict con la lista de pronósticos por servicio
+    """
+    pool = get_pool()
+    registros = await _registros(pool)
+    if not registros:
+        return {'meses_adelante': meses_adelante, 'total_servicios': 0, 'servicios': []}
+
+    resultados = await demand_predictor.predecir_demanda_lote(registros, meses_adelante)
+    info = await _info_servicios(pool, list(resultados.keys()))
+
+    return {
+        'meses_adelante': meses_adelante,
+        'generado_en': datetime.now().isoformat(),
+        'total_servicios': len(resultados),
+        'servicios': [
+            {
+                'servicio': {
+                    'servicio_id': servicio_id,
+                    'nombre': info[servicio_id]['nombre'] if servicio_id in info else None,
+                    'categoria': info[servicio_id]['categoria'] if servicio_id in info else None,
+                },
+                **resultado,
+            }
+            for servicio_id, resultado in resultados.items()
+        ],
+    }
+
+
+async def generar_pronosticos(conn, meses_adelante: int = 3) -> int:
+    """
+    Recalcula y guarda el pronóstico de todos los servicios. Usada por la
+    tarea periódica de Celery: el cálculo corre en el proceso del worker
+    (los procesos prefork no pueden crear el pool de ML).
+
+    Args:
+        conn: Conexión asyncpg
+        meses_adelante: Número de meses a predecir
+
+    Returns:
+        Número de servicios pronosticados
+    """
+    registros = await _registros(conn)
+    resultados = _pronosticar_lote(registros, meses_adelante) if registros else {}
+    await guardar_pronosticos(resultados, meses_adelante, conn)
+    return len(resultados)
+
+
+_UPSERT_PRONOSTICOS = """
+    INSERT INTO pronosticos_demanda (servicio_id, meses_adelante, resultado, generado_en)
+    VALUES ($1, $2, $3::jsonb, CURRENT_TIMESTAMP)
+    ON CONFLICT (servicio_id) DO UPDATE SET
+        meses_adelante = EXCLUDED.meses_adelante,
+        resultado = EXCLUDED.resultado,
+        generado_en = EXCLUDED.generado_en
+"""
+
+
+async def guardar_pronosticos(resultados: Dict[int, Dict[str, Any]], meses_adelante: int, conn=None) -> None:
+    """Guarda (upsert) el último pronóstico de cada servicio."""
+    filas = [
+        (servicio_id, meses_adelante, json.dumps(resultado))
+        for servicio_id, resultado in resultados.items()
+        if resultado.get('predicciones')
+    ]
+    if not filas:
+        return
+
+    try:
+        if conn is not None:
+            await conn.executemany(_UPSERT_PRONOSTICOS, filas)
+        else:
+            async with get_pool().acquire() as conn:
+                await conn.executemany(_UPSERT_PRONOSTICOS, filas)
+    except Exception as e:
+        # Migración 22 no aplicada: el pronóstico se devuelve igual
+        logger.warning(f"No se pudieron guardar los pronósticos de demanda: {e}")
+
+
+async def leer_pronosticos(servicio_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Lee los pronósticos persistidos que aún están vigentes.
+
+    Args:
+        servicio_ids: Servicios a consultar
+
+    Returns:
+        Dict servicio_id -> resultado (solo los vigentes)
+    """
+    try:
+        filas = await get_pool().fetch(
+            """
+            SELECT servicio_id, resultado
+            FROM pronosticos_demanda
+            WHERE servicio_id = ANY($1::int[])
+              AND generado_en >= CURRENT_TIMESTAMP - make_interval(secs => $2)
+            """,
+            list(servicio_ids),
+            PRONOSTICOS_MAX_AGE_HOURS * 3600,
+        )
+    except Exception as e:
+        logger.debug(f"Pronósticos persistidos no disponibles: {e}")
+        return {}
+
+    return {
+        f['servicio_id']: json.loads(f['resultado']) if isinstance(f['resultado'], str) else dict(f['resultado'])
+        for f in filas
+    }
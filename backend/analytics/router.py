@@ -7,17 +7,21 @@ from datetime import datetime, timedelta
 from typing import Optional
 
 from auth import get_current_user
+from cache import cached
 from db import get_db_connection_citas
 from analytics.predictor import (
     demand_predictor,
     financial_forecaster,
     inventory_analyzer
 )
+from analytics.consumo import consumo_por_producto
+from analytics.pronosticos import leer_pronosticos, pronosticar_todos_los_servicios
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
 
 @router.get("/predicciones-demanda")
+@cached("analytics.predicciones_demanda", ttl=300, stale_ttl=900, tags=("citas", "pagos"))
 async def predecir_demanda_servicio(
     servicio_id: Optional[int] = Query(None, description="ID del servicio a predecir"),
     meses_adelante: int = Query(3, ge=1, le=12, description="Meses a predecir"),
@@ -72,7 +76,7 @@ async def predecir_demanda_servicio(
             
             # Generar predicción
             prediccion = await demand_predictor.predecir_demanda_servicio(
-                datos, meses_adelante
+                datos, meses_adelante, clave_modelo=f"servicio:{servicio_id}"
             )
             
             return {
@@ -120,7 +124,23 @@ async def predecir_demanda_servicio(
         await conn.close()
 
 
+@router.get("/predicciones-demanda/lote")
+@cached("analytics.predicciones_demanda_lote", ttl=300, stale_ttl=900, tags=("citas",))
+async def predecir_demanda_todos_los_servicios(
+    meses_adelante: int = Query(3, ge=1, le=12, description="Meses a predecir"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Predice la demanda de todos los servicios en una sola llamada.
+
+    No guarda nada: /metricas-predictivas usa los pronósticos que guarda la
+    tarea periódica tasks.pronosticos.generar_pronosticos_demanda.
+    """
+    return await pronosticar_todos_los_servicios(meses_adelante)
+
+
 @router.get("/forecast-ingresos")
+@cached("analytics.forecast_ingresos", ttl=300, stale_ttl=900, tags=("pagos", "gastos"))
 async def forecast_ingresos_mensuales(
     meses_adelante: int = Query(6, ge=1, le=12),
     current_user: dict = Depends(get_current_user)
@@ -186,6 +206,7 @@ async def forecast_ingresos_mensuales(
 
 
 @router.get("/alertas-reorden")
+@cached("analytics.alertas_reorden", ttl=300, stale_ttl=900, tags=("gastos", "inventario"))
 async def obtener_alertas_reorden(
     incluir_recomendaciones: bool = Query(True),
     current_user: dict = Depends(get_current_user)
@@ -214,17 +235,8 @@ async def obtener_alertas_reorden(
             ORDER BY categoria, nombre
         """)
         
-        # Obtener historial de movimientos (salidas) de los últimos 90 días
-        historial = await conn.fetch("""
-            SELECT 
-                producto_id,
-                fecha_movimiento as fecha,
-                ABS(cantidad_movimiento) as cantidad
-            FROM stock_movements
-            WHERE tipo_movimiento = 'salida'
-              AND fecha_movimiento >= NOW() - INTERVAL '90 days'
-            ORDER BY fecha_movimiento DESC
-        """)
+        # Consumo agregado por producto (una fila por producto)
+        consumo = await consumo_por_producto(conn)
         
         # Convertir a listas de dicts
         productos_data = [
@@ -242,19 +254,8 @@ async def obtener_alertas_reorden(
             for p in productos
         ]
         
-        historial_data = [
-            {
-                'producto_id': h['producto_id'],
-                'fecha': h['fecha'],
-                'cantidad': float(h['cantidad'])
-            }
-            for h in historial
-        ]
-        
         # Analizar y generar alertas
-        resultado = await inventory_analyzer.analizar_puntos_reorden(
-            productos_data, historial_data
-        )
+        resultado = inventory_analyzer.evaluar_reorden(productos_data, consumo)
         
         # Filtrar recomendaciones si no se solicitan
         if not incluir_recomendaciones:
@@ -267,6 +268,7 @@ async def obtener_alertas_reorden(
 
 
 @router.get("/metricas-predictivas")
+@cached("analytics.metricas_predictivas", ttl=300, stale_ttl=900, tags=("citas", "pagos", "gastos", "inventario"))
 async def obtener_metricas_predictivas(
     current_user: dict = Depends(get_current_user)
 ):
@@ -293,28 +295,38 @@ async def obtener_metricas_predictivas(
             LIMIT 5
         """)
         
-        # Forecast de demanda para top 3 servicios
+        # Forecast de demanda para top 3 servicios: primero los pronósticos
+        # guardados por el lote, luego el cálculo por servicio como respaldo
+        top_3 = top_servicios[:3]
+        persistidos = await leer_pronosticos(s['servicio_id'] for s in top_3)
+
         predicciones_servicios = []
-        for servicio in top_servicios[:3]:
-            datos_hist = await conn.fetch("""
-                SELECT 
-                    DATE_TRUNC('month', fecha_cita) as fecha,
-                    COUNT(*) as cantidad
-                FROM citas
-                WHERE tratamiento_id = $1
-                  AND fecha_cita >= NOW() - INTERVAL '12 months'
-                GROUP BY DATE_TRUNC('month', fecha_cita)
-                ORDER BY fecha
-            """, servicio['servicio_id'])
-            
-            if len(datos_hist) >= 3:
-                datos = [{'fecha': d['fecha'], 'cantidad': int(d['cantidad']), 'ingresos': 0} for d in datos_hist]
-                pred = await demand_predictor.predecir_demanda_servicio(datos, 3)
+        for servicio in top_3:
+            pred = persistidos.get(servicio['servicio_id'])
+
+            if pred is None:
+                datos_hist = await conn.fetch("""
+                    SELECT 
+                        DATE_TRUNC('month', fecha_cita) as fecha,
+                        COUNT(*) as cantidad
+                    FROM citas
+                    WHERE tratamiento_id = $1
+                      AND fecha_cita >= NOW() - INTERVAL '12 months'
+                    GROUP BY DATE_TRUNC('month', fecha_cita)
+                    ORDER BY fecha
+                """, servicio['servicio_id'])
                 
-                predicciones_servicios.append({
-                    'servicio': servicio['nombre'],
-                    'prediccion_proximo_mes': pred['predicciones'][0]['cantidad_predicha'] if pred.get('predicciones') else None
-                })
+                if len(datos_hist) < 3:
+                    continue
+                datos = [{'fecha': d['fecha'], 'cantidad': int(d['cantidad']), 'ingresos': 0} for d in datos_hist]
+                pred = await demand_predictor.predecir_demanda_servicio(
+                    datos, 3, clave_modelo=f"servicio:{servicio['servicio_id']}"
+                )
+            
+            predicciones_servicios.append({
+                'servicio': servicio['nombre'],
+                'prediccion_proximo_mes': pred['predicciones'][0]['cantidad_predicha'] if pred.get('predicciones') else None
+            })
         
         # Forecast financiero (3 meses)
         datos_financieros = await conn.fetch("""
@@ -345,10 +357,7 @@ async def obtener_metricas_predictivas(
         
         # Alertas de inventario
         productos = await conn.fetch("SELECT * FROM inventario_productos WHERE activo = TRUE")
-        historial = await conn.fetch("""
-            SELECT producto_id, fecha_movimiento as fecha, ABS(cantidad_movimiento) as cantidad
-            FROM stock_movements WHERE tipo_movimiento = 'salida' AND fecha_movimiento >= NOW() - INTERVAL '30 days'
-        """)
+        consumo = await consumo_por_producto(conn)
         
         productos_data = [
             {
@@ -361,12 +370,7 @@ async def obtener_metricas_predictivas(
             for p in productos
         ]
         
-        historial_data = [
-            {'producto_id': h['producto_id'], 'fecha': h['fecha'], 'cantidad': float(h['cantidad'])}
-            for h in historial
-        ]
-        
-        alertas_inv = await inventory_analyzer.analizar_puntos_reorden(productos_data, historial_data)
+        alertas_inv = inventory_analyzer.evaluar_reorden(productos_data, consumo)
         
         return {
             'top_servicios': [
@@ -8,12 +8,15 @@ Incluye:
 - Sandbox de simulación
 - Gestión de dudas pendientes
 - Gestión de knowledge base
+- Re-indexado de embeddings (aprendizajes y knowledge base)
+- Detección y fusión de duplicados (aprendizajes y knowledge base)
 - Gestión de behavior rules
 """
 
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
 import logging
 from datetime import datetime
 import json
@@ -21,7 +24,9 @@ import json
 from agents.whatsapp_medico.utils.embeddings import get_embeddings_service
 
 from db import get_pool
-from auth import get_current_user, User
+from auth import AdminOnly, get_current_user, User
+from whatsapp_management import duplicados
+from whatsapp_management.indexador_embeddings import indexador_embeddings
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +51,15 @@ class ResponderDudaRequest(BaseModel):
     respuesta: str
     aprobar_y_aprender: bool = False
 
+class ReindexarEmbeddingsRequest(BaseModel):
+    forzar: bool = False  # Recalcular también los que ya están al día
+    tablas: Optional[List[str]] = None  # aprendizajes_agente, knowledge_base, knowledge_base_validated
+
+class FusionarDuplicadosRequest(BaseModel):
+    tabla: str  # aprendizajes_agente, knowledge_base, knowledge_base_validated
+    canonico_id: int
+    ids: List[int]  # Entradas a fusionar en la canónica
+
 # ============================================================================
 # SANDBOX
 # ============================================================================
@@ -150,7 +164,7 @@ async def responder_duda(
     
     try:
         # Actualizar duda
-        await pool.execute(
+        duda = await pool.fetchrow(
             """
             UPDATE dudas_pendientes
             SET respuesta_admin = $1,
@@ -158,25 +172,32 @@ async def responder_duda(
                 fecha_respuesta = NOW(),
                 respondido_por = $2
             WHERE id = $3
+            RETURNING duda AS pregunta
             """,
             request.respuesta, current_user.id, request.duda_id
         )
+        if duda is None:
+            raise HTTPException(status_code=404, detail="Duda no encontrada")
         
         if request.aprobar_y_aprender:
             # Guardar en knowledge base y generar embedding
             try:
                 embeddings_service = get_embeddings_service()
                 
-                # Generar embedding de la pregunta
-                embedding_bytes = embeddings_service.embed_to_bytes(duda['pregunta'])
+                # Generar embedding de la pregunta (la columna es NOT NULL)
+                embedding_bytes = await asyncio.to_thread(embeddings_service.embed_to_bytes, duda['pregunta'])
                 
-                # Guardar en knowledge_base_validated
+                # Guardar en knowledge_base_validated sin modelo: queda pendiente
+                # para el indexador, que la compara con las existentes y marca
+                # duplicado_de antes de que la use la búsqueda
                 await pool.execute("""
                     INSERT INTO knowledge_base_validated (
-                        pregunta, respuesta, embedding, aprobado, created_at
+                        pregunta, respuesta, pregunta_embedding, categoria,
+                        aprobado, origen, aprobado_por, fecha_aprobacion
                     )
-                    VALUES ($1, $2, $3, true, NOW())
-                """, duda['pregunta'], request.respuesta, embedding_bytes)
+                    VALUES ($1, $2, $3, 'Informacion_General', true, 'escalamiento_aprendido', $4, NOW())
+                """, duda['pregunta'], request.respuesta, embedding_bytes, current_user.id)
+                indexador_embeddings.solicitar(tablas=["knowledge_base_validated"])
                 
                 logger.info(f"✅ Duda #{request.duda_id} guardada en knowledge base con embedding")
                 
@@ -192,6 +213,8 @@ async def responder_duda(
             "aprendido": request.aprobar_y_aprender
         }
     
+    except HTTPException:
+        raise
     except Exception as e: 
         logger.error(f"Error respondiendo duda: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -270,16 +293,8 @@ async def update_knowledge_base(
             params.append(pregunta)
             param_counter += 1
             
-            # Regenerar embedding si cambia la pregunta
-            try:
-                embeddings_service = get_embeddings_service()
-                embedding_bytes = embeddings_service.embed_to_bytes(pregunta)
-                updates.append(f"embedding = ${param_counter}")
-                params.append(embedding_bytes)
-                param_counter += 1
-                logger.info(f"✅ Embedding regenerado para knowledge base #{kb_id}")
-            except Exception as embed_error:
-                logger.error(f"Error regenerando embedding: {embed_error}", exc_info=True)
+            # El trigger de la migración 34 deja el embedding pendiente; el
+            # indexador lo recalcula y revisa duplicados (ver más abajo)
         
         if respuesta is not None:
             updates.append(f"respuesta = ${param_counter}")
@@ -305,6 +320,8 @@ async def update_knowledge_base(
         """
         
         await pool.execute(query, *params)
+        if pregunta is not None:
+            indexador_embeddings.solicitar(tablas=["knowledge_base_validated"])
         
         return {
             "success": True,
@@ -317,3 +334,86 @@ async def update_knowledge_base(
     except Exception as e:
         logger.error(f"Error actualizando KB: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+# ============================================================================
+# EMBEDDINGS
+# ============================================================================
+
+@router.post("/learning/embeddings/reindexar", status_code=202)
+async def reindexar_embeddings(
+    request: ReindexarEmbeddingsRequest,
+    current_user: User = Depends(AdminOnly)
+):
+    """
+    Lanza el indexador de embeddings en segundo plano (solo Admin).
+    
+    Calcula por lotes los embeddings faltantes o de otro modelo; con
+    ``forzar`` recalcula todos. El avance se consulta en
+    GET /learning/embeddings/estado.
+    """
+    try:
+        iniciado = indexador_embeddings.solicitar(request.forzar, request.tablas)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "iniciado": iniciado,
+        "message": "Indexado iniciado" if iniciado else "Ya hay un indexado en curso; se repetirá al terminar",
+        "estado": indexador_embeddings.estado
+    }
+
+
+@router.get("/learning/embeddings/estado")
+async def estado_embeddings(current_user: User = Depends(AdminOnly)):
+    """
+    Avance del indexador (filas procesadas, filas por segundo) y filas
+    pendientes por tabla.
+    """
+    return {
+        **indexador_embeddings.estado,
+        "pendientes": await indexador_embeddings.pendientes()
+    }
+
+
+# ============================================================================
+# DUPLICADOS
+# ============================================================================
+
+@router.get("/learning/duplicados")
+async def get_duplicados(
+    tabla: str = "aprendizajes_agente",
+    umbral: Optional[float] = None,
+    current_user: User = Depends(AdminOnly)
+):
+    """
+    Clusters de preguntas casi duplicadas con su entrada canónica sugerida
+    (solo Admin).
+    
+    Args:
+        tabla: aprendizajes_agente, knowledge_base o knowledge_base_validated
+        umbral: Similitud coseno mínima (default DUPLICADOS_UMBRAL)
+    """
+    if umbral is not None and not 0 < umbral <= 1:
+        raise HTTPException(status_code=400, detail="El umbral debe estar entre 0 y 1")
+    try:
+        return await duplicados.detectar_clusters(tabla, umbral)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/learning/duplicados/fusionar")
+async def fusionar_duplicados(
+    request: FusionarDuplicadosRequest,
+    current_user: User = Depends(AdminOnly)
+):
+    """
+    Fusiona un cluster en su entrada canónica (solo Admin): suma los
+    contadores de uso, reapunta las referencias y borra las demás entradas.
+    """
+    try:
+        resultado = await duplicados.fusionar(request.tabla, request.canonico_id, request.ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"success": True, **resultado}
@@ -1,6 +1,14 @@
 """Módulo de Auditoría - Registro de acciones del sistema."""
 
-from .service import AuditService, log_action
+from .service import AuditService, log_action, log_action_async
+from .writer import AuditWriter, audit_writer
 from .router import router
 
-__all__ = ["AuditService", "log_action", "router"]
+__all__ = [
+    "AuditService",
+    "AuditWriter",
+    "audit_writer",
+    "log_action",
+    "log_action_async",
+    "router",
+]
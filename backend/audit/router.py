@@ -8,6 +8,7 @@ from typing import Optional, List
 from datetime import datetime
 from pydantic import BaseModel
 from audit.service import AuditService
+from audit.writer import audit_writer
 from auth.middleware import get_current_user
 from auth.permissions import check_permission
 import logging
@@ -49,6 +50,18 @@ class UserActivityResponse(BaseModel):
     cantidad: int
 
 
+class AuditWriterStatsResponse(BaseModel):
+    pendientes: int
+    encolados: int
+    escritos: int
+    lotes: int
+    descartados: int
+    rechazados: int
+    reintentos: int
+    politica: str
+    activo: bool
+
+
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
@@ -70,14 +83,14 @@ async def get_audit_logs(
     Requiere permiso: administracion:read
     """
     # Verificar permiso de administración
-    if not check_permission(current_user.id, "administracion:read"):
+    if not await check_permission(current_user.id, "administracion:read"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permiso para acceder a los logs de auditoría"
         )
     
     try:
-        result = audit_service.get_logs(
+        result = await audit_service.get_logs(
             usuario_id=usuario_id,
             modulo=modulo,
             accion=accion,
@@ -109,14 +122,14 @@ async def get_user_activity(
     Requiere permiso: administracion:read
     """
     # Verificar permiso de administración
-    if not check_permission(current_user.id, "administracion:read"):
+    if not await check_permission(current_user.id, "administracion:read"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permiso para acceder a la actividad de usuarios"
         )
     
     try:
-        activity = audit_service.get_user_activity(usuario_id, days)
+        activity = await audit_service.get_user_activity(usuario_id, days)
         return activity
         
     except Exception as e:
@@ -133,7 +146,7 @@ async def get_audit_modules(current_user: dict = Depends(get_current_user)):
     Obtiene lista de módulos disponibles para filtrar auditoría.
     """
     # Verificar permiso de administración
-    if not check_permission(current_user.id, "administracion:read"):
+    if not await check_permission(current_user.id, "administracion:read"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permiso para acceder a esta información"
@@ -158,7 +171,7 @@ async def get_audit_actions(current_user: dict = Depends(get_current_user)):
     Obtiene lista de acciones disponibles para filtrar auditoría.
     """
     # Verificar permiso de administración
-    if not check_permission(current_user.id, "administracion:read"):
+    if not await check_permission(current_user.id, "administracion:read"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permiso para acceder a esta información"
@@ -172,3 +185,18 @@ async def get_audit_actions(current_user: dict = Depends(get_current_user)):
         "aprobar",
         "rechazar"
     ]
+
+
+@router.get("/writer-stats", response_model=AuditWriterStatsResponse)
+async def get_audit_writer_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Estado del escritor de auditoría por lotes (cola, lotes, descartes).
+    """
+    # Verificar permiso de administración
+    if not await check_permission(current_user.id, "administracion:read"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permiso para acceder a esta información"
+        )
+    
+    return audit_writer.get_stats()
@@ -4,36 +4,37 @@ Servicio de Auditoría - Registro de acciones del sistema
 Registra todas las acciones sensibles para trazabilidad.
 """
 
-import psycopg
-from psycopg.rows import dict_row
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
-import os
 import logging
 import json
 
+from audit.writer import audit_writer, crear_registro
+from db import get_connection, release_connection
+
 logger = logging.getLogger(__name__)
 
 
+def _decodificar_jsonb(fila) -> dict:
+    """AsyncPG devuelve jsonb como texto."""
+    registro = dict(fila)
+    for campo in ("datos_anteriores", "datos_nuevos"):
+        if isinstance(registro.get(campo), str):
+            registro[campo] = json.loads(registro[campo])
+    return registro
+
+
 class AuditService:
-    """Servicio para gestión de auditoría."""
-    
-    def __init__(self):
-        self.conn = None
-    
-    def _get_connection(self):
-        """Obtiene conexión a la base de datos."""
-        if self.conn is None or self.conn.closed:
-            self.conn = psycopg.connect(
-                host=os.getenv("DB_HOST", "127.0.0.1"),
-                port=int(os.getenv("DB_PORT", "5432")),
-                dbname=os.getenv("DB_NAME", "podoskin_db"),
-                user=os.getenv("DB_USER", "podoskin_user"),
-                password=os.getenv("DB_PASSWORD"),  # Requerido en .env
-                row_factory=dict_row
-            )
-        return self.conn
-    
+    """
+    Servicio para gestión de auditoría.
+
+    Las escrituras pasan por la cola del escritor por lotes
+    (audit/writer.py); las consultas usan el pool centralizado AsyncPG.
+    """
+
+    def __init__(self, writer=audit_writer):
+        self.writer = writer
+
     def log_action(
         self,
         usuario_id: int,
@@ -43,10 +44,13 @@ class AuditService:
         datos_anteriores: Optional[Dict[str, Any]] = None,
         datos_nuevos: Optional[Dict[str, Any]] = None,
         ip_address: Optional[str] = None
-    ) -> dict:
+    ) -> bool:
         """
         Registra una acción en el log de auditoría.
-        
+
+        No bloquea: el registro se encola y el escritor de fondo lo guarda
+        en el siguiente lote.
+
         Args:
             usuario_id: ID del usuario que realiza la acción
             accion: Tipo de acción (crear, actualizar, eliminar, etc.)
@@ -55,48 +59,37 @@ class AuditService:
             datos_anteriores: Estado anterior del registro (opcional)
             datos_nuevos: Estado nuevo del registro (opcional)
             ip_address: Dirección IP del usuario (opcional)
-            
+
         Returns:
-            dict: Registro de auditoría creado
+            bool: False si se descartó por cola llena
         """
-        try:
-            conn = self._get_connection()
-            with conn.cursor() as cur:
-                # Convertir datos a JSON si son dicts
-                datos_ant_json = json.dumps(datos_anteriores) if datos_anteriores else None
-                datos_new_json = json.dumps(datos_nuevos) if datos_nuevos else None
-                
-                cur.execute("""
-                    INSERT INTO auditoria 
-                    (usuario_id, accion, modulo, descripcion, datos_anteriores, datos_nuevos, ip_address)
-                    VALUES (%s, %s, %s, %s, %s::jsonb, %s::jsonb, %s)
-                    RETURNING id, usuario_id, accion, modulo, descripcion, fecha_hora
-                """, (
-                    usuario_id,
-                    accion,
-                    modulo,
-                    descripcion,
-                    datos_ant_json,
-                    datos_new_json,
-                    ip_address
-                ))
-                
-                result = cur.fetchone()
-                conn.commit()
-                
-                logger.info(
-                    f"Auditoría registrada: {accion} en {modulo} por usuario {usuario_id}"
-                )
-                
-                return dict(result)
-                
-        except Exception as e:
-            logger.error(f"Error registrando auditoría: {e}")
-            if self.conn:
-                self.conn.rollback()
-            raise
+        registro = crear_registro(
+            usuario_id, accion, modulo, descripcion,
+            datos_anteriores, datos_nuevos, ip_address
+        )
+        return self.writer.encolar(registro)
+
+    async def log_action_async(
+        self,
+        usuario_id: int,
+        accion: str,
+        modulo: str,
+        descripcion: str,
+        datos_anteriores: Optional[Dict[str, Any]] = None,
+        datos_nuevos: Optional[Dict[str, Any]] = None,
+        ip_address: Optional[str] = None
+    ) -> bool:
+        """
+        Igual que ``log_action`` pero con la cola llena espera un momento
+        (AUDIT_ESPERA_MS) a que el escritor libere espacio.
+        """
+        registro = crear_registro(
+            usuario_id, accion, modulo, descripcion,
+            datos_anteriores, datos_nuevos, ip_address
+        )
+        return await self.writer.encolar_async(registro)
     
-    def get_logs(
+    async def get_logs(
         self,
         usuario_id: Optional[int] = None,
         modulo: Optional[str] = None,
@@ -121,80 +114,78 @@ class AuditService:
         Returns:
             dict: Lista de logs y total de registros
         """
+        # Construir query dinámicamente
+        conditions = []
+        params = []
+
+        if usuario_id:
+            params.append(usuario_id)
+            conditions.append(f"a.usuario_id = ${len(params)}")
+
+        if modulo:
+            params.append(modulo)
+            conditions.append(f"a.modulo = ${len(params)}")
+
+        if accion:
+            params.append(accion)
+            conditions.append(f"a.accion = ${len(params)}")
+
+        if fecha_desde:
+            params.append(fecha_desde)
+            conditions.append(f"a.fecha_hora >= ${len(params)}")
+
+        if fecha_hasta:
+            params.append(fecha_hasta)
+            conditions.append(f"a.fecha_hora <= ${len(params)}")
+
+        where_clause = " AND ".join(conditions) if conditions else "1=1"
+
+        # Query principal con JOIN a usuarios para obtener nombre
+        query = f"""
+            SELECT 
+                a.id,
+                a.usuario_id,
+                u.nombre_completo as usuario_nombre,
+                a.accion,
+                a.modulo,
+                a.descripcion,
+                a.datos_anteriores,
+                a.datos_nuevos,
+                a.ip_address,
+                a.fecha_hora
+            FROM auditoria a
+            LEFT JOIN usuarios u ON a.usuario_id = u.id
+            WHERE {where_clause}
+            ORDER BY a.fecha_hora DESC
+            LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}
+        """
+
+        # Contar total
+        count_query = f"""
+            SELECT COUNT(*) as total
+            FROM auditoria a
+            WHERE {where_clause}
+        """
+
+        conn = await get_connection()
         try:
-            conn = self._get_connection()
-            with conn.cursor() as cur:
-                # Construir query dinámicamente
-                conditions = []
-                params = []
-                
-                if usuario_id:
-                    conditions.append("a.usuario_id = %s")
-                    params.append(usuario_id)
-                
-                if modulo:
-                    conditions.append("a.modulo = %s")
-                    params.append(modulo)
-                
-                if accion:
-                    conditions.append("a.accion = %s")
-                    params.append(accion)
-                
-                if fecha_desde:
-                    conditions.append("a.fecha_hora >= %s")
-                    params.append(fecha_desde)
-                
-                if fecha_hasta:
-                    conditions.append("a.fecha_hora <= %s")
-                    params.append(fecha_hasta)
-                
-                where_clause = " AND ".join(conditions) if conditions else "1=1"
-                
-                # Query principal con JOIN a usuarios para obtener nombre
-                query = f"""
-                    SELECT 
-                        a.id,
-                        a.usuario_id,
-                        u.nombre as usuario_nombre,
-                        a.accion,
-                        a.modulo,
-                        a.descripcion,
-                        a.datos_anteriores,
-                        a.datos_nuevos,
-                        a.ip_address,
-                        a.fecha_hora
-                    FROM auditoria a
-                    LEFT JOIN usuarios u ON a.usuario_id = u.id
-                    WHERE {where_clause}
-                    ORDER BY a.fecha_hora DESC
-                    LIMIT %s OFFSET %s
-                """
-                
-                params.extend([limit, offset])
-                cur.execute(query, params)
-                logs = cur.fetchall()
-                
-                # Contar total
-                count_query = f"""
-                    SELECT COUNT(*) as total
-                    FROM auditoria a
-                    WHERE {where_clause}
-                """
-                cur.execute(count_query, params[:-2])  # Sin limit y offset
-                total = cur.fetchone()['total']
-                
-                return {
-                    "logs": [dict(log) for log in logs],
-                    "total": total,
-                    "limit": limit,
-                    "offset": offset
-                }
-                
+            logs = await conn.fetch(query, *params, limit, offset)
+            total = await conn.fetchval(count_query, *params)
+
+            return {
+                "logs": [_decodificar_jsonb(log) for log in logs],
+                "total": total,
+                "limit": limit,
+                "offset": offset
+            }
+
         except Exception as e:
             logger.error(f"Error obteniendo logs de auditoría: {e}")
             raise
+        finally:
+            await release_connection(conn)
     
-    def get_user_activity(self, usuario_id: int, days: int = 30) -> list:
+    async def get_user_activity(self, usuario_id: int, days: int = 30) -> list:
         """
         Obtiene resumen de actividad de un usuario.
         
@@ -205,27 +196,28 @@ class AuditService:
         Returns:
             list: Resumen de actividad por módulo
         """
+        fecha_desde = datetime.now() - timedelta(days=days)
+
+        conn = await get_connection()
         try:
-            conn = self._get_connection()
-            with conn.cursor() as cur:
-                fecha_desde = datetime.now() - timedelta(days=days)
-                
-                cur.execute("""
-                    SELECT 
-                        modulo,
-                        accion,
-                        COUNT(*) as cantidad
-                    FROM auditoria
-                    WHERE usuario_id = %s AND fecha_hora >= %s
-                    GROUP BY modulo, accion
-                    ORDER BY cantidad DESC
-                """, (usuario_id, fecha_desde))
-                
-                return [dict(row) for row in cur.fetchall()]
-                
+            rows = await conn.fetch("""
+                SELECT 
+                    modulo,
+                    accion,
+                    COUNT(*) as cantidad
+                FROM auditoria
+                WHERE usuario_id = $1 AND fecha_hora >= $2
+                GROUP BY modulo, accion
+                ORDER BY cantidad DESC
+            """, usuario_id, fecha_desde)
+
+            return [dict(row) for row in rows]
+
         except Exception as e:
             logger.error(f"Error obteniendo actividad de usuario: {e}")
             raise
+        finally:
+            await release_connection(conn)
 
 
 # Instancia global del servicio
@@ -240,7 +232,7 @@ def log_action(
     datos_anteriores: Optional[Dict[str, Any]] = None,
     datos_nuevos: Optional[Dict[str, Any]] = None,
     ip_address: Optional[str] = None
-) -> dict:
+) -> bool:
     """
     Función helper para registrar acciones en auditoría.
     
@@ -255,3 +247,24 @@ def log_action(
         datos_nuevos,
         ip_address
     )
+
+
+async def log_action_async(
+    usuario_id: int,
+    accion: str,
+    modulo: str,
+    descripcion: str,
+    datos_anteriores: Optional[Dict[str, Any]] = None,
+    datos_nuevos: Optional[Dict[str, Any]] = None,
+    ip_address: Optional[str] = None
+) -> bool:
+    """Helper de ``log_action`` con espera breve si la cola está llena."""
+    return await _audit_service.log_action_async(
+        usuario_id,
+        accion,
+        modulo,
+        descripcion,
+        datos_anteriores,
+        datos_nuevos,
+        ip_address
+    )
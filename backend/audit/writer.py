@@ -0,0 +1,321 @@
+"""
+Escritor de Auditoría por Lotes
+===============================
+Las acciones auditadas se encolan en memoria y un task de fondo las escribe
+en ``auditoria`` con ``copy_records_to_table`` usando el pool AsyncPG:
+
+- Vaciado por tamaño (AUDIT_BATCH_SIZE registros) o por tiempo
+  (AUDIT_FLUSH_MS desde el último vaciado), lo que ocurra primero.
+- Cola acotada (AUDIT_QUEUE_MAX). ``encolar()`` nunca bloquea: con la cola
+  llena aplica AUDIT_POLITICA_LLENO (``descartar_nuevos`` o
+  ``descartar_antiguos``). ``encolar_async()`` espera hasta AUDIT_ESPERA_MS
+  a que el escritor libere espacio antes de aplicar la política.
+- Si el COPY falla por datos (p.ej. usuario inexistente) el lote se reintenta
+  fila por fila y solo se rechazan las inválidas; si falla la conexión el
+  lote vuelve a la cola y se reintenta con backoff.
+- ``detener()`` (shutdown del lifespan) vacía lo pendiente.
+
+La fecha del registro se toma al encolar, no al escribir.
+"""
+
+import asyncio
+import collections
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import asyncpg
+
+import db
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_MS = int(os.getenv("AUDIT_FLUSH_MS", "1000"))
+AUDIT_ESPERA_MS = int(os.getenv("AUDIT_ESPERA_MS", "200"))
+AUDIT_POLITICA_LLENO = os.getenv("AUDIT_POLITICA_LLENO", "descartar_nuevos")
+
+COLUMNAS = (
+    "usuario_id",
+    "accion",
+    "modulo",
+    "descripcion",
+    "datos_anteriores",
+    "datos_nuevos",
+    "ip_address",
+    "fecha_hora",
+)
+
+_POLITICAS = ("descartar_nuevos", "descartar_antiguos")
+_REINTENTO_MAX_SEGUNDOS = 30
+
+Registro = Tuple[Any, ...]
+
+
+def _a_json(datos: Optional[Dict[str, Any]]) -> Optional[str]:
+    return json.dumps(datos, default=str) if datos else None
+
+
+def crear_registro(
+    usuario_id: int,
+    accion: str,
+    modulo: str,
+    descripcion: str,
+    datos_anteriores: Optional[Dict[str, Any]] = None,
+    datos_nuevos: Optional[Dict[str, Any]] = None,
+    ip_address: Optional[str] = None,
+) -> Registro:
+    """Fila lista para COPY en el orden de COLUMNAS"""
+    return (
+        int(usuario_id),
+        accion,
+        modulo,
+        descripcion,
+        _a_json(datos_anteriores),
+        _a_json(datos_nuevos),
+        ip_address,
+        datetime.now(),
+    )
+
+
+class AuditWriter:
+    """Cola acotada + escritor de fondo por lotes."""
+
+    def __init__(
+        self,
+        max_cola: int = AUDIT_QUEUE_MAX,
+        tamano_lote: int = AUDIT_BATCH_SIZE,
+        intervalo_ms: int = AUDIT_FLUSH_MS,
+        espera_ms: int = AUDIT_ESPERA_MS,
+        politica: str = AUDIT_POLITICA_LLENO,
+    ):
+        if politica not in _POLITICAS:
+            raise ValueError(f"Política de cola llena inválida: {politica}")
+        self.max_cola = max_cola
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo_ms / 1000
+        self.espera = espera_ms / 1000
+        self.politica = politica
+        # Estadísticas
+        self.encolados = 0
+        self.escritos = 0
+        self.lotes = 0
+        self.descartados = 0
+        self.rechazados = 0
+        self.reintentos = 0
+        self._cola: Deque[Registro] = collections.deque()
+        self._candado = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lote_listo: Optional[asyncio.Event] = None
+        self._espacio: Optional[asyncio.Event] = None
+        self._escritor: Optional[asyncio.Task] = None
+        self._cerrando = False
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._cola)
+
+    # ------------------------------------------------------------------
+    # Encolado
+    # ------------------------------------------------------------------
+
+    def encolar(self, registro: Registro) -> bool:
+        """
+        Encola un registro sin bloquear (seguro desde cualquier hilo).
+
+        Returns:
+            False si se descartó por cola llena
+        """
+        with self._candado:
+            aceptado = True
+            if len(self._cola) >= self.max_cola:
+                self.descartados += 1
+                if self.politica == "descartar_nuevos":
+                    aceptado = False
+                else:
+                    self._cola.popleft()
+            if aceptado:
+                self._cola.append(registro)
+                self.encolados += 1
+            descartados, lleno = self.descartados, len(self._cola) >= self.max_cola
+            listo = len(self._cola) >= self.tamano_lote
+
+        if descartados and (descartados == 1 or descartados % 1000 == 0) and lleno:
+            logger.warning(
+                f"[Auditoría] Cola llena ({self.max_cola}); "
+                f"{descartados} registros descartados ({self.politica})"
+            )
+        if listo or lleno:
+            self._despertar(lleno)
+        return aceptado
+
+    async def encolar_async(self, registro: Registro) -> bool:
+        """Como ``encolar()`` pero espera a que haya espacio (hasta AUDIT_ESPERA_MS)"""
+        if len(self._cola) >= self.max_cola and self._espacio is not None and self.espera > 0:
+            self._despertar(True)
+            try:
+                await asyncio.wait_for(self._espacio.wait(), self.espera)
+            except asyncio.TimeoutError:
+                pass
+        return self.encolar(registro)
+
+    def _despertar(self, lleno: bool) -> None:
+        if self._loop is None or self._loop.is_closed():
+            return
+
+        def despertar():
+            self._lote_listo.set()
+            if lleno:
+                self._espacio.clear()
+
+        try:
+            en_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            en_loop = False
+        if en_loop:
+            despertar()
+        else:
+            self._loop.call_soon_threadsafe(despertar)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def _tomar_lote(self) -> List[Registro]:
+        with self._candado:
+            n = min(self.tamano_lote, len(self._cola))
+            return [self._cola.popleft() for _ in range(n)]
+
+    def _devolver_lote(self, lote: List[Registro]) -> None:
+        # Al frente para conservar el orden; lo que no quepa se descarta
+        with self._candado:
+            libres = max(0, self.max_cola - len(self._cola))
+            perdidos = len(lote) - libres
+            if perdidos > 0:
+                self.descartados += perdidos
+                lote = lote[perdidos:]
+            self._cola.extendleft(reversed(lote))
+
+    async def _escribir(self, lote: List[Registro]) -> None:
+        conn = await db.get_connection()
+        try:
+            try:
+                await conn.copy_records_to_table("auditoria", records=lote, columns=COLUMNAS)
+                self.escritos += len(lote)
+            except (asyncpg.IntegrityConstraintViolationError, asyncpg.DataError) as e:
+                logger.warning(f"[Auditoría] Lote rechazado ({e}); reintentando fila por fila")
+                await self._escribir_filas(conn, lote)
+        finally:
+            await db.release_connection(conn)
+        self.lotes += 1
+
+    async def _escribir_filas(self, conn, lote: List[Registro]) -> None:
+        for registro in lote:
+            try:
+                await conn.copy_records_to_table("auditoria", records=[registro], columns=COLUMNAS)
+                self.escritos += 1
+            except (asyncpg.IntegrityConstraintViolationError, asyncpg.DataError) as e:
+                self.rechazados += 1
+                logger.error(
+                    f"[Auditoría] Registro rechazado: {registro[2]}/{registro[1]} "
+                    f"usuario {registro[0]}: {e}"
+                )
+
+    async def vaciar(self) -> int:
+        """
+        Escribe todo lo pendiente.
+
+        Returns:
+            Número de registros escritos
+        """
+        antes = self.escritos
+        while self._cola:
+            lote = self._tomar_lote()
+            try:
+                await self._escribir(lote)
+            except Exception:
+                self._devolver_lote(lote)
+                raise
+            finally:
+                if self._espacio is not None and len(self._cola) < self.max_cola:
+                    self._espacio.set()
+        return self.escritos - antes
+
+    async def _esperar(self, segundos: float) -> None:
+        try:
+            await asyncio.wait_for(self._lote_listo.wait(), segundos)
+        except asyncio.TimeoutError:
+            pass
+        self._lote_listo.clear()
+
+    async def _ejecutar(self) -> None:
+        # Sin cancelación: un lote en curso siempre termina (o vuelve a la cola)
+        espera = 1
+        while not self._cerrando:
+            await self._esperar(self.intervalo)
+            try:
+                await self.vaciar()
+                espera = 1
+            except Exception as e:
+                self.reintentos += 1
+                logger.error(
+                    f"[Auditoría] Error escribiendo lote ({self.pendientes} pendientes), "
+                    f"reintento en {espera}s: {e}"
+                )
+                await self._esperar(espera)
+                espera = min(espera * 2, _REINTENTO_MAX_SEGUNDOS)
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def iniciar(self) -> None:
+        if self._escritor is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._lote_listo = asyncio.Event()
+        self._espacio = asyncio.Event()
+        self._espacio.set()
+        self._cerrando = False
+        self._escritor = self._loop.create_task(self._ejecutar())
+        logger.info(
+            f"✅ Escritor de auditoría iniciado (lote {self.tamano_lote}, "
+            f"{int(self.intervalo * 1000)} ms, cola {self.max_cola})"
+        )
+
+    async def detener(self) -> None:
+        """Detiene el escritor y vacía lo pendiente"""
+        if self._escritor is not None:
+            self._cerrando = True
+            self._lote_listo.set()
+            await self._escritor
+            self._escritor = None
+        try:
+            escritos = await self.vaciar()
+            if escritos:
+                logger.info(f"[Auditoría] {escritos} registros escritos al cerrar")
+        except Exception as e:
+            logger.error(f"❌ [Auditoría] {self.pendientes} registros sin escribir al cerrar: {e}")
+        self._loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pendientes": self.pendientes,
+            "encolados": self.encolados,
+            "escritos": self.escritos,
+            "lotes": self.lotes,
+            "descartados": self.descartados,
+            "rechazados": self.rechazados,
+            "reintentos": self.reintentos,
+            "politica": self.politica,
+            "activo": self._escritor is not None,
+        }
+
+
+# Instancia global (una por proceso)
+audit_writer = AuditWriter()
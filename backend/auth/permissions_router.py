@@ -7,8 +7,8 @@ Endpoints para gestión de permisos personalizados
 from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List
 import logging
-import psycopg
-from psycopg.rows import dict_row
+
+from db import get_connection, release_connection
 
 from .models import User
 from .middleware import get_current_user
@@ -27,23 +27,11 @@ from .granular_permissions import (
     grant_patient_access,
     revoke_patient_access
 )
-from .database import CONNINFO  # ✅ Importar connection string
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/permissions", tags=["Permisos Granulares"])
 
-# ========================================================================
-# HELPER PARA CONEXIÓN A BD (mismo patrón que patients_router.py)
-# ========================================================================
-
-async def get_db_connection():
-    """
-    Obtiene una conexión a la base de datos.
-    Usa el mismo CONNINFO que auth/database.py
-    """
-    return await psycopg.AsyncConnection.connect(CONNINFO)
-
 # ========================================================================
 # ENDPOINTS DE CONSULTA
 # ========================================================================
@@ -61,9 +49,8 @@ async def get_my_permissions(
     - Permisos efectivos (combinación)
     - Acceso a pacientes específicos
     """
-    conn = None
+    conn = await get_connection()
     try:
-        conn = await get_db_connection()
         permissions = await get_effective_permissions(
             conn,
             current_user.id,
@@ -71,8 +58,7 @@ async def get_my_permissions(
         )
         return permissions
     finally:
-        if conn:
-            await conn.close()
+        await release_connection(conn)
 
 @router.get("/check-patient/{patient_id}", response_model=PatientAccessCheck)
 async def check_my_patient_access(
@@ -86,9 +72,8 @@ async def check_my_patient_access(
     Query params:
     - required_level: Nivel de acceso requerido (read, write, full)
     """
-    conn = None
+    conn = await get_connection()
     try:
-        conn = await get_db_connection()
         access_check = await check_patient_access(
             conn,
             current_user.id,
@@ -97,8 +82,7 @@ async def check_my_patient_access(
         )
         return access_check
     finally:
-        if conn:
-            await conn.close()
+        await release_connection(conn)
 
 # ========================================================================
 # ENDPOINTS DE ADMINISTRACIÓN (Solo Admin)
@@ -120,18 +104,18 @@ async def grant_access_to_patient(
             detail="Solo Admin puede otorgar accesos a pacientes"
         )
     
-    conn = None
+    conn = await get_connection()
     try:
-        conn = await get_db_connection()
-        access = await grant_patient_access(
-            conn,
-            access_request.user_id,
-            access_request.patient_id,
-            access_request.access_level,
-            current_user.id,
-            access_request.expires_at,
-            access_request.notes
-        )
+        async with conn.transaction():
+            access = await grant_patient_access(
+                conn,
+                access_request.user_id,
+                access_request.patient_id,
+                access_request.access_level,
+                current_user.id,
+                access_request.expires_at,
+                access_request.notes
+            )
         
         logger.info(
             f"Admin {current_user.nombre_usuario} otorgó acceso {access_request.access_level} "
@@ -143,8 +127,7 @@ async def grant_access_to_patient(
             "access": access
         }
     finally:
-        if conn:
-            await conn.close()
+        await release_connection(conn)
 
 @router.delete("/revoke-patient-access/{user_id}/{patient_id}")
 async def revoke_access_to_patient(
@@ -163,9 +146,8 @@ async def revoke_access_to_patient(
             detail="Solo Admin puede revocar accesos"
         )
     
-    conn = None
+    conn = await get_connection()
     try:
-        conn = await get_db_connection()
         revoked = await revoke_patient_access(conn, user_id, patient_id)
         
         if not revoked:
@@ -181,8 +163,7 @@ async def revoke_access_to_patient(
         
         return {"message": "Acceso revocado correctamente"}
     finally:
-        if conn:
-            await conn.close()
+        await release_connection(conn)
 
 @router.get("/user/{user_id}", response_model=PermissionsResponse)
 async def get_user_permissions(
@@ -200,19 +181,13 @@ async def get_user_permissions(
             detail="Solo Admin puede consultar permisos de otros usuarios"
         )
     
-    conn = None
+    conn = await get_connection()
     try:
-        conn = await get_db_connection()
-        
         # Obtener rol del usuario
-        async with conn.cursor(row_factory=dict_row) as cur:
-            await cur.execute(
-                "SELECT rol FROM usuarios WHERE id = $1",
-                (user_id,)
-            )
-            user = await cur.fetchone()
-        
-        await conn.rollback()
+        user = await conn.fetchrow(
+            "SELECT rol FROM usuarios WHERE id = $1",
+            user_id
+        )
         
         if not user:
             raise HTTPException(
@@ -227,5 +202,4 @@ async def get_user_permissions(
         )
         return permissions
     finally:
-        if conn:
-            await conn.close()
+        await release_connection(conn)
@@ -0,0 +1,21 @@
+"""
+Cache Module
+============
+Caché en proceso con single-flight para lecturas costosas.
+"""
+
+from .single_flight import (
+    SingleFlightCache,
+    CacheStats,
+    cached,
+    invalidate_tags,
+    read_cache,
+)
+
+__all__ = [
+    "SingleFlightCache",
+    "CacheStats",
+    "cached",
+    "invalidate_tags",
+    "read_cache",
+]
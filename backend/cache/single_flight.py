@@ -0,0 +1,292 @@
+"""
+Single-Flight TTL Cache
+=======================
+
+Caché async en proceso para lecturas costosas (stats, analytics, reportes).
+
+- Single-flight: llamadas concurrentes con la misma llave esperan una sola
+  ejecución en lugar de repetir el cálculo.
+- TTL + stale-while-revalidate: dentro de ``ttl`` el valor es fresco; entre
+  ``ttl`` y ``ttl + stale_ttl`` se sirve el valor viejo y se recalcula en
+  segundo plano.
+- Invalidación por tags: los write paths (citas, pagos, gastos) llaman a
+  ``invalidate_tags`` para descartar lo que depende de esas tablas.
+
+Uso:
+    @router.get("/dashboard")
+    @cached("stats.dashboard", ttl=15, stale_ttl=60, tags=("citas",))
+    async def get_dashboard(current_user=Depends(get_current_user)):
+        ...
+
+La llave es ``namespace`` + parámetros normalizados + rol del usuario.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Parámetros que no forman parte de la llave (inyectados por FastAPI)
+_USER_PARAMS = ("current_user", "user")
+
+
+@dataclass
+class _Entry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+    tags: Tuple[str, ...] = ()
+
+
+@dataclass
+class CacheStats:
+    """Contadores del caché."""
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    stale_served: int = 0
+    refreshes: int = 0
+    invalidations: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class SingleFlightCache:
+    """
+    Caché TTL con single-flight y stale-while-revalidate.
+
+    Args:
+        max_entries: Máximo de llaves guardadas (se expulsa la menos usada)
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        # Cálculos en curso y sus tags. Invalidar una llave (o un tag) la
+        # desprende de aquí: las lecturas siguientes inician otro cálculo y
+        # el viejo, iniciado antes de la escritura, ya no guarda su resultado
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._inflight_tags: Dict[Hashable, Tuple[str, ...]] = {}
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float,
+        stale_ttl: float = 0.0,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """
+        Retorna el valor para ``key`` o lo calcula con ``compute``.
+
+        Args:
+            key: Llave hashable
+            compute: Fábrica de la corrutina que calcula el valor
+            ttl: Segundos que el valor se considera fresco
+            stale_ttl: Segundos extra en que se sirve viejo mientras se recalcula
+            tags: Tags para invalidación
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            if now < entry.fresh_until:
+                self.stats.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if now < entry.stale_until:
+                self.stats.stale_served += 1
+                if key not in self._inflight:
+                    self.stats.refreshes += 1
+                    self._start(key, compute, ttl, stale_ttl, tuple(tags))
+                return entry.value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+            future = self._start(key, compute, ttl, stale_ttl, tuple(tags))
+
+        # shield: si un cliente se desconecta no se cancela el cálculo compartido
+        return await asyncio.shield(future)
+
+    def _start(self, key, compute, ttl, stale_ttl, tags) -> asyncio.Future:
+        future = asyncio.ensure_future(compute())
+        self._inflight[key] = future
+        self._inflight_tags[key] = tags
+
+        def _done(f: asyncio.Future):
+            current = self._inflight.get(key) is f
+            if current:
+                self._detach(key)
+            if f.cancelled():
+                return
+            if f.exception() is not None:
+                self.stats.errors += 1
+                return
+            if not current:
+                # Se invalidó mientras se calculaba
+                return
+            now = time.monotonic()
+            self._entries[key] = _Entry(
+                value=f.result(),
+                fresh_until=now + ttl,
+                stale_until=now + ttl + stale_ttl,
+                tags=tags,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        future.add_done_callback(_done)
+        return future
+
+    def _detach(self, key: Hashable) -> None:
+        self._inflight.pop(key, None)
+        self._inflight_tags.pop(key, None)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Descarta una llave y su cálculo en curso (las demás no se tocan)."""
+        self._entries.pop(key, None)
+        self._detach(key)
+        self.stats.invalidations += 1
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        Descarta todas las llaves con alguno de los tags.
+
+        Returns:
+            Número de llaves descartadas
+        """
+        wanted = set(tags)
+        keys = [k for k, e in self._entries.items() if wanted.intersection(e.tags)]
+        for k in keys:
+            del self._entries[k]
+        for k in [k for k, t in self._inflight_tags.items() if wanted.intersection(t)]:
+            self._detach(k)
+        self.stats.invalidations += 1
+        return len(keys)
+
+    def clear(self) -> None:
+        """Descarta todo el contenido."""
+        self._entries.clear()
+        self._inflight.clear()
+        self._inflight_tags.clear()
+
+    def info(self) -> Dict[str, Any]:
+        """Contadores y tamaño actual (para el endpoint de administración)."""
+        return {
+            **self.stats.as_dict(),
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+        }
+
+
+# Instancia compartida por todo el backend
+read_cache = SingleFlightCache()
+
+
+def invalidate_tags(*tags: str) -> int:
+    """Atajo para los write paths: ``invalidate_tags("citas")``."""
+    return read_cache.invalidate_tags(*tags)
+
+
+# ============================================================================
+# DECORADOR
+# ============================================================================
+
+
+def _normalize(value: Any) -> Hashable:
+    """Convierte un parámetro a una forma hashable y estable."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _normalize(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_normalize(v) for v in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else tuple(items)
+    if hasattr(value, "model_dump"):
+        return _normalize(value.model_dump())
+    return repr(value)
+
+
+def _role_of(user: Any) -> Optional[str]:
+    if user is None:
+        return None
+    if isinstance(user, dict):
+        return user.get("rol")
+    return getattr(user, "rol", None)
+
+
+def cached(
+    namespace: str,
+    ttl: float,
+    stale_ttl: float = 0.0,
+    tags: Iterable[str] = (),
+    cache: Optional[SingleFlightCache] = None,
+):
+    """
+    Decorador para corrutinas de lectura (endpoints o helpers).
+
+    La llave combina ``namespace``, los argumentos normalizados y el rol del
+    ``current_user`` si la función lo recibe. El usuario en sí no forma parte
+    de la llave: dos usuarios del mismo rol comparten resultado.
+
+    Args:
+        namespace: Identificador del endpoint (ej. "stats.dashboard")
+        ttl: Segundos de frescura
+        stale_ttl: Segundos de stale-while-revalidate
+        tags: Tags para ``invalidate_tags``
+        cache: Instancia a usar (default ``read_cache``)
+    """
+    tags = tuple(tags)
+
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            role = None
+            params = []
+            for name, value in bound.arguments.items():
+                if name in _USER_PARAMS:
+                    role = _role_of(value)
+                    continue
+                params.append((name, _normalize(value)))
+
+            key = (namespace, tuple(params), role)
+            target = cache or read_cache
+            return await target.get_or_compute(
+                key,
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+                tags=tags,
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,155 @@
+"""
+Búsqueda de citas
+=================
+
+Búsqueda de GET /citas/buscar sobre los índices de
+data/migrations/30_citas_busqueda.sql, sin recorrer toda la tabla citas:
+
+- Texto: ``citas.busqueda`` es un tsvector generado de ``motivo_consulta``
+  (peso A) y ``notas_recepcion`` (peso B) con la configuración
+  ``spanish_unaccent`` (sin acentos y lematizado). Cada palabra escrita se
+  busca como prefijo (``fasc`` -> ``fascitis``).
+- Nombres: ``pacientes.busqueda`` y ``podologos.busqueda`` (normalizados
+  con ``texto_busqueda``) con índices GIN de trigramas: subcadena
+  (``LIKE``) o parecido por palabra (``<%``) para errores de tipeo; las
+  citas salen por ``id_paciente`` / ``id_podologo``.
+
+Relevancia: suma del ``ts_rank`` del texto y de la ``word_similarity`` de
+los nombres, de lo que haya coincidido; cada vía aporta sus candidatas con
+su puntaje y se agrupan por cita, sin volver a leer la tabla. Orden: relevancia, fecha (más reciente primero) e
+id, que también es la llave del cursor de paginación: cada página pide las
+citas estrictamente "después" de la última entregada, así que no se
+repiten ni se saltan resultados aunque se agreguen citas entre páginas.
+"""
+
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import db
+from pacientes.busqueda import normalizar
+
+logger = logging.getLogger(__name__)
+
+LIMITE_DEFAULT = 50
+
+COLUMNAS = """
+    c.id,
+    c.id_paciente,
+    c.id_podologo,
+    c.fecha_hora_inicio,
+    c.fecha_hora_fin,
+    c.tipo_cita,
+    c.estado,
+    c.motivo_consulta,
+    c.notas_recepcion,
+    c.motivo_cancelacion,
+    c.es_primera_vez,
+    c.recordatorio_24h_enviado,
+    c.recordatorio_2h_enviado,
+    c.fecha_creacion,
+    c.fecha_actualizacion,
+    CONCAT(p.primer_nombre, ' ', p.primer_apellido) AS paciente_nombre,
+    pod.nombre_completo AS podologo_nombre
+"""
+
+# $1 texto normalizado, $2 tsquery, $3-$5 cursor (o NULL), $6 límite
+_CONSULTA = f"""
+    WITH por_paciente AS (
+        SELECT id, word_similarity($1, busqueda) AS similitud
+        FROM pacientes
+        WHERE busqueda LIKE '%' || $1 || '%' OR $1 <% busqueda
+    ), por_podologo AS (
+        SELECT id, word_similarity($1, busqueda) AS similitud
+        FROM podologos
+        WHERE busqueda LIKE '%' || $1 || '%' OR $1 <% busqueda
+    ), puntajes AS (
+        SELECT id, fecha_hora_inicio, ts_rank(busqueda, to_tsquery('spanish_unaccent', $2)) AS puntaje
+        FROM citas
+        WHERE busqueda @@ to_tsquery('spanish_unaccent', $2)
+        UNION ALL
+        SELECT c.id, c.fecha_hora_inicio, pp.similitud
+        FROM citas c JOIN por_paciente pp ON pp.id = c.id_paciente
+        UNION ALL
+        SELECT c.id, c.fecha_hora_inicio, pd.similitud
+        FROM citas c JOIN por_podologo pd ON pd.id = c.id_podologo
+    ), ranking AS (
+        SELECT id, fecha_hora_inicio, sum(puntaje)::float8 AS relevancia
+        FROM puntajes
+        GROUP BY id, fecha_hora_inicio
+    ), pagina AS (
+        SELECT id, fecha_hora_inicio, relevancia
+        FROM ranking
+        WHERE $3::float8 IS NULL
+           OR (relevancia, fecha_hora_inicio, id) < ($3::float8, $4::timestamp, $5::bigint)
+        ORDER BY relevancia DESC, fecha_hora_inicio DESC, id DESC
+        LIMIT $6
+    )
+    SELECT {COLUMNAS}, r.relevancia
+    FROM pagina r
+    JOIN citas c ON c.id = r.id
+    JOIN pacientes p ON p.id = c.id_paciente
+    JOIN podologos pod ON pod.id = c.id_podologo
+    ORDER BY r.relevancia DESC, r.fecha_hora_inicio DESC, r.id DESC
+"""
+
+
+def consulta_texto(normalizado: str) -> str:
+    """``dolor talon`` -> ``dolor:* & talon:*`` (cada palabra como prefijo)"""
+    return " & ".join(f"{palabra}:*" for palabra in normalizado.split())
+
+
+# ============================================================================
+# CURSOR
+# ============================================================================
+
+
+def codificar_cursor(cita: Dict[str, Any]) -> str:
+    """Cursor opaco con la llave de orden (relevancia, fecha, id) de una cita"""
+    llave = [cita["relevancia"], cita["fecha_hora_inicio"].isoformat(), cita["id"]]
+    return base64.urlsafe_b64encode(json.dumps(llave).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[float, datetime, int]:
+    """Inverso de codificar_cursor; ValueError si el cursor no es válido"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        relevancia, fecha, id_cita = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return float(relevancia), datetime.fromisoformat(fecha), int(id_cita)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor de búsqueda inválido") from e
+
+
+# ============================================================================
+# BÚSQUEDA
+# ============================================================================
+
+
+async def buscar_citas(
+    texto: str,
+    limite: int = LIMITE_DEFAULT,
+    cursor: Optional[str] = None,
+    conn=None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Citas que coinciden con ``texto``, ordenadas por relevancia.
+
+    Returns:
+        (página de citas, cursor de la siguiente página o None si no hay más)
+    """
+    normalizado = normalizar(texto)
+    if not normalizado:
+        return [], None
+
+    despues = decodificar_cursor(cursor) if cursor else (None, None, None)
+    # Una fila de más para saber si hay otra página
+    params = (normalizado, consulta_texto(normalizado), *despues, limite + 1)
+    if conn is not None:
+        filas = [dict(f) for f in await conn.fetch(_CONSULTA, *params)]
+    else:
+        filas = await db.fetch_all(_CONSULTA, *params)
+
+    siguiente = codificar_cursor(filas[limite - 1]) if len(filas) > limite else None
+    return filas[:limite], siguiente
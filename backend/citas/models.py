@@ -191,6 +191,14 @@ class CitaListResponse(BaseModel):
     citas: List[CitaResponse]
 
 
+class CitaBusquedaResponse(CitaListResponse):
+    """Modelo de respuesta para una página de la búsqueda de citas."""
+
+    siguiente_cursor: Optional[str] = Field(
+        None, description="Cursor para pedir la siguiente página (None si no hay más)"
+    )
+
+
 # ============================================================================
 # DISPONIBILIDAD
 # ============================================================================
@@ -20,6 +20,7 @@ from .models import (
     CitaCancel,
     CitaResponse,
     CitaListResponse,
+    CitaBusquedaResponse,
     DisponibilidadResponse,
     PacienteInfo,
     PodologoInfo,
@@ -361,35 +362,43 @@ async def cancelar_cita_endpoint(id_cita: int, cancelacion: CitaCancel):
         )
 
 
-@router.get("/buscar")
+@router.get("/buscar", response_model=CitaBusquedaResponse)
 async def buscar_citas(
     q: str = Query(..., min_length=2, description="Término de búsqueda"),
-    limit: int = Query(50, gt=0, le=200, description="Límite de resultados")
+    limit: int = Query(50, gt=0, le=200, description="Límite de resultados"),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior")
 ):
     """
     Busca citas por nombre de paciente, podólogo o contenido de notas.
     
-    Realiza búsqueda insensible a mayúsculas en:
-    - Nombre del paciente
-    - Nombre del podólogo
-    - Notas de recepción
-    - Motivo de consulta
+    Realiza búsqueda sin distinguir mayúsculas ni acentos en:
+    - Nombre del paciente (tolera errores de tipeo)
+    - Nombre del podólogo (tolera errores de tipeo)
+    - Notas de recepción (texto completo, palabras como prefijo)
+    - Motivo de consulta (texto completo, palabras como prefijo)
+    
+    Los resultados van por relevancia y luego por fecha. Para la siguiente
+    página se manda el ``siguiente_cursor`` de la respuesta.
     
     **Ejemplo de uso:**
     ```
     GET /citas/buscar?q=Juan&limit=20
+    GET /citas/buscar?q=Juan&limit=20&cursor=WzEuMCwgIjIwMjYtMDEtMTVUMTA6MDA6MDAiLCA0Ml0
     ```
     """
     try:
-        citas = await service.buscar_citas(q, limit)
+        citas, siguiente = await service.buscar_citas(q, limit, cursor)
         
         # Formatear respuestas
         citas_formateadas = [format_cita_response(cita) for cita in citas]
         
-        return CitaListResponse(
+        return CitaBusquedaResponse(
             total=len(citas_formateadas),
-            citas=citas_formateadas
+            citas=citas_formateadas,
+            siguiente_cursor=siguiente
         )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error buscando citas con término '{q}': {e}")
         raise HTTPException(
@@ -11,12 +11,14 @@ from datetime import datetime, timedelta, date
 from typing import List, Optional, Dict, Any, Tuple
 from fastapi import HTTPException
 
+from . import busqueda
 from .database import (
     execute_query,
     execute_query_one,
     execute_mutation,
 )
 from db import get_connection, release_connection
+from cache import invalidate_tags
 import asyncpg
 
 logger = logging.getLogger(__name__)
@@ -383,6 +385,8 @@ async def crear_cita(
     if not cita:
         raise Exception("Error al crear la cita")
 
+    invalidate_tags("citas")
+
     # Obtener la cita con información completa
     return await obtener_cita_por_id(cita["id"])
 
@@ -535,6 +539,7 @@ async def crear_cita_smart(
             created_id = row["id"]
 
         # fin transaction
+        invalidate_tags("citas", "pacientes")
         return await obtener_cita_por_id(created_id)
 
     except Exception:
@@ -646,6 +651,7 @@ async def actualizar_cita(
     params.append(id_cita)
 
     await execute_mutation(query, tuple(params))
+    invalidate_tags("citas")
 
     # Retornar la cita actualizada con información completa
     return await obtener_cita_por_id(id_cita)
@@ -687,6 +693,7 @@ async def cancelar_cita(
     """
 
     await execute_mutation(query, (motivo_cancelacion, id_cita))
+    invalidate_tags("citas")
 
     # Retornar la cita cancelada
     return await obtener_cita_por_id(id_cita)
@@ -933,6 +940,7 @@ async def crear_serie(serie_data: Any, creado_por: int) -> Dict[str, Any]:
     )
     
     logger.info(f"Serie creada: ID {serie['id']}")
+    invalidate_tags("citas")
     
     # Nota: El trigger automáticamente generará las citas
     # Contar citas generadas
@@ -1088,6 +1096,7 @@ async def actualizar_serie(
     
     if result:
         logger.info(f"Serie {id_serie} actualizada")
+        invalidate_tags("citas")
         return await obtener_serie_por_id(id_serie)
     
     return None
@@ -1114,6 +1123,8 @@ async def desactivar_serie(
         result = await conn.fetchrow(query, id_serie)
         
         if result and result['resultado']:
+            invalidate_tags("citas")
+
             # Contar citas canceladas si aplica
             if cancelar_futuras:
                 query_count = """
@@ -1146,56 +1157,27 @@ async def desactivar_serie(
 # ============================================================================
 
 
-async def buscar_citas(termino_busqueda: str, limit: int = 50) -> List[Dict[str, Any]]:
+async def buscar_citas(
+    termino_busqueda: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
-    Busca citas por nombre de paciente, podólogo o notas.
+    Busca citas por nombre de paciente, podólogo, motivo o notas.
+
+    Usa el texto completo de motivo y notas y los trigramas de los nombres
+    (ver busqueda.py), ordenado por relevancia y paginado por cursor.
     
     Args:
         termino_busqueda: Término a buscar
         limit: Límite de resultados
+        cursor: Cursor devuelto por la página anterior
         
     Returns:
-        Lista de citas que coinciden con el término
+        (citas que coinciden, cursor de la siguiente página o None)
     """
-    # Preparar patrón para búsqueda ILIKE
-    patron = f"%{termino_busqueda}%"
-    
-    query = """
-        SELECT 
-            c.id,
-            c.id_paciente,
-            c.id_podologo,
-            c.fecha_hora_inicio,
-            c.fecha_hora_fin,
-            c.tipo_cita,
-            c.estado,
-            c.motivo_consulta,
-            c.notas_recepcion,
-            c.motivo_cancelacion,
-            c.es_primera_vez,
-            c.recordatorio_24h_enviado,
-            c.recordatorio_2h_enviado,
-            c.fecha_creacion,
-            c.fecha_actualizacion,
-            p.nombre_completo as paciente_nombre,
-            pod.nombre_completo as podologo_nombre
-        FROM citas c
-        JOIN pacientes p ON c.id_paciente = p.id
-        JOIN podologos pod ON c.id_podologo = pod.id
-        WHERE 
-            p.nombre_completo ILIKE %s OR
-            pod.nombre_completo ILIKE %s OR
-            c.notas_recepcion ILIKE %s OR
-            c.motivo_consulta ILIKE %s
-        ORDER BY c.fecha_hora_inicio DESC
-        LIMIT %s
-    """
-    
-    citas = await execute_query(
-        query,
-        (patron, patron, patron, patron, limit)
-    )
+    citas, siguiente = await busqueda.buscar_citas(termino_busqueda, limit, cursor)
     
-    logger.info(f"Búsqueda '{termino_busqueda}': {len(citas) if citas else 0} resultados")
+    logger.info(f"Búsqueda '{termino_busqueda}': {len(citas)} resultados")
     
-    return citas or []
+    return citas, siguiente
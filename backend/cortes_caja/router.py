@@ -18,13 +18,13 @@ class CorteCreate(BaseModel):
 @router.get("")
 async def listar_cortes():
     """Lista todos los cortes de caja."""
-    return cortes_caja_service.get_all()
+    return await cortes_caja_service.get_all()
 
 
 @router.get("/{fecha}")
 async def obtener_corte(fecha: date):
     """Obtiene el corte de una fecha específica."""
-    corte = cortes_caja_service.get_by_fecha(fecha)
+    corte = await cortes_caja_service.get_by_fecha(fecha)
     if not corte:
         raise HTTPException(404, "No hay corte para esa fecha")
     return corte
@@ -33,9 +33,9 @@ async def obtener_corte(fecha: date):
 @router.post("", status_code=201)
 async def crear_corte(corte: CorteCreate):
     """Crea el corte de caja del día."""
-    existente = cortes_caja_service.get_by_fecha(corte.fecha)
-    if existente:
-        raise HTTPException(400, "Ya existe un corte para esta fecha")
-    return cortes_caja_service.crear_corte(
+    creado = await cortes_caja_service.crear_corte(
         fecha=corte.fecha, realizado_por=corte.realizado_por, notas=corte.notas
     )
+    if creado is None:
+        raise HTTPException(400, "Ya existe un corte para esta fecha")
+    return creado
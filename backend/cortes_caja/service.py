@@ -1,105 +1,90 @@
 """Servicio Cortes de Caja."""
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import date
-from db import fetch_all, fetch_one, execute_returning
+from db import fetch_all, fetch_one, get_connection, release_connection
+
+
+_COLUMNAS = """
+    id, fecha_corte, ingresos_efectivo, ingresos_tarjeta,
+    ingresos_transferencia, total_ingresos, gastos_dia,
+    saldo_final, realizado_por, notas, fecha_registro
+"""
 
 
 class CortesCajaService:
 
     async def get_all(self) -> List[Dict[str, Any]]:
-        query = """
-            SELECT id, fecha_corte, ingresos_efectivo, ingresos_tarjeta,
-                   ingresos_transferencia, total_ingresos, gastos_dia,
-                   saldo_final, realizado_por, notas, fecha_registro
-            FROM cortes_caja ORDER BY fecha_corte DESC
-        """
-        return await fetch_all(query)
-
-    def get_by_fecha(self, fecha: date) -> Dict[str, Any]:
-        conn = self._get_connection()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT id, fecha_corte, ingresos_efectivo, ingresos_tarjeta,
-                   ingresos_transferencia, total_ingresos, gastos_dia,
-                   saldo_final, realizado_por, notas, fecha_registro
-            FROM cortes_caja WHERE fecha_corte = %s
-        """,
-            (fecha,),
+        return await fetch_all(
+            f"SELECT {_COLUMNAS} FROM cortes_caja ORDER BY fecha_corte DESC"
         )
-        row = cur.fetchone()
-        if row:
-            columns = [
-                "id",
-                "fecha_corte",
-                "ingresos_efectivo",
-                "ingresos_tarjeta",
-                "ingresos_transferencia",
-                "total_ingresos",
-                "gastos_dia",
-                "saldo_final",
-                "realizado_por",
-                "notas",
-                "fecha_registro",
-            ]
-            return dict(zip(columns, row))
-        return None
-
-    def crear_corte(self, fecha: date, realizado_por: int, notas: str = None):
-        conn = self._get_connection()
-        cur = conn.cursor()
 
-        # Calcular ingresos del día por método de pago
-        cur.execute(
-            """
-            SELECT 
-                SUM(CASE WHEN metodo_pago = 'Efectivo' THEN monto_total ELSE 0 END),
-                SUM(CASE WHEN metodo_pago IN ('Tarjeta_Credito', 'Tarjeta_Debito') THEN monto_total ELSE 0 END),
-                SUM(CASE WHEN metodo_pago = 'Transferencia' THEN monto_total ELSE 0 END),
-                SUM(monto_total)
-            FROM pagos WHERE DATE(fecha_pago) = %s
-        """,
-            (fecha,),
+    async def get_by_fecha(self, fecha: date) -> Optional[Dict[str, Any]]:
+        return await fetch_one(
+            f"SELECT {_COLUMNAS} FROM cortes_caja WHERE fecha_corte = $1", fecha
         )
-        pagos = cur.fetchone()
 
-        # Calcular gastos del día
-        cur.execute(
-            "SELECT COALESCE(SUM(monto), 0) FROM gastos WHERE DATE(fecha_gasto) = %s",
-            (fecha,),
-        )
-        gastos = cur.fetchone()[0]
+    async def crear_corte(
+        self, fecha: date, realizado_por: int, notas: str = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Calcula e inserta el corte del día en una transacción.
 
-        efectivo = float(pagos[0] or 0)
-        tarjeta = float(pagos[1] or 0)
-        transferencia = float(pagos[2] or 0)
-        total_ingresos = float(pagos[3] or 0)
-        gastos_dia = float(gastos or 0)
-        saldo = total_ingresos - gastos_dia
+        Returns:
+            El corte creado, o None si ya existía uno para esa fecha
+        """
+        conn = await get_connection()
+        try:
+            async with conn.transaction():
+                # Serializa cortes concurrentes del mismo día
+                await conn.execute(
+                    "SELECT pg_advisory_xact_lock(hashtext('cortes_caja'), $1)",
+                    fecha.toordinal(),
+                )
+                if await conn.fetchval(
+                    "SELECT 1 FROM cortes_caja WHERE fecha_corte = $1", fecha
+                ):
+                    return None
 
-        cur.execute(
-            """
-            INSERT INTO cortes_caja (fecha_corte, ingresos_efectivo, ingresos_tarjeta,
-                ingresos_transferencia, total_ingresos, gastos_dia, saldo_final,
-                realizado_por, notas)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
-        """,
-            (
-                fecha,
-                efectivo,
-                tarjeta,
-                transferencia,
-                total_ingresos,
-                gastos_dia,
-                saldo,
-                realizado_por,
-                notas,
-            ),
-        )
-        new_id = cur.fetchone()[0]
-        conn.commit()
-        return self.get_by_fecha(fecha)
+                # Ingresos por método de pago y gastos del día (rango sobre
+                # el timestamp para poder usar índices)
+                totales = await conn.fetchrow(
+                    """
+                    SELECT
+                        COALESCE(SUM(monto_total) FILTER (WHERE metodo_pago = 'Efectivo'), 0) AS efectivo,
+                        COALESCE(SUM(monto_total) FILTER (
+                            WHERE metodo_pago IN ('Tarjeta_Credito', 'Tarjeta_Debito')), 0) AS tarjeta,
+                        COALESCE(SUM(monto_total) FILTER (WHERE metodo_pago = 'Transferencia'), 0) AS transferencia,
+                        COALESCE(SUM(monto_total), 0) AS total_ingresos,
+                        (SELECT COALESCE(SUM(monto), 0) FROM gastos
+                         WHERE fecha_gasto >= $1::date AND fecha_gasto < $1::date + 1) AS gastos_dia
+                    FROM pagos
+                    WHERE fecha_pago >= $1::date AND fecha_pago < $1::date + 1
+                    """,
+                    fecha,
+                )
+
+                row = await conn.fetchrow(
+                    f"""
+                    INSERT INTO cortes_caja (fecha_corte, ingresos_efectivo, ingresos_tarjeta,
+                        ingresos_transferencia, total_ingresos, gastos_dia, saldo_final,
+                        realizado_por, notas)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                    RETURNING {_COLUMNAS}
+                    """,
+                    fecha,
+                    totales["efectivo"],
+                    totales["tarjeta"],
+                    totales["transferencia"],
+                    totales["total_ingresos"],
+                    totales["gastos_dia"],
+                    totales["total_ingresos"] - totales["gastos_dia"],
+                    realizado_por,
+                    notas,
+                )
+                return dict(row)
+        finally:
+            await release_connection(conn)
 
 
 cortes_caja_service = CortesCajaService()
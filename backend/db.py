@@ -6,8 +6,10 @@ Reemplaza databases, psycopg2 y psycopg3.
 """
 
 import os
+import re
 import logging
-from typing import Optional, Dict, List, Any
+from functools import lru_cache
+from typing import Optional, Dict, List, Any, Tuple
 import asyncpg
 from dotenv import load_dotenv
 
@@ -127,6 +129,115 @@ async def get_db_connection_citas():
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 
+# ============================================================================
+# PARÁMETROS NOMBRADOS (:param -> $n)
+# ============================================================================
+
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1024"))
+
+# Inicio de lo que el compilador debe mirar: literales, identificadores entre
+# comillas, dollar quotes, comentarios, casts y parámetros
+_SIGUIENTE = re.compile(r"[eE]'|'|\"|\$|--|/\*|::|:(?=[A-Za-z_])")
+_NOMBRE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_DOLAR = re.compile(r"\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$")
+
+
+def _fin_comentario(query: str, i: int) -> int:
+    """Fin de un comentario /* */ que empieza en ``i`` (Postgres los anida)."""
+    nivel = 0
+    n = len(query)
+    while i < n:
+        if query.startswith("/*", i):
+            nivel += 1
+            i += 2
+        elif query.startswith("*/", i):
+            nivel -= 1
+            i += 2
+            if nivel == 0:
+                return i
+        else:
+            i += 1
+    return n
+
+
+def _fin_cadena(query: str, i: int, comilla: str, escapes: bool) -> int:
+    """Fin de un literal que abre en ``i`` (la comilla repetida se escapa; E'' admite \\)."""
+    n = len(query)
+    while i < n:
+        c = query[i]
+        if escapes and c == "\\":
+            i += 2
+        elif c == comilla:
+            if query.startswith(comilla, i + 1):
+                i += 2
+            else:
+                return i + 1
+        else:
+            i += 1
+    return n
+
+
+@lru_cache(maxsize=DB_QUERY_CACHE_SIZE)
+def compilar_query(query: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Compila una query con parámetros ``:nombre`` al formato de AsyncPG.
+
+    Recorre el SQL una sola vez ignorando literales ('...', E'...',
+    $tag$...$tag$), identificadores entre comillas, comentarios y casts
+    ``::tipo``. Un mismo nombre repetido usa el mismo ``$n``. El resultado
+    queda en un LRU: las queries del código son constantes.
+
+    Returns:
+        (query con $1, $2..., nombres de los parámetros en ese orden)
+    """
+    partes: List[str] = []
+    nombres: Dict[str, int] = {}
+    inicio = 0
+    i = 0
+    while True:
+        m = _SIGUIENTE.search(query, i)
+        if m is None:
+            break
+        token = m.group()
+        i = m.start()
+        if token == "::":
+            i += 2
+        elif token[0] == ":":
+            nombre = _NOMBRE.match(query, i + 1).group()
+            if nombre not in nombres:
+                nombres[nombre] = len(nombres) + 1
+            partes.append(query[inicio:i])
+            partes.append(f"${nombres[nombre]}")
+            i += 1 + len(nombre)
+            inicio = i
+        elif token == "--":
+            fin = query.find("\n", i)
+            i = len(query) if fin == -1 else fin
+        elif token == "/*":
+            i = _fin_comentario(query, i)
+        elif token == "$":
+            dolar = _DOLAR.match(query, i)
+            if dolar is None:
+                # $1 u otro uso de $ que no abre un dollar quote
+                i += 1
+            else:
+                fin = query.find(dolar.group(), dolar.end())
+                i = len(query) if fin == -1 else fin + len(dolar.group())
+        elif token == '"':
+            i = _fin_cadena(query, i + 1, '"', escapes=False)
+        elif token == "'":
+            i = _fin_cadena(query, i + 1, "'", escapes=False)
+        else:
+            # E'...': la E solo cuenta si no es el final de un identificador
+            if i > 0 and (query[i - 1].isalnum() or query[i - 1] in "_$"):
+                i += 1
+            else:
+                i = _fin_cadena(query, i + 2, "'", escapes=True)
+
+    partes.append(query[inicio:])
+    return "".join(partes), tuple(nombres)
+
+
 # ============================================================================
 # WRAPPER PARA DATABASES LIBRARY (DEPRECATED)
 # ============================================================================
@@ -187,20 +298,20 @@ class DatabaseWrapper:
         """
         Convierte query de databases (:param) a AsyncPG ($1, $2).
 
+        La query se compila una vez (ver ``compilar_query``); en cada
+        llamada solo se ordenan los valores.
+
         Returns:
             (query_convertido, lista_de_parametros)
         """
         if not values:
             return query, []
 
-        # Ordenar keys para mantener consistencia
-        param_names = sorted(values.keys(), key=lambda k: query.find(f":{k}"))
-        params = []
-        converted_query = query
-
-        for i, param_name in enumerate(param_names, 1):
-            converted_query = converted_query.replace(f":{param_name}", f"${i}")
-            params.append(values[param_name])
+        converted_query, param_names = compilar_query(query)
+        try:
+            params = [values[name] for name in param_names]
+        except KeyError as e:
+            raise KeyError(f"Falta el valor del parámetro :{e.args[0]}") from None
 
         return converted_query, params
 
@@ -13,7 +13,7 @@ from decimal import Decimal
 import logging
 
 from facturas.models import FacturaCreate
-from audit.service import log_action
+from audit.service import log_action_async
 from db import get_connection, release_connection
 
 logger = logging.getLogger(__name__)
@@ -225,7 +225,7 @@ class FacturasService:
             factura = await self.get_by_id(factura_id)
             
             # Registrar en auditoría
-            log_action(
+            await log_action_async(
                 usuario_id=usuario_id,
                 accion="crear",
                 modulo="facturas",
@@ -267,7 +267,7 @@ class FacturasService:
             factura_cancelada = await self.get_by_id(factura_id)
             
             # Registrar en auditoría
-            log_action(
+            await log_action_async(
                 usuario_id=usuario_id,
                 accion="cancelar",
                 modulo="facturas",
@@ -6,6 +6,7 @@ from typing import Optional, List
 from datetime import datetime
 from .service import gastos_service
 from db import get_connection, release_connection
+from cache import invalidate_tags
 
 router = APIRouter(prefix="/gastos", tags=["Gastos"])
 
@@ -218,6 +219,7 @@ async def crear_gasto_con_inventario(request: GastoConInventarioRequest):
                 )
 
         await release_connection(conn)
+        invalidate_tags("gastos", "inventario")
 
         return {
             "success": True,
@@ -4,6 +4,8 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 import logging
 
+from cache import invalidate_tags
+
 logger = logging.getLogger(__name__)
 
 
@@ -132,6 +134,7 @@ class GastosService:
                 data.get("notas"),
             )
 
+            invalidate_tags("gastos")
             return dict(new_gasto) if new_gasto else None
 
         except Exception as e:
@@ -22,7 +22,7 @@ async def get_horarios(
     - activo: Filtrar por estado (true/false)
     """
     try:
-        horarios = horarios_service.get_all(id_podologo=id_podologo, activo=activo)
+        horarios = await horarios_service.get_all(id_podologo=id_podologo, activo=activo)
         return horarios
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -33,7 +33,7 @@ async def get_horario(
     current_user: dict = Depends(get_current_user)
 ):
     """Obtiene un horario específico por ID."""
-    horario = horarios_service.get_by_id(horario_id)
+    horario = await horarios_service.get_by_id(horario_id)
     if not horario:
         raise HTTPException(status_code=404, detail=f"Horario con ID {horario_id} no encontrado")
     return horario
@@ -60,7 +60,7 @@ async def create_horario(
     
     try:
         horario_dict = horario.model_dump()
-        nuevo_horario = horarios_service.create(
+        nuevo_horario = await horarios_service.create(
             horario_data=horario_dict,
             creado_por=current_user["id"]
         )
@@ -91,7 +91,7 @@ async def update_horario(
     
     try:
         updates = {k: v for k, v in horario.model_dump().items() if v is not None}
-        horario_actualizado = horarios_service.update(horario_id, updates)
+        horario_actualizado = await horarios_service.update(horario_id, updates)
         return horario_actualizado
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -117,7 +117,7 @@ async def delete_horario(
         )
     
     try:
-        success = horarios_service.delete(horario_id)
+        success = await horarios_service.delete(horario_id)
         if not success:
             raise HTTPException(status_code=404, detail=f"Horario con ID {horario_id} no encontrado")
         return None
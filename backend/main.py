@@ -57,6 +57,10 @@ from api.web_chat_api import router as web_chat_router
 
 # Importar middleware de rate limiting
 from middleware.rate_limit import rate_limit_middleware
+from middleware.route_timing import RouteTimingMiddleware
+
+# Importar monitor del event loop
+from monitoring import LOOP_MONITOR_ENABLED, router as monitoring_router
 
 # Importar catálogo de servicios
 from catalog.router import router as catalog_router
@@ -123,6 +127,12 @@ async def lifespan(app: FastAPI):
     if db_password == "podoskin_password_123":
         logger.warning("⚠️ ADVERTENCIA: Usando password por defecto inseguro!")
 
+    # Monitor del event loop (antes que nada para ver también el arranque)
+    if LOOP_MONITOR_ENABLED:
+        from monitoring import monitor
+
+        monitor.iniciar()
+
     # Inicializar pool centralizado de AsyncPG
     try:
         from db import init_db_pool
@@ -133,11 +143,146 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Failed to initialize database pool: {e}")
         raise
 
+    # Fan-out de notificaciones WebSocket entre workers
+    try:
+        from ws_notifications.fanout import fanout
+
+        await fanout.iniciar()
+    except Exception as e:
+        logger.error(f"❌ Failed to start notification fan-out: {e}")
+
+    # Escritor de auditoría por lotes
+    try:
+        from audit.writer import audit_writer
+
+        audit_writer.iniciar()
+    except Exception as e:
+        logger.error(f"❌ Failed to start audit writer: {e}")
+
+    # Índice de búsqueda de pacientes (se carga en segundo plano)
+    try:
+        from pacientes.busqueda import indice_pacientes
+
+        await indice_pacientes.iniciar()
+    except Exception as e:
+        logger.error(f"❌ Failed to start patient search index: {e}")
+
+    # Caché de expedientes médicos (invalidada por NOTIFY)
+    try:
+        from medical_records import expediente
+
+        await expediente.iniciar()
+    except Exception as e:
+        logger.error(f"❌ Failed to start medical record cache: {e}")
+
+    # Catálogo CIE-10 en memoria (se carga en segundo plano)
+    try:
+        from tratamientos.cie10 import catalogo_cie10
+
+        catalogo_cie10.iniciar()
+    except Exception as e:
+        logger.error(f"❌ Failed to start CIE-10 catalog: {e}")
+
+    # Embeddings faltantes o de otro modelo (se indexan en segundo plano)
+    try:
+        from whatsapp_management.indexador_embeddings import indexador_embeddings
+
+        await indexador_embeddings.iniciar()
+    except Exception as e:
+        logger.error(f"❌ Failed to start embeddings indexer: {e}")
+
+    # Resúmenes de conversaciones (embedding y escrituras fuera del agente)
+    try:
+        from whatsapp_management.resumenes_conversaciones import resumenes_conversaciones
+
+        resumenes_conversaciones.iniciar()
+    except Exception as e:
+        logger.error(f"❌ Failed to start conversation summaries: {e}")
+
+    # Compilar plantillas (email, WhatsApp, PDF) una sola vez
+    try:
+        from plantillas import precompilar
+
+        precompilar()
+    except Exception as e:
+        logger.error(f"❌ Error precompiling templates: {e}")
+
     yield  # ← La aplicación corre aquí
 
     # ✅ Shutdown
     logger.info("Shutting down Podoskin Solution Backend...")
 
+    try:
+        from ws_notifications.fanout import fanout
+
+        await fanout.detener()
+    except Exception as e:
+        logger.error(f"❌ Error stopping notification fan-out: {e}")
+
+    try:
+        from pacientes.busqueda import indice_pacientes
+
+        await indice_pacientes.detener()
+    except Exception as e:
+        logger.error(f"❌ Error stopping patient search index: {e}")
+
+    try:
+        from medical_records import expediente
+
+        await expediente.detener()
+    except Exception as e:
+        logger.error(f"❌ Error stopping medical record cache: {e}")
+
+    try:
+        from tratamientos.cie10 import catalogo_cie10
+
+        await catalogo_cie10.detener()
+    except Exception as e:
+        logger.error(f"❌ Error stopping CIE-10 catalog: {e}")
+
+    try:
+        from whatsapp_management.indexador_embeddings import indexador_embeddings
+
+        await indexador_embeddings.detener()
+    except Exception as e:
+        logger.error(f"❌ Error stopping embeddings indexer: {e}")
+
+    try:
+        from whatsapp_management.resumenes_conversaciones import resumenes_conversaciones
+
+        await resumenes_conversaciones.detener()
+    except Exception as e:
+        logger.error(f"❌ Error stopping conversation summaries: {e}")
+
+    # Vaciar auditoría pendiente antes de cerrar el pool
+    try:
+        from audit.writer import audit_writer
+
+        await audit_writer.detener()
+    except Exception as e:
+        logger.error(f"❌ Error flushing audit writer: {e}")
+
+    try:
+        from analytics.predictor import shutdown_ml_executor
+
+        shutdown_ml_executor()
+    except Exception as e:
+        logger.error(f"❌ Error closing ML process pool: {e}")
+
+    try:
+        from reportes.render import shutdown_render_executor
+
+        shutdown_render_executor()
+    except Exception as e:
+        logger.error(f"❌ Error closing report render pool: {e}")
+
+    try:
+        from monitoring import monitor
+
+        await monitor.detener()
+    except Exception as e:
+        logger.error(f"❌ Error stopping event loop monitor: {e}")
+
     try:
         from db import close_db_pool
 
@@ -166,6 +311,10 @@ app.add_middleware(CORSMiddleware, **CORS_CONFIG)
 # Configurar rate limiting middleware (para WhatsApp webhook)
 app.middleware("http")(rate_limit_middleware)
 
+# Tiempo de pared vs CPU del loop por ruta (solo con LOOP_MONITOR_ENABLED)
+if LOOP_MONITOR_ENABLED:
+    app.add_middleware(RouteTimingMiddleware)
+
 # Incluir routers
 app.include_router(auth_router)
 app.include_router(users_router, prefix="/api")
@@ -187,6 +336,7 @@ app.include_router(stats_router, prefix="/api")
 app.include_router(medical_records_router)
 app.include_router(reportes_router, prefix="/api")
 app.include_router(analytics_router, prefix="/api")
+app.include_router(monitoring_router, prefix="/api")
 app.include_router(whatsapp_agent_router)  # WhatsApp Agent (LangGraph) - AI System
 
 # WebSocket para notificaciones en tiempo real (sin prefix /api)
@@ -0,0 +1,198 @@
+"""
+Armado del expediente médico
+============================
+
+``get_medical_record`` necesitaba siete consultas secuenciales (paciente,
+alergias, antecedentes, estilo de vida, ginecología, consultas y
+diagnósticos), cada una con su propia conexión. Aquí se arma el expediente
+completo en una sola consulta que agrega cada sección como JSON: un solo
+round-trip y una sola conexión del pool por apertura.
+
+El resultado se guarda por paciente en una caché en proceso
+(``SingleFlightCache``: aperturas simultáneas del mismo expediente
+comparten la consulta). Se invalida:
+
+- en el mismo worker, desde los handlers que escriben el expediente
+  (``invalidar_expediente``), para leer lo recién guardado;
+- en todos los workers, por NOTIFY en ``expedientes_cambios``, que emiten
+  los triggers de data/migrations/29_expedientes_cambios_notify.sql ante
+  cualquier cambio en las tablas del expediente.
+
+Sin listener (no se pudo hacer LISTEN) no se usa la caché. Si la conexión
+LISTEN se pierde, los avisos de ese intervalo se pierden también: el TTL
+acota cuánto puede durar una sección vieja.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import db
+from cache import SingleFlightCache
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+EXPEDIENTE_CACHE_TTL_SECONDS = float(os.getenv("EXPEDIENTE_CACHE_TTL_SECONDS", "120"))
+EXPEDIENTE_CACHE_ENTRIES = int(os.getenv("EXPEDIENTE_CACHE_ENTRIES", "512"))
+EXPEDIENTE_CANAL = os.getenv("EXPEDIENTE_CANAL", "expedientes_cambios")
+
+# Secciones que vienen como JSON (listas u objetos)
+_SECCIONES_JSON = ("alergias", "antecedentes", "estilo_vida", "ginecologia", "consultas", "diagnosticos")
+
+# Mismas columnas, filtros y orden que las consultas por sección de router.py
+_EXPEDIENTE_QUERY = """
+    SELECT
+        p.id AS paciente_id,
+        p.primer_nombre || ' ' || COALESCE(p.segundo_nombre || ' ', '') ||
+        p.primer_apellido || COALESCE(' ' || p.segundo_apellido, '') AS paciente_nombre,
+        p.fecha_nacimiento,
+        p.sexo,
+        p.telefono_principal AS telefono,
+        p.email,
+        emr.fecha_ultima_actualizacion,
+        (
+            SELECT COALESCE(json_agg(a), '[]')
+            FROM (
+                SELECT id, tipo_alergeno AS tipo, nombre_alergeno AS sustancia,
+                       reaccion, severidad, activo
+                FROM alergias
+                WHERE id_paciente = p.id AND activo = true
+            ) a
+        ) AS alergias,
+        (
+            SELECT COALESCE(json_agg(am), '[]')
+            FROM (
+                SELECT id, tipo_categoria AS tipo, nombre_enfermedad AS enfermedad,
+                       parentesco, fecha_inicio, tratamiento_actual, controlado, notas
+                FROM antecedentes_medicos
+                WHERE id_paciente = p.id AND activo = true
+            ) am
+        ) AS antecedentes,
+        (
+            SELECT row_to_json(ev)
+            FROM (
+                SELECT tipo_dieta, descripcion_dieta, ejercicio_frecuencia, tipo_ejercicio,
+                       tabaquismo, tabaco_cigarros_dia, tabaco_anios,
+                       alcoholismo, alcohol_frecuencia,
+                       drogas, drogas_tipo,
+                       inmunizaciones_completas, esquema_vacunacion,
+                       higiene_sueno_horas, exposicion_toxicos, suplementos_vitaminas, notas
+                FROM estilo_vida
+                WHERE id_paciente = p.id
+                LIMIT 1
+            ) ev
+        ) AS estilo_vida,
+        (
+            SELECT row_to_json(hg)
+            FROM (
+                SELECT menarca_edad, ritmo_menstrual_dias, fecha_ultima_menstruacion,
+                       gestaciones, partos, cesareas, abortos,
+                       metodo_anticonceptivo, menopausia, fecha_menopausia, notas_adicionales
+                FROM historia_ginecologica
+                WHERE id_paciente = p.id
+                LIMIT 1
+            ) hg
+        ) AS ginecologia,
+        (
+            SELECT COALESCE(json_agg(c ORDER BY c.fecha_consulta DESC), '[]')
+            FROM (
+                SELECT c.id, c.fecha_consulta, c.motivo_consulta, c.sintomas,
+                       c.exploracion_fisica, c.plan_tratamiento, c.indicaciones,
+                       c.finalizada, c.fecha_finalizacion,
+                       u.nombre_completo AS podologo_nombre
+                FROM consultas c
+                LEFT JOIN usuarios u ON u.id = c.id_podologo
+                WHERE c.id_paciente = p.id
+                ORDER BY c.fecha_consulta DESC
+                LIMIT 10
+            ) c
+        ) AS consultas,
+        (
+            SELECT COALESCE(json_agg(d ORDER BY d.fecha_diagnostico DESC), '[]')
+            FROM (
+                SELECT id, codigo_cie10, nombre_diagnostico, tipo_diagnostico,
+                       descripcion, fecha_diagnostico, activo
+                FROM diagnosticos
+                WHERE id_paciente = p.id AND activo = true
+            ) d
+        ) AS diagnosticos
+    FROM pacientes p
+    LEFT JOIN expedientes_medicos_resumen emr ON emr.paciente_id = p.id
+    WHERE p.id = $1 AND p.activo = true
+"""
+
+# Caché por paciente, compartida por el proceso
+expedientes = SingleFlightCache(max_entries=EXPEDIENTE_CACHE_ENTRIES)
+
+_listener = None
+
+
+async def cargar_expediente(patient_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Arma el expediente completo en una sola consulta (sin caché).
+
+    Returns:
+        Dict con las llaves de ``MedicalRecordResponse`` o None si el
+        paciente no existe o está inactivo
+    """
+    fila = await db.fetch_one(_EXPEDIENTE_QUERY, patient_id)
+    if fila is None:
+        return None
+    for seccion in _SECCIONES_JSON:
+        if fila[seccion] is not None:
+            fila[seccion] = json.loads(fila[seccion])
+    return fila
+
+
+async def obtener_expediente(patient_id: int) -> Optional[Dict[str, Any]]:
+    """Expediente del paciente, desde la caché si el listener está activo."""
+    if _listener is None:
+        return await cargar_expediente(patient_id)
+    return await expedientes.get_or_compute(
+        patient_id,
+        lambda: cargar_expediente(patient_id),
+        ttl=EXPEDIENTE_CACHE_TTL_SECONDS,
+    )
+
+
+def invalidar_expediente(patient_id: int) -> None:
+    """Descarta el expediente en caché (llamar después de escribirlo)."""
+    expedientes.invalidate(patient_id)
+
+
+async def _on_cambio(mensaje: Dict[str, Any]) -> None:
+    try:
+        invalidar_expediente(int(mensaje["id"]))
+    except (KeyError, TypeError, ValueError):
+        logger.warning(f"[Expedientes] Aviso inválido en {EXPEDIENTE_CANAL}: {mensaje}")
+
+
+async def iniciar() -> None:
+    """Escucha los cambios de expedientes para invalidar la caché."""
+    global _listener
+    if _listener is not None:
+        return
+    from ws_notifications.fanout import BackendPostgres
+
+    listener = BackendPostgres(canal=EXPEDIENTE_CANAL)
+    try:
+        await listener.iniciar(_on_cambio)
+    except Exception as e:
+        # Sin avisos de otros workers la caché podría servir datos viejos
+        logger.error(f"[Expedientes] No se pudo escuchar {EXPEDIENTE_CANAL}: {e}")
+        return
+    _listener = listener
+
+
+async def detener() -> None:
+    global _listener
+    if _listener is not None:
+        await _listener.detener()
+        _listener = None
+    expedientes.clear()
+
+
+def get_expediente_stats() -> Dict[str, Any]:
+    return {"cache_activa": _listener is not None, **expedientes.info()}
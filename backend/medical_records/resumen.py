@@ -0,0 +1,140 @@
+"""
+Resumen de expedientes médicos
+==============================
+
+``expedientes_medicos_resumen`` es una tabla mantenida por triggers
+(data/migrations/28_expedientes_resumen_incremental.sql): cada sentencia
+sobre consultas, diagnosticos, alergias, estilo_vida o pacientes recalcula
+solo los pacientes que tocó, con la definición de la vista
+``expedientes_medicos_resumen_calculo``.
+
+Aquí están los trabajos de mantenimiento:
+
+- ``backfill_resumen``: recalcula todos los pacientes por lotes de ids, cada
+  lote en su propia transacción (carga inicial o reparación completa sin
+  bloquear la tabla entera).
+- ``verificar_resumen``: compara la tabla contra el cálculo completo, por
+  lotes de ids, y opcionalmente repara las diferencias.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List
+
+import db
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+EXPEDIENTES_RESUMEN_LOTE = int(os.getenv("EXPEDIENTES_RESUMEN_LOTE", "1000"))
+
+# Ids de pacientes del lote siguiente (activos o con fila en el resumen)
+_SIGUIENTE_LOTE = """
+    SELECT array_agg(id ORDER BY id) AS ids FROM (
+        SELECT id FROM pacientes WHERE id > $1
+        UNION
+        SELECT paciente_id FROM expedientes_medicos_resumen WHERE paciente_id > $1
+        ORDER BY 1
+        LIMIT $2
+    ) lote
+"""
+
+# Filas distintas entre la tabla y el cálculo completo, para un lote de ids
+_DIFERENCIAS = """
+    SELECT
+        COALESCE(r.paciente_id, c.paciente_id) AS paciente_id,
+        CASE
+            WHEN r.paciente_id IS NULL THEN 'faltante'
+            WHEN c.paciente_id IS NULL THEN 'sobrante'
+            ELSE 'distinto'
+        END AS problema
+    FROM (
+        SELECT * FROM expedientes_medicos_resumen
+        WHERE paciente_id = ANY($1::bigint[])
+    ) r
+    FULL JOIN (
+        SELECT * FROM expedientes_medicos_resumen_calculo
+        WHERE paciente_id = ANY($1::bigint[])
+    ) c ON c.paciente_id = r.paciente_id
+    WHERE ROW(r.*) IS DISTINCT FROM ROW(c.*)
+    ORDER BY 1
+"""
+
+
+async def _lotes(lote: int):
+    """Itera los ids de pacientes por lotes (keyset sobre el id)."""
+    ultimo = 0
+    while True:
+        fila = await db.fetch_one(_SIGUIENTE_LOTE, ultimo, lote)
+        ids = fila["ids"] if fila else None
+        if not ids:
+            return
+        yield ids
+        ultimo = ids[-1]
+
+
+async def backfill_resumen(lote: int = EXPEDIENTES_RESUMEN_LOTE, pausa: float = 0.0) -> int:
+    """
+    Recalcula el resumen de todos los pacientes por lotes.
+
+    Args:
+        lote: Pacientes por transacción
+        pausa: Segundos de espera entre lotes (para no saturar la BD)
+
+    Returns:
+        Número de pacientes procesados
+    """
+    total = 0
+    async for ids in _lotes(lote):
+        await db.fetch_one("SELECT recalcular_expedientes_resumen($1::bigint[])", ids)
+        total += len(ids)
+        logger.info(f"[Expedientes] Resumen recalculado hasta paciente {ids[-1]} ({total})")
+        if pausa:
+            await asyncio.sleep(pausa)
+    return total
+
+
+async def verificar_resumen(
+    lote: int = EXPEDIENTES_RESUMEN_LOTE, reparar: bool = False, muestra: int = 20
+) -> Dict[str, Any]:
+    """
+    Compara la tabla de resumen contra el cálculo completo.
+
+    Args:
+        lote: Pacientes comparados por consulta
+        reparar: Recalcular los pacientes con diferencias
+        muestra: Máximo de ids reportados por tipo de problema
+
+    Returns:
+        Dict con pacientes revisados, conteo por problema y ejemplos
+    """
+    revisados = 0
+    conteo: Dict[str, int] = {"faltante": 0, "sobrante": 0, "distinto": 0}
+    ejemplos: Dict[str, List[int]] = {k: [] for k in conteo}
+    reparados = 0
+
+    async for ids in _lotes(lote):
+        revisados += len(ids)
+        filas = await db.fetch_all(_DIFERENCIAS, ids)
+        for fila in filas:
+            conteo[fila["problema"]] += 1
+            if len(ejemplos[fila["problema"]]) < muestra:
+                ejemplos[fila["problema"]].append(fila["paciente_id"])
+        if reparar and filas:
+            await db.fetch_one(
+                "SELECT recalcular_expedientes_resumen($1::bigint[])",
+                [f["paciente_id"] for f in filas],
+            )
+            reparados += len(filas)
+
+    resultado = {
+        "revisados": revisados,
+        "diferencias": sum(conteo.values()),
+        "por_problema": conteo,
+        "ejemplos": ejemplos,
+        "reparados": reparados,
+    }
+    if resultado["diferencias"]:
+        logger.warning(f"[Expedientes] Resumen inconsistente: {conteo}")
+    return resultado
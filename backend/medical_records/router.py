@@ -14,8 +14,10 @@ from .schemas import (
     ConsultationCreate,
     ConsultationResponse,
 )
+from .expediente import invalidar_expediente, obtener_expediente
 from auth import get_current_user, User
 from db import database, get_connection
+from pacientes.busqueda import buscar_pacientes
 from pacientes.service import AlergiasService, AntecedentesService
 from pacientes.models import AlergiaCreate, AntecedenteCreate
 from pydantic import BaseModel
@@ -30,11 +32,14 @@ async def search_patients(
 ):
     """
     Búsqueda fuzzy de pacientes por ID, teléfono o nombre.
-    Tolera errores de tipeo usando similarity de PostgreSQL.
+    Tolera errores de tipeo e ignora acentos (índice de pacientes/busqueda.py,
+    con respaldo en la columna pacientes.busqueda y pg_trgm).
     """
-    # Instalar extensión pg_trgm si no existe (necesaria para búsqueda fuzzy)
-    await database.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
-    
+    encontrados = await buscar_pacientes(q, 50)
+    if not encontrados:
+        return []
+    orden = {p["id"]: i for i, p in enumerate(encontrados)}
+
     query = """
     SELECT 
         p.id,
@@ -54,33 +59,12 @@ async def search_patients(
         emr.diagnostico_reciente
     FROM pacientes p
     LEFT JOIN expedientes_medicos_resumen emr ON emr.paciente_id = p.id
-    WHERE p.activo = true
-    AND (
-        -- Búsqueda por ID exacto
-        p.id::text = :query
-        -- Búsqueda por teléfono exacto
-        OR p.telefono_principal = :query
-        OR p.telefono_secundario = :query
-        -- Búsqueda fuzzy por nombre (similarity > 0.3)
-        OR similarity(p.primer_nombre || ' ' || p.primer_apellido, :query) > 0.3
-        OR similarity(p.primer_nombre || ' ' || COALESCE(p.segundo_nombre, '') || ' ' || 
-                     p.primer_apellido || ' ' || COALESCE(p.segundo_apellido, ''), :query) > 0.3
-        -- Búsqueda con LIKE para subcadenas
-        OR LOWER(p.primer_nombre || ' ' || p.primer_apellido) LIKE LOWER('%' || :query || '%')
-    )
-    ORDER BY 
-        -- Prioridad: coincidencia exacta > fuzzy > LIKE
-        CASE 
-            WHEN p.id::text = :query THEN 1
-            WHEN p.telefono_principal = :query THEN 2
-            ELSE 3
-        END,
-        similarity(p.primer_nombre || ' ' || p.primer_apellido, :query) DESC
-    LIMIT 50
+    WHERE p.id = ANY(:ids)
     """
-    
-    results = await database.fetch_all(query, {"query": q})
-    return results
+
+    results = await database.fetch_all(query, {"ids": list(orden)})
+    # Mantener el orden de relevancia de la búsqueda
+    return sorted(results, key=lambda r: orden[r["id"]])
 
 
 @router.get("/upcoming-appointments", response_model=List[UpcomingAppointmentResponse])
@@ -170,107 +154,13 @@ async def get_medical_record(
 ):
     """
     Obtiene el expediente médico completo de un paciente.
+    Todas las secciones salen de una sola consulta, con caché por paciente
+    (ver expediente.py).
     """
-    # Verificar que el paciente existe
-    patient_query = """
-    SELECT 
-        p.id,
-        p.primer_nombre || ' ' || COALESCE(p.segundo_nombre || ' ', '') || 
-        p.primer_apellido || COALESCE(' ' || p.segundo_apellido, '') as nombre_completo,
-        p.fecha_nacimiento,
-        p.sexo,
-        p.telefono_principal as telefono,
-        p.email,
-        emr.fecha_ultima_actualizacion
-    FROM pacientes p
-    LEFT JOIN expedientes_medicos_resumen emr ON emr.paciente_id = p.id
-    WHERE p.id = :patient_id AND p.activo = true
-    """
-    patient = await database.fetch_one(patient_query, {"patient_id": patient_id})
-    
-    if not patient:
+    expediente = await obtener_expediente(patient_id)
+    if not expediente:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
-    
-    # Obtener alergias
-    alergias_query = """
-    SELECT id, tipo_alergeno as tipo, nombre_alergeno as sustancia, 
-           reaccion, severidad, activo
-    FROM alergias
-    WHERE id_paciente = :patient_id AND activo = true
-    """
-    alergias = await database.fetch_all(alergias_query, {"patient_id": patient_id})
-    
-    # Obtener antecedentes
-    antecedentes_query = """
-    SELECT id, tipo_categoria as tipo, nombre_enfermedad as enfermedad, 
-           parentesco, fecha_inicio, tratamiento_actual, controlado, notas
-    FROM antecedentes_medicos
-    WHERE id_paciente = :patient_id AND activo = true
-    """
-    antecedentes = await database.fetch_all(antecedentes_query, {"patient_id": patient_id})
-    
-    # Obtener estilo de vida
-    estilo_vida_query = """
-    SELECT tipo_dieta, descripcion_dieta, ejercicio_frecuencia, tipo_ejercicio,
-           tabaquismo, tabaco_cigarros_dia, tabaco_anios,
-           alcoholismo, alcohol_frecuencia,
-           drogas, drogas_tipo,
-           inmunizaciones_completas, esquema_vacunacion,
-           higiene_sueno_horas, exposicion_toxicos, suplementos_vitaminas, notas
-    FROM estilo_vida
-    WHERE id_paciente = :patient_id
-    """
-    estilo_vida = await database.fetch_one(estilo_vida_query, {"patient_id": patient_id})
-    
-    # Obtener historia ginecológica (si aplica)
-    ginecologia_query = """
-    SELECT menarca_edad, ritmo_menstrual_dias, fecha_ultima_menstruacion,
-           gestaciones, partos, cesareas, abortos,
-           metodo_anticonceptivo, menopausia, fecha_menopausia, notas_adicionales
-    FROM historia_ginecologica
-    WHERE id_paciente = :patient_id
-    """
-    ginecologia = await database.fetch_one(ginecologia_query, {"patient_id": patient_id})
-    
-    # Obtener consultas
-    consultas_query = """
-    SELECT c.id, c.fecha_consulta, c.motivo_consulta, c.sintomas,
-           c.exploracion_fisica, c.plan_tratamiento, c.indicaciones,
-           c.finalizada, c.fecha_finalizacion,
-           u.nombre || ' ' || u.apellido_paterno as podologo_nombre
-    FROM consultas c
-    LEFT JOIN usuarios u ON u.id = c.id_podologo
-    WHERE c.id_paciente = :patient_id
-    ORDER BY c.fecha_consulta DESC
-    LIMIT 10
-    """
-    consultas = await database.fetch_all(consultas_query, {"patient_id": patient_id})
-    
-    # Obtener diagnósticos activos
-    diagnosticos_query = """
-    SELECT d.id, d.codigo_cie10, d.nombre_diagnostico, d.tipo_diagnostico,
-           d.descripcion, d.fecha_diagnostico, d.activo
-    FROM diagnosticos d
-    WHERE d.id_paciente = :patient_id AND d.activo = true
-    ORDER BY d.fecha_diagnostico DESC
-    """
-    diagnosticos = await database.fetch_all(diagnosticos_query, {"patient_id": patient_id})
-    
-    return {
-        "paciente_id": patient["id"],
-        "paciente_nombre": patient["nombre_completo"],
-        "fecha_nacimiento": patient["fecha_nacimiento"],
-        "sexo": patient["sexo"],
-        "telefono": patient["telefono"],
-        "email": patient["email"],
-        "fecha_ultima_actualizacion": patient["fecha_ultima_actualizacion"],
-        "alergias": alergias,
-        "antecedentes": antecedentes,
-        "estilo_vida": estilo_vida,
-        "ginecologia": ginecologia,
-        "consultas": consultas,
-        "diagnosticos": diagnosticos,
-    }
+    return expediente
 
 
 # ============================================================================
@@ -291,6 +181,7 @@ async def update_alergias_section(patient_id: int, data: dict, user_id: int):
             alergia = AlergiaCreate(**alergia_data)
             result = await AlergiasService.create_alergia(conn, patient_id, alergia)
             results.append(result)
+    invalidar_expediente(patient_id)
     
     return {'alergias_agregadas': len(results), 'alergias': results}
 
@@ -308,6 +199,7 @@ async def update_antecedentes_section(patient_id: int, data: dict, user_id: int)
             antecedente = AntecedenteCreate(**antecedente_data)
             result = await AntecedentesService.create_antecedente(conn, patient_id, antecedente)
             results.append(result)
+    invalidar_expediente(patient_id)
     
     return {'antecedentes_agregados': len(results), 'antecedentes': results}
 
@@ -336,6 +228,7 @@ async def update_estilo_vida_section(patient_id: int, data: dict, user_id: int):
         "patient_id": patient_id,
         **data
     })
+    invalidar_expediente(patient_id)
     
     return result if result else {"message": "Estilo de vida actualizado"}
 
@@ -363,6 +256,7 @@ async def update_ginecologia_section(patient_id: int, data: dict, user_id: int):
         "patient_id": patient_id,
         **data
     })
+    invalidar_expediente(patient_id)
     
     return result if result else {"message": "Datos ginecológicos actualizados"}
 
@@ -391,6 +285,7 @@ async def audit_medical_record_change(
         "new_value": new_value,
         "user_id": user_id
     })
+    invalidar_expediente(patient_id)
 
 
 # Map section names to update handlers
@@ -498,10 +393,9 @@ async def create_consultation(
         "exploracion": consultation.exploracion_fisica,
         "plan": consultation.plan_tratamiento,
     })
+    invalidar_expediente(patient_id)
     
-    # Refrescar vista materializada en background
-    await database.execute("SELECT refrescar_expedientes_resumen()")
-    
+    # expedientes_medicos_resumen se actualiza por trigger
     return result
 
 
@@ -537,9 +431,7 @@ async def finalize_consultation(
     """
     await database.execute(update_patient_query, {"consultation_id": consultation_id})
     
-    # Refrescar vista materializada
-    await database.execute("SELECT refrescar_expedientes_resumen()")
-    
+    # expedientes_medicos_resumen se actualiza por trigger
     return {"message": "Consulta finalizada exitosamente", "data": result}
 
 
@@ -1,4 +1,5 @@
 # Middleware package
 from .rate_limit import rate_limit_middleware
+from .route_timing import RouteTimingMiddleware
 
-__all__ = ['rate_limit_middleware']
+__all__ = ['rate_limit_middleware', 'RouteTimingMiddleware']
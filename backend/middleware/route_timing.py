@@ -0,0 +1,38 @@
+"""
+Route Timing Middleware
+=======================
+
+Mide por ruta el tiempo de pared y la CPU que cada petición consumió dentro
+del event loop (monitoring/loop_monitor.py). Una ruta con mucha CPU de loop
+respecto a su tiempo de pared está haciendo trabajo síncrono en el loop.
+
+Las rutas se agrupan por plantilla (``/api/horarios/{horario_id}``), no por
+URL, para no crecer sin límite.
+
+Solo se registra cuando LOOP_MONITOR_ENABLED=true (ver main.py).
+"""
+
+import time
+
+from monitoring.loop_monitor import LoopMonitor, monitor as monitor_global
+
+
+class RouteTimingMiddleware:
+    """Middleware ASGI puro: el contexto de la petición llega a sus tasks."""
+
+    def __init__(self, app, monitor: LoopMonitor = monitor_global):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.monitor.activo:
+            return await self.app(scope, receive, send)
+
+        token = self.monitor.iniciar_peticion()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            ruta = f"{scope['method']} {getattr(route, 'path', None) or 'sin_ruta'}"
+            self.monitor.terminar_peticion(token, ruta, time.perf_counter() - inicio)
@@ -0,0 +1,19 @@
+"""
+Monitoring Module
+=================
+Detección de bloqueos del event loop y tiempo de CPU por ruta.
+"""
+
+from .loop_monitor import (
+    LOOP_MONITOR_ENABLED,
+    LoopMonitor,
+    monitor,
+)
+from .router import router
+
+__all__ = [
+    "LOOP_MONITOR_ENABLED",
+    "LoopMonitor",
+    "monitor",
+    "router",
+]
@@ -0,0 +1,417 @@
+"""
+Monitor del Event Loop
+======================
+Detecta trabajo síncrono que bloquea el loop (psycopg síncrono, encode de
+embeddings, fits de scikit-learn, matplotlib, ``invoke`` del orquestador...)
+y lo atribuye a código y rutas concretas:
+
+- Muestreador de lag: un task duerme LOOP_MONITOR_INTERVAL_MS y mide cuánto
+  tarde despierta.
+- Callbacks lentos: se envuelve ``asyncio.Handle._run`` para medir cada paso
+  del loop; los que superan LOOP_MONITOR_SLOW_MS se agrupan por callback.
+- Atribución por pila: un hilo vigía revisa el paso en curso y, si ya superó
+  el umbral, captura la pila del hilo del loop *mientras está bloqueado*
+  (el frame que de verdad consume el tiempo, no solo el callback).
+- CPU por ruta: cada paso suma su ``thread_time`` a la ruta HTTP cuyo contexto
+  está ejecutando (ver middleware/route_timing.py), para comparar tiempo de
+  pared contra CPU consumida en el loop.
+- Cada LOOP_MONITOR_LOG_S se registran en el log los peores infractores.
+
+Se activa con LOOP_MONITOR_ENABLED=true. Desactivado no se instala nada: sin
+parche, sin hilo y sin middleware, así que el costo es cero.
+
+Solo funciona con el loop de asyncio (no uvloop, cuyo Handle es nativo): con
+uvloop queda el muestreador de lag y la pila del vigía.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "false").lower() == "true"
+LOOP_MONITOR_INTERVAL_MS = int(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100"))
+LOOP_MONITOR_SLOW_MS = int(os.getenv("LOOP_MONITOR_SLOW_MS", "100"))
+LOOP_MONITOR_LOG_S = float(os.getenv("LOOP_MONITOR_LOG_S", "60"))
+LOOP_MONITOR_TOP = int(os.getenv("LOOP_MONITOR_TOP", "10"))
+
+_MAX_MUESTRAS = 2048
+_MAX_INFRACTORES = 200
+_FRAMES_PILA = 12
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ruta HTTP en curso (la fija el middleware en el contexto de la petición)
+ruta_actual: contextvars.ContextVar[Optional["EstadisticaRuta"]] = contextvars.ContextVar(
+    "ruta_actual", default=None
+)
+
+
+# ============================================================================
+# ESTADÍSTICAS
+# ============================================================================
+
+
+@dataclass
+class EstadisticaRuta:
+    """Tiempo de pared vs CPU en el loop de una ruta (o de una petición)"""
+
+    ruta: str = ""
+    peticiones: int = 0
+    pared_ms: float = 0.0
+    cpu_ms: float = 0.0
+    max_pared_ms: float = 0.0
+    max_cpu_ms: float = 0.0
+    pasos_lentos: int = 0
+    # Solo por petición: CPU y paso del loop al abrirla, y si ya se cerró
+    cpu_inicio: float = 0.0
+    paso_inicio: int = -1
+    cerrada: bool = False
+
+    def acumular(self, peticion: "EstadisticaRuta") -> None:
+        self.peticiones += 1
+        self.pared_ms += peticion.pared_ms
+        self.cpu_ms += peticion.cpu_ms
+        self.max_pared_ms = max(self.max_pared_ms, peticion.pared_ms)
+        self.max_cpu_ms = max(self.max_cpu_ms, peticion.cpu_ms)
+        self.pasos_lentos += peticion.pasos_lentos
+
+    def as_dict(self) -> Dict[str, Any]:
+        n = max(self.peticiones, 1)
+        return {
+            "ruta": self.ruta,
+            "peticiones": self.peticiones,
+            "pared_ms_promedio": round(self.pared_ms / n, 2),
+            "cpu_loop_ms_promedio": round(self.cpu_ms / n, 2),
+            "cpu_loop_ms_total": round(self.cpu_ms, 1),
+            "max_pared_ms": round(self.max_pared_ms, 1),
+            "max_cpu_loop_ms": round(self.max_cpu_ms, 1),
+            # Cerca de 1: la ruta ocupa el loop todo el tiempo que tarda
+            "fraccion_cpu": round(self.cpu_ms / self.pared_ms, 3) if self.pared_ms else 0.0,
+            "pasos_lentos": self.pasos_lentos,
+        }
+
+
+@dataclass
+class Infractor:
+    """Callback (agrupado por código) que bloqueó el loop"""
+
+    callback: str
+    ubicacion: str
+    veces: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rutas: Dict[str, int] = field(default_factory=dict)
+    pila: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "callback": self.callback,
+            "ubicacion": self.ubicacion,
+            "veces": self.veces,
+            "total_ms": round(self.total_ms, 1),
+            "max_ms": round(self.max_ms, 1),
+            "rutas": dict(sorted(self.rutas.items(), key=lambda kv: -kv[1])[:5]),
+            "pila": self.pila,
+        }
+
+
+def _describir_callback(handle: asyncio.Handle) -> str:
+    callback = getattr(handle, "_callback", None)
+    tarea = getattr(callback, "__self__", None)
+    if isinstance(tarea, asyncio.Task):
+        coro = tarea.get_coro()
+        return getattr(coro, "__qualname__", repr(coro))
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+def _formatear_pila(frame) -> List[str]:
+    pila = traceback.extract_stack(frame)[-_FRAMES_PILA:]
+    return [f"{f.filename}:{f.lineno} {f.name}" for f in pila]
+
+
+def _ubicacion(pila: List[str]) -> str:
+    """Frame más interno del backend (o el último si no hay ninguno)"""
+    for linea in reversed(pila):
+        if linea.startswith(_BACKEND) and "monitoring" not in linea:
+            return os.path.relpath(linea, _BACKEND)
+    return pila[-1] if pila else "?"
+
+
+# ============================================================================
+# MONITOR
+# ============================================================================
+
+
+class LoopMonitor:
+    """Muestreador de lag + callbacks lentos + CPU por ruta."""
+
+    def __init__(
+        self,
+        intervalo_ms: int = LOOP_MONITOR_INTERVAL_MS,
+        lento_ms: int = LOOP_MONITOR_SLOW_MS,
+        log_s: float = LOOP_MONITOR_LOG_S,
+        top: int = LOOP_MONITOR_TOP,
+    ):
+        self.intervalo = intervalo_ms / 1000
+        self.lento = lento_ms / 1000
+        self.log_s = log_s
+        self.top = top
+        self.activo = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hilo_loop: Optional[int] = None
+        self._tareas: List[asyncio.Task] = []
+        self._vigia: Optional[threading.Thread] = None
+        self._detener_vigia = threading.Event()
+        self._run_original = None
+        # Paso en curso (escrito por el loop, leído por el vigía)
+        self._paso_inicio = 0.0
+        self._paso_cpu = 0.0
+        self._paso_id = 0
+        self._cerrada_en_paso: Optional[EstadisticaRuta] = None
+        self._pila_paso: Optional[List[str]] = None
+        self._pila_paso_id = -1
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        """Descarta lo acumulado"""
+        self.desde = time.time()
+        self.lags_ms: Deque[float] = deque(maxlen=_MAX_MUESTRAS)
+        self.max_lag_ms = 0.0
+        self.bloqueos = 0
+        self.pasos = 0
+        self.pasos_lentos = 0
+        self.infractores: Dict[str, Infractor] = {}
+        self.rutas: Dict[str, EstadisticaRuta] = {}
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def iniciar(self) -> None:
+        if self.activo:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._hilo_loop = threading.get_ident()
+        self.activo = True
+        self._instalar_parche()
+        self._tareas = [self._loop.create_task(self._muestrear())]
+        if self.log_s > 0:
+            self._tareas.append(self._loop.create_task(self._registrar_periodicamente()))
+        self._detener_vigia.clear()
+        self._vigia = threading.Thread(target=self._vigilar, name="loop-monitor", daemon=True)
+        self._vigia.start()
+        logger.info(
+            f"✅ Monitor del event loop activo (muestreo {int(self.intervalo * 1000)} ms, "
+            f"umbral {int(self.lento * 1000)} ms)"
+        )
+
+    async def detener(self) -> None:
+        if not self.activo:
+            return
+        self.activo = False
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        self._detener_vigia.set()
+        if self._vigia is not None:
+            self._vigia.join(timeout=1)
+            self._vigia = None
+        self._quitar_parche()
+
+    def _instalar_parche(self) -> None:
+        if self._run_original is not None:
+            return
+        monitor = self
+        original = asyncio.Handle._run
+        perf_counter, thread_time = time.perf_counter, time.thread_time
+
+        def _run(handle):
+            if threading.get_ident() != monitor._hilo_loop:
+                return original(handle)
+            contexto = handle._context
+            antes = contexto.get(ruta_actual) if contexto is not None else None
+            inicio, cpu = perf_counter(), thread_time()
+            monitor._paso_id += 1
+            monitor._paso_inicio, monitor._paso_cpu = inicio, cpu
+            monitor._cerrada_en_paso = None
+            try:
+                return original(handle)
+            finally:
+                monitor._paso_inicio = 0.0
+                duracion = perf_counter() - inicio
+                despues = contexto.get(ruta_actual) if contexto is not None else None
+                peticion = despues or antes
+                if peticion is not None and not peticion.cerrada:
+                    # Si la petición se abrió en este paso, solo desde ahí
+                    desde = cpu if peticion is antes else peticion.cpu_inicio
+                    peticion.cpu_ms += (thread_time() - desde) * 1000
+                monitor.pasos += 1
+                if duracion >= monitor.lento:
+                    monitor._registrar_lento(handle, duracion, peticion or monitor._cerrada_en_paso)
+
+        self._run_original = original
+        asyncio.Handle._run = _run
+
+    def _quitar_parche(self) -> None:
+        if self._run_original is not None:
+            asyncio.Handle._run = self._run_original
+            self._run_original = None
+
+    # ------------------------------------------------------------------
+    # Muestreo
+    # ------------------------------------------------------------------
+
+    async def _muestrear(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            esperado = loop.time() + self.intervalo
+            await asyncio.sleep(self.intervalo)
+            lag_ms = max(0.0, (loop.time() - esperado) * 1000)
+            self.lags_ms.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if lag_ms >= self.lento * 1000:
+                self.bloqueos += 1
+
+    def _vigilar(self) -> None:
+        """Hilo vigía: captura la pila del loop durante un paso lento"""
+        espera = max(self.lento / 4, 0.005)
+        while not self._detener_vigia.wait(espera):
+            inicio, paso_id = self._paso_inicio, self._paso_id
+            if not inicio or paso_id == self._pila_paso_id:
+                continue
+            if time.perf_counter() - inicio < self.lento:
+                continue
+            frame = sys._current_frames().get(self._hilo_loop)
+            if frame is not None and paso_id == self._paso_id:
+                self._pila_paso = _formatear_pila(frame)
+                self._pila_paso_id = paso_id
+
+    def _registrar_lento(self, handle, duracion: float, peticion: Optional[EstadisticaRuta]) -> None:
+        self.pasos_lentos += 1
+        pila = self._pila_paso if self._pila_paso_id == self._paso_id else []
+        callback = _describir_callback(handle)
+        ubicacion = _ubicacion(pila) if pila else callback
+        clave = f"{callback}|{ubicacion}"
+
+        infractor = self.infractores.get(clave)
+        if infractor is None:
+            if len(self.infractores) >= _MAX_INFRACTORES:
+                menor = min(self.infractores, key=lambda k: self.infractores[k].total_ms)
+                del self.infractores[menor]
+            infractor = self.infractores[clave] = Infractor(callback, ubicacion)
+        ms = duracion * 1000
+        infractor.veces += 1
+        infractor.total_ms += ms
+        infractor.max_ms = max(infractor.max_ms, ms)
+        if pila:
+            infractor.pila = pila
+        if peticion is not None:
+            # Si ya se cerró en este paso, sus totales ya están en la ruta
+            destino = self.rutas.get(peticion.ruta) if peticion.cerrada else peticion
+            if destino is not None:
+                destino.pasos_lentos += 1
+            infractor.rutas[peticion.ruta] = infractor.rutas.get(peticion.ruta, 0) + 1
+
+    # ------------------------------------------------------------------
+    # Rutas
+    # ------------------------------------------------------------------
+
+    def iniciar_peticion(self) -> Optional[contextvars.Token]:
+        """Abre la medición de una petición en el contexto actual"""
+        if not self.activo:
+            return None
+        return ruta_actual.set(
+            EstadisticaRuta(cpu_inicio=time.thread_time(), paso_inicio=self._paso_id)
+        )
+
+    def terminar_peticion(self, token: Optional[contextvars.Token], ruta: str, pared_s: float) -> None:
+        if token is None:
+            return
+        peticion = ruta_actual.get()
+        ruta_actual.reset(token)
+        if peticion is None:
+            return
+        # CPU del paso en curso hasta aquí (el parche ya no verá la petición)
+        desde = peticion.cpu_inicio if peticion.paso_inicio == self._paso_id else self._paso_cpu
+        peticion.cpu_ms += (time.thread_time() - desde) * 1000
+        peticion.cerrada = True
+        self._cerrada_en_paso = peticion
+        peticion.ruta = ruta
+        peticion.pared_ms = pared_s * 1000
+        estadistica = self.rutas.get(ruta)
+        if estadistica is None:
+            estadistica = self.rutas[ruta] = EstadisticaRuta(ruta=ruta)
+        estadistica.acumular(peticion)
+
+    # ------------------------------------------------------------------
+    # Reporte
+    # ------------------------------------------------------------------
+
+    def reporte(self, top: Optional[int] = None) -> Dict[str, Any]:
+        top = top or self.top
+        lags = sorted(self.lags_ms)
+
+        def percentil(p):
+            return round(lags[min(len(lags) - 1, int(len(lags) * p))], 2) if lags else 0.0
+
+        return {
+            "activo": self.activo,
+            "desde": self.desde,
+            "umbral_ms": self.lento * 1000,
+            "lag": {
+                "muestras": len(lags),
+                "p50_ms": percentil(0.50),
+                "p99_ms": percentil(0.99),
+                "max_ms": round(self.max_lag_ms, 2),
+                "bloqueos": self.bloqueos,
+            },
+            "pasos": self.pasos,
+            "pasos_lentos": self.pasos_lentos,
+            "infractores": [
+                i.as_dict()
+                for i in sorted(self.infractores.values(), key=lambda i: -i.total_ms)[:top]
+            ],
+            "rutas": [
+                r.as_dict()
+                for r in sorted(self.rutas.values(), key=lambda r: -r.cpu_ms)[:top]
+            ],
+        }
+
+    async def _registrar_periodicamente(self) -> None:
+        while True:
+            await asyncio.sleep(self.log_s)
+            try:
+                self._registrar_infractores()
+            except Exception as e:
+                logger.error(f"[LoopMonitor] Error generando reporte: {e}")
+
+    def _registrar_infractores(self) -> None:
+        reporte = self.reporte(top=3)
+        if not reporte["infractores"]:
+            return
+        lag = reporte["lag"]
+        lineas = [
+            f"[LoopMonitor] lag p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms, "
+            f"{reporte['pasos_lentos']} pasos > {int(self.lento * 1000)} ms"
+        ]
+        for i in reporte["infractores"]:
+            lineas.append(
+                f"  {i['total_ms']:.0f} ms en {i['veces']} pasos (max {i['max_ms']:.0f} ms): "
+                f"{i['ubicacion']} [{i['callback']}]"
+            )
+        logger.warning("\n".join(lineas))
+
+
+# Instancia global (una por proceso)
+monitor = LoopMonitor()
@@ -0,0 +1,33 @@
+"""
+Router de Monitoreo - Diagnóstico del event loop
+================================================
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from auth import AdminOnly
+from .loop_monitor import monitor
+
+router = APIRouter(prefix="/monitoring", tags=["Monitoreo"])
+
+
+@router.get(
+    "/event-loop",
+    summary="Bloqueos del event loop",
+    description="Lag del loop, callbacks lentos con su pila y CPU por ruta (solo Admin)",
+)
+async def get_event_loop_report(
+    top: Optional[int] = Query(None, ge=1, le=100, description="Cuántos infractores y rutas"),
+    current_user=Depends(AdminOnly),
+):
+    """Peores infractores desde el último reinicio (LOOP_MONITOR_ENABLED=true)"""
+    return monitor.reporte(top)
+
+
+@router.post("/event-loop/reset", summary="Reiniciar estadísticas del loop")
+async def reset_event_loop_report(current_user=Depends(AdminOnly)):
+    """Descarta lo acumulado para medir una ventana nueva"""
+    monitor.reiniciar()
+    return {"message": "Estadísticas reiniciadas"}
@@ -0,0 +1,651 @@
+"""
+Búsqueda de pacientes (typeahead)
+=================================
+
+Índice en memoria de los pacientes activos para el autocompletado:
+
+- Tokens normalizados: minúsculas y sin acentos (``José Peña`` -> ``jose``,
+  ``pena``), más el código de paciente sin separadores y los dígitos del
+  teléfono, todo en el mismo vocabulario.
+- Prefijo: el vocabulario está ordenado, así que los tokens que empiezan
+  con lo escrito son un rango contiguo (``bisect``).
+- Trigramas: para errores de tipeo (``marai`` -> ``maria``) se comparan los
+  trigramas del término contra los del vocabulario, no contra cada
+  paciente, igual que la ``similarity`` de pg_trgm.
+- Cada token guarda sus pacientes ordenados por apellidos y nombre, así el
+  top-N de una palabra sale en orden sin ordenar todos los candidatos:
+  primero coincidencia exacta de token, luego prefijo, luego similares.
+  Con varias palabras se intersectan los conjuntos de ids, empezando por la
+  palabra más selectiva.
+
+El índice se carga al arrancar (en segundo plano) y se mantiene con las
+altas/cambios/bajas del servicio y con el canal ``pacientes_cambios``
+(trigger de data/migrations/27_pacientes_busqueda.sql) para los cambios
+hechos por otros workers.
+
+Mientras no está listo, o si se desactiva (PACIENTES_INDICE_ENABLED=false),
+se usa la columna generada ``pacientes.busqueda`` con su índice GIN de
+trigramas.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+import db
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+PACIENTES_INDICE_ENABLED = os.getenv("PACIENTES_INDICE_ENABLED", "true").lower() == "true"
+PACIENTES_INDICE_CANAL = os.getenv("PACIENTES_INDICE_CANAL", "pacientes_cambios")
+PACIENTES_INDICE_LOTE = int(os.getenv("PACIENTES_INDICE_LOTE", "1000"))
+
+UMBRAL_SIMILITUD = 0.3  # mismo default que pg_trgm
+LIMITE_DEFAULT = 50
+# Consultas de varias palabras: una palabra cuyo prefijo abarca más tokens que
+# esto no se cuenta, se supone que aparece en todos los pacientes
+_MAX_TOKENS_CONJUNTO = 4096
+# Revisar los tokens de un candidato cuesta lo que intersectar unas 16
+# entradas de una lista: si la palabra aparece más veces, se revisan los candidatos
+_COSTO_REVISION = 16
+# Si se esperan al menos 4 veces los resultados que faltan, conviene recorrer
+# las listas en orden y parar al llenar el límite en vez de intersectar
+_DENSIDAD_RECORRIDO = 4
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+_NO_DIGITO = re.compile(r"\D+")
+_ESPACIO_ENTRE_DIGITOS = re.compile(r"(?<=\d) (?=\d)")
+# pacientes.id es INTEGER
+_MAX_ID = 2**31 - 1
+
+COLUMNAS = (
+    "id, codigo_paciente, primer_nombre, segundo_nombre, "
+    "primer_apellido, segundo_apellido, telefono_principal, telefono_secundario"
+)
+
+
+# ============================================================================
+# NORMALIZACIÓN
+# ============================================================================
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas, sin acentos y solo [a-z0-9] separados por espacios"""
+    if not texto:
+        return ""
+    sin_acentos = unicodedata.normalize("NFKD", texto)
+    sin_acentos = "".join(c for c in sin_acentos if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(" ", sin_acentos.lower()).strip()
+
+
+def normalizar_like(texto: Optional[str]) -> str:
+    """
+    normalizar() sin separadores entre dígitos, como están los teléfonos en
+    pacientes.busqueda ("555-1234" -> "5551234"). Es el patrón de
+    ``busqueda LIKE``.
+    """
+    return _ESPACIO_ENTRE_DIGITOS.sub("", normalizar(texto))
+
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    """
+    Tokens de una consulta. Si todo son dígitos (``55 1234 5678``) se unen
+    en uno solo para buscar el teléfono completo.
+    """
+    tokens = normalizar(texto).split()
+    if len(tokens) > 1 and all(t.isdigit() for t in tokens):
+        return ["".join(tokens)]
+    return tokens
+
+
+def _digitos(telefono: Optional[str]) -> List[str]:
+    """Dígitos del teléfono, y los últimos 10 si trae lada de país"""
+    digitos = _NO_DIGITO.sub("", telefono or "")
+    if not digitos:
+        return []
+    return [digitos] if len(digitos) <= 10 else [digitos, digitos[-10:]]
+
+
+def trigramas(token: str) -> Set[str]:
+    """Trigramas estilo pg_trgm (con dos espacios al inicio y uno al final)"""
+    relleno = f"  {token} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _ordenar_por_partes(elementos: Iterable, salida: list, clave=None) -> Iterator[None]:
+    """
+    Agrega ``elementos`` ordenados a ``salida``: ordena partes de
+    ``PACIENTES_INDICE_LOTE`` y las mezcla, cediendo entre partes.
+    """
+    elementos = list(elementos)
+    partes = []
+    for i in range(0, len(elementos), PACIENTES_INDICE_LOTE):
+        partes.append(sorted(elementos[i:i + PACIENTES_INDICE_LOTE], key=clave))
+        yield
+    for i, elemento in enumerate(heapq.merge(*partes, key=clave), 1):
+        salida.append(elemento)
+        if i % PACIENTES_INDICE_LOTE == 0:
+            yield
+
+
+def _con_prefijo(tokens: Tuple[str, ...], prefijo: str) -> bool:
+    """Si algún token (tupla ordenada) empieza con ``prefijo``"""
+    i = bisect_left(tokens, prefijo)
+    return i < len(tokens) and tokens[i].startswith(prefijo)
+
+
+# ============================================================================
+# ÍNDICE
+# ============================================================================
+
+
+class _Paciente:
+    """Entrada del índice (solo lo necesario para mostrar el resultado)"""
+
+    __slots__ = ("id", "codigo", "nombres", "telefono", "tokens", "clave")
+
+    def __init__(self, fila: Mapping[str, Any]):
+        self.id = int(fila["id"])
+        self.codigo = fila.get("codigo_paciente")
+        self.nombres = (
+            fila["primer_nombre"],
+            fila.get("segundo_nombre"),
+            fila["primer_apellido"],
+            fila.get("segundo_apellido"),
+        )
+        self.telefono = fila.get("telefono_principal")
+
+        tokens = set()
+        for parte in self.nombres:
+            tokens.update(normalizar(parte).split())
+        if self.codigo:
+            tokens.add(normalizar(self.codigo).replace(" ", ""))
+        for telefono in (fila.get("telefono_principal"), fila.get("telefono_secundario")):
+            tokens.update(_digitos(telefono))
+        self.tokens: Tuple[str, ...] = tuple(sorted(tokens))
+
+        # Orden dentro de un mismo token: apellidos, nombre, id
+        primer_nombre, _, primer_apellido, segundo_apellido = self.nombres
+        self.clave = (
+            f"{normalizar(primer_apellido)} {normalizar(segundo_apellido)} "
+            f"{normalizar(primer_nombre)}\x00{self.id:012d}"
+        )
+
+    @property
+    def nombre_completo(self) -> str:
+        return " ".join(p for p in self.nombres if p)
+
+    def as_dict(self) -> Dict[str, Any]:
+        primer_nombre, segundo_nombre, primer_apellido, segundo_apellido = self.nombres
+        return {
+            "id": self.id,
+            "codigo_paciente": self.codigo,
+            "primer_nombre": primer_nombre,
+            "segundo_nombre": segundo_nombre,
+            "primer_apellido": primer_apellido,
+            "segundo_apellido": segundo_apellido,
+            "nombre_completo": self.nombre_completo,
+            "telefono_principal": self.telefono,
+        }
+
+
+@dataclass
+class Coincidencia:
+    """Resultado de una búsqueda"""
+
+    paciente: _Paciente
+    tipo: str  # "id", "exacto", "prefijo" o "similar"
+    similitud: float = 1.0
+
+
+class IndicePacientes:
+    """Índice en memoria de pacientes activos para autocompletado."""
+
+    def __init__(self):
+        self.listo = False
+        self._pacientes: Dict[int, _Paciente] = {}
+        # token -> ids ordenados por clave del paciente
+        self._postings: Dict[str, List[int]] = {}
+        # vocabulario ordenado (para rangos de prefijo)
+        self._vocabulario: List[str] = []
+        # trigrama -> tokens (solo tokens de letras)
+        self._trigramas: Dict[str, Set[str]] = {}
+        self._clave = lambda pid: self._pacientes[pid].clave
+        # Ids cambiados mientras se carga (se releen al terminar)
+        self._tocados: Optional[Set[int]] = None
+        self._carga: Optional[asyncio.Task] = None
+        self._listener = None
+
+    def __len__(self) -> int:
+        return len(self._pacientes)
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+
+    def construir(self, filas: Iterable[Mapping[str, Any]]) -> None:
+        """Reemplaza el contenido con ``filas`` (ordena una sola vez al final)"""
+        self._pacientes = {}
+        self._acumular(filas)
+        for _ in self._ordenar():
+            pass
+
+    def _acumular(self, filas: Iterable[Mapping[str, Any]]) -> None:
+        for fila in filas:
+            paciente = _Paciente(fila)
+            self._pacientes[paciente.id] = paciente
+
+    def _ordenar(self) -> Iterator[None]:
+        """
+        Arma listas, vocabulario y trigramas de los pacientes acumulados.
+        Cede cada ``PACIENTES_INDICE_LOTE`` elementos para no bloquear el loop.
+        """
+        # Recorriendo los pacientes por clave las listas quedan ya ordenadas
+        ordenados: List[_Paciente] = []
+        yield from _ordenar_por_partes(self._pacientes.values(), ordenados, lambda p: p.clave)
+        self._postings = {}
+        for i, paciente in enumerate(ordenados, 1):
+            for token in paciente.tokens:
+                ids = self._postings.get(token)
+                if ids is None:
+                    self._postings[token] = [paciente.id]
+                else:
+                    ids.append(paciente.id)
+            if i % PACIENTES_INDICE_LOTE == 0:
+                yield
+
+        self._vocabulario = []
+        yield from _ordenar_por_partes(self._postings, self._vocabulario)
+
+        self._trigramas = {}
+        for i, token in enumerate(self._vocabulario, 1):
+            if token.isalpha():
+                for trigrama in trigramas(token):
+                    self._trigramas.setdefault(trigrama, set()).add(token)
+            if i % PACIENTES_INDICE_LOTE == 0:
+                yield
+
+    # ------------------------------------------------------------------
+    # Altas, cambios y bajas
+    # ------------------------------------------------------------------
+
+    def agregar(self, fila: Mapping[str, Any]) -> None:
+        """Agrega o reemplaza un paciente (fila con las COLUMNAS)"""
+        nuevo = _Paciente(fila)
+        self.quitar(nuevo.id)
+        self._pacientes[nuevo.id] = nuevo
+        for token in nuevo.tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = []
+                insort(self._vocabulario, token)
+                if token.isalpha():
+                    for trigrama in trigramas(token):
+                        self._trigramas.setdefault(trigrama, set()).add(token)
+            insort(ids, nuevo.id, key=self._clave)
+
+    def quitar(self, paciente_id: int) -> bool:
+        """Quita un paciente (baja o inactivación). Retorna si existía."""
+        actual = self._pacientes.get(paciente_id)
+        if actual is None:
+            return False
+        for token in actual.tokens:
+            ids = self._postings[token]
+            i = bisect_left(ids, actual.clave, key=self._clave)
+            if i < len(ids) and ids[i] == paciente_id:
+                del ids[i]
+            if not ids:
+                del self._postings[token]
+                del self._vocabulario[bisect_left(self._vocabulario, token)]
+                if token.isalpha():
+                    for trigrama in trigramas(token):
+                        tokens = self._trigramas.get(trigrama)
+                        if tokens is not None:
+                            tokens.discard(token)
+                            if not tokens:
+                                del self._trigramas[trigrama]
+        del self._pacientes[paciente_id]
+        return True
+
+    def aplicar(self, fila: Optional[Mapping[str, Any]], paciente_id: int) -> None:
+        """Refleja el estado actual de un paciente (None = ya no existe)"""
+        if self._tocados is not None:
+            # Cargando: se relee al terminar la carga
+            self._tocados.add(paciente_id)
+            return
+        if fila is None or not fila.get("activo", True):
+            self.quitar(paciente_id)
+        else:
+            self.agregar(fila)
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def _rango(self, prefijo: str) -> Tuple[int, int]:
+        inicio = bisect_left(self._vocabulario, prefijo)
+        fin = bisect_left(self._vocabulario, prefijo + "\uffff", lo=inicio)
+        return inicio, fin
+
+    def similares(self, token: str, umbral: float = UMBRAL_SIMILITUD) -> List[Tuple[str, float]]:
+        """Tokens del vocabulario con similitud de trigramas >= umbral"""
+        propios = trigramas(token)
+        compartidos: Counter = Counter()
+        for trigrama in propios:
+            compartidos.update(self._trigramas.get(trigrama, ()))
+        resultado = []
+        for candidato, n in compartidos.items():
+            # Un token de n letras tiene n + 1 trigramas
+            similitud = n / (len(propios) + len(candidato) + 1 - n)
+            if similitud >= umbral and candidato != token:
+                resultado.append((candidato, similitud))
+        resultado.sort(key=lambda par: (-par[1], par[0]))
+        return resultado
+
+    def _palabra(self, token: str) -> Optional[Tuple[str, List[str], Optional[Dict[str, float]]]]:
+        """
+        Tokens del vocabulario que satisfacen una palabra: los que empiezan
+        con ella o, si no hay ninguno, los similares (solo palabras de letras).
+        """
+        inicio, fin = self._rango(token)
+        if inicio < fin:
+            return token, self._vocabulario[inicio:fin], None
+        if len(token) < 3 or not token.isalpha():
+            return None
+        parecidos = dict(self.similares(token))
+        if not parecidos:
+            return None
+        return token, list(parecidos), parecidos
+
+    def buscar(self, texto: str, limite: int = LIMITE_DEFAULT) -> List[Coincidencia]:
+        """
+        Top ``limite`` pacientes para lo escrito.
+
+        Todas las palabras deben coincidir con algún token del paciente, como
+        prefijo o, si la palabra no es prefijo de nada, por similitud. Orden:
+        id exacto, todas las palabras exactas, prefijo, similares; dentro de
+        cada grupo, por apellidos y nombre.
+        """
+        tokens = tokenizar(texto)
+        if not tokens or limite <= 0:
+            return []
+
+        resultados: List[Coincidencia] = []
+        if len(tokens) == 1 and tokens[0].isdigit():
+            paciente = self._pacientes.get(int(tokens[0]))
+            if paciente is not None:
+                resultados.append(Coincidencia(paciente, "id"))
+                if limite == 1:
+                    return resultados
+
+        palabras = []
+        for token in dict.fromkeys(tokens):
+            palabra = self._palabra(token)
+            if palabra is None:
+                return resultados
+            palabras.append(palabra)
+
+        if len(palabras) == 1:
+            self._recorrer(palabras[0], resultados, limite)
+        else:
+            self._intersectar(palabras, resultados, limite)
+        return resultados
+
+    def _recorrer(self, palabra, resultados: List[Coincidencia], limite: int) -> None:
+        """Una palabra: las listas ya están ordenadas, se para al llenar el límite"""
+        token, vocab, parecidos = palabra
+        vistos = {c.paciente.id for c in resultados}
+        for tok in vocab:
+            if parecidos is not None:
+                tipo, similitud = "similar", parecidos[tok]
+            else:
+                tipo, similitud = ("exacto" if tok == token else "prefijo"), 1.0
+            for pid in self._postings[tok]:
+                if pid in vistos:
+                    continue
+                vistos.add(pid)
+                resultados.append(Coincidencia(self._pacientes[pid], tipo, similitud))
+                if len(resultados) >= limite:
+                    return
+
+    def _apariciones(self, vocab: List[str]) -> int:
+        """Cuántas entradas suman las listas de ``vocab`` (acotado)"""
+        if len(vocab) > _MAX_TOKENS_CONJUNTO:
+            return len(self._pacientes)
+        return sum(len(self._postings[t]) for t in vocab)
+
+    def _intersectar(self, palabras, resultados: List[Coincidencia], limite: int) -> None:
+        """Varias palabras: primero las que están tal cual en el paciente, luego el resto"""
+        condiciones = []
+        for token, vocab, parecidos in palabras:
+            if parecidos is not None:
+                cumple = lambda tokens, p=parecidos: not p.keys().isdisjoint(tokens)
+            else:
+                cumple = lambda tokens, token=token: _con_prefijo(tokens, token)
+            condiciones.append(([self._postings[t] for t in vocab], self._apariciones(vocab), cumple))
+
+        grupos = []
+        if all(token in self._postings for token, _, _ in palabras):
+            grupos.append(("exacto", [
+                ([self._postings[token]], len(self._postings[token]), lambda tokens, token=token: token in tokens)
+                for token, _, _ in palabras
+            ]))
+        # Si cada palabra solo coincide consigo misma no hay más que los exactos
+        if not grupos or any(p[2] is not None or p[1] != [p[0]] for p in palabras):
+            grupos.append(("similar" if any(p[2] is not None for p in palabras) else "prefijo", condiciones))
+
+        similares = [p[2] for p in palabras if p[2] is not None]
+        vistos = {c.paciente.id for c in resultados}
+        for tipo, grupo in grupos:
+            faltan = limite - len(resultados)
+            if faltan <= 0:
+                return
+            for pid in self._primeros(grupo, faltan, vistos):
+                vistos.add(pid)
+                paciente = self._pacientes[pid]
+                similitud = min(
+                    (max((p.get(t, 0.0) for t in paciente.tokens), default=0.0) for p in similares),
+                    default=1.0,
+                )
+                resultados.append(Coincidencia(paciente, tipo, similitud))
+
+    def _primeros(self, condiciones, faltan: int, vistos: Set[int]) -> List[int]:
+        """
+        Los ``faltan`` primeros ids (por clave) fuera de ``vistos`` que cumplen
+        todas las condiciones ``(listas, apariciones, cumple)``.
+
+        Se parte de la condición que menos aparece. Si se esperan muchos
+        resultados se recorren sus listas en orden revisando los tokens de
+        cada paciente; si no, se intersectan conjuntos de ids.
+        """
+        condiciones = sorted(condiciones, key=lambda c: c[1])
+        listas, esperados, _ = condiciones[0]
+        for _, apariciones, _ in condiciones[1:]:
+            esperados *= apariciones / max(len(self._pacientes), 1)
+
+        if esperados >= _DENSIDAD_RECORRIDO * faltan:
+            resto = [cumple for _, _, cumple in condiciones[1:]]
+            primeros: List[int] = []
+            revisados: Set[int] = set()
+            for pid in listas[0] if len(listas) == 1 else heapq.merge(*listas, key=self._clave):
+                if pid in vistos or pid in revisados:
+                    continue
+                revisados.add(pid)
+                tokens = self._pacientes[pid].tokens
+                if all(cumple(tokens) for cumple in resto):
+                    primeros.append(pid)
+                    if len(primeros) >= faltan:
+                        break
+            return primeros
+
+        candidatos: Set[int] = set()
+        for ids in listas:
+            candidatos.update(ids)
+        for listas, apariciones, cumple in condiciones[1:]:
+            if not candidatos:
+                return []
+            if len(listas) > _MAX_TOKENS_CONJUNTO or apariciones > _COSTO_REVISION * len(candidatos):
+                candidatos = {pid for pid in candidatos if cumple(self._pacientes[pid].tokens)}
+            else:
+                reducidos: Set[int] = set()
+                for ids in listas:
+                    reducidos |= candidatos.intersection(ids)
+                candidatos = reducidos
+        return heapq.nsmallest(faltan, candidatos - vistos, key=self._clave)
+
+    # ------------------------------------------------------------------
+    # Carga y sincronización
+    # ------------------------------------------------------------------
+
+    async def cargar(self) -> int:
+        """
+        Carga todos los pacientes activos por lotes, cediendo el loop entre
+        lotes. Los cambios que llegan mientras tanto se releen al final.
+        """
+        self._tocados = set()
+        nuevo = IndicePacientes()
+        try:
+            conn = await db.get_connection()
+            try:
+                async with conn.transaction():
+                    cursor = conn.cursor(
+                        f"SELECT {COLUMNAS} FROM pacientes WHERE activo = TRUE",
+                        prefetch=PACIENTES_INDICE_LOTE,
+                    )
+                    lote = []
+                    async for fila in cursor:
+                        lote.append(fila)
+                        if len(lote) >= PACIENTES_INDICE_LOTE:
+                            nuevo._acumular(lote)
+                            lote = []
+                            await asyncio.sleep(0)
+                    nuevo._acumular(lote)
+            finally:
+                await db.release_connection(conn)
+            for _ in nuevo._ordenar():
+                await asyncio.sleep(0)
+
+            self._pacientes = nuevo._pacientes
+            self._postings = nuevo._postings
+            self._vocabulario = nuevo._vocabulario
+            self._trigramas = nuevo._trigramas
+        finally:
+            tocados, self._tocados = self._tocados, None
+
+        for paciente_id in tocados:
+            await self.refrescar(paciente_id)
+        self.listo = True
+        logger.info(f"[Pacientes] Índice de búsqueda listo: {len(self)} pacientes")
+        return len(self)
+
+    async def refrescar(self, paciente_id: int, conn=None) -> None:
+        """Relee un paciente de la BD y lo aplica al índice"""
+        consulta = f"SELECT {COLUMNAS}, activo FROM pacientes WHERE id = $1"
+        if conn is not None:
+            fila = await conn.fetchrow(consulta, paciente_id)
+        else:
+            fila = await db.fetch_one(consulta, paciente_id)
+        self.aplicar(fila, paciente_id)
+
+    async def _on_cambio(self, mensaje: Dict[str, Any]) -> None:
+        try:
+            await self.refrescar(int(mensaje["id"]))
+        except Exception as e:
+            logger.error(f"[Pacientes] Error aplicando cambio al índice: {e}")
+
+    async def iniciar(self) -> None:
+        """Escucha cambios y carga el índice en segundo plano"""
+        if not PACIENTES_INDICE_ENABLED or self._carga is not None:
+            return
+        from ws_notifications.fanout import BackendPostgres
+
+        try:
+            self._listener = BackendPostgres(canal=PACIENTES_INDICE_CANAL)
+            await self._listener.iniciar(self._on_cambio)
+        except Exception as e:
+            # Sin listener los cambios de otros workers no llegan: mejor no usar el índice
+            logger.error(f"[Pacientes] No se pudo escuchar {PACIENTES_INDICE_CANAL}: {e}")
+            self._listener = None
+            return
+
+        async def _cargar():
+            try:
+                await self.cargar()
+            except Exception as e:
+                logger.error(f"[Pacientes] Error cargando índice de búsqueda: {e}")
+
+        self._carga = asyncio.get_running_loop().create_task(_cargar())
+
+    async def detener(self) -> None:
+        if self._carga is not None:
+            self._carga.cancel()
+            self._carga = None
+        if self._listener is not None:
+            await self._listener.detener()
+            self._listener = None
+        self.listo = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "listo": self.listo,
+            "pacientes": len(self._pacientes),
+            "tokens": len(self._vocabulario),
+            "trigramas": len(self._trigramas),
+        }
+
+
+# Instancia compartida por el proceso
+indice_pacientes = IndicePacientes()
+
+
+# ============================================================================
+# BÚSQUEDA CON RESPALDO EN BD
+# ============================================================================
+
+
+async def buscar_pacientes(
+    texto: str, limite: int = LIMITE_DEFAULT, conn=None
+) -> List[Dict[str, Any]]:
+    """
+    Pacientes activos que coinciden con ``texto`` (ya ordenados).
+
+    Usa el índice en memoria si está listo; si no, la columna ``busqueda``
+    con su índice GIN de trigramas.
+    """
+    if indice_pacientes.listo:
+        return [c.paciente.as_dict() for c in indice_pacientes.buscar(texto, limite)]
+
+    normalizado = normalizar_like(texto)
+    if not normalizado:
+        return []
+
+    async def _fetch(consulta, *params):
+        if conn is not None:
+            return await conn.fetch(consulta, *params)
+        return await db.fetch_all(consulta, *params)
+
+    # El id va en su propia consulta: un OR con el LIKE impide usar el índice GIN
+    por_id = []
+    if normalizado.isdigit() and int(normalizado) <= _MAX_ID:
+        por_id = await _fetch(
+            f"SELECT {COLUMNAS} FROM pacientes WHERE activo = TRUE AND id = $1::int",
+            int(normalizado),
+        )
+    filas = await _fetch(f"""
+        SELECT {COLUMNAS}
+        FROM pacientes
+        WHERE activo = TRUE
+        AND (busqueda LIKE '%' || $1 || '%' OR $1 <% busqueda)
+        ORDER BY word_similarity($1, busqueda) DESC, primer_apellido, primer_nombre
+        LIMIT $2
+    """, normalizado, limite)
+    filas = por_id + [f for f in filas if f["id"] not in {p["id"] for p in por_id}]
+    return [_Paciente(f).as_dict() for f in filas[:limite]]
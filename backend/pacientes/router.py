@@ -22,6 +22,7 @@ from .models import (
     AntecedenteResponse,
     AntecedenteListResponse,
 )
+from .busqueda import buscar_pacientes
 from .service import PacientesService, AlergiasService, AntecedentesService
 
 logger = logging.getLogger(__name__)
@@ -86,46 +87,20 @@ async def search_pacientes(
 ):
     """
     Búsqueda optimizada para autocompletado: busca por nombre parcial o teléfono.
+
+    Ignora acentos y mayúsculas, tolera errores de tipeo y ordena primero las
+    coincidencias exactas (ver pacientes/busqueda.py).
     """
     try:
-        pattern = f"%{q}%"
-        rows = await conn.fetch(
-            """
-            SELECT id, codigo_paciente, primer_nombre, segundo_nombre, primer_apellido, segundo_apellido, telefono_principal
-            FROM pacientes
-            WHERE (
-                primer_nombre ILIKE $1 OR 
-                primer_apellido ILIKE $1 OR 
-                segundo_apellido ILIKE $1 OR 
-                telefono_principal LIKE $1 OR
-                codigo_paciente ILIKE $1
-            )
-            AND activo = TRUE
-            ORDER BY primer_apellido, primer_nombre
-            LIMIT $2
-            """,
-            pattern,
-            limit,
-        )
+        rows = await buscar_pacientes(q, limit, conn)
 
         results = []
         for r in rows:
-            nombre = " ".join(
-                filter(
-                    None,
-                    [
-                        r["primer_nombre"],
-                        r.get("segundo_nombre"),
-                        r["primer_apellido"],
-                        r.get("segundo_apellido"),
-                    ],
-                )
-            )
             results.append(
                 PacienteListItem(
                     id=r["id"],
                     codigo_paciente=r.get("codigo_paciente"),
-                    nombre_completo=nombre,
+                    nombre_completo=r["nombre_completo"],
                     telefono_principal=r["telefono_principal"],
                     email=None,
                     fecha_nacimiento=None,
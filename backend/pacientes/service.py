@@ -19,6 +19,7 @@ from .models import (
     AntecedenteResponse,
     AntecedenteListResponse,
 )
+from .busqueda import indice_pacientes, normalizar_like
 
 
 # ============================================================================
@@ -99,13 +100,9 @@ class PacientesService:
             param_count += 1
 
         if search:
-            where_conditions.append(
-                f"(primer_nombre ILIKE ${param_count} OR "
-                f"primer_apellido ILIKE ${param_count} OR "
-                f"segundo_apellido ILIKE ${param_count} OR "
-                f"telefono_principal LIKE ${param_count})"
-            )
-            params.append(f"%{search}%")
+            # Columna generada sin acentos con índice GIN de trigramas
+            where_conditions.append(f"busqueda LIKE '%' || ${param_count} || '%'")
+            params.append(normalizar_like(search))
             param_count += 1
 
         where_clause = (
@@ -129,6 +126,7 @@ class PacientesService:
         query = f"""
             SELECT 
                 p.id,
+                p.codigo_paciente,
                 p.primer_nombre,
                 p.segundo_nombre,
                 p.primer_apellido,
@@ -328,6 +326,9 @@ class PacientesService:
             creado_por,
         )
 
+        if indice_pacientes.listo:
+            await indice_pacientes.refrescar(row["id"], conn)
+
         # Get the created patient
         return await PacientesService.get_paciente_by_id(conn, row["id"])
 
@@ -391,6 +392,9 @@ class PacientesService:
 
         await conn.execute(query, *params)
 
+        if indice_pacientes.listo:
+            await indice_pacientes.refrescar(paciente_id, conn)
+
         # Get the updated patient
         return await PacientesService.get_paciente_by_id(conn, paciente_id)
 
@@ -415,7 +419,10 @@ class PacientesService:
         result = await conn.execute(query, datetime.now(), paciente_id)
 
         # Check if any row was updated
-        return result.split()[-1] != "0"
+        deleted = result.split()[-1] != "0"
+        if deleted:
+            indice_pacientes.quitar(paciente_id)
+        return deleted
 
 
 # ============================================================================
@@ -10,8 +10,9 @@ from decimal import Decimal
 import logging
 
 from pagos.models import PagoCreate, PagoUpdate, PagoResponse, PagoStats
-from audit.service import log_action
+from audit.service import log_action_async
 from db import get_connection, release_connection
+from cache import invalidate_tags
 
 logger = logging.getLogger(__name__)
 
@@ -234,11 +235,13 @@ class PagosService:
                 pago_data.notas,
             )
 
+            invalidate_tags("pagos")
+
             # Obtener pago completo con información extendida
             pago = await self.get_by_id(pago_id)
 
             # Registrar en auditoría
-            log_action(
+            await log_action_async(
                 usuario_id=usuario_id,
                 accion="crear",
                 modulo="pagos",
@@ -343,12 +346,13 @@ class PagosService:
             """
 
             await conn.execute(query, *params)
+            invalidate_tags("pagos")
 
             # Obtener pago actualizado
             pago_actualizado = await self.get_by_id(pago_id)
 
             # Registrar en auditoría
-            log_action(
+            await log_action_async(
                 usuario_id=usuario_id,
                 accion="actualizar",
                 modulo="pagos",
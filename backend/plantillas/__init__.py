@@ -0,0 +1,21 @@
+"""
+Plantillas Module
+=================
+Plantillas Jinja2 precompiladas compartidas por email, WhatsApp y PDF.
+"""
+
+from .renderer import (
+    get_env,
+    get_plantilla,
+    precompilar,
+    render,
+    render_stream,
+)
+
+__all__ = [
+    "get_env",
+    "get_plantilla",
+    "precompilar",
+    "render",
+    "render_stream",
+]
@@ -0,0 +1,156 @@
+"""
+Renderizado de plantillas
+=========================
+Un solo ``Environment`` de Jinja2 para todos los canales:
+
+- ``email/*.html``: HTML de emails (autoescape)
+- ``whatsapp/*.txt``: texto plano de WhatsApp / notificaciones (sin escape)
+- ``pdf/*.xml``: captions de reportlab (marcado ``<b>``/``<i>``, autoescape)
+
+Las plantillas se compilan una vez: ``precompilar()`` las carga todas al
+arrancar (API y worker de Celery) y quedan en la caché del Environment. Con
+``PLANTILLAS_AUTO_RELOAD=false`` (default) no se vuelve a revisar el disco en
+cada render. El bytecode compilado se guarda en ``PLANTILLAS_BYTECODE_DIR``,
+así que los procesos nuevos no vuelven a parsear las fuentes.
+
+Para tablas grandes ``render_stream`` entrega el resultado por fragmentos en
+vez de construir todo el texto en memoria.
+"""
+
+import logging
+import os
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    StrictUndefined,
+    Template,
+)
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+PLANTILLAS_DIR = Path(__file__).parent / "templates"
+PLANTILLAS_BYTECODE_DIR = os.getenv(
+    "PLANTILLAS_BYTECODE_DIR",
+    os.path.join(tempfile.gettempdir(), "podoskin_jinja_cache"),
+)
+PLANTILLAS_AUTO_RELOAD = os.getenv("PLANTILLAS_AUTO_RELOAD", "false").lower() == "true"
+# Fragmentos agrupados por ``render_stream``
+PLANTILLAS_STREAM_BUFFER = int(os.getenv("PLANTILLAS_STREAM_BUFFER", "64"))
+
+
+def _autoescape(nombre: Optional[str]) -> bool:
+    # Todo se escapa salvo el texto plano
+    return not (nombre or "").endswith(".txt")
+
+
+def _moneda(valor: Union[int, float, Decimal, None]) -> str:
+    return f"${float(valor or 0):,.2f}"
+
+
+def _fecha(valor: Union[date, datetime, None], formato: str = "%d/%m/%Y") -> str:
+    return valor.strftime(formato) if valor is not None else ""
+
+
+def _hora(valor: Any, formato: str = "%H:%M") -> str:
+    return valor.strftime(formato) if valor is not None else ""
+
+
+def _crear_env(bytecode_dir: Optional[str] = PLANTILLAS_BYTECODE_DIR) -> Environment:
+    bytecode_cache = None
+    if bytecode_dir:
+        try:
+            os.makedirs(bytecode_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+        except OSError as e:
+            logger.warning(f"Caché de bytecode de plantillas deshabilitada: {e}")
+
+    env = Environment(
+        loader=FileSystemLoader(str(PLANTILLAS_DIR)),
+        autoescape=_autoescape,
+        undefined=StrictUndefined,
+        auto_reload=PLANTILLAS_AUTO_RELOAD,
+        bytecode_cache=bytecode_cache,
+        cache_size=-1,  # Nunca expulsar plantillas compiladas
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    env.filters["moneda"] = _moneda
+    env.filters["fecha"] = _fecha
+    env.filters["hora"] = _hora
+    env.globals["ahora"] = datetime.now
+    return env
+
+
+_env: Optional[Environment] = None
+
+
+def get_env() -> Environment:
+    """Environment compartido del proceso"""
+    global _env
+    if _env is None:
+        _env = _crear_env()
+    return _env
+
+
+def get_plantilla(nombre: str) -> Template:
+    """
+    Plantilla compilada (``Template.render(dict)`` / ``Template.render(**kw)``).
+
+    Args:
+        nombre: Ruta relativa a plantillas/templates, p.ej. ``email/resumen_diario.html``
+    """
+    return get_env().get_template(nombre)
+
+
+def precompilar() -> List[str]:
+    """
+    Compila todas las plantillas (llamar al arrancar el proceso).
+
+    Returns:
+        Nombres de las plantillas cargadas
+    """
+    env = get_env()
+    nombres = env.list_templates(filter_func=lambda n: not n.startswith("."))
+    for nombre in nombres:
+        env.get_template(nombre)
+    logger.info(f"✅ {len(nombres)} plantillas precompiladas")
+    return nombres
+
+
+def render(nombre: str, contexto: Optional[Dict[str, Any]] = None, **kwargs: Any) -> str:
+    """
+    Renderiza una plantilla completa.
+
+    Args:
+        nombre: Plantilla (``email/...``, ``whatsapp/...``, ``pdf/...``)
+        contexto: Valores de la plantilla
+        **kwargs: Valores adicionales
+    """
+    return get_plantilla(nombre).render(contexto or {}, **kwargs)
+
+
+def render_stream(
+    nombre: str,
+    contexto: Optional[Dict[str, Any]] = None,
+    buffer: int = PLANTILLAS_STREAM_BUFFER,
+    **kwargs: Any,
+) -> Iterator[str]:
+    """
+    Renderiza por fragmentos.
+
+    Las filas pueden pasarse como generador: solo se materializan
+    ``buffer`` fragmentos a la vez. Útil para respuestas HTTP
+    (``StreamingResponse``) o para escribir a archivo.
+    """
+    stream = get_plantilla(nombre).stream(contexto or {}, **kwargs)
+    if buffer > 1:
+        stream.enable_buffering(buffer)
+    return stream
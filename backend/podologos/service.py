@@ -458,44 +458,35 @@ async def create_podologo_from_user(
     Returns:
         Datos del podólogo creado
     """
-    conn = get_db_connection()
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute(
-                """
-                INSERT INTO podologos (
-                    cedula_profesional,
-                    nombre_completo,
-                    especialidad,
-                    telefono,
-                    email,
-                    activo,
-                    fecha_contratacion,
-                    id_usuario
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id, cedula_profesional, nombre_completo, especialidad, 
-                          telefono, email, activo, fecha_contratacion, id_usuario
-                """,
-                (
-                    cedula_profesional,
-                    nombre_completo,
-                    especialidad,
-                    telefono,
-                    email,
-                    True,  # activo
-                    date.today(),  # fecha_contratacion
-                    id_usuario,
-                ),
-            )
-            result = cursor.fetchone()
-            conn.commit()
+        result = await execute_returning(
+            """
+            INSERT INTO podologos (
+                cedula_profesional,
+                nombre_completo,
+                especialidad,
+                telefono,
+                email,
+                activo,
+                fecha_contratacion,
+                id_usuario
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            RETURNING id, cedula_profesional, nombre_completo, especialidad, 
+                      telefono, email, activo, fecha_contratacion, id_usuario
+            """,
+            cedula_profesional,
+            nombre_completo,
+            especialidad,
+            telefono,
+            email,
+            True,  # activo
+            date.today(),  # fecha_contratacion
+            id_usuario,
+        )
 
-            logger.info(f"Created podologo record for user {id_usuario}")
-            return dict(result)
+        logger.info(f"Created podologo record for user {id_usuario}")
+        return result
 
     except Exception as e:
-        conn.rollback()
         logger.error(f"Error creating podologo: {e}")
         raise
-    finally:
-        conn.close()
@@ -0,0 +1,130 @@
+"""
+Generador de reportes en CSV
+Las filas se producen con generadores y se codifican por bloques, así la
+respuesta se envía conforme se genera en lugar de armar todo el archivo
+"""
+
+import csv
+import io
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Filas por bloque enviado al cliente
+FILAS_POR_BLOQUE = 500
+
+
+def stream_csv(filas: Iterable[List[Any]], filas_por_bloque: int = FILAS_POR_BLOQUE) -> Iterator[bytes]:
+    """
+    Codifica filas como CSV UTF-8 (con BOM para Excel) por bloques.
+
+    Args:
+        filas: Iterable de filas (listas de valores)
+        filas_por_bloque: Filas que se acumulan antes de emitir un bloque
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    yield '\ufeff'.encode('utf-8')
+
+    pendientes = 0
+    for fila in filas:
+        writer.writerow(fila)
+        pendientes += 1
+        if pendientes >= filas_por_bloque:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+
+    if pendientes:
+        yield buffer.getvalue().encode('utf-8')
+
+
+def filas_csv_gastos(reporte: Dict[str, Any]) -> Iterator[List[Any]]:
+    """Filas del CSV del reporte de gastos"""
+    # Header
+    yield ['REPORTE DE GASTOS MENSUALES']
+    yield [f"Periodo: {reporte['periodo']}"]
+    yield [f"Total Gastos: ${reporte['total_gastos']:,.2f}"]
+    yield [f"Variación vs Mes Anterior: {reporte['variacion_porcentual']:+.2f}%"]
+    yield []
+
+    # Gastos por categoría
+    yield ['GASTOS POR CATEGORÍA']
+    yield ['Categoría', 'Total', 'Cantidad', 'Porcentaje', 'Variación %']
+    for cat in reporte['gastos_por_categoria']:
+        yield [
+            cat['categoria'],
+            f"${cat['total']:,.2f}",
+            cat['cantidad'],
+            f"{cat['porcentaje']:.2f}%",
+            f"{cat['variacion_mes_anterior']:+.2f}%"
+        ]
+    yield []
+
+    # Top 10 gastos
+    yield ['TOP 10 GASTOS MAYORES']
+    yield ['Concepto', 'Monto', 'Fecha', 'Método Pago', 'Categoría']
+    for g in reporte['top_10_gastos']:
+        yield [
+            g['concepto'],
+            f"${g['monto']:,.2f}",
+            g['fecha'],
+            g['metodo_pago'],
+            g['categoria']
+        ]
+    yield []
+
+    # Productos comprados
+    if reporte['productos_comprados']:
+        yield ['PRODUCTOS COMPRADOS']
+        yield ['Producto', 'Cantidad', 'Precio Unitario', 'Subtotal', 'Concepto', 'Fecha']
+        for p in reporte['productos_comprados']:
+            yield [
+                p['producto'],
+                p['cantidad'],
+                f"${p['precio_unitario']:,.2f}",
+                f"${p['subtotal']:,.2f}",
+                p['concepto_gasto'],
+                p['fecha']
+            ]
+
+
+def filas_csv_inventario(reporte: Dict[str, Any]) -> Iterator[List[Any]]:
+    """Filas del CSV del reporte de inventario"""
+    # Header
+    yield ['REPORTE DE ESTADO DE INVENTARIO']
+    yield [f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}"]
+    yield [f"Valor Total: ${reporte['valor_total_inventario']:,.2f}"]
+    yield [f"Productos: {reporte['numero_productos']}"]
+    yield [f"Rotación Promedio: {reporte['rotacion_promedio_dias']} días"]
+    yield []
+
+    # Productos críticos
+    if reporte['productos_criticos']:
+        yield ['PRODUCTOS CRÍTICOS']
+        yield ['Código', 'Nombre', 'Categoría', 'Stock', 'Mínimo', 'Déficit', 'Unidad']
+        for p in reporte['productos_criticos']:
+            yield [
+                p['codigo'],
+                p['nombre'],
+                p['categoria'],
+                p['stock_actual'],
+                p['stock_minimo'],
+                p['deficit'],
+                p['unidad_medida']
+            ]
+        yield []
+
+    # Productos con exceso
+    if reporte['productos_exceso']:
+        yield ['PRODUCTOS CON EXCESO']
+        yield ['Código', 'Nombre', 'Stock', 'Máximo', 'Exceso', 'Unidad']
+        for p in reporte['productos_exceso']:
+            yield [
+                p['codigo'],
+                p['nombre'],
+                p['stock_actual'],
+                p['stock_maximo'],
+                p['exceso'],
+                p['unidad_medida']
+            ]
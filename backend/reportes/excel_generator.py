@@ -0,0 +1,136 @@
+"""
+Generador de reportes en Excel
+Usa openpyxl en modo write-only: las filas se escriben en orden y se
+vuelcan al archivo conforme se agregan, sin mantener la hoja en memoria
+"""
+
+import io
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+
+# Estilos globales
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+TITLE_FONT = Font(bold=True, size=14)
+SECTION_FONT = Font(bold=True)
+WARNING_FILL = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+CENTER = Alignment(horizontal='center')
+
+
+def _celda(ws, valor: Any, font=None, fill=None, alignment=None, number_format: Optional[str] = None):
+    """Celda con estilo para una hoja write-only"""
+    cell = WriteOnlyCell(ws, value=valor)
+    if font is not None:
+        cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    if alignment is not None:
+        cell.alignment = alignment
+    if number_format is not None:
+        cell.number_format = number_format
+    return cell
+
+
+def _encabezados(ws, headers: Iterable[str], alignment=None) -> list:
+    return [_celda(ws, h, font=HEADER_FONT, fill=HEADER_FILL, alignment=alignment) for h in headers]
+
+
+def _hoja(titulo: str, anchos: Dict[str, float]):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(titulo)
+    # En write-only los anchos deben fijarse antes de escribir filas
+    for columna, ancho in anchos.items():
+        ws.column_dimensions[columna].width = ancho
+    return wb, ws
+
+
+def _guardar(wb: Workbook) -> io.BytesIO:
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
+
+
+def generar_excel_gastos(reporte: Dict[str, Any]) -> io.BytesIO:
+    """
+    Genera Excel del reporte de gastos mensuales
+    """
+    wb, ws = _hoja("Reporte Gastos", {'A': 30, 'B': 15, 'C': 12, 'D': 15, 'E': 15})
+
+    # Título
+    ws.append([_celda(ws, 'REPORTE DE GASTOS MENSUALES', font=TITLE_FONT)])
+    ws.merged_cells.add('A1:E1')
+    ws.append([f"Periodo: {reporte['periodo']}"])
+    ws.append([f"Total Gastos: ${reporte['total_gastos']:,.2f}"])
+    ws.append([f"Variación vs Mes Anterior: {reporte['variacion_porcentual']:+.2f}%"])
+    ws.append([])
+
+    # Gastos por categoría
+    ws.append([_celda(ws, 'GASTOS POR CATEGORÍA', font=SECTION_FONT)])
+    ws.append(_encabezados(
+        ws, ['Categoría', 'Total', 'Cantidad', 'Porcentaje', 'Variación %'], alignment=CENTER
+    ))
+    for cat in reporte['gastos_por_categoria']:
+        ws.append([
+            cat['categoria'],
+            _celda(ws, cat['total'], number_format='$#,##0.00'),
+            cat['cantidad'],
+            _celda(ws, cat['porcentaje'] / 100, number_format='0.00%'),
+            _celda(ws, cat['variacion_mes_anterior'] / 100, number_format='+0.00%;-0.00%'),
+        ])
+
+    # Top 10 gastos
+    ws.append([])
+    ws.append([])
+    ws.append([_celda(ws, 'TOP 10 GASTOS MAYORES', font=SECTION_FONT)])
+    ws.append(_encabezados(ws, ['Concepto', 'Monto', 'Fecha', 'Método Pago', 'Categoría']))
+    for g in reporte['top_10_gastos']:
+        ws.append([
+            g['concepto'],
+            _celda(ws, g['monto'], number_format='$#,##0.00'),
+            g['fecha'],
+            g['metodo_pago'],
+            g['categoria'],
+        ])
+
+    return _guardar(wb)
+
+
+def generar_excel_inventario(reporte: Dict[str, Any]) -> io.BytesIO:
+    """
+    Genera Excel del reporte de estado del inventario
+    """
+    anchos = {'A': 15, 'B': 30, 'C': 20, 'D': 12, 'E': 12, 'F': 12, 'G': 12}
+    wb, ws = _hoja("Estado Inventario", anchos)
+
+    # Título
+    ws.append([_celda(ws, 'REPORTE DE ESTADO DE INVENTARIO', font=TITLE_FONT)])
+    ws.merged_cells.add('A1:F1')
+    ws.append([f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}"])
+    ws.append([f"Valor Total Inventario: ${reporte['valor_total_inventario']:,.2f}"])
+    ws.append([f"Total Productos: {reporte['numero_productos']}"])
+    ws.append([f"Rotación Promedio: {reporte['rotacion_promedio_dias']} días"])
+
+    # Productos críticos
+    if reporte['productos_criticos']:
+        ws.append([])
+        ws.append([_celda(ws, f"PRODUCTOS CRÍTICOS ({reporte['num_criticos']})", font=SECTION_FONT)])
+        ws.append(_encabezados(
+            ws, ['Código', 'Nombre', 'Categoría', 'Stock', 'Mínimo', 'Déficit', 'Unidad']
+        ))
+        for p in reporte['productos_criticos']:
+            ws.append([
+                p['codigo'],
+                p['nombre'],
+                p['categoria'],
+                _celda(ws, p['stock_actual'], fill=WARNING_FILL),
+                p['stock_minimo'],
+                p['deficit'],
+                p['unidad_medida'],
+            ])
+
+    return _guardar(wb)
@@ -12,13 +12,14 @@ from reportlab.platypus import (
     PageBreak, Image
 )
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
-from datetime import datetime
 import io
 import matplotlib
 matplotlib.use('Agg')  # Backend sin GUI
 import matplotlib.pyplot as plt
 from typing import Dict, List, Any
 
+from plantillas import render
+
 # Estilos globales
 COLORS = {
     'primary': colors.HexColor('#366092'),
@@ -115,11 +116,8 @@ def generar_pdf_gastos(reporte: Dict[str, Any]) -> io.BytesIO:
     
     # Título principal
     story.append(Paragraph(f"Reporte de Gastos Mensuales", title_style))
-    story.append(Paragraph(f"<b>Periodo:</b> {reporte['periodo']}", styles['Normal']))
-    story.append(Paragraph(
-        f"<b>Generado:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-        styles['Normal']
-    ))
+    story.append(Paragraph(render('pdf/periodo.xml', periodo=reporte['periodo']), styles['Normal']))
+    story.append(Paragraph(render('pdf/generado.xml'), styles['Normal']))
     story.append(Spacer(1, 0.3*inch))
     
     # Resumen ejecutivo
@@ -264,10 +262,7 @@ def generar_pdf_gastos(reporte: Dict[str, Any]) -> io.BytesIO:
         textColor=colors.grey,
         alignment=TA_CENTER
     )
-    story.append(Paragraph(
-        f"Reporte generado por Podoskin Solution - {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-        footer_style
-    ))
+    story.append(Paragraph(render('pdf/pie.xml'), footer_style))
     
     # Construir PDF
     doc.build(story)
@@ -305,10 +300,7 @@ def generar_pdf_inventario(reporte: Dict[str, Any]) -> io.BytesIO:
     
     # Título
     story.append(Paragraph("Reporte de Estado del Inventario", title_style))
-    story.append(Paragraph(
-        f"<b>Fecha de Generación:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-        styles['Normal']
-    ))
+    story.append(Paragraph(render('pdf/generado.xml', etiqueta='Fecha de Generación'), styles['Normal']))
     story.append(Spacer(1, 0.3*inch))
     
     # Resumen general
@@ -437,10 +429,7 @@ def generar_pdf_inventario(reporte: Dict[str, Any]) -> io.BytesIO:
         textColor=colors.grey,
         alignment=TA_CENTER
     )
-    story.append(Paragraph(
-        f"Reporte generado por Podoskin Solution - {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-        footer_style
-    ))
+    story.append(Paragraph(render('pdf/pie.xml'), footer_style))
     
     # Construir PDF
     doc.build(story)
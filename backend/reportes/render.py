@@ -0,0 +1,134 @@
+"""
+Servicio de renderizado de reportes
+===================================
+
+Los PDF (reportlab + gráficos de matplotlib) y los Excel son CPU-bound: se
+generan en un pool de procesos para no bloquear el event loop mientras el
+resto de los endpoints (dashboard, agenda) siguen atendiendo.
+
+Los archivos generados se guardan en un caché en proceso con llave
+``(reporte, formato, periodo, versión de datos)``. La versión es una huella
+del reporte ya calculado: si los datos cambian (los write paths invalidan
+el caché de datos con ``invalidate_tags``) cambia la llave y se vuelve a
+renderizar; si no, se reutiliza el archivo. Solicitudes simultáneas del
+mismo archivo esperan un solo renderizado (single-flight).
+
+Los CSV no pasan por aquí: se generan por bloques en un StreamingResponse
+(ver csv_generator.py).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from cache import SingleFlightCache
+from reportes.excel_generator import generar_excel_gastos, generar_excel_inventario
+from reportes.pdf_generator import generar_pdf_gastos, generar_pdf_inventario
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+REPORTES_RENDER_WORKERS = int(os.getenv("REPORTES_RENDER_WORKERS", "2"))
+REPORTES_CACHE_ENTRIES = int(os.getenv("REPORTES_CACHE_ENTRIES", "64"))
+REPORTES_CACHE_TTL_SECONDS = float(os.getenv("REPORTES_CACHE_TTL_SECONDS", "3600"))
+
+# (reporte, formato) -> función que recibe el dict y retorna un BytesIO
+_RENDERIZADORES: Dict[Tuple[str, str], Callable[[Dict[str, Any]], Any]] = {
+    ("gastos", "pdf"): generar_pdf_gastos,
+    ("gastos", "excel"): generar_excel_gastos,
+    ("inventario", "pdf"): generar_pdf_inventario,
+    ("inventario", "excel"): generar_excel_inventario,
+}
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Campos que cambian en cada cálculo sin que cambien los datos
+_CAMPOS_VOLATILES = ("fecha_generacion",)
+
+_render_executor: Optional[ProcessPoolExecutor] = None
+
+# Archivos renderizados (bytes)
+artefactos = SingleFlightCache(max_entries=REPORTES_CACHE_ENTRIES)
+
+
+def get_render_executor() -> ProcessPoolExecutor:
+    """Retorna el pool de procesos de renderizado (se crea al primer uso)."""
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ProcessPoolExecutor(
+            max_workers=REPORTES_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _render_executor
+
+
+def shutdown_render_executor() -> None:
+    """Cierra el pool de procesos (llamado en el shutdown de la app)."""
+    global _render_executor
+    if _render_executor is not None:
+        _render_executor.shutdown(wait=False, cancel_futures=True)
+        _render_executor = None
+
+
+def version_datos(reporte: Dict[str, Any]) -> str:
+    """
+    Huella del contenido de un reporte: cambia solo cuando cambian los datos.
+
+    Args:
+        reporte: Dict del reporte (salida de ``_obtener_reporte_*``)
+
+    Returns:
+        Hash hexadecimal
+    """
+    estable = {k: v for k, v in reporte.items() if k not in _CAMPOS_VOLATILES}
+    contenido = json.dumps(estable, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(contenido.encode()).hexdigest()
+
+
+def _renderizar(nombre: str, formato: str, reporte: Dict[str, Any]) -> bytes:
+    """Corre en el pool: genera el archivo y retorna sus bytes."""
+    return _RENDERIZADORES[(nombre, formato)](reporte).getvalue()
+
+
+async def renderizar(nombre: str, formato: str, periodo: str, reporte: Dict[str, Any]) -> bytes:
+    """
+    Retorna el archivo del reporte, renderizado en el pool o desde caché.
+
+    Args:
+        nombre: Reporte ("gastos", "inventario")
+        formato: "pdf" o "excel"
+        periodo: Identificador del periodo/filtros del reporte
+        reporte: Datos del reporte
+
+    Returns:
+        Contenido del archivo
+    """
+    if (nombre, formato) not in _RENDERIZADORES:
+        raise ValueError(f"Formato no soportado para {nombre}: {formato}")
+
+    clave = (nombre, formato, periodo, version_datos(reporte))
+
+    async def _calcular() -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_render_executor(), _renderizar, nombre, formato, reporte
+        )
+
+    return await artefactos.get_or_compute(clave, _calcular, ttl=REPORTES_CACHE_TTL_SECONDS)
+
+
+def get_render_stats() -> Dict[str, Any]:
+    """Contadores del caché de archivos (para monitoreo)."""
+    return {
+        **artefactos.info(),
+        "workers": REPORTES_RENDER_WORKERS,
+        "pool_activo": _render_executor is not None,
+    }
@@ -4,20 +4,42 @@ Soporta múltiples formatos: JSON, CSV, Excel, PDF
 """
 
 from fastapi import APIRouter, Depends, Query, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from datetime import datetime, timedelta
 from typing import Optional, List
-import csv
-import io
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
 
-from auth import get_current_user
+from auth import AdminOnly, get_current_user
+from cache import cached
 from db import get_db_connection_citas
-from reportes.pdf_generator import generar_pdf_gastos, generar_pdf_inventario
+from reportes.csv_generator import filas_csv_gastos, filas_csv_inventario, stream_csv
+from reportes.render import MEDIA_TYPES, get_render_stats, renderizar
 
 router = APIRouter(prefix="/reportes", tags=["Reportes"])
 
+_EXTENSIONES = {"pdf": "pdf", "excel": "xlsx"}
+
+
+def _respuesta_archivo(contenido: bytes, formato: str, nombre_archivo: str) -> Response:
+    """Respuesta de descarga para un archivo ya renderizado (PDF/Excel)"""
+    return Response(
+        content=contenido,
+        media_type=MEDIA_TYPES[formato],
+        headers={
+            "Content-Disposition": f"attachment; filename={nombre_archivo}.{_EXTENSIONES[formato]}"
+        }
+    )
+
+
+def _respuesta_csv(filas, nombre_archivo: str) -> StreamingResponse:
+    """CSV enviado por bloques conforme se generan las filas"""
+    return StreamingResponse(
+        stream_csv(filas),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": f"attachment; filename={nombre_archivo}.csv"
+        }
+    )
+
 
 @router.get("/gastos-mensuales")
 async def generar_reporte_gastos_mensuales(
@@ -34,6 +56,22 @@ async def generar_reporte_gastos_mensuales(
     - Top 10 gastos mayores
     - Productos comprados (si vinculados)
     """
+    reporte = await _obtener_reporte_gastos(mes, anio, current_user=current_user)
+    nombre_archivo = f"reporte_gastos_{reporte['periodo'].replace(' ', '_')}"
+
+    # Generar según formato solicitado
+    if formato == "csv":
+        return _respuesta_csv(filas_csv_gastos(reporte), nombre_archivo)
+    elif formato in ("excel", "pdf"):
+        contenido = await renderizar("gastos", formato, f"{anio}-{mes:02d}", reporte)
+        return _respuesta_archivo(contenido, formato, nombre_archivo)
+    else:
+        return reporte
+
+
+@cached("reportes.gastos_mensuales", ttl=60, stale_ttl=300, tags=("gastos",))
+async def _obtener_reporte_gastos(mes: int, anio: int, current_user=None) -> dict:
+    """Construye el reporte de gastos (datos, sin formato)."""
     conn = await get_db_connection_citas()
     
     try:
@@ -156,7 +194,7 @@ async def generar_reporte_gastos_mensuales(
         periodo_nombre = f"{meses_es[mes - 1]} {anio}"
         
         # Construir reporte
-        reporte = {
+        return {
             'periodo': periodo_nombre,
             'fecha_inicio': primer_dia.strftime('%Y-%m-%d'),
             'fecha_fin': ultimo_dia.strftime('%Y-%m-%d'),
@@ -194,173 +232,10 @@ async def generar_reporte_gastos_mensuales(
             ]
         }
         
-        # Generar según formato solicitado
-        if formato == "csv":
-            return generar_csv_gastos(reporte)
-        elif formato == "excel":
-            return generar_excel_gastos(reporte)
-        elif formato == "pdf":
-            pdf_buffer = generar_pdf_gastos(reporte)
-            return StreamingResponse(
-                pdf_buffer,
-                media_type="application/pdf",
-                headers={
-                    "Content-Disposition": f"attachment; filename=reporte_gastos_{reporte['periodo'].replace(' ', '_')}.pdf"
-                }
-            )
-        else:
-            return reporte
-            
     finally:
         await conn.close()
 
 
-def generar_csv_gastos(reporte: dict) -> StreamingResponse:
-    """Genera CSV del reporte de gastos"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow(['REPORTE DE GASTOS MENSUALES'])
-    writer.writerow([f"Periodo: {reporte['periodo']}"])
-    writer.writerow([f"Total Gastos: ${reporte['total_gastos']:,.2f}"])
-    writer.writerow([f"Variación vs Mes Anterior: {reporte['variacion_porcentual']:+.2f}%"])
-    writer.writerow([])
-    
-    # Gastos por categoría
-    writer.writerow(['GASTOS POR CATEGORÍA'])
-    writer.writerow(['Categoría', 'Total', 'Cantidad', 'Porcentaje', 'Variación %'])
-    for cat in reporte['gastos_por_categoria']:
-        writer.writerow([
-            cat['categoria'],
-            f"${cat['total']:,.2f}",
-            cat['cantidad'],
-            f"{cat['porcentaje']:.2f}%",
-            f"{cat['variacion_mes_anterior']:+.2f}%"
-        ])
-    writer.writerow([])
-    
-    # Top 10 gastos
-    writer.writerow(['TOP 10 GASTOS MAYORES'])
-    writer.writerow(['Concepto', 'Monto', 'Fecha', 'Método Pago', 'Categoría'])
-    for g in reporte['top_10_gastos']:
-        writer.writerow([
-            g['concepto'],
-            f"${g['monto']:,.2f}",
-            g['fecha'],
-            g['metodo_pago'],
-            g['categoria']
-        ])
-    writer.writerow([])
-    
-    # Productos comprados
-    if reporte['productos_comprados']:
-        writer.writerow(['PRODUCTOS COMPRADOS'])
-        writer.writerow(['Producto', 'Cantidad', 'Precio Unitario', 'Subtotal', 'Concepto', 'Fecha'])
-        for p in reporte['productos_comprados']:
-            writer.writerow([
-                p['producto'],
-                p['cantidad'],
-                f"${p['precio_unitario']:,.2f}",
-                f"${p['subtotal']:,.2f}",
-                p['concepto_gasto'],
-                p['fecha']
-            ])
-    
-    output.seek(0)
-    return StreamingResponse(
-        io.BytesIO(output.getvalue().encode('utf-8-sig')),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=reporte_gastos_{reporte['periodo'].replace(' ', '_')}.csv"
-        }
-    )
-
-
-def generar_excel_gastos(reporte: dict) -> StreamingResponse:
-    """Genera Excel del reporte de gastos"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Reporte Gastos"
-    
-    # Estilos
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    title_font = Font(bold=True, size=14)
-    
-    # Título
-    ws['A1'] = 'REPORTE DE GASTOS MENSUALES'
-    ws['A1'].font = title_font
-    ws.merge_cells('A1:E1')
-    
-    ws['A2'] = f"Periodo: {reporte['periodo']}"
-    ws['A3'] = f"Total Gastos: ${reporte['total_gastos']:,.2f}"
-    ws['A4'] = f"Variación vs Mes Anterior: {reporte['variacion_porcentual']:+.2f}%"
-    
-    # Gastos por categoría
-    row = 6
-    ws[f'A{row}'] = 'GASTOS POR CATEGORÍA'
-    ws[f'A{row}'].font = Font(bold=True)
-    row += 1
-    
-    headers = ['Categoría', 'Total', 'Cantidad', 'Porcentaje', 'Variación %']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=row, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center')
-    
-    row += 1
-    for cat in reporte['gastos_por_categoria']:
-        ws.cell(row=row, column=1, value=cat['categoria'])
-        ws.cell(row=row, column=2, value=cat['total']).number_format = '$#,##0.00'
-        ws.cell(row=row, column=3, value=cat['cantidad'])
-        ws.cell(row=row, column=4, value=cat['porcentaje']/100).number_format = '0.00%'
-        ws.cell(row=row, column=5, value=cat['variacion_mes_anterior']/100).number_format = '+0.00%;-0.00%'
-        row += 1
-    
-    # Top 10 gastos
-    row += 2
-    ws[f'A{row}'] = 'TOP 10 GASTOS MAYORES'
-    ws[f'A{row}'].font = Font(bold=True)
-    row += 1
-    
-    headers = ['Concepto', 'Monto', 'Fecha', 'Método Pago', 'Categoría']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=row, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-    
-    row += 1
-    for g in reporte['top_10_gastos']:
-        ws.cell(row=row, column=1, value=g['concepto'])
-        ws.cell(row=row, column=2, value=g['monto']).number_format = '$#,##0.00'
-        ws.cell(row=row, column=3, value=g['fecha'])
-        ws.cell(row=row, column=4, value=g['metodo_pago'])
-        ws.cell(row=row, column=5, value=g['categoria'])
-        row += 1
-    
-    # Ajustar anchos de columna
-    ws.column_dimensions['A'].width = 30
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 12
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 15
-    
-    # Guardar en BytesIO
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename=reporte_gastos_{reporte['periodo'].replace(' ', '_')}.xlsx"
-        }
-    )
-
-
 @router.get("/inventario-estado")
 async def generar_reporte_inventario(
     formato: str = Query("json", pattern="^(json|csv|excel|pdf)$"),
@@ -376,6 +251,27 @@ async def generar_reporte_inventario(
     - Rotación estimada
     - Productos sin movimiento en 90 días
     """
+    reporte = await _obtener_reporte_inventario(
+        incluir_criticos, incluir_obsoletos, current_user=current_user
+    )
+    nombre_archivo = f"reporte_inventario_{datetime.now().strftime('%Y%m%d')}"
+
+    # Generar según formato
+    if formato == "csv":
+        return _respuesta_csv(filas_csv_inventario(reporte), nombre_archivo)
+    elif formato in ("excel", "pdf"):
+        periodo = f"criticos={incluir_criticos}|obsoletos={incluir_obsoletos}"
+        contenido = await renderizar("inventario", formato, periodo, reporte)
+        return _respuesta_archivo(contenido, formato, nombre_archivo)
+    else:
+        return reporte
+
+
+@cached("reportes.inventario_estado", ttl=60, stale_ttl=300, tags=("gastos", "inventario"))
+async def _obtener_reporte_inventario(
+    incluir_criticos: bool, incluir_obsoletos: bool, current_user=None
+) -> dict:
+    """Construye el reporte de inventario (datos, sin formato)."""
     conn = await get_db_connection_citas()
     
     try:
@@ -457,7 +353,7 @@ async def generar_reporte_inventario(
         """) or 0
         
         # Construir reporte
-        reporte = {
+        return {
             'fecha_generacion': datetime.now().isoformat(),
             'valor_total_inventario': round(float(valor_total), 2),
             'numero_productos': num_productos,
@@ -505,143 +401,15 @@ async def generar_reporte_inventario(
             'num_sin_movimiento': len(productos_sin_movimiento)
         }
         
-        # Generar según formato
-        if formato == "csv":
-            return generar_csv_inventario(reporte)
-        elif formato == "excel":
-            return generar_excel_inventario(reporte)
-        elif formato == "pdf":
-            pdf_buffer = generar_pdf_inventario(reporte)
-            return StreamingResponse(
-                pdf_buffer,
-                media_type="application/pdf",
-                headers={
-                    "Content-Disposition": f"attachment; filename=reporte_inventario_{datetime.now().strftime('%Y%m%d')}.pdf"
-                }
-            )
-        else:
-            return reporte
-            
     finally:
         await conn.close()
 
 
-def generar_csv_inventario(reporte: dict) -> StreamingResponse:
-    """Genera CSV del reporte de inventario"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow(['REPORTE DE ESTADO DE INVENTARIO'])
-    writer.writerow([f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}"])
-    writer.writerow([f"Valor Total: ${reporte['valor_total_inventario']:,.2f}"])
-    writer.writerow([f"Productos: {reporte['numero_productos']}"])
-    writer.writerow([f"Rotación Promedio: {reporte['rotacion_promedio_dias']} días"])
-    writer.writerow([])
-    
-    # Productos críticos
-    if reporte['productos_criticos']:
-        writer.writerow(['PRODUCTOS CRÍTICOS'])
-        writer.writerow(['Código', 'Nombre', 'Categoría', 'Stock', 'Mínimo', 'Déficit', 'Unidad'])
-        for p in reporte['productos_criticos']:
-            writer.writerow([
-                p['codigo'],
-                p['nombre'],
-                p['categoria'],
-                p['stock_actual'],
-                p['stock_minimo'],
-                p['deficit'],
-                p['unidad_medida']
-            ])
-        writer.writerow([])
-    
-    # Productos con exceso
-    if reporte['productos_exceso']:
-        writer.writerow(['PRODUCTOS CON EXCESO'])
-        writer.writerow(['Código', 'Nombre', 'Stock', 'Máximo', 'Exceso', 'Unidad'])
-        for p in reporte['productos_exceso']:
-            writer.writerow([
-                p['codigo'],
-                p['nombre'],
-                p['stock_actual'],
-                p['stock_maximo'],
-                p['exceso'],
-                p['unidad_medida']
-            ])
-    
-    output.seek(0)
-    return StreamingResponse(
-        io.BytesIO(output.getvalue().encode('utf-8-sig')),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=reporte_inventario_{datetime.now().strftime('%Y%m%d')}.csv"
-        }
-    )
-
-
-def generar_excel_inventario(reporte: dict) -> StreamingResponse:
-    """Genera Excel del reporte de inventario"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Estado Inventario"
-    
-    # Estilos
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    title_font = Font(bold=True, size=14)
-    warning_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-    
-    # Título
-    ws['A1'] = 'REPORTE DE ESTADO DE INVENTARIO'
-    ws['A1'].font = title_font
-    ws.merge_cells('A1:F1')
-    
-    ws['A2'] = f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-    ws['A3'] = f"Valor Total Inventario: ${reporte['valor_total_inventario']:,.2f}"
-    ws['A4'] = f"Total Productos: {reporte['numero_productos']}"
-    ws['A5'] = f"Rotación Promedio: {reporte['rotacion_promedio_dias']} días"
-    
-    # Productos críticos
-    if reporte['productos_criticos']:
-        row = 7
-        ws[f'A{row}'] = f"PRODUCTOS CRÍTICOS ({reporte['num_criticos']})"
-        ws[f'A{row}'].font = Font(bold=True)
-        row += 1
-        
-        headers = ['Código', 'Nombre', 'Categoría', 'Stock', 'Mínimo', 'Déficit', 'Unidad']
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=row, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-        
-        row += 1
-        for p in reporte['productos_criticos']:
-            ws.cell(row=row, column=1, value=p['codigo'])
-            ws.cell(row=row, column=2, value=p['nombre'])
-            ws.cell(row=row, column=3, value=p['categoria'])
-            ws.cell(row=row, column=4, value=p['stock_actual']).fill = warning_fill
-            ws.cell(row=row, column=5, value=p['stock_minimo'])
-            ws.cell(row=row, column=6, value=p['deficit'])
-            ws.cell(row=row, column=7, value=p['unidad_medida'])
-            row += 1
-    
-    # Ajustar anchos
-    ws.column_dimensions['A'].width = 15
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 12
-    ws.column_dimensions['E'].width = 12
-    ws.column_dimensions['F'].width = 12
-    ws.column_dimensions['G'].width = 12
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename=reporte_inventario_{datetime.now().strftime('%Y%m%d')}.xlsx"
-        }
-    )
+@router.get(
+    "/cache",
+    summary="Estado del caché de archivos de reportes",
+    description="Contadores del caché de PDF/Excel renderizados (solo Admin)",
+)
+async def get_reportes_cache_stats(current_user=Depends(AdminOnly)):
+    """Retorna los contadores del caché de archivos y del pool de renderizado"""
+    return get_render_stats()
@@ -0,0 +1,119 @@
+"""
+Benchmark de alertas de reorden
+===============================
+
+Compara el análisis de puntos de reorden sobre datos sintéticos
+(por defecto 5.000 productos × 500.000 movimientos en 90 días):
+
+- anterior: 90 días de movimientos como dicts + ciclo producto por producto
+- vectorizado: mismos movimientos, agregación y evaluación con groupby/NumPy
+- agregado: una fila de consumo por producto (lo que devuelve
+  analytics.consumo.consumo_por_producto desde consumo_diario_productos)
+
+No requiere BD.
+
+Uso:
+    python scripts/bench_alertas_reorden.py --productos 5000 --movimientos 500000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from analytics.predictor import InventoryAnalyzer, consumo_desde_movimientos
+
+
+def _datos_sinteticos(num_productos: int, num_movimientos: int):
+    rng = np.random.default_rng(42)
+    productos = [
+        {
+            'producto_id': i,
+            'codigo_producto': f"P{i:05d}",
+            'nombre': f"Producto {i}",
+            'categoria': 'general',
+            'stock_actual': float(rng.integers(0, 200)),
+            'stock_minimo': 20.0,
+            'stock_maximo': 100.0,
+            'tiempo_reposicion_dias': int(rng.integers(3, 15)),
+            'costo_unitario': float(rng.uniform(1, 50)),
+        }
+        for i in range(num_productos)
+    ]
+
+    ahora = datetime.now()
+    ids = rng.integers(0, num_productos, num_movimientos)
+    segundos = rng.integers(0, 90 * 86400, num_movimientos)
+    cantidades = rng.integers(1, 10, num_movimientos).astype(float)
+    movimientos = [
+        {'producto_id': int(p), 'fecha': ahora - timedelta(seconds=int(s)), 'cantidad': c}
+        for p, s, c in zip(ids, segundos, cantidades)
+    ]
+    return productos, movimientos
+
+
+def _analizar_por_producto(productos, historial_movimientos):
+    """Implementación anterior: consumo con groupby y un ciclo por producto."""
+    df_mov = pd.DataFrame(historial_movimientos)
+    df_mov['fecha'] = pd.to_datetime(df_mov['fecha'])
+    df_reciente = df_mov[df_mov['fecha'] >= datetime.now() - timedelta(days=30)]
+    consumo_dict = (df_reciente.groupby('producto_id')['cantidad'].sum() / 30).to_dict()
+
+    alertas = []
+    for producto in productos:
+        consumo = consumo_dict.get(producto['producto_id'], 0)
+        punto_reorden = producto['stock_minimo'] * 1.2
+        dias_restantes = producto['stock_actual'] / consumo if consumo > 0 else float('inf')
+        if producto['stock_actual'] <= punto_reorden:
+            alertas.append((producto['producto_id'], dias_restantes))
+    return alertas
+
+
+def _medir(fn, iteraciones):
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+async def main(num_productos: int, num_movimientos: int, iteraciones: int):
+    productos, movimientos = _datos_sinteticos(num_productos, num_movimientos)
+    analyzer = InventoryAnalyzer()
+    consumo = consumo_desde_movimientos(movimientos)
+
+    resultados = {
+        'anterior': _medir(lambda: _analizar_por_producto(productos, movimientos), iteraciones),
+        'vectorizado': _medir(
+            lambda: analyzer.evaluar_reorden(productos, consumo_desde_movimientos(movimientos)),
+            iteraciones,
+        ),
+        'agregado': _medir(lambda: analyzer.evaluar_reorden(productos, consumo), iteraciones),
+    }
+
+    print(f"{num_productos} productos × {num_movimientos} movimientos (mediana de {iteraciones})")
+    for nombre, ms in resultados.items():
+        print(f"{nombre:<12} {ms:9.1f} ms")
+
+    resumen = analyzer.evaluar_reorden(productos, consumo)['resumen']
+    print(f"alertas: {resumen}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--productos", type=int, default=5000)
+    parser.add_argument("--movimientos", type=int, default=500000)
+    parser.add_argument("--iteraciones", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.productos, args.movimientos, args.iteraciones))
@@ -0,0 +1,113 @@
+"""
+Benchmark de bloqueo del event loop en analytics
+=================================================
+
+Mide cuánto se bloquea el event loop mientras se atienden predicciones de
+demanda concurrentes:
+
+- inline: entrenamiento e inferencia dentro del loop (comportamiento anterior)
+- pool (frío): entrenamiento en el pool de procesos, sin modelos cacheados
+- pool (cacheado): misma serie, solo inferencia en el pool
+
+Un "ticker" duerme 1 ms en bucle; el retraso sobre ese 1 ms es el tiempo
+que el loop estuvo ocupado con otra cosa. No requiere BD.
+
+Uso:
+    python scripts/bench_analytics_event_loop.py --requests 20 --servicios 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from analytics import predictor
+from analytics.predictor import DemandPredictor
+
+
+def _serie_sintetica(semilla: int, meses: int = 12):
+    rng = np.random.default_rng(semilla)
+    return [
+        {
+            'fecha': datetime(2025 + (m // 12), (m % 12) + 1, 1),
+            'cantidad': int(40 + 10 * np.sin(m / 2) + rng.integers(0, 8)),
+            'ingresos': 0.0,
+        }
+        for m in range(meses)
+    ]
+
+
+async def _medir_stall(trabajo):
+    """Ejecuta ``trabajo`` mientras un ticker mide el retraso del loop."""
+    retrasos = []
+    terminado = asyncio.Event()
+
+    async def ticker():
+        while not terminado.is_set():
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.001)
+            retrasos.append(max(0.0, time.perf_counter() - inicio - 0.001) * 1000)
+
+    tarea = asyncio.create_task(ticker())
+    inicio = time.perf_counter()
+    await trabajo()
+    total = (time.perf_counter() - inicio) * 1000
+    terminado.set()
+    await tarea
+    return total, max(retrasos or [0]), sum(retrasos)
+
+
+def _reportar(nombre, total, max_stall, suma_stall):
+    print(
+        f"{nombre:<16} total={total:8.1f} ms  "
+        f"stall_max={max_stall:8.1f} ms  stall_acumulado={suma_stall:8.1f} ms"
+    )
+
+
+async def main(num_requests: int, num_servicios: int):
+    series = [_serie_sintetica(i) for i in range(num_servicios)]
+
+    async def inline():
+        for i in range(num_requests):
+            datos = series[i % num_servicios]
+            modelos = predictor._entrenar_modelos_demanda(datos)
+            predictor._predecir_demanda(modelos, 3)
+            await asyncio.sleep(0)
+
+    dp = DemandPredictor()
+
+    async def pool():
+        await asyncio.gather(*(
+            dp.predecir_demanda_servicio(
+                series[i % num_servicios], 3, clave_modelo=f"servicio:{i % num_servicios}"
+            )
+            for i in range(num_requests)
+        ))
+
+    # Calentar el pool para no medir el arranque de procesos
+    await asyncio.gather(*(
+        predictor._run_in_pool(abs, -1) for _ in range(predictor.ANALYTICS_ML_WORKERS)
+    ))
+
+    _reportar("inline", *await _medir_stall(inline))
+    _reportar("pool (frío)", *await _medir_stall(pool))
+    _reportar("pool (cacheado)", *await _medir_stall(pool))
+    print(f"caché de modelos: {dp.cache_info()}")
+
+    predictor.shutdown_ml_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--servicios", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.servicios))
@@ -0,0 +1,145 @@
+"""
+Benchmark de escritura de auditoría
+===================================
+
+Compara, para N acciones auditadas lanzadas desde requests concurrentes:
+
+1. Antes: un INSERT + COMMIT por acción en una conexión psycopg síncrona
+   compartida (bloquea el event loop en cada round-trip).
+2. Ahora: ``log_action`` encola y el escritor de fondo escribe por lotes con
+   ``copy_records_to_table`` en el pool AsyncPG.
+
+Informa el tiempo bloqueado en el loop (latencia del handler), el tiempo
+hasta que todo está en la BD y el retraso máximo de un tick del loop.
+
+Usa DB_* de db.py y el usuario ``--usuario-id`` (debe existir). Borra sus
+registros del módulo ``bench_auditoria`` al terminar.
+
+Uso:
+    python scripts/bench_auditoria.py --acciones 5000 --concurrencia 50
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg
+
+import db
+from audit.service import AuditService
+from audit.writer import AuditWriter
+
+MODULO = "bench_auditoria"
+
+
+class _Monitor:
+    """Mide el mayor retraso de un tick de 1 ms del event loop"""
+
+    def __init__(self):
+        self.max_ms = 0.0
+        self._tarea = None
+
+    async def _medir(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            inicio = loop.time()
+            await asyncio.sleep(0.001)
+            self.max_ms = max(self.max_ms, (loop.time() - inicio - 0.001) * 1000)
+
+    def __enter__(self):
+        self._tarea = asyncio.get_running_loop().create_task(self._medir())
+        return self
+
+    def __exit__(self, *exc):
+        self._tarea.cancel()
+
+
+async def _lanzar(n, concurrencia, accion):
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def request(i):
+        async with semaforo:
+            accion(i)
+            await asyncio.sleep(0)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(n)))
+    return time.perf_counter() - inicio
+
+
+async def bench_sincrono(n, concurrencia, usuario_id):
+    conn = psycopg.connect(
+        host=db.DB_HOST, port=db.DB_PORT, dbname=db.DB_NAME,
+        user=db.DB_USER, password=db.DB_PASSWORD,
+    )
+
+    def insertar(i):
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO auditoria (usuario_id, accion, modulo, descripcion, datos_nuevos)
+                VALUES (%s, 'crear', %s, %s, %s::jsonb)
+                """,
+                (usuario_id, MODULO, f"acción {i}", '{"i": %d}' % i),
+            )
+        conn.commit()
+
+    with _Monitor() as monitor:
+        segundos = await _lanzar(n, concurrencia, insertar)
+    conn.close()
+    return segundos, segundos, monitor.max_ms
+
+
+async def bench_lotes(n, concurrencia, usuario_id, lote):
+    writer = AuditWriter(max_cola=n, tamano_lote=lote, intervalo_ms=200)
+    servicio = AuditService(writer=writer)
+    writer.iniciar()
+
+    with _Monitor() as monitor:
+        inicio = time.perf_counter()
+        encolar = await _lanzar(
+            n, concurrencia,
+            lambda i: servicio.log_action(usuario_id, "crear", MODULO, f"acción {i}", None, {"i": i}),
+        )
+        await writer.detener()
+        total = time.perf_counter() - inicio
+    return encolar, total, monitor.max_ms, writer.lotes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de auditoría")
+    parser.add_argument("--acciones", type=int, default=5000)
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--lote", type=int, default=500)
+    parser.add_argument("--usuario-id", type=int, default=1)
+    args = parser.parse_args()
+
+    await db.init_db_pool()
+    try:
+        handlers, total, tick = await bench_sincrono(args.acciones, args.concurrencia, args.usuario_id)
+        print(f"\n{args.acciones} acciones, {args.concurrencia} requests concurrentes")
+        print(
+            f"  psycopg síncrono:  handlers {handlers * 1000:8.1f} ms   en BD {total * 1000:8.1f} ms   "
+            f"tick máx {tick:6.1f} ms   ({args.acciones / total:,.0f}/s)"
+        )
+        handlers, total, tick, lotes = await bench_lotes(
+            args.acciones, args.concurrencia, args.usuario_id, args.lote
+        )
+        print(
+            f"  cola + COPY:       handlers {handlers * 1000:8.1f} ms   en BD {total * 1000:8.1f} ms   "
+            f"tick máx {tick:6.1f} ms   ({args.acciones / total:,.0f}/s, {lotes} lotes)"
+        )
+    finally:
+        conn = await db.get_connection()
+        await conn.execute("DELETE FROM auditoria WHERE modulo = $1", MODULO)
+        await db.release_connection(conn)
+        await db.close_db_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
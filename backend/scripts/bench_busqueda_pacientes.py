@@ -0,0 +1,128 @@
+"""
+Benchmark de búsqueda de pacientes
+==================================
+
+Construye el índice en memoria de pacientes/busqueda.py con N pacientes
+sintéticos (nombres con acentos, códigos y teléfonos) y mide la latencia
+de búsquedas típicas del autocompletado:
+
+- prefijos de 1, 2 y 3 letras
+- nombre completo, dos palabras, palabra con error de tipeo
+- prefijo de teléfono y código de paciente
+
+Informa el tiempo de construcción, la memoria aproximada (RSS) y p50/p99/máx por
+tipo de consulta. No usa la base de datos.
+
+Uso:
+    python scripts/bench_busqueda_pacientes.py --pacientes 200000 --repeticiones 200
+"""
+
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pacientes.busqueda import IndicePacientes
+
+NOMBRES = [
+    "José", "María", "Juan", "Sofía", "Luis", "Lucía", "Jesús", "Ana", "Héctor",
+    "Mónica", "Raúl", "Verónica", "Andrés", "Inés", "Ramón", "Begoña", "Martín",
+    "Fernanda", "Óscar", "Guadalupe", "Iván", "Rocío", "Tomás", "Ximena", "Joaquín",
+]
+APELLIDOS = [
+    "Peña", "Núñez", "García", "Hernández", "López", "Martínez", "González",
+    "Pérez", "Sánchez", "Ramírez", "Cruz", "Gómez", "Díaz", "Vázquez", "Jiménez",
+    "Ibáñez", "Muñoz", "Ordóñez", "Castañeda", "Álvarez", "Rodríguez", "Ortíz",
+    "Valdés", "Acuña", "Montaño", "Saldaña", "Quiñones", "Ríos", "Ávila", "León",
+]
+SILABAS = [
+    "al", "ba", "be", "ca", "ce", "ci", "cha", "da", "do", "es", "fa", "fer", "ga",
+    "gue", "ir", "ja", "la", "lo", "ma", "me", "mo", "na", "ñe", "no", "pa", "ran",
+    "ri", "ro", "sal", "te", "to", "tu", "va", "vi", "ya", "za", "zu", "ón", "ás",
+]
+
+
+def paciente_sintetico(i: int, rnd: random.Random) -> dict:
+    nombre = rnd.choice(NOMBRES)
+    ap1, ap2 = rnd.choice(APELLIDOS), rnd.choice(APELLIDOS)
+    # Apellidos menos comunes para que el vocabulario no sea tan pequeño
+    if rnd.random() < 0.3:
+        ap1 = "".join(rnd.choice(SILABAS) for _ in range(rnd.randint(2, 4))).capitalize()
+    return {
+        "id": i,
+        "codigo_paciente": f"{nombre[:2].upper()}{ap1[:2].upper()}{i:07d}",
+        "primer_nombre": nombre,
+        "segundo_nombre": rnd.choice(NOMBRES) if rnd.random() < 0.4 else None,
+        "primer_apellido": ap1,
+        "segundo_apellido": ap2,
+        "telefono_principal": f"55{rnd.randrange(10**8):08d}",
+        "telefono_secundario": None,
+    }
+
+
+def percentiles(tiempos):
+    tiempos.sort()
+    p = lambda q: tiempos[min(len(tiempos) - 1, int(len(tiempos) * q))]
+    return p(0.5), p(0.99), tiempos[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda de pacientes")
+    parser.add_argument("--pacientes", type=int, default=200000)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--limite", type=int, default=50)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    filas = [paciente_sintetico(i, rnd) for i in range(1, args.pacientes + 1)]
+
+    rss_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    indice = IndicePacientes()
+    indice.construir(filas)
+    construccion = time.perf_counter() - inicio
+    memoria = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_antes) / 1024
+
+    muestra = rnd.sample(filas, 50)
+    consultas = {
+        "prefijo 1": lambda f: f["primer_apellido"][:1],
+        "prefijo 2": lambda f: f["primer_apellido"][:2],
+        "prefijo 3": lambda f: f["primer_nombre"][:3],
+        "nombre completo": lambda f: f"{f['primer_nombre']} {f['primer_apellido']} {f['segundo_apellido']}",
+        "dos palabras": lambda f: f"{f['primer_nombre'][:3]} {f['segundo_apellido'][:4]}",
+        "error de tipeo": lambda f: f["segundo_apellido"][:1] + f["segundo_apellido"][2:3]
+        + f["segundo_apellido"][1:2] + f["segundo_apellido"][3:],
+        "teléfono": lambda f: f["telefono_principal"][:6],
+        "código": lambda f: f["codigo_paciente"],
+    }
+
+    print(f"\n{len(indice)} pacientes: índice en {construccion:.1f} s, ~{memoria:.0f} MB")
+    print(f"  {indice.get_stats()}")
+
+    # Altas/cambios incrementales (lo que hace el listener)
+    t0 = time.perf_counter()
+    for fila in rnd.sample(filas, 1000):
+        indice.agregar({**fila, "segundo_apellido": rnd.choice(APELLIDOS)})
+    print(f"  actualización incremental: {(time.perf_counter() - t0) / 1000 * 1000:.3f} ms por paciente")
+    for nombre, generar in consultas.items():
+        tiempos, encontrados = [], 0
+        for r in range(args.repeticiones):
+            texto = generar(muestra[r % len(muestra)])
+            t0 = time.perf_counter()
+            resultado = indice.buscar(texto, args.limite)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+            encontrados += bool(resultado)
+        p50, p99, maximo = percentiles(tiempos)
+        print(
+            f"  {nombre:16} p50 {p50:6.3f} ms  p99 {p99:6.3f} ms  máx {maximo:6.3f} ms  "
+            f"con resultados {encontrados}/{args.repeticiones}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark del runtime async de Celery
+=====================================
+
+Mide el costo fijo por tarea de una tarea trivial (``SELECT 1``) ejecutada
+con ``Task.apply()`` (en proceso, sin broker):
+
+- anterior: ``asyncio.run`` + ``asyncpg.connect`` por tarea
+- runtime: loop persistente del worker + conexión del pool
+
+Usa la configuración POSTGRES_* de tasks/runtime.py.
+
+Uso:
+    python scripts/bench_celery_runtime.py --tareas 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tasks.celery_app import celery_app
+from tasks.runtime import get_db_connection, release_db_connection, run_async, runtime
+
+
+async def _select_uno():
+    conn = await get_db_connection()
+    try:
+        return await conn.fetchval("SELECT 1")
+    finally:
+        await release_db_connection(conn)
+
+
+@celery_app.task(name='bench.select_uno')
+def select_uno():
+    return run_async(_select_uno())
+
+
+def _medir(nombre, tareas):
+    tiempos = []
+    for _ in range(tareas):
+        inicio = time.perf_counter()
+        assert select_uno.apply().get() == 1
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    print(
+        f"{nombre:<10} n={tareas:<5} "
+        f"media={statistics.mean(tiempos):6.2f} ms  "
+        f"p50={statistics.median(tiempos):6.2f} ms  "
+        f"p95={sorted(tiempos)[int(0.95 * (len(tiempos) - 1))]:6.2f} ms"
+    )
+
+
+def main(tareas: int):
+    _medir("anterior", tareas)
+
+    runtime.start()
+    try:
+        _medir("runtime", tareas)
+    finally:
+        runtime.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tareas", type=int, default=500)
+    args = parser.parse_args()
+
+    main(args.tareas)
@@ -0,0 +1,194 @@
+"""
+Benchmark de búsqueda CIE-10
+============================
+
+Construye el catálogo en memoria de tratamientos/cie10.py y mide la
+latencia del selector de diagnósticos:
+
+- prefijo de código (1 a 4 caracteres, con y sin punto)
+- prefijo de una palabra (2 y 4 letras), palabra completa, dos palabras
+- palabra con error de tipeo
+
+Por defecto usa un catálogo sintético con la forma del CIE-10 (A00-Z99 con
+subcódigos, ~14k códigos, descripciones con acentos). Con ``--bd`` usa
+``catalogo_cie10`` y mide también la búsqueda de respaldo en la BD
+(texto completo + prefijo de código) y la búsqueda anterior con ILIKE,
+con las mismas consultas.
+
+Uso:
+    python scripts/bench_cie10.py --codigos 14000 --repeticiones 300
+    python scripts/bench_cie10.py --bd
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import string
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from tratamientos import cie10
+
+AFECCIONES = [
+    "Fascitis", "Onicomicosis", "Dermatitis", "Infección", "Tumor maligno", "Fractura",
+    "Luxación", "Esguince", "Úlcera", "Neuropatía", "Artritis", "Artrosis", "Tendinitis",
+    "Bursitis", "Quemadura", "Hemorragia", "Trastorno", "Deformidad", "Absceso", "Celulitis",
+    "Insuficiencia", "Hipertensión", "Diabetes mellitus", "Tuberculosis", "Micosis",
+    "Verruga", "Callosidad", "Espolón", "Contusión", "Herida", "Necrosis", "Gangrena",
+]
+SITIOS = [
+    "plantar", "del pie", "del tobillo", "de la uña", "del calcáneo", "del hallux",
+    "del tendón de Aquiles", "de la rodilla", "de la mano", "del hígado", "del riñón",
+    "del pulmón", "del estómago", "de la piel", "del tejido subcutáneo", "de la columna",
+    "del fémur", "de la tibia", "del peroné", "de los metatarsianos", "del ojo", "del oído",
+]
+SILABAS = [
+    "al", "ba", "bac", "ci", "clo", "co", "di", "es", "fi", "gi", "la", "lo", "ma",
+    "mi", "na", "no", "pa", "ri", "ro", "sal", "si", "ta", "to", "tri", "va", "xi",
+]
+CALIFICADORES = [
+    "aguda", "crónica", "no especificada", "recurrente", "bilateral", "derecha",
+    "izquierda", "debida a dermatofitos", "por VPH", "con complicaciones",
+    "sin complicaciones", "inicial", "subsecuente", "secuela", "congénita", "adquirida",
+]
+
+
+def _termino(rnd: random.Random) -> str:
+    """Término poco frecuente (agente, epónimo) para que el vocabulario no sea tan pequeño"""
+    return "".join(rnd.choice(SILABAS) for _ in range(rnd.randint(3, 5)))
+
+
+def catalogo_sintetico(n: int, rnd: random.Random):
+    filas = []
+    categorias = [f"{letra}{i:02d}" for letra in string.ascii_uppercase for i in range(100)]
+    por_categoria = max(1, -(-n // len(categorias)))
+    for categoria in categorias:
+        afeccion, sitio = rnd.choice(AFECCIONES), rnd.choice(SITIOS)
+        filas.append({
+            "id": len(filas) + 1,
+            "codigo": categoria,
+            "descripcion": f"{afeccion} {sitio}",
+            "categoria": afeccion,
+            "subcategoria": None,
+        })
+        for sub in range(por_categoria - 1):
+            filas.append({
+                "id": len(filas) + 1,
+                "codigo": f"{categoria}.{sub}",
+                "descripcion": f"{afeccion} {sitio} {rnd.choice(CALIFICADORES)}"
+                + (f" por {_termino(rnd)}" if rnd.random() < 0.5 else ""),
+                "categoria": afeccion,
+                "subcategoria": rnd.choice(CALIFICADORES),
+            })
+            if len(filas) >= n:
+                return filas
+    return filas
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    p = lambda q: tiempos[min(len(tiempos) - 1, int(len(tiempos) * q))]
+    return p(0.5), p(0.95), tiempos[-1]
+
+
+def _quitar_letra(palabra: str, rnd: random.Random) -> str:
+    i = rnd.randrange(1, len(palabra) - 1)
+    return palabra[:i] + palabra[i + 1:]
+
+
+def consultas(filas, rnd: random.Random):
+    muestra = rnd.sample(filas, min(50, len(filas)))
+
+    def palabra(f):
+        return max(f["descripcion"].split(), key=len)
+
+    return muestra, {
+        "código 1": lambda i: muestra[i]["codigo"][:1],
+        "código 3": lambda i: muestra[i]["codigo"][:3].lower(),
+        "código 4": lambda i: muestra[i]["codigo"][:5],
+        "palabra 2": lambda i: palabra(muestra[i])[:2],
+        "palabra 4": lambda i: palabra(muestra[i])[:4],
+        "palabra": lambda i: palabra(muestra[i]),
+        "dos palabras": lambda i: " ".join(w[:5] for w in muestra[i]["descripcion"].split()[::2][:2]),
+        "error de tipeo": lambda i: _quitar_letra(palabra(muestra[i]), rnd),
+    }
+
+
+# Búsqueda anterior de tratamientos/service.py (ILIKE sobre todo el catálogo)
+_ILIKE = """
+    SELECT id, codigo, descripcion, categoria, subcategoria
+    FROM catalogo_cie10
+    WHERE activo = true
+      AND (codigo ILIKE $1 OR descripcion ILIKE $1 OR categoria ILIKE $1)
+    ORDER BY codigo
+    LIMIT $2
+"""
+
+
+async def medir_bd(muestra, generadores, repeticiones, limite):
+    variantes = {
+        "BD": lambda texto: cie10.buscar_cie10(texto, limite),
+        "ILIKE": lambda texto: db.fetch_all(_ILIKE, f"%{texto}%", limite),
+    }
+    for variante, buscar in variantes.items():
+        for nombre, generar in generadores.items():
+            tiempos = []
+            for r in range(repeticiones):
+                texto = generar(r % len(muestra))
+                t0 = time.perf_counter()
+                await buscar(texto)
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            p50, p95, maximo = percentiles(tiempos)
+            print(f"  {variante:5} {nombre:15} p50 {p50:6.2f} ms  p95 {p95:6.2f} ms  máx {maximo:6.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--codigos", type=int, default=14000)
+    parser.add_argument("--repeticiones", type=int, default=300)
+    parser.add_argument("--limite", type=int, default=50)
+    parser.add_argument("--bd", action="store_true", help="Usar catalogo_cie10 y medir el respaldo en BD")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    if args.bd:
+        await db.init_db_pool()
+        filas = await db.fetch_all(f"SELECT {cie10.COLUMNAS} FROM catalogo_cie10 WHERE activo = true")
+    else:
+        filas = catalogo_sintetico(args.codigos, rnd)
+
+    inicio = time.perf_counter()
+    catalogo = cie10.CatalogoCIE10()
+    catalogo.construir(filas)
+    print(f"\n{len(catalogo)} códigos: catálogo en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    print(f"  {catalogo.get_stats()}")
+
+    muestra, generadores = consultas(filas, rnd)
+    for nombre, generar in generadores.items():
+        tiempos, encontrados = [], 0
+        for r in range(args.repeticiones):
+            texto = generar(r % len(muestra))
+            t0 = time.perf_counter()
+            resultado = catalogo.buscar(texto, args.limite)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+            encontrados += bool(resultado)
+        p50, p95, maximo = percentiles(tiempos)
+        print(
+            f"  {nombre:18} p50 {p50:6.3f} ms  p95 {p95:6.3f} ms  máx {maximo:6.3f} ms  "
+            f"con resultados {encontrados}/{args.repeticiones}"
+        )
+
+    if args.bd:
+        try:
+            await medir_bd(muestra, generadores, args.repeticiones, args.limite)
+        finally:
+            await db.close_db_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
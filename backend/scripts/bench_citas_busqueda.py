@@ -0,0 +1,309 @@
+"""
+Benchmark de búsqueda de citas
+==============================
+
+Compara GET /citas/buscar sobre una tabla de citas grande (1M por defecto):
+
+- anterior: cuatro ``ILIKE '%texto%'`` en OR sobre nombres, notas y motivo,
+  ordenado por fecha (recorre toda la tabla citas). El nombre del paciente se
+  arma con primer nombre y apellido porque ``pacientes`` no tiene
+  ``nombre_completo``.
+- indexada: citas/busqueda.buscar_citas (tsvector + trigramas, ranking y
+  cursor)
+
+con palabras del motivo, prefijos, dos palabras, apellidos y nombres de
+podólogo, más el recorrido de 10 páginas con cursor.
+
+Los datos sintéticos se generan en el esquema ``bench_citas`` (mismas
+columnas e índices que data/migrations/30_citas_busqueda.sql) para no tocar
+las tablas reales; se reutilizan entre corridas mientras el número de citas
+no cambie. Requiere las migraciones 27 y 30 en la BD (texto_busqueda,
+spanish_unaccent y pg_trgm).
+
+Uso:
+    python scripts/bench_citas_busqueda.py --citas 1000000 --repeticiones 30
+    python scripts/bench_citas_busqueda.py --explain --limpiar
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from citas import busqueda
+from pacientes.busqueda import normalizar
+
+ESQUEMA = "bench_citas"
+
+NOMBRES = [
+    "María", "José", "Juan", "Guadalupe", "Francisco", "Ana", "Luis", "Rosa",
+    "Carlos", "Verónica", "Jesús", "Alejandra", "Miguel", "Patricia", "Pedro",
+    "Sofía", "Ángel", "Fernanda", "Raúl", "Mónica", "Héctor", "Lucía",
+]
+APELLIDOS = [
+    "Hernández", "García", "Martínez", "López", "González", "Pérez", "Rodríguez",
+    "Sánchez", "Ramírez", "Cruz", "Flores", "Gómez", "Morales", "Vázquez",
+    "Jiménez", "Reyes", "Díaz", "Torres", "Gutiérrez", "Ruiz", "Mendoza",
+]
+SILABAS = ["al", "ba", "ce", "do", "fe", "gar", "la", "lo", "man", "mi", "no", "pa", "quin", "ra", "so", "ta", "ve", "za"]
+AFECCIONES = [
+    "Fascitis", "Onicomicosis", "Uña encarnada", "Callosidad", "Verruga plantar",
+    "Espolón calcáneo", "Pie diabético", "Juanete", "Dolor", "Úlcera", "Esguince",
+    "Tendinitis", "Neuroma de Morton", "Pie plano", "Hiperqueratosis", "Ampolla",
+]
+SITIOS = [
+    "plantar", "del talón", "del hallux", "del tobillo", "de la uña", "del antepié",
+    "del tendón de Aquiles", "interdigital", "del quinto dedo", "bilateral",
+]
+NOTAS = [
+    "Paciente refiere dolor al caminar", "Trae estudios de laboratorio", "Pago pendiente",
+    "Llamar para confirmar", "Viene acompañado", "Requiere factura", "Reagendada por el paciente",
+    "Seguimiento de tratamiento", "Primera revisión después de cirugía", "Diabético, revisar glucosa",
+    "Alérgico a la penicilina", "Usa plantillas ortopédicas", "Deportista, corre maratones",
+]
+
+
+def _termino(rnd: random.Random) -> str:
+    return "".join(rnd.choice(SILABAS) for _ in range(rnd.randint(2, 4)))
+
+
+def catalogos(rnd: random.Random):
+    apellidos = APELLIDOS + [_termino(rnd).capitalize() + "ez" for _ in range(2000)]
+    motivos = [
+        f"{rnd.choice(AFECCIONES)} {rnd.choice(SITIOS)}"
+        + (f" por {_termino(rnd)}" if rnd.random() < 0.3 else "")
+        for _ in range(3000)
+    ]
+    notas = [
+        f"{rnd.choice(NOTAS)}. {rnd.choice(NOTAS).lower()}"
+        + (f", ref {_termino(rnd)}" if rnd.random() < 0.5 else "")
+        for _ in range(2000)
+    ]
+    return apellidos, motivos, notas
+
+
+_TABLAS = f"""
+    DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE;
+    CREATE SCHEMA {ESQUEMA};
+    CREATE TABLE {ESQUEMA}.pacientes (
+        id bigint PRIMARY KEY,
+        primer_nombre text NOT NULL,
+        segundo_nombre text,
+        primer_apellido text NOT NULL,
+        segundo_apellido text,
+        activo boolean DEFAULT true,
+        busqueda text GENERATED ALWAYS AS (public.texto_busqueda(
+            primer_nombre || ' ' || COALESCE(segundo_nombre, '') || ' ' ||
+            primer_apellido || ' ' || COALESCE(segundo_apellido, '')
+        )) STORED
+    );
+    CREATE TABLE {ESQUEMA}.podologos (
+        id bigint PRIMARY KEY,
+        nombre_completo text NOT NULL,
+        busqueda text GENERATED ALWAYS AS (public.texto_busqueda(nombre_completo)) STORED
+    );
+    CREATE TABLE {ESQUEMA}.citas (
+        id bigint PRIMARY KEY,
+        id_paciente bigint NOT NULL,
+        id_podologo bigint NOT NULL,
+        fecha_hora_inicio timestamp NOT NULL,
+        fecha_hora_fin timestamp NOT NULL,
+        tipo_cita text DEFAULT 'Consulta',
+        estado text DEFAULT 'Completada',
+        motivo_consulta text,
+        notas_recepcion text,
+        motivo_cancelacion text,
+        es_primera_vez boolean DEFAULT false,
+        recordatorio_24h_enviado boolean DEFAULT true,
+        recordatorio_2h_enviado boolean DEFAULT true,
+        fecha_creacion timestamp,
+        fecha_actualizacion timestamp,
+        busqueda tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('spanish_unaccent'::regconfig, COALESCE(motivo_consulta, '')), 'A')
+            || setweight(to_tsvector('spanish_unaccent'::regconfig, COALESCE(notas_recepcion, '')), 'B')
+        ) STORED
+    );
+"""
+
+_INDICES = [
+    f"CREATE INDEX ON {ESQUEMA}.citas (id_paciente)",
+    f"CREATE INDEX ON {ESQUEMA}.citas (id_podologo, fecha_hora_inicio)",
+    f"CREATE INDEX ON {ESQUEMA}.citas USING GIN (busqueda)",
+    f"CREATE INDEX ON {ESQUEMA}.pacientes USING GIN (busqueda gin_trgm_ops)",
+    f"CREATE INDEX ON {ESQUEMA}.podologos USING GIN (busqueda gin_trgm_ops)",
+]
+
+
+def _al_azar(arreglo: str) -> str:
+    return f"({arreglo})[1 + floor(random() * array_length({arreglo}, 1))::int]"
+
+
+async def generar(conn, n_citas: int, n_pacientes: int, n_podologos: int, rnd: random.Random):
+    apellidos, motivos, notas = catalogos(rnd)
+    inicio = time.perf_counter()
+    await conn.execute(_TABLAS)
+    await conn.execute("SELECT setseed(0.42)")
+    await conn.execute(
+        f"""
+        INSERT INTO {ESQUEMA}.pacientes (id, primer_nombre, segundo_nombre, primer_apellido, segundo_apellido)
+        SELECT i, {_al_azar('$2::text[]')}, CASE WHEN random() < 0.5 THEN {_al_azar('$2::text[]')} END,
+               {_al_azar('$3::text[]')}, {_al_azar('$3::text[]')}
+        FROM generate_series(1, $1) i
+        """,
+        n_pacientes, NOMBRES, apellidos,
+    )
+    await conn.executemany(
+        f"INSERT INTO {ESQUEMA}.podologos (id, nombre_completo) VALUES ($1, $2)",
+        [(i, f"Dr. {rnd.choice(NOMBRES)} {rnd.choice(apellidos)}") for i in range(1, n_podologos + 1)],
+    )
+    await conn.execute(
+        f"""
+        INSERT INTO {ESQUEMA}.citas (
+            id, id_paciente, id_podologo, fecha_hora_inicio, fecha_hora_fin,
+            motivo_consulta, notas_recepcion, fecha_creacion, fecha_actualizacion
+        )
+        SELECT i, 1 + floor(random() * $2)::int, 1 + floor(random() * $3)::int,
+               inicio, inicio + interval '30 minutes',
+               CASE WHEN random() < 0.9 THEN {_al_azar('$4::text[]')} END,
+               CASE WHEN random() < 0.6 THEN {_al_azar('$5::text[]')} END,
+               inicio, inicio
+        FROM (
+            SELECT i, date_trunc('minute', timestamp '2020-01-01' + random() * interval '6 years') AS inicio
+            FROM generate_series(1, $1) i
+        ) s
+        """,
+        n_citas, n_pacientes, n_podologos, motivos, notas,
+    )
+    for indice in _INDICES:
+        await conn.execute(indice)
+    await conn.execute(f"ANALYZE {ESQUEMA}.citas; ANALYZE {ESQUEMA}.pacientes; ANALYZE {ESQUEMA}.podologos")
+    print(f"{n_citas} citas generadas en {time.perf_counter() - inicio:.0f} s")
+
+
+# Búsqueda anterior de citas/service.py
+_ILIKE = f"""
+    SELECT {busqueda.COLUMNAS}
+    FROM citas c
+    JOIN pacientes p ON c.id_paciente = p.id
+    JOIN podologos pod ON c.id_podologo = pod.id
+    WHERE
+        CONCAT(p.primer_nombre, ' ', p.primer_apellido) ILIKE $1 OR
+        pod.nombre_completo ILIKE $1 OR
+        c.notas_recepcion ILIKE $1 OR
+        c.motivo_consulta ILIKE $1
+    ORDER BY c.fecha_hora_inicio DESC
+    LIMIT $2
+"""
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    p = lambda q: tiempos[min(len(tiempos) - 1, int(len(tiempos) * q))]
+    return p(0.5), p(0.95), tiempos[-1]
+
+
+async def consultas(conn, rnd: random.Random):
+    muestra = await conn.fetch(
+        """
+        SELECT c.motivo_consulta, p.primer_apellido, p.segundo_apellido, pod.nombre_completo
+        FROM citas c JOIN pacientes p ON p.id = c.id_paciente JOIN podologos pod ON pod.id = c.id_podologo
+        WHERE c.motivo_consulta IS NOT NULL AND p.segundo_apellido IS NOT NULL
+        LIMIT 200
+        """
+    )
+
+    def palabra(f):
+        return max(f["motivo_consulta"].split(), key=len)
+
+    return {
+        "motivo palabra": lambda f: palabra(f),
+        "motivo prefijo": lambda f: palabra(f)[:4],
+        "motivo 2 palabras": lambda f: " ".join(f["motivo_consulta"].split()[:2]),
+        "apellido común": lambda f: rnd.choice(APELLIDOS),
+        "dos apellidos": lambda f: f"{f['primer_apellido']} {f['segundo_apellido']}",
+        "podólogo": lambda f: f["nombre_completo"].split()[-1],
+    }, muestra
+
+
+async def medir(conn, generadores, muestra, repeticiones, limite):
+    variantes = {
+        "anterior": lambda texto: conn.fetch(_ILIKE, f"%{texto}%", limite),
+        "indexada": lambda texto: busqueda.buscar_citas(texto, limite, conn=conn),
+    }
+    for nombre, generar in generadores.items():
+        for variante, buscar in variantes.items():
+            tiempos = []
+            for r in range(repeticiones):
+                texto = generar(muestra[r % len(muestra)])
+                t0 = time.perf_counter()
+                await buscar(texto)
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            p50, p95, maximo = percentiles(tiempos)
+            print(f"  {nombre:18} {variante:9} p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  máx {maximo:8.1f} ms")
+
+
+async def paginar(conn, texto: str, limite: int, paginas: int):
+    cursor, total = None, 0
+    for pagina in range(1, paginas + 1):
+        t0 = time.perf_counter()
+        citas, cursor = await busqueda.buscar_citas(texto, limite, cursor, conn=conn)
+        total += len(citas)
+        print(f"  '{texto}' página {pagina:2}: {len(citas)} citas en {(time.perf_counter() - t0) * 1000:6.1f} ms")
+        if cursor is None:
+            break
+    return total
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--citas", type=int, default=1_000_000)
+    parser.add_argument("--pacientes", type=int, default=50_000)
+    parser.add_argument("--podologos", type=int, default=8)
+    parser.add_argument("--repeticiones", type=int, default=30)
+    parser.add_argument("--limite", type=int, default=50)
+    parser.add_argument("--explain", action="store_true", help="Mostrar el plan de la búsqueda indexada")
+    parser.add_argument("--limpiar", action="store_true", help="Borrar el esquema de prueba al terminar")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    await db.init_db_pool()
+    conn = await db.get_connection()
+    try:
+        existentes = 0
+        if await conn.fetchval("SELECT to_regclass($1)", f"{ESQUEMA}.citas"):
+            existentes = await conn.fetchval(f"SELECT count(*) FROM {ESQUEMA}.citas")
+        if existentes != args.citas:
+            await generar(conn, args.citas, args.pacientes, args.podologos, rnd)
+
+        await conn.execute(f"SET search_path TO {ESQUEMA}, public")
+        generadores, muestra = await consultas(conn, rnd)
+
+        if args.explain:
+            texto = normalizar(generadores["motivo 2 palabras"](muestra[0]))
+            plan = await conn.fetch(
+                f"EXPLAIN (ANALYZE, COSTS OFF) {busqueda._CONSULTA}",
+                texto, busqueda.consulta_texto(texto), None, None, None, args.limite + 1,
+            )
+            print("\n".join(f["QUERY PLAN"] for f in plan))
+
+        print(f"\nLímite {args.limite}, {args.repeticiones} repeticiones por consulta")
+        await medir(conn, generadores, muestra, args.repeticiones, args.limite)
+
+        print("\nPaginación con cursor")
+        await paginar(conn, generadores["motivo palabra"](muestra[0]), args.limite, 10)
+    finally:
+        await conn.execute("RESET search_path")
+        if args.limpiar:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+        await db.release_connection(conn)
+        await db.close_db_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
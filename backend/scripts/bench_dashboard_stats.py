@@ -0,0 +1,105 @@
+"""
+Benchmark del dashboard de estadísticas
+========================================
+
+Mide p50/p95 de la carga de KPIs del dashboard en cuatro variantes:
+
+- secuencial: las 9 consultas en una sola conexión (comportamiento anterior)
+- concurrente: las 9 consultas en paralelo, una conexión cada una
+- snapshot: lectura de dashboard_kpi_snapshot
+- cache: N pestañas simultáneas sobre el caché con single-flight
+
+Requiere una BD con la migración 21_dashboard_kpi_snapshot.sql aplicada.
+
+Uso:
+    python scripts/bench_dashboard_stats.py --iteraciones 200 --pestanas 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncpg
+
+import db
+from stats import kpi_snapshot
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+
+def _reportar(nombre, tiempos_ms):
+    print(
+        f"{nombre:<12} n={len(tiempos_ms):<5} "
+        f"p50={statistics.median(tiempos_ms):7.2f} ms  "
+        f"p95={_percentil(tiempos_ms, 95):7.2f} ms"
+    )
+
+
+async def _medir(fn, iteraciones):
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        await fn()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+async def _crear_pool(size):
+    return await asyncpg.create_pool(
+        host=db.DB_HOST,
+        port=db.DB_PORT,
+        user=db.DB_USER,
+        password=db.DB_PASSWORD,
+        database=db.DB_NAME,
+        min_size=size,
+        max_size=size,
+    )
+
+
+async def main(iteraciones: int, pestanas: int):
+    # Secuencial: un pool de una sola conexión serializa las consultas
+    db._pool = await _crear_pool(1)
+    _reportar("secuencial", await _medir(kpi_snapshot.calcular_kpis_concurrente, iteraciones))
+    await db._pool.close()
+
+    db._pool = await _crear_pool(20)
+    try:
+        _reportar("concurrente", await _medir(kpi_snapshot.calcular_kpis_concurrente, iteraciones))
+
+        await kpi_snapshot.refrescar_snapshot()
+        _reportar("snapshot", await _medir(kpi_snapshot._leer_snapshot, iteraciones))
+
+        # Pestañas simultáneas: cada ronda invalida el caché y lanza N cargas
+        tiempos = []
+        for _ in range(max(1, iteraciones // pestanas)):
+            kpi_snapshot.invalidar_cache_dashboard()
+
+            async def una_pestana():
+                inicio = time.perf_counter()
+                await kpi_snapshot.obtener_kpis_dashboard()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+
+            await asyncio.gather(*(una_pestana() for _ in range(pestanas)))
+        _reportar("cache", tiempos)
+    finally:
+        await db._pool.close()
+        db._pool = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iteraciones", type=int, default=200)
+    parser.add_argument("--pestanas", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.iteraciones, args.pestanas))
@@ -0,0 +1,118 @@
+"""
+Benchmark de conversión de parámetros nombrados
+===============================================
+
+Compara la conversión ``:param`` -> ``$n`` de DatabaseWrapper:
+
+- anterior: ordenar las llaves con ``query.find`` y ``str.replace`` sobre todo
+  el SQL en cada llamada
+- compilada (fría): ``compilar_query`` sin caché (primera vez de cada query)
+- compilada (LRU): ``_convert_query`` actual, con la query ya compilada
+
+sobre queries reales de catalog/service.py y medical_records/router.py. No
+usa la base de datos.
+
+Uso:
+    python scripts/bench_db_params.py --repeticiones 100000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import DatabaseWrapper, compilar_query
+
+QUERIES = {
+    "1 parámetro": (
+        "SELECT id, nombre, descripcion, precio, duracion_minutos, tipo, categoria, activo "
+        "FROM catalogo_servicios WHERE id = :id",
+        {"id": 1},
+    ),
+    "8 parámetros": (
+        """
+        UPDATE catalogo_servicios
+        SET nombre = :nombre, descripcion = :descripcion, precio = :precio,
+            duracion_minutos = :duracion_minutos, tipo = :tipo, categoria = :categoria, activo = :activo
+        WHERE id = :id
+        RETURNING id, nombre, descripcion, precio, duracion_minutos, tipo, categoria, activo
+        """,
+        {
+            "id": 1, "nombre": "Consulta", "descripcion": "General", "precio": 500,
+            "duracion_minutos": 30, "tipo": "servicio", "categoria": "consulta", "activo": True,
+        },
+    ),
+    "12 parámetros": (
+        """
+        UPDATE estilo_vida_paciente
+        SET tipo_dieta = COALESCE(:tipo_dieta, tipo_dieta),
+            descripcion_dieta = COALESCE(:descripcion_dieta, descripcion_dieta),
+            ejercicio_frecuencia = COALESCE(:ejercicio_frecuencia, ejercicio_frecuencia),
+            tipo_ejercicio = COALESCE(:tipo_ejercicio, tipo_ejercicio),
+            tabaquismo = COALESCE(:tabaquismo, tabaquismo),
+            tabaco_cigarros_dia = COALESCE(:tabaco_cigarros_dia, tabaco_cigarros_dia),
+            tabaco_anios = COALESCE(:tabaco_anios, tabaco_anios),
+            alcoholismo = COALESCE(:alcoholismo, alcoholismo),
+            alcohol_frecuencia = COALESCE(:alcohol_frecuencia, alcohol_frecuencia),
+            drogas = COALESCE(:drogas, drogas),
+            drogas_tipo = COALESCE(:drogas_tipo, drogas_tipo),
+            fecha_actualizacion = NOW()
+        WHERE id_paciente = :patient_id
+        RETURNING *
+        """,
+        {
+            k: None for k in (
+                "tipo_dieta", "descripcion_dieta", "ejercicio_frecuencia", "tipo_ejercicio",
+                "tabaquismo", "tabaco_cigarros_dia", "tabaco_anios", "alcoholismo",
+                "alcohol_frecuencia", "drogas", "drogas_tipo", "patient_id",
+            )
+        },
+    ),
+}
+
+
+def convertir_anterior(query: str, values: dict):
+    """Implementación anterior de DatabaseWrapper._convert_query"""
+    if not values:
+        return query, []
+    param_names = sorted(values.keys(), key=lambda k: query.find(f":{k}"))
+    params = []
+    converted_query = query
+    for i, param_name in enumerate(param_names, 1):
+        converted_query = converted_query.replace(f":{param_name}", f"${i}")
+        params.append(values[param_name])
+    return converted_query, params
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=100000)
+    args = parser.parse_args()
+
+    wrapper = DatabaseWrapper()
+    fria = compilar_query.__wrapped__
+    n = args.repeticiones
+
+    print(f"{'query':<14} {'anterior':>10} {'fría':>10} {'LRU':>10}   (µs por llamada)")
+    for nombre, (query, values) in QUERIES.items():
+        anterior = timeit.timeit(lambda: convertir_anterior(query, values), number=n)
+        compilada = timeit.timeit(lambda: fria(query), number=max(1, n // 10)) * 10
+        lru = timeit.timeit(lambda: wrapper._convert_query(query, values), number=n)
+        print(
+            f"{nombre:<14} {anterior / n * 1e6:>10.2f} {compilada / n * 1e6:>10.2f} "
+            f"{lru / n * 1e6:>10.2f}"
+        )
+
+    # La colisión de prefijos que motivó el cambio
+    query = "SELECT * FROM consultas WHERE id = :id AND id_paciente = :id_paciente"
+    values = {"id_paciente": 9, "id": 5}
+    print("\nanterior:", convertir_anterior(query, values))
+    print("compilada:", wrapper._convert_query(query, values))
+    print(compilar_query.cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark de detección de duplicados
+====================================
+
+Genera ``--entradas`` embeddings sintéticos de 384 dimensiones agrupados en
+temas > intenciones > paráfrasis (las paráfrasis de una misma intención
+tienen similitud ~0.93, intenciones distintas del mismo tema ~0.8) y mide:
+
+- por fila: cada entrada contra todas con un producto matriz-vector (se
+  mide sobre ``--muestra`` filas y se extrapola)
+- por bloques: whatsapp_management/duplicados.py (``pares_similares``, y
+  aparte pares + clusters + canónica como en GET /learning/duplicados)
+- al indexar: ``DetectorDuplicados.revisar`` de un lote de 512 contra la
+  matriz completa
+
+y la precisión/recall de los pares encontrados contra las intenciones
+generadas. No usa la BD.
+
+Uso:
+    python scripts/bench_duplicados.py --entradas 50000
+    python scripts/bench_duplicados.py --entradas 50000 --umbral 0.9 --bloque 4096
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from whatsapp_management import duplicados
+from whatsapp_management.duplicados import DetectorDuplicados, matriz_normalizada, pares_similares
+
+DIMENSIONES = 384
+
+
+def generar(entradas: int, semilla: int = 42):
+    """Matriz normalizada y la intención de cada fila"""
+    rnd = np.random.default_rng(semilla)
+
+    def ruido(n, norma):
+        v = rnd.standard_normal((n, DIMENSIONES)).astype(np.float32)
+        return v / np.linalg.norm(v, axis=1, keepdims=True) * norma
+
+    # 1-8 paráfrasis por intención (la mitad sin duplicados)
+    tamanos = np.where(rnd.random(entradas) < 0.5, 1, rnd.integers(2, 9, entradas))
+    tamanos = tamanos[: np.searchsorted(np.cumsum(tamanos), entradas) + 1]
+    tamanos[-1] -= tamanos.sum() - entradas
+    intenciones = len(tamanos)
+
+    temas = ruido(max(intenciones // 50, 1), 1.0)
+    centros = temas[rnd.integers(0, len(temas), intenciones)] + ruido(intenciones, 0.5)
+    centros /= np.linalg.norm(centros, axis=1, keepdims=True)
+
+    intencion = np.repeat(np.arange(intenciones), tamanos)
+    matriz = matriz_normalizada(centros[intencion] + ruido(entradas, 0.27))
+    orden = rnd.permutation(entradas)
+    return matriz[orden], intencion[orden]
+
+
+def por_fila(matriz: np.ndarray, umbral: float, muestra: int) -> float:
+    """Segundos estimados para comparar cada fila contra las siguientes"""
+    inicio = time.perf_counter()
+    for i in range(muestra):
+        s = matriz[i + 1:] @ matriz[i]
+        np.nonzero(s >= umbral)
+    # El costo por fila es proporcional a las filas restantes
+    n = len(matriz)
+    hechas = sum(n - 1 - i for i in range(muestra))
+    return (time.perf_counter() - inicio) * (n * (n - 1) / 2) / hechas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entradas", type=int, default=50000)
+    parser.add_argument("--umbral", type=float, default=duplicados.DUPLICADOS_UMBRAL)
+    parser.add_argument("--bloque", type=int, default=duplicados.DUPLICADOS_BLOQUE)
+    parser.add_argument("--muestra", type=int, default=2000, help="Filas medidas en el modo por fila")
+    args = parser.parse_args()
+
+    matriz, intencion = generar(args.entradas)
+    print(f"{args.entradas} entradas, {intencion.max() + 1} intenciones, umbral {args.umbral}")
+
+    segundos = por_fila(matriz, args.umbral, min(args.muestra, args.entradas - 1))
+    print(f"por fila:     {segundos:8.2f} s (estimado)")
+
+    inicio = time.perf_counter()
+    i, j, _ = pares_similares(matriz, args.umbral, args.bloque)
+    pares = time.perf_counter() - inicio
+    print(f"por bloques:  {pares:8.2f} s (bloque {args.bloque})")
+
+    filas = [{"id": k, "texto": "", "duplicado_de": None, "uso": (0,)} for k in range(len(matriz))]
+    inicio = time.perf_counter()
+    clusters = duplicados._clusters(filas, matriz, args.umbral, args.bloque)
+    print(
+        f"con clusters: {time.perf_counter() - inicio:8.2f} s "
+        f"-> {len(clusters)} clusters, {sum(c['tamano'] - 1 for c in clusters)} duplicadas"
+    )
+
+    verdaderos = np.bincount(intencion)
+    esperados = int((verdaderos * (verdaderos - 1) // 2).sum())
+    correctos = int((intencion[i] == intencion[j]).sum())
+    precision = correctos / len(i) if len(i) else 1.0
+    print(f"pares:        {len(i)} encontrados, precisión {precision:.3f}, recall {correctos / esperados:.3f}")
+
+    lote = 512
+    detector = DetectorDuplicados(np.arange(len(matriz) - lote), matriz[:-lote], {}, args.umbral)
+    inicio = time.perf_counter()
+    marcadas = detector.revisar(np.arange(len(matriz) - lote, len(matriz)), matriz[-lote:])
+    al_indexar = time.perf_counter() - inicio
+    print(
+        f"al indexar:   {al_indexar * 1000:8.1f} ms por lote de {lote} "
+        f"({sum(m is not None for m in marcadas)} marcadas)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark del envío de emails por SMTP
+======================================
+
+Compara, contra el servidor SMTP de depuración local (tasks/smtp_debug.py),
+con una latencia de red simulada por comando:
+
+- anterior: una conexión nueva (connect + EHLO + envío + QUIT) por email,
+  en secuencia
+- pool: sesiones reutilizadas y envío concurrente con ``enviar_lote``
+
+Uso:
+    python scripts/bench_email_smtp.py --emails 200 --latencia-ms 5
+"""
+
+import argparse
+import asyncio
+import os
+import smtplib
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tasks import smtp_debug
+from tasks.smtp_debug import ServidorSMTPDebug
+from tasks.smtp_pool import SMTPPool, enviar_lote
+from email.message import EmailMessage
+
+
+def _mensajes(n: int):
+    mensajes = []
+    for i in range(n):
+        msg = EmailMessage()
+        msg['From'] = 'noreply@podoskin.com'
+        msg['To'] = f"admin{i}@podoskin.com"
+        msg['Subject'] = 'Resumen de Citas'
+        msg.set_content('<p>resumen</p>' * 50, subtype='html')
+        mensajes.append(msg)
+    return mensajes
+
+
+def _simular_latencia(segundos: float):
+    """Cada respuesta del servidor tarda ``segundos`` (RTT simulado)"""
+    responder = smtp_debug._Sesion._responder
+
+    def con_latencia(self, linea):
+        time.sleep(segundos)
+        responder(self, linea)
+
+    smtp_debug._Sesion._responder = con_latencia
+
+
+def enviar_sin_pool(port: int, mensajes) -> float:
+    inicio = time.perf_counter()
+    for msg in mensajes:
+        with smtplib.SMTP("127.0.0.1", port) as server:
+            server.send_message(msg)
+    return time.perf_counter() - inicio
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de envío SMTP")
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--latencia-ms", type=float, default=5.0)
+    parser.add_argument("--conexiones", type=int, default=4)
+    args = parser.parse_args()
+
+    _simular_latencia(args.latencia_ms / 1000)
+    mensajes = _mensajes(args.emails)
+
+    with ServidorSMTPDebug() as servidor:
+        segundos = enviar_sin_pool(servidor.port, mensajes)
+        print(f"anterior: {segundos:.2f}s  ({args.emails / segundos:.1f} emails/s)")
+
+        pool = SMTPPool("127.0.0.1", servidor.port, starttls=False, max_conexiones=args.conexiones)
+        resultado = await enviar_lote(pool, mensajes)
+        pool.cerrar()
+        print(
+            f"pool:     {resultado.segundos:.2f}s  ({resultado.emails_por_segundo} emails/s, "
+            f"{pool.stats.conexiones_creadas} conexiones, {resultado.fallidos} fallidos)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
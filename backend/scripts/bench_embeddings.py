@@ -0,0 +1,113 @@
+"""
+Benchmark del indexador de embeddings
+=====================================
+
+Inserta ``--filas`` preguntas sin embedding en ``knowledge_base`` y compara:
+
+- por fila: un ``encode`` y un ``UPDATE`` por pregunta (como se calculaban
+  al guardar cada aprendizaje)
+- indexador: whatsapp_management/indexador_embeddings.py (encode por lotes,
+  COPY + UPDATE ... FROM por lote)
+
+reportando filas por segundo. Con ``--vectores-aleatorios`` no carga el
+modelo y mide solo la lectura/escritura en la BD (vectores de 384 floats).
+Las filas de prueba (categoria = 'bench_embeddings') se borran al terminar.
+
+Usar en una BD de pruebas con la migración 31: el indexador también procesa
+las demás filas pendientes de aprendizajes_agente y knowledge_base.
+
+Uso:
+    python scripts/bench_embeddings.py --filas 5000 --lote 512 --batch-size 64
+    python scripts/bench_embeddings.py --filas 20000 --vectores-aleatorios
+"""
+
+import argparse
+import asyncio
+import os
+import pickle
+import random
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from whatsapp_management import indexador_embeddings as modulo
+from whatsapp_management.indexador_embeddings import IndexadorEmbeddings
+
+CATEGORIA = "bench_embeddings"
+TEMAS = [
+    "horario", "precio de la consulta", "estacionamiento", "uña encarnada", "pie diabético",
+    "plantillas", "formas de pago", "factura", "cancelar mi cita", "primera visita",
+]
+
+
+def vectores_aleatorios(textos, batch_size):
+    rnd = random.Random(len(textos))
+    return [[rnd.random() for _ in range(384)] for _ in textos]
+
+
+async def insertar(filas: int) -> None:
+    rnd = random.Random(42)
+    registros = [
+        (f"¿{rnd.choice(TEMAS)} {i}?", f"Respuesta {i}", CATEGORIA, "auto")
+        for i in range(filas)
+    ]
+    conn = await db.get_connection()
+    try:
+        await conn.copy_records_to_table(
+            "knowledge_base", records=registros,
+            columns=["pregunta", "respuesta", "categoria", "origen"],
+        )
+    finally:
+        await db.release_connection(conn)
+
+
+async def por_fila(codificar, modelo: str) -> float:
+    filas = await db.fetch_all(
+        "SELECT id, pregunta FROM knowledge_base WHERE categoria = $1 ORDER BY id", CATEGORIA
+    )
+    inicio = time.perf_counter()
+    for fila in filas:
+        vector = codificar([fila["pregunta"]], 1)[0]
+        await db.execute(
+            "UPDATE knowledge_base SET pregunta_embedding = $1, pregunta_embedding_modelo = $2 WHERE id = $3",
+            pickle.dumps(list(vector)), modelo, fila["id"],
+        )
+    return len(filas) / (time.perf_counter() - inicio)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=5000)
+    parser.add_argument("--lote", type=int, default=modulo.EMBEDDINGS_LOTE)
+    parser.add_argument("--batch-size", type=int, default=modulo.EMBEDDINGS_BATCH_SIZE)
+    parser.add_argument("--vectores-aleatorios", action="store_true", help="No cargar el modelo")
+    args = parser.parse_args()
+
+    codificar = vectores_aleatorios if args.vectores_aleatorios else modulo._codificar_modelo
+    await db.init_db_pool()
+    try:
+        await insertar(args.filas)
+        fps = await por_fila(codificar, "bench")
+        print(f"por fila:   {fps:8.1f} filas/s")
+
+        # Las filas quedaron con otro modelo: el indexador las recalcula todas
+        indexador = IndexadorEmbeddings(codificar)
+        estado = await indexador.ejecutar(
+            tablas=["knowledge_base"], lote=args.lote, batch_size=args.batch_size
+        )
+        progreso = estado["tablas"]["knowledge_base"]
+        print(
+            f"indexador:  {progreso['filas_por_segundo']:8.1f} filas/s "
+            f"({progreso['escritas']} escritas, lote {args.lote}, batch_size {args.batch_size})"
+        )
+        print(f"pendientes: {await indexador.pendientes()}")
+    finally:
+        await db.execute("DELETE FROM knowledge_base WHERE categoria = $1", CATEGORIA)
+        await db.close_db_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
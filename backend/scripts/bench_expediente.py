@@ -0,0 +1,172 @@
+"""
+Benchmark de apertura del expediente médico
+============================================
+
+Mide p50/p95 de abrir el expediente de un paciente durante una consulta en
+curso: mientras se mide, una tarea guarda la exploración física de su
+consulta más reciente cada ``--escritura-ms`` (autoguardado del formulario,
+que invalida la caché) y ``--ruido`` tareas abren expedientes de otros
+pacientes sin pausa.
+
+Variantes:
+
+- secuencial: las 7 consultas por sección con DatabaseWrapper (comportamiento
+  anterior de get_medical_record)
+- una_consulta: medical_records/expediente.cargar_expediente
+- cache: obtener_expediente con el listener de expedientes_cambios activo
+
+Requiere una BD con las migraciones 28 y 29 aplicadas y un paciente con al
+menos una consulta.
+
+Uso:
+    python scripts/bench_expediente.py --paciente 1 --iteraciones 500 --ruido 8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from medical_records import expediente
+
+# Consultas por sección como las tenía get_medical_record
+_SECCIONES = [
+    ("fetch_one", """
+        SELECT p.id, p.primer_nombre || ' ' || COALESCE(p.segundo_nombre || ' ', '') ||
+               p.primer_apellido || COALESCE(' ' || p.segundo_apellido, '') as nombre_completo,
+               p.fecha_nacimiento, p.sexo, p.telefono_principal as telefono, p.email,
+               emr.fecha_ultima_actualizacion
+        FROM pacientes p
+        LEFT JOIN expedientes_medicos_resumen emr ON emr.paciente_id = p.id
+        WHERE p.id = :patient_id AND p.activo = true
+    """),
+    ("fetch_all", """
+        SELECT id, tipo_alergeno as tipo, nombre_alergeno as sustancia, reaccion, severidad, activo
+        FROM alergias WHERE id_paciente = :patient_id AND activo = true
+    """),
+    ("fetch_all", """
+        SELECT id, tipo_categoria as tipo, nombre_enfermedad as enfermedad, parentesco,
+               fecha_inicio, tratamiento_actual, controlado, notas
+        FROM antecedentes_medicos WHERE id_paciente = :patient_id AND activo = true
+    """),
+    ("fetch_one", "SELECT * FROM estilo_vida WHERE id_paciente = :patient_id"),
+    ("fetch_one", "SELECT * FROM historia_ginecologica WHERE id_paciente = :patient_id"),
+    ("fetch_all", """
+        SELECT c.id, c.fecha_consulta, c.motivo_consulta, c.sintomas, c.exploracion_fisica,
+               c.plan_tratamiento, c.indicaciones, c.finalizada, c.fecha_finalizacion,
+               u.nombre_completo as podologo_nombre
+        FROM consultas c
+        LEFT JOIN usuarios u ON u.id = c.id_podologo
+        WHERE c.id_paciente = :patient_id
+        ORDER BY c.fecha_consulta DESC
+        LIMIT 10
+    """),
+    ("fetch_all", """
+        SELECT id, codigo_cie10, nombre_diagnostico, tipo_diagnostico, descripcion,
+               fecha_diagnostico, activo
+        FROM diagnosticos WHERE id_paciente = :patient_id AND activo = true
+        ORDER BY fecha_diagnostico DESC
+    """),
+]
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+
+def _reportar(nombre, tiempos_ms):
+    print(
+        f"{nombre:<13} n={len(tiempos_ms):<5} "
+        f"p50={statistics.median(tiempos_ms):7.2f} ms  "
+        f"p95={_percentil(tiempos_ms, 95):7.2f} ms  "
+        f"máx={max(tiempos_ms):7.2f} ms"
+    )
+
+
+async def secuencial(patient_id: int):
+    for metodo, query in _SECCIONES:
+        await getattr(db.database, metodo)(query, {"patient_id": patient_id})
+
+
+async def _autoguardado(patient_id: int, consulta_id: int, intervalo: float, alto: asyncio.Event):
+    n = 0
+    while not alto.is_set():
+        n += 1
+        await db.execute(
+            "UPDATE consultas SET exploracion_fisica = $2 WHERE id = $1",
+            consulta_id, f"autoguardado {n}",
+        )
+        expediente.invalidar_expediente(patient_id)
+        await asyncio.sleep(intervalo)
+
+
+async def _ruido(fn, otros, alto: asyncio.Event):
+    i = 0
+    while not alto.is_set():
+        await fn(otros[i % len(otros)])
+        i += 1
+        # Un acierto de caché no suspende: ceder el loop a las demás tareas
+        await asyncio.sleep(0)
+
+
+async def _medir(nombre, fn, patient_id, consulta_id, otros, args):
+    alto = asyncio.Event()
+    fondo = [asyncio.create_task(_autoguardado(patient_id, consulta_id, args.escritura_ms / 1000, alto))]
+    fondo += [asyncio.create_task(_ruido(fn, otros, alto)) for _ in range(args.ruido if otros else 0)]
+    tiempos = []
+    try:
+        for _ in range(args.iteraciones):
+            inicio = time.perf_counter()
+            await fn(patient_id)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            await asyncio.sleep(args.pausa_ms / 1000)
+    finally:
+        alto.set()
+        await asyncio.gather(*fondo)
+    _reportar(nombre, tiempos)
+
+
+async def main(args):
+    await db.init_db_pool()
+    try:
+        fila = await db.fetch_one(
+            "SELECT id FROM consultas WHERE id_paciente = $1 ORDER BY fecha_consulta DESC LIMIT 1",
+            args.paciente,
+        )
+        if not fila:
+            sys.exit(f"El paciente {args.paciente} no tiene consultas")
+        otros = [
+            f["id"] for f in await db.fetch_all(
+                "SELECT id FROM pacientes WHERE activo AND id <> $1 ORDER BY id LIMIT 200", args.paciente
+            )
+        ]
+
+        await _medir("secuencial", secuencial, args.paciente, fila["id"], otros, args)
+        await _medir("una_consulta", expediente.cargar_expediente, args.paciente, fila["id"], otros, args)
+
+        await expediente.iniciar()
+        await _medir("cache", expediente.obtener_expediente, args.paciente, fila["id"], otros, args)
+        print(expediente.get_expediente_stats())
+        await expediente.detener()
+    finally:
+        await db.close_db_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paciente", type=int, default=1)
+    parser.add_argument("--iteraciones", type=int, default=500)
+    parser.add_argument("--ruido", type=int, default=8, help="Tareas abriendo otros expedientes")
+    parser.add_argument("--escritura-ms", type=float, default=500, help="Intervalo del autoguardado")
+    parser.add_argument("--pausa-ms", type=float, default=5, help="Pausa entre aperturas medidas")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,79 @@
+"""
+Benchmark del monitor del event loop
+====================================
+
+Mide el costo por paso del loop con el monitor apagado (sin parche) y
+encendido (``Handle._run`` envuelto + vigía + muestreador), ejecutando N
+callbacks triviales con ``call_soon`` y N tasks que hacen ``await sleep(0)``.
+
+Uso:
+    python scripts/bench_loop_monitor.py --pasos 200000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring.loop_monitor import LoopMonitor
+
+
+async def _callbacks(n):
+    loop = asyncio.get_running_loop()
+    hecho = loop.create_future()
+    restantes = [n]
+
+    def paso():
+        restantes[0] -= 1
+        if restantes[0]:
+            loop.call_soon(paso)
+        else:
+            hecho.set_result(None)
+
+    inicio = time.perf_counter()
+    loop.call_soon(paso)
+    await hecho
+    return time.perf_counter() - inicio
+
+
+async def _tasks(n, concurrencia=100):
+    async def trabajador(k):
+        for _ in range(k):
+            await asyncio.sleep(0)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador(n // concurrencia) for _ in range(concurrencia)))
+    return time.perf_counter() - inicio
+
+
+async def _medir(n):
+    return await _callbacks(n), await _tasks(n)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark del monitor del event loop")
+    parser.add_argument("--pasos", type=int, default=200000)
+    args = parser.parse_args()
+
+    apagado = await _medir(args.pasos)
+    monitor = LoopMonitor(log_s=0)
+    monitor.iniciar()
+    try:
+        encendido = await _medir(args.pasos)
+    finally:
+        await monitor.detener()
+
+    print(f"\n{args.pasos} pasos del loop")
+    for nombre, off, on in zip(("call_soon", "await sleep(0)"), apagado, encendido):
+        print(
+            f"  {nombre:15} apagado {off * 1e9 / args.pasos:7.0f} ns/paso   "
+            f"encendido {on * 1e9 / args.pasos:7.0f} ns/paso   (+{(on / off - 1) * 100:.0f}%)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
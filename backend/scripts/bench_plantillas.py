@@ -0,0 +1,117 @@
+"""
+Benchmark del renderizado de plantillas
+=======================================
+
+Resumen diario de N citas (default 500):
+
+- anterior: f-strings con ``html +=`` por fila (sin y con escape HTML)
+- compilando por llamada: ``Environment.from_string`` en cada render
+- plantilla: ``email/resumen_diario.html`` precompilada (``render``)
+- stream: ``render_stream`` con las filas como generador
+- compilación en frío: parseo desde la fuente vs bytecode en caché
+
+Uso:
+    python scripts/bench_plantillas.py --filas 500 --repeticiones 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as hora
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from markupsafe import escape
+
+from plantillas import render, render_stream
+from plantillas import renderer
+
+
+def _citas(n: int):
+    return [
+        {
+            'hora_inicio': hora(8 + i % 10, (i * 7) % 60),
+            'paciente_nombre': f"Paciente {i}",
+            'podologo_nombre': f"Podólogo {i % 5}",
+            'servicio_nombre': None if i % 4 == 0 else "Quiropodia",
+            'estado': 'Confirmada',
+        }
+        for i in range(n)
+    ]
+
+
+def _render_concatenado(fecha, citas, e=str):
+    html = f"""
+    <html><body><h1>Resumen de Citas - {fecha.strftime('%d/%m/%Y')}</h1>
+    <p>Total de citas programadas: <strong>{len(citas)}</strong></p>
+    <table><tbody>
+    """
+    for cita in citas:
+        html += f"""
+            <tr>
+                <td>{cita['hora_inicio'].strftime('%H:%M')}</td>
+                <td>{e(cita['paciente_nombre'])}</td>
+                <td>{e(cita['podologo_nombre'])}</td>
+                <td>{e(cita['servicio_nombre'] or 'N/A')}</td>
+                <td>{e(cita['estado'])}</td>
+            </tr>
+        """
+    html += "</tbody></table></body></html>"
+    return html
+
+
+def _cronometrar(etiqueta, funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+    print(f"{etiqueta:<28} {ms:8.3f} ms")
+
+
+def _compilacion_en_frio(bytecode_dir):
+    inicio = time.perf_counter()
+    env = renderer._crear_env(bytecode_dir)
+    for nombre in env.list_templates():
+        env.get_template(nombre)
+    return (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de plantillas")
+    parser.add_argument("--filas", type=int, default=500)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    fecha = date(2026, 10, 20)
+    citas = _citas(args.filas)
+    contexto = {'fecha': fecha, 'total_citas': len(citas)}
+
+    print(f"Resumen diario de {args.filas} citas ({args.repeticiones} repeticiones)")
+    _cronometrar("anterior (html +=)", lambda: _render_concatenado(fecha, citas), args.repeticiones)
+    _cronometrar("anterior + escape", lambda: _render_concatenado(fecha, citas, escape), args.repeticiones)
+    fuente = renderer.get_env().loader.get_source(renderer.get_env(), 'email/resumen_diario.html')[0]
+    _cronometrar(
+        "compilando por llamada",
+        lambda: renderer.get_env().from_string(fuente).render(contexto, citas=citas),
+        max(1, args.repeticiones // 10),
+    )
+    render('email/resumen_diario.html', contexto, citas=citas)  # compilar
+    _cronometrar("plantilla (render)", lambda: render('email/resumen_diario.html', contexto, citas=citas),
+                 args.repeticiones)
+    _cronometrar(
+        "plantilla (render_stream)",
+        lambda: sum(len(f) for f in render_stream('email/resumen_diario.html', contexto, citas=iter(citas))),
+        args.repeticiones,
+    )
+
+    with tempfile.TemporaryDirectory() as directorio:
+        print(f"{'compilación sin caché':<28} {_compilacion_en_frio(None):8.3f} ms")
+        _compilacion_en_frio(directorio)
+        print(f"{'compilación con bytecode':<28} {_compilacion_en_frio(directorio):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark del pipeline de recordatorios
+=======================================
+
+Mide con N recordatorios sintéticos (default 5.000):
+
+- render: concatenación por cita (anterior) vs plantilla precompilada
+- entrega: un envío tras otro vs ``entregar`` con concurrencia limitada,
+  usando un canal que simula latencia de red
+- inserción (si hay BD): un INSERT por fila vs copy_records_to_table,
+  sobre una tabla temporal con las columnas de ``notificaciones``
+
+Uso:
+    python scripts/bench_recordatorios.py --recordatorios 5000 --latencia-ms 2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncpg
+
+import db
+from tasks.recordatorios import (
+    RECORDATORIO_24H,
+    Recordatorio,
+    contexto_recordatorio,
+    entregar,
+)
+
+
+class CanalLatencia:
+    """Canal que solo duerme ``latencia`` segundos por envío."""
+
+    nombre = 'bench'
+
+    def __init__(self, latencia: float):
+        self.latencia = latencia
+
+    async def enviar(self, recordatorio):
+        await asyncio.sleep(self.latencia)
+
+
+def _citas(n: int):
+    inicio = datetime.now() + timedelta(hours=25)
+    return [
+        {
+            'id_cita': i,
+            'fecha_hora_inicio': inicio + timedelta(minutes=i % 120),
+            'primer_nombre': f"Paciente{i}",
+            'podologo_nombre': "Dra. Pérez",
+            'telefono': f"+52155{i:08d}",
+            'email': f"p{i}@example.com",
+            'nombre_usuario': "podologo1",
+        }
+        for i in range(n)
+    ]
+
+
+def _render_concatenado(cita):
+    """Construcción anterior del mensaje de 24h."""
+    dias_es = {'Monday': 'lunes', 'Tuesday': 'martes', 'Wednesday': 'miércoles',
+               'Thursday': 'jueves', 'Friday': 'viernes', 'Saturday': 'sábado', 'Sunday': 'domingo'}
+    inicio = cita['fecha_hora_inicio']
+    dia_es = dias_es.get(inicio.strftime('%A'), inicio.strftime('%A').lower())
+    mensaje = f"Hola {cita['primer_nombre']}, ¿qué tal? 😊\n\n"
+    mensaje += f"Solo para recordarte que tenemos tu cita programada para mañana {dia_es} "
+    mensaje += f"{inicio.strftime('%d/%m/%Y')} a las {inicio.strftime('%I:%M %p')} "
+    mensaje += f"con {cita['podologo_nombre']}.\n\n"
+    mensaje += "Si necesitas reagendar o tienes alguna duda, solo avísanos. "
+    mensaje += "¡Nos vemos pronto! 🦶✨"
+    return mensaje
+
+
+def _cronometrar(nombre, inicio, n):
+    ms = (time.perf_counter() - inicio) * 1000
+    print(f"{nombre:<28} {ms:9.1f} ms  ({n / (ms / 1000):9.0f} /s)")
+
+
+async def _bench_insercion(recordatorios):
+    try:
+        conn = await asyncpg.connect(
+            host=db.DB_HOST, port=db.DB_PORT, user=db.DB_USER,
+            password=db.DB_PASSWORD, database=db.DB_NAME,
+        )
+    except Exception as e:
+        print(f"inserción: BD no disponible ({e}); se omite")
+        return
+
+    try:
+        await conn.execute("""
+            CREATE TEMP TABLE notificaciones_bench (
+                usuario_id text, tipo text, titulo text, mensaje text,
+                referencia_id bigint, referencia_tipo text,
+                fecha_envio timestamptz, leido boolean
+            )
+        """)
+        ahora = datetime.now(timezone.utc)
+        filas = [
+            ('podologo1', r.tipo, r.titulo, r.mensaje, r.id_cita, 'cita', ahora, False)
+            for r in recordatorios
+        ]
+
+        inicio = time.perf_counter()
+        async with conn.transaction():
+            for fila in filas:
+                await conn.execute(
+                    "INSERT INTO notificaciones_bench VALUES ($1, $2, $3, $4, $5, $6, $7, $8)", *fila
+                )
+        _cronometrar("inserción fila por fila", inicio, len(filas))
+
+        await conn.execute("TRUNCATE notificaciones_bench")
+        inicio = time.perf_counter()
+        await conn.copy_records_to_table('notificaciones_bench', records=filas)
+        _cronometrar("inserción copy", inicio, len(filas))
+    finally:
+        await conn.close()
+
+
+async def main(n: int, latencia_ms: float, concurrencia: int):
+    citas = _citas(n)
+    ahora = datetime.now()
+
+    inicio = time.perf_counter()
+    for c in citas:
+        _render_concatenado(c)
+    _cronometrar("render concatenado", inicio, n)
+
+    inicio = time.perf_counter()
+    recordatorios = [
+        Recordatorio(
+            id_cita=c['id_cita'],
+            tipo=RECORDATORIO_24H.tipo,
+            titulo=RECORDATORIO_24H.titulo,
+            mensaje=RECORDATORIO_24H.plantilla.render(contexto_recordatorio(c, ahora)),
+            telefono=c['telefono'],
+            email=c['email'],
+        )
+        for c in citas
+    ]
+    _cronometrar("render plantilla", inicio, n)
+
+    canal = CanalLatencia(latencia_ms / 1000)
+    inicio = time.perf_counter()
+    for r in recordatorios:
+        await canal.enviar(r)
+    _cronometrar("entrega secuencial", inicio, n)
+
+    inicio = time.perf_counter()
+    resultados = await entregar(canal, recordatorios, concurrencia)
+    _cronometrar(f"entrega concurrente ({concurrencia})", inicio, n)
+    assert all(estado == 'enviado' for _, estado, _ in resultados)
+
+    await _bench_insercion(recordatorios)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recordatorios", type=int, default=5000)
+    parser.add_argument("--latencia-ms", type=float, default=2.0)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.recordatorios, args.latencia_ms, args.concurrencia))
@@ -0,0 +1,132 @@
+"""
+Benchmark de renderizado de reportes
+====================================
+
+Lanza N solicitudes concurrentes de PDF del reporte de gastos mientras un
+cliente "dashboard" hace peticiones ligeras cada 10 ms, y compara:
+
+1. Antes: ``generar_pdf_gastos`` dentro de la corrutina (bloquea el loop).
+2. Pool: renderizado en el pool de procesos, cada solicitud con un periodo
+   distinto (sin aciertos de caché).
+3. Caché: todas las solicitudes del mismo periodo y datos (un solo
+   renderizado, el resto lo reutiliza).
+
+Informa el tiempo total de los reportes y la latencia p50/p99/máx del
+dashboard. No usa la base de datos: el reporte es sintético.
+
+Uso:
+    python scripts/bench_reportes.py --solicitudes 8 --categorias 12
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportes import render
+from reportes.pdf_generator import generar_pdf_gastos
+
+
+def reporte_sintetico(categorias: int) -> dict:
+    return {
+        'periodo': 'Marzo 2026',
+        'fecha_inicio': '2026-03-01',
+        'fecha_fin': '2026-03-31',
+        'total_gastos': 125000.0,
+        'total_gastos_mes_anterior': 98000.0,
+        'variacion_porcentual': 27.55,
+        'gastos_por_categoria': [
+            {
+                'categoria': f'CATEGORIA_{i}', 'total': 1000.0 * (i + 1), 'cantidad': i + 3,
+                'porcentaje': 100 / categorias, 'variacion_mes_anterior': 5.0 * i,
+            }
+            for i in range(categorias)
+        ],
+        'top_10_gastos': [
+            {
+                'concepto': f'Compra de material {i}', 'monto': 5000.0 - i * 100,
+                'fecha': '2026-03-10', 'metodo_pago': 'transferencia', 'categoria': 'INSUMOS',
+            }
+            for i in range(10)
+        ],
+        'tendencia_6_meses': [
+            {'periodo': f'2025-{m:02d}', 'total': 90000.0 + m * 1500} for m in range(7, 13)
+        ],
+        'productos_comprados': [
+            {
+                'producto': f'Producto {i}', 'cantidad': 10.0, 'precio_unitario': 35.5,
+                'subtotal': 355.0, 'concepto_gasto': 'Reposición', 'fecha': '2026-03-05',
+            }
+            for i in range(20)
+        ],
+    }
+
+
+async def _dashboard(latencias, detener):
+    """Petición ligera cada 10 ms: mide cuánto espera hasta ser atendida"""
+    loop = asyncio.get_running_loop()
+    while not detener.is_set():
+        llegada = loop.time() + 0.01
+        await asyncio.sleep(0.01)
+        latencias.append(max(0.0, loop.time() - llegada) * 1000)
+
+
+async def _escenario(solicitudes, solicitud):
+    latencias, detener = [], asyncio.Event()
+    tarea = asyncio.create_task(_dashboard(latencias, detener))
+    await asyncio.sleep(0.05)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(solicitud(i) for i in range(solicitudes)))
+    total = time.perf_counter() - inicio
+
+    detener.set()
+    await tarea
+    latencias.sort()
+    p = lambda q: latencias[min(len(latencias) - 1, int(len(latencias) * q))]
+    return total, p(0.5), p(0.99), latencias[-1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de renderizado de reportes")
+    parser.add_argument("--solicitudes", type=int, default=8)
+    parser.add_argument("--categorias", type=int, default=12)
+    args = parser.parse_args()
+
+    reporte = reporte_sintetico(args.categorias)
+
+    async def inline(i):
+        await asyncio.sleep(0)
+        generar_pdf_gastos(reporte).getvalue()
+
+    async def pool(i):
+        await render.renderizar("gastos", "pdf", f"bench-{i}", reporte)
+
+    async def cache(i):
+        await render.renderizar("gastos", "pdf", "bench-cache", reporte)
+
+    # Calentar: importar matplotlib/reportlab en el proceso y en los workers
+    generar_pdf_gastos(reporte)
+    await asyncio.gather(*(render.renderizar("gastos", "pdf", f"warm-{i}", reporte)
+                           for i in range(render.REPORTES_RENDER_WORKERS)))
+    render.artefactos.clear()
+
+    print(f"\n{args.solicitudes} PDFs concurrentes ({args.categorias} categorías), "
+          f"{render.REPORTES_RENDER_WORKERS} workers")
+    try:
+        for nombre, solicitud in (("en el loop", inline), ("pool", pool), ("pool + caché", cache)):
+            total, p50, p99, maximo = await _escenario(args.solicitudes, solicitud)
+            print(
+                f"  {nombre:14} reportes {total * 1000:8.1f} ms   "
+                f"dashboard p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  máx {maximo:7.2f} ms"
+            )
+    finally:
+        render.shutdown_render_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,198 @@
+"""
+Benchmark de resúmenes de conversaciones
+========================================
+
+Crea ``--conversaciones`` conversaciones inactivas (``--mensajes`` mensajes
+cada una) y mide el tiempo que ya no paga el agente por mensaje:
+
+- guardar resumen: antes ``encode`` + ``INSERT ... ON CONFLICT`` en el
+  camino del agente; ahora ``encolar_resumen`` (en memoria)
+- última consulta: antes un ``UPDATE`` por conversación encontrada (hasta
+  3); ahora ``registrar_consulta`` y un ``UPDATE`` por ciclo
+- pipeline: whatsapp_management/resumenes_conversaciones.py resumiendo
+  todas las conversaciones inactivas (filas por segundo, ms por lote)
+
+Con ``--vectores-aleatorios`` no carga el modelo (vectores de 384 floats).
+Los datos de prueba (contactos con nombre 'bench_resumenes') se borran al
+terminar. Usar en una BD de pruebas con la migración 33: el pipeline también
+resume las demás conversaciones inactivas.
+
+Uso:
+    python scripts/bench_resumenes_conversaciones.py --conversaciones 2000 --mensajes 12
+    python scripts/bench_resumenes_conversaciones.py --conversaciones 5000 --vectores-aleatorios
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import random
+import sys
+import time
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from whatsapp_management import indexador_embeddings
+from whatsapp_management.resumenes_conversaciones import ResumenesConversaciones
+
+NOMBRE = "bench_resumenes"
+
+
+def vectores_aleatorios(textos, batch_size):
+    rnd = random.Random(len(textos))
+    return [[rnd.random() for _ in range(384)] for _ in textos]
+
+
+async def insertar(conversaciones: int, mensajes: int) -> list:
+    """Conversaciones con la última actividad hace dos horas"""
+    await db.execute(
+        """
+        INSERT INTO contactos (nombre, whatsapp_id, origen)
+        SELECT $1, 'bench-' || g, 'WhatsApp' FROM generate_series(1, $2) g
+        """,
+        NOMBRE, max(conversaciones // 5, 1),
+    )
+    await db.execute(
+        """
+        INSERT INTO conversaciones (id_contacto, canal, estado, categoria, fecha_inicio, fecha_ultima_actividad)
+        SELECT (SELECT array_agg(id) FROM contactos WHERE nombre = $1)[1 + g % GREATEST($2 / 5, 1)],
+               'whatsapp', 'Activa', 'Agendar_Cita',
+               NOW() - interval '3 hours', NOW() - interval '2 hours'
+        FROM generate_series(1, $2) g
+        """,
+        NOMBRE, conversaciones,
+    )
+    await db.execute(
+        """
+        INSERT INTO mensajes (id_conversacion, direccion, enviado_por_tipo, contenido, fecha_envio)
+        SELECT c.id,
+               CASE WHEN n % 2 = 1 THEN 'Entrante' ELSE 'Saliente' END,
+               CASE WHEN n % 2 = 1 THEN 'Contacto' ELSE 'Bot' END,
+               CASE WHEN n % 2 = 1
+                    THEN 'Hola, quisiera una cita para revisar mi uña encarnada, mensaje ' || n
+                    ELSE 'Con gusto, tenemos disponibilidad el martes a las 10:00, mensaje ' || n END,
+               NOW() - interval '3 hours' + n * interval '1 minute'
+        FROM conversaciones c
+        JOIN contactos k ON k.id = c.id_contacto AND k.nombre = $1
+        CROSS JOIN generate_series(1, $2) n
+        """,
+        NOMBRE, mensajes,
+    )
+    filas = await db.fetch_all(
+        """
+        SELECT c.id, c.id_contacto FROM conversaciones c
+        JOIN contactos k ON k.id = c.id_contacto AND k.nombre = $1
+        ORDER BY c.id
+        """,
+        NOMBRE,
+    )
+    return [(f["id_contacto"], f["id"]) for f in filas]
+
+
+async def guardar_antes(codificar, id_contacto: int, id_conversacion: int) -> None:
+    """Lo que hacía guardar_resumen_conversacion dentro del agente"""
+    resumen = "El paciente pidió cita para revisar una uña encarnada; se agendó el martes."
+    vector = codificar([resumen], 1)[0]
+    await db.execute(
+        """
+        INSERT INTO conversaciones_embeddings
+        (id_contacto, id_conversacion, resumen_conversacion, embedding, metadata)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (id_conversacion)
+        DO UPDATE SET
+            resumen_conversacion = EXCLUDED.resumen_conversacion,
+            embedding = EXCLUDED.embedding,
+            metadata = EXCLUDED.metadata
+        """,
+        id_contacto, id_conversacion, resumen, pickle.dumps(list(vector)), json.dumps({"tipo_consulta": "agendar_cita"}),
+    )
+
+
+async def consultas_antes(ids) -> None:
+    """Lo que hacía buscar_conversaciones_previas por cada resultado"""
+    for id_conversacion in ids:
+        await db.execute(
+            "UPDATE conversaciones_embeddings SET fecha_ultima_consulta = NOW() WHERE id_conversacion = $1",
+            id_conversacion,
+        )
+
+
+def ms(inicio: float, n: int) -> float:
+    return (time.perf_counter() - inicio) * 1000 / max(n, 1)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversaciones", type=int, default=2000)
+    parser.add_argument("--mensajes", type=int, default=12)
+    parser.add_argument("--muestra", type=int, default=200, help="Mensajes medidos en el camino del agente")
+    parser.add_argument("--lote", type=int, default=64)
+    parser.add_argument("--vectores-aleatorios", action="store_true", help="No cargar el modelo")
+    args = parser.parse_args()
+
+    codificar = vectores_aleatorios if args.vectores_aleatorios else indexador_embeddings._codificar_modelo
+    await db.init_db_pool()
+    try:
+        conversaciones = await insertar(args.conversaciones, args.mensajes)
+        muestra = conversaciones[: args.muestra]
+        codificar(["calentamiento"], 1)
+
+        # Pipeline (resume todas las inactivas)
+        pipeline = ResumenesConversaciones(codificar, lote=args.lote)
+        inicio = time.perf_counter()
+        resultado = await pipeline.procesar()
+        segundos = time.perf_counter() - inicio
+        print(
+            f"pipeline:          {resultado['inactivas'] / segundos:8.1f} conversaciones/s "
+            f"({resultado['inactivas']} en {segundos:.2f} s, {pipeline.estado['ms_por_lote']} ms/lote de {args.lote})"
+        )
+
+        # Camino del agente: guardar resumen
+        inicio = time.perf_counter()
+        for id_contacto, id_conversacion in muestra:
+            await guardar_antes(codificar, id_contacto, id_conversacion)
+        antes = ms(inicio, len(muestra))
+        inicio = time.perf_counter()
+        for id_contacto, id_conversacion in muestra:
+            pipeline.encolar_resumen(id_contacto, id_conversacion, "Resumen del agente", {})
+        ahora = ms(inicio, len(muestra))
+        print(f"guardar resumen:   antes {antes:8.3f} ms/mensaje, ahora {ahora:8.4f} ms/mensaje")
+
+        # Camino del agente: última consulta de los 3 mejores resultados
+        grupos = [[c for _, c in muestra[i:i + 3]] for i in range(0, len(muestra), 3)]
+        inicio = time.perf_counter()
+        for ids in grupos:
+            await consultas_antes(ids)
+        antes = ms(inicio, len(grupos))
+        inicio = time.perf_counter()
+        for ids in grupos:
+            pipeline.registrar_consulta(ids)
+        ahora = ms(inicio, len(grupos))
+        print(f"última consulta:   antes {antes:8.3f} ms/mensaje, ahora {ahora:8.4f} ms/mensaje")
+
+        inicio = time.perf_counter()
+        resultado = await pipeline.procesar()
+        print(
+            f"ciclo siguiente:   {(time.perf_counter() - inicio) * 1000:8.1f} ms "
+            f"({resultado['encolados']} resúmenes del agente, {resultado['inactivas']} inactivas, "
+            f"{resultado['consultas']} consultas en un UPDATE)"
+        )
+    finally:
+        await db.execute(
+            """
+            DELETE FROM conversaciones_embeddings WHERE id_contacto IN (SELECT id FROM contactos WHERE nombre = $1)
+            """,
+            NOMBRE,
+        )
+        await db.execute(
+            "DELETE FROM conversaciones WHERE id_contacto IN (SELECT id FROM contactos WHERE nombre = $1)", NOMBRE
+        )
+        await db.execute("DELETE FROM contactos WHERE nombre = $1", NOMBRE)
+        await db.close_db_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,205 @@
+"""
+Prueba de carga de notificaciones WebSocket
+===========================================
+
+Levanta uvicorn en proceso con el router de ws_notifications (fan-out
+PostgreSQL + contadores en caché) y conecta N sockets reales (default 500):
+
+1. Conexión simultánea: latencia hasta recibir el contador inicial.
+2. ``get_count`` repetido desde todos los sockets.
+3. Una notificación nueva por usuario (un solo INSERT; llegan por NOTIFY).
+4. ``mark_read`` de esa notificación desde todos los sockets.
+
+En cada fase informa cuántas conexiones del pool se tomaron y cuántas
+consultas de contador se hicieron. Antes había una consulta COUNT(*) por
+conexión, por ``get_count``, por ``mark_read`` y por broadcast, y una
+conexión del pool por cada mensaje recibido.
+
+Usa DB_* de db.py. Crea usuarios ``carga_ws_*`` y borra sus notificaciones
+al terminar.
+
+Uso:
+    python scripts/bench_ws_notificaciones.py --sockets 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+import websockets
+from fastapi import FastAPI
+
+import db
+from auth.jwt_handler import create_access_token
+from ws_notifications.fanout import fanout
+from ws_notifications.notifications_ws import router
+
+PREFIJO = "carga_ws_"
+adquisiciones = 0
+
+
+def _contar_adquisiciones():
+    """Cuenta las conexiones tomadas del pool (solo para el reporte)"""
+    original = db.get_connection
+
+    async def get_connection():
+        global adquisiciones
+        adquisiciones += 1
+        return await original()
+
+    db.get_connection = get_connection
+    import ws_notifications.notifications_ws as ws_mod
+    ws_mod.get_connection = get_connection
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await db.init_db_pool()
+    await fanout.iniciar()
+    yield
+    await fanout.detener()
+    await db.close_db_pool()
+
+
+def _percentiles(etiqueta, valores_ms):
+    valores_ms = sorted(valores_ms)
+    p95 = valores_ms[int(len(valores_ms) * 0.95) - 1]
+    print(
+        f"  {etiqueta:<34} p50 {statistics.median(valores_ms):7.1f} ms   "
+        f"p95 {p95:7.1f} ms   max {valores_ms[-1]:7.1f} ms"
+    )
+
+
+async def _esperar(ws, tipo):
+    while True:
+        mensaje = json.loads(await ws.recv())
+        if mensaje["type"] == tipo:
+            return mensaje
+
+
+def _fase(nombre, antes):
+    consultas = fanout.contadores.consultas
+    print(
+        f"{nombre}: {adquisiciones - antes[0]} conexiones del pool, "
+        f"{consultas - antes[1]} consultas de contador"
+    )
+    return adquisiciones, consultas
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de WebSocket")
+    parser.add_argument("--sockets", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--get-count", type=int, default=5)
+    args = parser.parse_args()
+
+    _contar_adquisiciones()
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router)
+    server = uvicorn.Server(uvicorn.Config(app, port=args.port, log_level="warning", ws="websockets"))
+    servidor = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    usuarios = [f"{PREFIJO}{i}" for i in range(args.sockets)]
+    conn = await db.get_connection()
+    await conn.execute(
+        """
+        INSERT INTO notificaciones (usuario_id, tipo, titulo, mensaje)
+        SELECT u, 'info', 'carga', 'pendiente' FROM unnest($1::text[]) u, generate_series(1, 3)
+        """,
+        usuarios,
+    )
+    await db.release_connection(conn)
+    await asyncio.sleep(0.5)  # NOTIFYs del seed (sin sockets aún)
+
+    url = f"ws://127.0.0.1:{args.port}/ws/notifications?token="
+    sockets = []
+    try:
+        # 1. Conexión simultánea
+        marca = (adquisiciones, fanout.contadores.consultas)
+
+        async def conectar(usuario):
+            inicio = time.perf_counter()
+            ws = await websockets.connect(url + create_access_token({"sub": usuario}), max_queue=None)
+            conteo = await _esperar(ws, "count")
+            assert conteo["count"] == 3, conteo
+            return ws, (time.perf_counter() - inicio) * 1000
+
+        resultados = await asyncio.gather(*(conectar(u) for u in usuarios))
+        sockets = [ws for ws, _ in resultados]
+        print(f"\n{args.sockets} sockets")
+        _percentiles("conexión -> contador inicial", [ms for _, ms in resultados])
+        marca = _fase("  fase conexión", marca)
+
+        # 2. get_count
+        async def pedir_contador(ws):
+            tiempos = []
+            for _ in range(args.get_count):
+                inicio = time.perf_counter()
+                await ws.send(json.dumps({"action": "get_count"}))
+                await _esperar(ws, "count")
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            return tiempos
+
+        tiempos = await asyncio.gather(*(pedir_contador(ws) for ws in sockets))
+        _percentiles(f"get_count x{args.get_count}", [t for ts in tiempos for t in ts])
+        marca = _fase("  fase get_count", marca)
+
+        # 3. Notificación nueva por usuario
+        inicio = time.perf_counter()
+        conn = await db.get_connection()
+        await conn.execute(
+            """
+            INSERT INTO notificaciones (usuario_id, tipo, titulo, mensaje)
+            SELECT u, 'info', 'carga', 'nueva' FROM unnest($1::text[]) u
+            """,
+            usuarios,
+        )
+        await db.release_connection(conn)
+        marca = (marca[0] + 1, marca[1])  # El INSERT de la prueba no cuenta
+
+        async def recibir(ws):
+            notificacion = await _esperar(ws, "notification")
+            conteo = await _esperar(ws, "count")
+            assert conteo["count"] == 4, conteo
+            return notificacion["data"]["id"], (time.perf_counter() - inicio) * 1000
+
+        recibidos = await asyncio.gather(*(recibir(ws) for ws in sockets))
+        _percentiles("INSERT -> notificación + contador", [ms for _, ms in recibidos])
+        marca = _fase("  fase broadcast", marca)
+
+        # 4. mark_read
+        async def marcar(ws, notification_id):
+            inicio_marca = time.perf_counter()
+            await ws.send(json.dumps({"action": "mark_read", "notification_id": notification_id}))
+            respuesta = await _esperar(ws, "mark_read_success")
+            assert respuesta["count"] == 3, respuesta
+            return (time.perf_counter() - inicio_marca) * 1000
+
+        tiempos = await asyncio.gather(*(marcar(ws, nid) for ws, (nid, _) in zip(sockets, recibidos)))
+        _percentiles("mark_read", tiempos)
+        await asyncio.sleep(0.3)
+        _fase("  fase mark_read", marca)
+        print(f"  contadores: {fanout.contadores.get_stats()}")
+
+    finally:
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+        conn = await db.get_connection()
+        await conn.execute("DELETE FROM notificaciones WHERE usuario_id LIKE $1", PREFIJO + "%")
+        await db.release_connection(conn)
+        server.should_exit = True
+        await servidor
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
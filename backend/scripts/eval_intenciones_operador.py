@@ -0,0 +1,153 @@
+"""
+Evaluación del clasificador de intenciones del operador
+=======================================================
+
+Evaluación offline del clasificador en dos etapas de
+agents/sub_agent_operator (nodes/classify_intent.py): validación cruzada
+estratificada sobre los ejemplos etiquetados de
+``agents/sub_agent_operator/data/intent_examples.jsonl``. Cada mensaje se
+clasifica con un modelo entrenado sin él y, para cada umbral, reporta:
+
+- llamadas al LLM: porcentaje de mensajes con confianza local bajo el umbral
+- exactitud local: aciertos entre los mensajes que resuelve el modelo local
+- exactitud total: local + LLM. Sin ``--llm`` se supone que el LLM acierta
+  siempre (cota superior); con ``--llm`` se consulta de verdad a Claude
+  (requiere ANTHROPIC_API_KEY) para los mensajes bajo el umbral mayor
+
+También mide la latencia del modelo local por mensaje. Con ``--errores``
+lista los mensajes que el modelo local acepta con la intención equivocada:
+son los primeros candidatos a nuevos ejemplos.
+
+Uso:
+    python scripts/eval_intenciones_operador.py
+    python scripts/eval_intenciones_operador.py --umbrales 0.5 0.6 0.7 0.8 --errores
+    python scripts/eval_intenciones_operador.py --llm
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.sub_agent_operator.config import config
+from agents.sub_agent_operator.utils.local_classifier import (
+    EXAMPLES_PATH,
+    LocalIntentClassifier,
+    load_examples,
+)
+
+
+def validacion_cruzada(examples, folds: int, repeticiones: int):
+    """(texto, esperado, predicho, confianza) de cada ejemplo y repetición."""
+    textos = np.array([t for t, _ in examples], dtype=object)
+    intents = np.array([i for _, i in examples])
+    resultados = []
+    for semilla in range(repeticiones):
+        kfold = StratifiedKFold(n_splits=folds, shuffle=True, random_state=semilla)
+        for train, test in kfold.split(textos, intents):
+            classifier = LocalIntentClassifier(list(zip(textos[train], intents[train])))
+            for texto, esperado, (intent, confianza) in zip(
+                textos[test], intents[test], classifier.predict_many(textos[test])
+            ):
+                resultados.append((texto, esperado, intent, confianza))
+    return resultados
+
+
+async def clasificar_llm(textos) -> dict:
+    """Intención que devuelve Claude para cada texto (None si falla)."""
+    from agents.sub_agent_operator.config import SYSTEM_PROMPT_CLASSIFIER
+    from agents.sub_agent_operator.nodes.classify_intent import llm_classifier
+
+    respuestas = {}
+    for texto in textos:
+        try:
+            response = await llm_classifier.ainvoke([
+                {"role": "system", "content": SYSTEM_PROMPT_CLASSIFIER},
+                {"role": "user", "content": texto},
+            ])
+            respuestas[texto] = json.loads(response.content).get("intent")
+        except Exception as e:
+            print(f"  LLM falló con {texto!r}: {e}")
+            respuestas[texto] = None
+    return respuestas
+
+
+def latencia_ms(examples, mensajes: int) -> float:
+    classifier = LocalIntentClassifier(examples)
+    textos = [t for t, _ in examples]
+    classifier.predict(textos[0])
+    inicio = time.perf_counter()
+    for i in range(mensajes):
+        classifier.predict(textos[i % len(textos)])
+    return (time.perf_counter() - inicio) * 1000 / mensajes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ejemplos", default=str(EXAMPLES_PATH))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--repeticiones", type=int, default=3, help="Validaciones cruzadas con distinta partición")
+    parser.add_argument(
+        "--umbrales", type=float, nargs="+",
+        default=sorted({0.5, 0.6, 0.7, 0.8, 0.9, config.local_classifier_threshold}),
+    )
+    parser.add_argument("--llm", action="store_true", help="Consultar a Claude bajo el umbral (una repetición)")
+    parser.add_argument("--errores", action="store_true", help="Listar los errores aceptados por el modelo local")
+    args = parser.parse_args()
+
+    examples = load_examples(args.ejemplos)
+    if args.llm:
+        args.repeticiones = 1
+    print(
+        f"{len(examples)} ejemplos, {len(set(i for _, i in examples))} intenciones, "
+        f"{args.folds} folds x {args.repeticiones}"
+    )
+
+    resultados = validacion_cruzada(examples, args.folds, args.repeticiones)
+    aciertos = np.array([esperado == intent for _, esperado, intent, _ in resultados])
+    confianzas = np.array([confianza for *_, confianza in resultados])
+    print(f"exactitud del modelo local (sin umbral): {aciertos.mean():.1%}")
+    print(f"latencia local: {latencia_ms(examples, 500):.2f} ms/mensaje")
+
+    respuestas_llm = {}
+    if args.llm:
+        dudosos = {texto for texto, *_, confianza in resultados if confianza < max(args.umbrales)}
+        print(f"consultando al LLM {len(dudosos)} mensajes...")
+        respuestas_llm = asyncio.run(clasificar_llm(sorted(dudosos)))
+
+    print()
+    print(f"{'umbral':>7} {'llamadas LLM':>13} {'exactitud local':>16} {'exactitud total':>16}")
+    for umbral in args.umbrales:
+        local = confianzas >= umbral
+        if args.llm:
+            llm = [respuestas_llm.get(texto) == esperado for texto, esperado, _, c in resultados if c < umbral]
+            total = (aciertos[local].sum() + sum(llm)) / len(resultados)
+        else:
+            total = (aciertos[local].sum() + (~local).sum()) / len(resultados)
+        exactitud_local = f"{aciertos[local].mean():.1%}" if local.any() else "-"
+        marca = " <- config" if umbral == config.local_classifier_threshold else ""
+        print(f"{umbral:>7.2f} {1 - local.mean():>13.1%} {exactitud_local:>16} {total:>16.1%}{marca}")
+
+    if args.errores:
+        umbral = config.local_classifier_threshold
+        errores = Counter(
+            (texto, esperado, intent)
+            for texto, esperado, intent, confianza in resultados
+            if confianza >= umbral and esperado != intent
+        )
+        print(f"\nerrores aceptados con umbral {umbral}:")
+        for (texto, esperado, intent), veces in errores.most_common():
+            print(f"  {texto!r}: {esperado} -> {intent} (x{veces})")
+
+
+if __name__ == "__main__":
+    main()
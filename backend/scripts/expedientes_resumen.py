@@ -0,0 +1,57 @@
+"""
+Mantenimiento del resumen de expedientes
+========================================
+
+Backfill por lotes y verificación de ``expedientes_medicos_resumen`` contra
+el cálculo completo (ver medical_records/resumen.py).
+
+Uso:
+    python scripts/expedientes_resumen.py backfill --lote 1000 --pausa 0.05
+    python scripts/expedientes_resumen.py verificar [--reparar]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import close_db_pool, init_db_pool
+from medical_records.resumen import (
+    EXPEDIENTES_RESUMEN_LOTE,
+    backfill_resumen,
+    verificar_resumen,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento del resumen de expedientes")
+    parser.add_argument("accion", choices=["backfill", "verificar"])
+    parser.add_argument("--lote", type=int, default=EXPEDIENTES_RESUMEN_LOTE)
+    parser.add_argument("--pausa", type=float, default=0.0, help="Segundos entre lotes (backfill)")
+    parser.add_argument("--reparar", action="store_true", help="Recalcular las diferencias (verificar)")
+    args = parser.parse_args()
+
+    await init_db_pool()
+    try:
+        if args.accion == "backfill":
+            total = await backfill_resumen(lote=args.lote, pausa=args.pausa)
+            logger.info(f"✅ Resumen recalculado para {total} pacientes")
+        else:
+            resultado = await verificar_resumen(lote=args.lote, reparar=args.reparar)
+            print(json.dumps(resultado, indent=2, ensure_ascii=False))
+            if resultado["diferencias"] and not args.reparar:
+                sys.exit(1)
+    finally:
+        await close_db_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
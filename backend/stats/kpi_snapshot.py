@@ -0,0 +1,244 @@
+"""
+KPI Snapshot - Dashboard pre-agregado
+=====================================
+Fuente de datos de /api/stats/dashboard en tres niveles:
+
+1. Caché en proceso con TTL corto y single-flight (cache.read_cache): las
+   pestañas que consultan el dashboard al mismo tiempo comparten un cálculo.
+2. Snapshot en BD (``dashboard_kpi_snapshot``), refrescado por Celery beat
+   a partir de contadores diarios mantenidos por triggers
+   (ver data/migrations/21_dashboard_kpi_snapshot.sql).
+3. Fallback: si el snapshot está viejo o no existe, las consultas
+   independientes se ejecutan en paralelo, cada una en su propia conexión.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from cache import read_cache
+from db import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+KPI_CACHE_TTL_SECONDS = float(os.getenv("KPI_CACHE_TTL_SECONDS", "15"))
+KPI_SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("KPI_SNAPSHOT_MAX_AGE_SECONDS", "120"))
+
+_CACHE_KEY = ("stats.dashboard_kpis",)
+_CACHE_TAGS = ("citas", "pacientes")
+
+
+async def obtener_kpis_dashboard() -> Dict[str, Any]:
+    """
+    Retorna los KPIs del dashboard.
+
+    Las llamadas concurrentes con el caché vencido esperan al mismo cálculo
+    en lugar de lanzar uno cada una.
+
+    Returns:
+        Diccionario con el mismo formato que ``dashboard_kpi_snapshot.payload``
+    """
+    return await read_cache.get_or_compute(
+        _CACHE_KEY,
+        _calcular,
+        ttl=KPI_CACHE_TTL_SECONDS,
+        tags=_CACHE_TAGS,
+    )
+
+
+def invalidar_cache_dashboard() -> None:
+    """Descarta el valor cacheado; la siguiente llamada recalcula."""
+    read_cache.invalidate(_CACHE_KEY)
+
+
+async def _calcular() -> Dict[str, Any]:
+    kpis = await _leer_snapshot()
+    if kpis is None:
+        kpis = await calcular_kpis_concurrente()
+    return kpis
+
+
+async def _leer_snapshot() -> Optional[Dict[str, Any]]:
+    """
+    Lee el snapshot pre-agregado.
+
+    Returns:
+        Payload del snapshot o None si no existe, es de otro día o está viejo
+    """
+    try:
+        row = await get_pool().fetchrow(
+            """
+            SELECT
+                payload,
+                fecha_calculo = CURRENT_DATE AS es_de_hoy,
+                EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - actualizado_en)) AS edad_segundos
+            FROM dashboard_kpi_snapshot
+            WHERE id = 1
+            """
+        )
+    except Exception as e:
+        # Migración 21 no aplicada o BD no disponible: usar fallback
+        logger.debug(f"Snapshot de KPIs no disponible: {e}")
+        return None
+
+    if row is None or not row["es_de_hoy"]:
+        return None
+    if float(row["edad_segundos"]) > KPI_SNAPSHOT_MAX_AGE_SECONDS:
+        return None
+
+    payload = row["payload"]
+    return json.loads(payload) if isinstance(payload, str) else dict(payload)
+
+
+# ============================================================================
+# FALLBACK: CONSULTAS CONCURRENTES
+# ============================================================================
+
+
+async def _fetchval(query: str, *params) -> Any:
+    async with get_pool().acquire() as conn:
+        return await conn.fetchval(query, *params)
+
+
+async def _fetch(query: str, *params):
+    async with get_pool().acquire() as conn:
+        return await conn.fetch(query, *params)
+
+
+async def _fetchrow(query: str, *params):
+    async with get_pool().acquire() as conn:
+        return await conn.fetchrow(query, *params)
+
+
+async def calcular_kpis_concurrente() -> Dict[str, Any]:
+    """
+    Calcula los KPIs directamente sobre las tablas base.
+
+    Cada consulta toma su propia conexión del pool y todas se ejecutan con
+    ``asyncio.gather``, así la latencia es la de la consulta más lenta y no
+    la suma de todas.
+    """
+    now = datetime.now()
+    first_day_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today_end = today_start + timedelta(days=1)
+    week_start = today_start - timedelta(days=today_start.weekday())
+    week_end = week_start + timedelta(days=7)
+    month_end = (first_day_month + timedelta(days=32)).replace(day=1)
+    future_7days = today_start + timedelta(days=7)
+
+    count_citas = (
+        "SELECT COUNT(*) FROM citas WHERE fecha_hora_inicio >= $1 AND fecha_hora_inicio < $2"
+    )
+
+    (
+        total_patients,
+        new_patients_month,
+        appt_today,
+        appt_week,
+        appt_month,
+        status_rows,
+        upcoming,
+        top_treatments_rows,
+        ocupacion_row,
+    ) = await asyncio.gather(
+        _fetchval("SELECT COUNT(*) FROM pacientes WHERE activo = true"),
+        _fetchval(
+            "SELECT COUNT(*) FROM pacientes WHERE fecha_registro >= $1 AND activo = true",
+            first_day_month,
+        ),
+        _fetchval(count_citas, today_start, today_end),
+        _fetchval(count_citas, week_start, week_end),
+        _fetchval(count_citas, first_day_month, month_end),
+        _fetch(
+            """
+            SELECT estado, COUNT(*) as cantidad
+            FROM citas
+            WHERE fecha_hora_inicio >= $1
+            GROUP BY estado
+            """,
+            first_day_month,
+        ),
+        _fetchval(
+            """
+            SELECT COUNT(*) FROM citas
+            WHERE fecha_hora_inicio >= $1 AND fecha_hora_inicio < $2
+            AND estado NOT IN ('cancelada', 'completada')
+            """,
+            today_start, future_7days,
+        ),
+        _fetch(
+            """
+            SELECT t.nombre_servicio, COUNT(dc.id) as cantidad
+            FROM detalle_cita dc
+            INNER JOIN tratamientos t ON dc.id_tratamiento = t.id
+            INNER JOIN citas c ON dc.id_cita = c.id
+            WHERE c.fecha_hora_inicio >= $1
+            AND c.estado != 'cancelada'
+            GROUP BY t.id, t.nombre_servicio
+            ORDER BY cantidad DESC
+            LIMIT 5
+            """,
+            first_day_month,
+        ),
+        _fetchrow(
+            """
+            WITH horarios_disponibles AS (
+                SELECT
+                    dia_semana,
+                    SUM(
+                        EXTRACT(EPOCH FROM (hora_fin - hora_inicio)) /
+                        (duracion_cita_minutos * 60)
+                    ) as slots_disponibles
+                FROM horarios_trabajo
+                WHERE activo = true
+                AND (fecha_fin_vigencia IS NULL OR fecha_fin_vigencia >= CURRENT_DATE)
+                GROUP BY dia_semana
+            ),
+            citas_semana AS (
+                SELECT
+                    EXTRACT(DOW FROM fecha_hora_inicio)::integer as dia_semana,
+                    COUNT(*) as citas_realizadas
+                FROM citas
+                WHERE fecha_hora_inicio >= $1
+                AND fecha_hora_inicio < $2
+                AND estado NOT IN ('cancelada', 'no_asistio')
+                GROUP BY dia_semana
+            )
+            SELECT
+                COALESCE(SUM(cs.citas_realizadas), 0) as total_citas,
+                COALESCE(SUM(hd.slots_disponibles), 0) as total_slots
+            FROM horarios_disponibles hd
+            LEFT JOIN citas_semana cs ON hd.dia_semana = cs.dia_semana
+            """,
+            week_start, week_end,
+        ),
+    )
+
+    return {
+        "total_patients": total_patients or 0,
+        "new_patients_this_month": new_patients_month or 0,
+        "total_appointments_today": appt_today or 0,
+        "total_appointments_week": appt_week or 0,
+        "total_appointments_month": appt_month or 0,
+        "appointments_by_status": {row["estado"]: row["cantidad"] for row in status_rows},
+        "upcoming_appointments": upcoming or 0,
+        "top_treatments": [
+            {"nombre": row["nombre_servicio"], "cantidad": row["cantidad"]}
+            for row in top_treatments_rows
+        ],
+        "ocupacion": {
+            "total_citas": float(ocupacion_row["total_citas"] or 0) if ocupacion_row else 0,
+            "total_slots": float(ocupacion_row["total_slots"] or 0) if ocupacion_row else 0,
+        },
+    }
+
+
+async def refrescar_snapshot() -> None:
+    """Recalcula el snapshot en BD (usado por la tarea periódica)."""
+    await get_pool().execute("SELECT refrescar_dashboard_kpi_snapshot()")
+    invalidar_cache_dashboard()
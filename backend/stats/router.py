@@ -11,7 +11,10 @@ from pydantic import BaseModel
 import logging
 
 from auth.middleware import get_current_user
+from auth import AdminOnly
+from cache import cached, read_cache
 from auth.database import _get_connection, _return_connection
+from .kpi_snapshot import obtener_kpis_dashboard
 
 logger = logging.getLogger(__name__)
 
@@ -101,134 +104,24 @@ class RevenueTrend(BaseModel):
 async def get_dashboard_stats(current_user=Depends(get_current_user)):
     """
     Retorna estadísticas generales del dashboard con datos REALES de la BD.
-    Por ahora retorna valores iniciales (ceros) para una app nueva.
+
+    Los KPIs salen del snapshot pre-agregado (ver stats/kpi_snapshot.py);
+    si está viejo se calculan con consultas concurrentes.
     """
 
-    conn = None
     try:
-        conn = await _get_connection()
-
-        # Fechas para filtros
-        first_day_month = datetime.now().replace(
-            day=1, hour=0, minute=0, second=0, microsecond=0
-        )
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-        week_start = today_start - timedelta(days=today_start.weekday())
-        week_end = week_start + timedelta(days=7)
-        month_end = (first_day_month + timedelta(days=32)).replace(day=1)
-        future_7days = today_start + timedelta(days=7)
-
-        # Contar pacientes totales y activos
-        total_patients = await conn.fetchval(
-            "SELECT COUNT(*) FROM pacientes WHERE activo = true"
-        ) or 0
-
-        # Pacientes nuevos este mes
-        new_patients_month = await conn.fetchval(
-            "SELECT COUNT(*) FROM pacientes WHERE fecha_registro >= $1 AND activo = true",
-            first_day_month,
-        ) or 0
-
-        # Citas de hoy
-        appt_today = await conn.fetchval(
-            "SELECT COUNT(*) FROM citas WHERE fecha_hora_inicio >= $1 AND fecha_hora_inicio < $2",
-            today_start, today_end,
-        ) or 0
-
-        # Citas de esta semana
-        appt_week = await conn.fetchval(
-            "SELECT COUNT(*) FROM citas WHERE fecha_hora_inicio >= $1 AND fecha_hora_inicio < $2",
-            week_start, week_end,
-        ) or 0
-
-        # Citas de este mes
-        appt_month = await conn.fetchval(
-            "SELECT COUNT(*) FROM citas WHERE fecha_hora_inicio >= $1 AND fecha_hora_inicio < $2",
-            first_day_month, month_end,
-        ) or 0
-
-        # Citas por estado
-        status_rows = await conn.fetch(
-            """
-            SELECT estado, COUNT(*) as cantidad
-            FROM citas
-            WHERE fecha_hora_inicio >= $1
-            GROUP BY estado
-            """,
-            first_day_month,
-        )
-        status_dict = {row["estado"]: row["cantidad"] for row in status_rows}
+        kpis = await obtener_kpis_dashboard()
 
-        # Próximas citas (siguientes 7 días)
-        upcoming = await conn.fetchval(
-            """
-            SELECT COUNT(*) FROM citas 
-            WHERE fecha_hora_inicio >= $1 AND fecha_hora_inicio < $2
-            AND estado NOT IN ('cancelada', 'completada')
-            """,
-            today_start, future_7days,
-        ) or 0
-
-        # Top tratamientos (5 más frecuentes del mes)
-        top_treatments_rows = await conn.fetch(
-            """
-            SELECT t.nombre_servicio, COUNT(dc.id) as cantidad
-            FROM detalle_cita dc
-            INNER JOIN tratamientos t ON dc.id_tratamiento = t.id
-            INNER JOIN citas c ON dc.id_cita = c.id
-            WHERE c.fecha_hora_inicio >= $1
-            AND c.estado != 'cancelada'
-            GROUP BY t.id, t.nombre_servicio
-            ORDER BY cantidad DESC
-            LIMIT 5
-            """,
-            first_day_month,
-        )
+        status_dict = kpis.get("appointments_by_status") or {}
         top_treatments = [
-            TopTreatment(nombre=row["nombre_servicio"], cantidad=row["cantidad"])
-            for row in top_treatments_rows
+            TopTreatment(nombre=t["nombre"], cantidad=t["cantidad"])
+            for t in kpis.get("top_treatments") or []
         ]
 
-        # Calcular porcentaje de ocupación basado en horarios
-        # Ocupación = (horas con citas) / (horas disponibles) * 100
-        # Calculamos para la semana actual
-        ocupacion_row = await conn.fetchrow(
-            """
-            WITH horarios_disponibles AS (
-                -- Calcular slots disponibles por día
-                SELECT 
-                    dia_semana,
-                    SUM(
-                        EXTRACT(EPOCH FROM (hora_fin - hora_inicio)) / 
-                        (duracion_cita_minutos * 60)
-                    ) as slots_disponibles
-                FROM horarios_trabajo
-                WHERE activo = true
-                AND (fecha_fin_vigencia IS NULL OR fecha_fin_vigencia >= CURRENT_DATE)
-                GROUP BY dia_semana
-            ),
-            citas_semana AS (
-                -- Contar citas de esta semana
-                SELECT 
-                    EXTRACT(DOW FROM fecha_hora_inicio)::integer as dia_semana,
-                    COUNT(*) as citas_realizadas
-                FROM citas
-                WHERE fecha_hora_inicio >= $1 
-                AND fecha_hora_inicio < $2
-                AND estado NOT IN ('cancelada', 'no_asistio')
-                GROUP BY dia_semana
-            )
-            SELECT 
-                COALESCE(SUM(cs.citas_realizadas), 0) as total_citas,
-                COALESCE(SUM(hd.slots_disponibles), 0) as total_slots
-            FROM horarios_disponibles hd
-            LEFT JOIN citas_semana cs ON hd.dia_semana = cs.dia_semana
-            """,
-            week_start, week_end,
-        )
-        total_citas = ocupacion_row["total_citas"] or 0
-        total_slots = ocupacion_row["total_slots"] or 0
+        # Ocupación = (citas de la semana) / (slots disponibles) * 100
+        ocupacion = kpis.get("ocupacion") or {}
+        total_citas = float(ocupacion.get("total_citas") or 0)
+        total_slots = float(ocupacion.get("total_slots") or 0)
         ocupacion_porcentaje = (
             (total_citas / total_slots * 100) if total_slots > 0 else 0.0
         )
@@ -239,13 +132,15 @@ async def get_dashboard_stats(current_user=Depends(get_current_user)):
         revenue_month = 0
         revenue_year = 0
 
+        total_patients = int(kpis.get("total_patients") or 0)
+
         return DashboardStats(
             total_patients=total_patients,
             active_patients=total_patients,  # Todos los activos
-            new_patients_this_month=new_patients_month,
-            total_appointments_today=appt_today,
-            total_appointments_week=appt_week,
-            total_appointments_month=appt_month,
+            new_patients_this_month=int(kpis.get("new_patients_this_month") or 0),
+            total_appointments_today=int(kpis.get("total_appointments_today") or 0),
+            total_appointments_week=int(kpis.get("total_appointments_week") or 0),
+            total_appointments_month=int(kpis.get("total_appointments_month") or 0),
             appointments_by_status=AppointmentsByStatus(
                 pendiente=status_dict.get("pendiente", 0),
                 confirmada=status_dict.get("confirmada", 0),
@@ -259,7 +154,7 @@ async def get_dashboard_stats(current_user=Depends(get_current_user)):
             revenue_year=revenue_year,
             top_treatments=top_treatments,
             ocupacion_porcentaje=round(ocupacion_porcentaje, 2),
-            upcoming_appointments=upcoming,
+            upcoming_appointments=int(kpis.get("upcoming_appointments") or 0),
         )
 
     except Exception as e:
@@ -284,9 +179,6 @@ async def get_dashboard_stats(current_user=Depends(get_current_user)):
             ocupacion_porcentaje=0.0,
             upcoming_appointments=0,
         )
-    finally:
-        if conn:
-            await _return_connection(conn)
 
 
 @router.get(
@@ -295,6 +187,7 @@ async def get_dashboard_stats(current_user=Depends(get_current_user)):
     summary="Tendencia de citas",
     description="Obtiene la cantidad de citas por día en los últimos N días",
 )
+@cached("stats.appointments_trend", ttl=60, stale_ttl=300, tags=("citas",))
 async def get_appointments_trend(
     days: int = 30, current_user=Depends(get_current_user)
 ):
@@ -349,6 +242,7 @@ async def get_appointments_trend(
     summary="Tendencia de ingresos",
     description="Obtiene los ingresos por mes del último año",
 )
+@cached("stats.revenue_trend", ttl=60, stale_ttl=300, tags=("pagos",))
 async def get_revenue_trend(current_user=Depends(get_current_user)):
     """Retorna tendencia de ingresos del último año"""
     # Por ahora retornar lista vacía hasta implementar módulo de pagos
@@ -431,6 +325,7 @@ class MetricasFinancieras(BaseModel):
     summary="Métricas financieras completas",
     description="KPIs financieros: gastos por categoría, servicios rentables, productos críticos",
 )
+@cached("stats.metricas_financieras", ttl=60, stale_ttl=300, tags=("citas", "pagos", "gastos", "inventario"))
 async def get_metricas_financieras(
     mes: Optional[int] = Query(
         None, ge=1, le=12, description="Mes (1-12), default mes actual"
@@ -652,3 +547,18 @@ async def get_metricas_financieras(
     finally:
         if conn:
             await _return_connection(conn)
+
+
+# ============================================================================
+# CACHÉ DE LECTURAS
+# ============================================================================
+
+
+@router.get(
+    "/cache",
+    summary="Estado del caché de lecturas",
+    description="Contadores de hits, misses y llamadas coalescidas (solo Admin)",
+)
+async def get_cache_stats(current_user=Depends(AdminOnly)):
+    """Retorna los contadores del caché single-flight compartido"""
+    return read_cache.info()
@@ -4,6 +4,7 @@ Configuración de Celery para tareas asíncronas
 
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_init
 import os
 from dotenv import load_dotenv
 
@@ -19,7 +20,9 @@ celery_app = Celery(
     backend=REDIS_URL,
     include=[
         'backend.tasks.notifications',
-        'backend.tasks.email_service'
+        'backend.tasks.email_service',
+        'backend.tasks.kpis',
+        'backend.tasks.pronosticos'
     ]
 )
 
@@ -75,13 +78,36 @@ celery_app.conf.beat_schedule = {
         'task': 'backend.tasks.notifications.limpiar_notificaciones_antiguas',
         'schedule': crontab(hour=2, minute=0, day_of_week=0),  # Domingo 2 AM
     },
+    
+    # Refrescar snapshot de KPIs del dashboard (cada minuto)
+    'refrescar-kpi-dashboard': {
+        'task': 'backend.tasks.kpis.refrescar_kpi_dashboard',
+        'schedule': crontab(),  # Cada minuto
+    },
+
+    # Recalcular pronósticos de demanda (cada 6 horas)
+    'generar-pronosticos-demanda': {
+        'task': 'backend.tasks.pronosticos.generar_pronosticos_demanda',
+        'schedule': crontab(hour='*/6', minute=15),
+    },
 }
 
 # Configuración de colas (queues)
 celery_app.conf.task_routes = {
     'backend.tasks.notifications.*': {'queue': 'notifications'},
     'backend.tasks.email_service.*': {'queue': 'emails'},
+    'backend.tasks.kpis.*': {'queue': 'notifications'},
+    'backend.tasks.pronosticos.*': {'queue': 'notifications'},
 }
 
+
+@worker_init.connect
+def _precompilar_plantillas(**kwargs):
+    # En el proceso padre: los hijos prefork heredan las plantillas compiladas
+    from plantillas import precompilar
+
+    precompilar()
+
+
 if __name__ == '__main__':
     celery_app.start()
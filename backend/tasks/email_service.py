@@ -3,16 +3,17 @@ Servicio de envío de emails con templates Jinja2
 """
 
 from tasks.celery_app import celery_app
-from jinja2 import Environment, FileSystemLoader, select_autoescape
 from datetime import datetime, timedelta
-from db import get_connection, release_connection
+from tasks.runtime import get_db_connection, release_db_connection, run_async
+from plantillas import render
+from tasks.smtp_pool import SMTPPool, ResultadoLote, enviar_lote, enviar_mensaje
+from celery.signals import worker_process_shutdown
+from typing import List, Optional
 import asyncio
 import os
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
-from pathlib import Path
 
 # Configuración de email
 SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
@@ -20,54 +21,91 @@ SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
 SMTP_USER = os.getenv('SMTP_USER', '')
 SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
 SMTP_FROM = os.getenv('SMTP_FROM', 'noreply@podoskin.com')
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'true').lower() == 'true'
+# false solo para servidores locales sin AUTH (tasks/smtp_debug.py)
+SMTP_REQUIRE_AUTH = os.getenv('SMTP_REQUIRE_AUTH', 'true').lower() == 'true'
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 4))
+SMTP_MAX_REINTENTOS = int(os.getenv('SMTP_MAX_REINTENTOS', 3))
+SMTP_BACKOFF_SEGUNDOS = float(os.getenv('SMTP_BACKOFF_SEGUNDOS', 0.5))
 
-# Configurar Jinja2
-templates_dir = Path(__file__).parent / 'templates'
-templates_dir.mkdir(exist_ok=True)
 
-jinja_env = Environment(
-    loader=FileSystemLoader(str(templates_dir)),
-    autoescape=select_autoescape(['html', 'xml'])
-)
+_smtp_pool: Optional[SMTPPool] = None
+
+
+def get_smtp_pool() -> SMTPPool:
+    """Pool SMTP del proceso (se crea en el primer envío)"""
+    global _smtp_pool
+    if _smtp_pool is None:
+        _smtp_pool = SMTPPool(
+            SMTP_SERVER,
+            SMTP_PORT,
+            SMTP_USER,
+            SMTP_PASSWORD,
+            starttls=SMTP_STARTTLS,
+            max_conexiones=SMTP_POOL_SIZE,
+        )
+    return _smtp_pool
+
+
+def cerrar_smtp_pool():
+    """Cierra las sesiones SMTP abiertas del proceso"""
+    global _smtp_pool
+    if _smtp_pool is not None:
+        _smtp_pool.cerrar()
+        _smtp_pool = None
+
+
+@worker_process_shutdown.connect
+def _cerrar_smtp_pool(**kwargs):
+    cerrar_smtp_pool()
+
+
+def _smtp_configurado() -> bool:
+    if SMTP_REQUIRE_AUTH and (not SMTP_USER or not SMTP_PASSWORD):
+        print("⚠️ Credenciales SMTP no configuradas. Email no enviado.")
+        return False
+    return True
+
+
+def construir_mensaje(destinatario: str, asunto: str, html: str, archivos_adjuntos: list = None) -> MIMEMultipart:
+    """Arma el mensaje MIME (HTML + adjuntos opcionales)"""
+    msg = MIMEMultipart('alternative')
+    msg['From'] = SMTP_FROM
+    msg['To'] = destinatario
+    msg['Subject'] = asunto
+    
+    # Agregar contenido HTML
+    html_part = MIMEText(html, 'html')
+    msg.attach(html_part)
+    
+    # Agregar archivos adjuntos si existen
+    if archivos_adjuntos:
+        for filename, content in archivos_adjuntos:
+            attachment = MIMEApplication(content)
+            attachment.add_header('Content-Disposition', 'attachment', filename=filename)
+            msg.attach(attachment)
+    
+    return msg
 
 
 def enviar_email(destinatario: str, asunto: str, html: str, archivos_adjuntos: list = None):
     """
     Envía un email HTML
     
+    Reutiliza una sesión del pool SMTP y reintenta errores transitorios.
+    
     Args:
         destinatario: Email del destinatario
         asunto: Asunto del email
         html: Contenido HTML del email
         archivos_adjuntos: Lista de (filename, content) tuplas
     """
-    if not SMTP_USER or not SMTP_PASSWORD:
-        print("⚠️ Credenciales SMTP no configuradas. Email no enviado.")
+    if not _smtp_configurado():
         return False
     
     try:
-        msg = MIMEMultipart('alternative')
-        msg['From'] = SMTP_FROM
-        msg['To'] = destinatario
-        msg['Subject'] = asunto
-        
-        # Agregar contenido HTML
-        html_part = MIMEText(html, 'html')
-        msg.attach(html_part)
-        
-        # Agregar archivos adjuntos si existen
-        if archivos_adjuntos:
-            for filename, content in archivos_adjuntos:
-                attachment = MIMEApplication(content)
-                attachment.add_header('Content-Disposition', 'attachment', filename=filename)
-                msg.attach(attachment)
-        
-        # Enviar email
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(msg)
-        
+        msg = construir_mensaje(destinatario, asunto, html, archivos_adjuntos)
+        enviar_mensaje(get_smtp_pool(), msg, SMTP_MAX_REINTENTOS, SMTP_BACKOFF_SEGUNDOS)
         return True
         
     except Exception as e:
@@ -75,17 +113,36 @@ def enviar_email(destinatario: str, asunto: str, html: str, archivos_adjuntos: l
         return False
 
 
+async def enviar_emails(destinatarios: List[str], asunto: str, html: str) -> ResultadoLote:
+    """
+    Envía el mismo email a varios destinatarios en paralelo sobre el pool SMTP
+    
+    Returns:
+        ResultadoLote con enviados, fallidos y emails/s
+    """
+    if not _smtp_configurado():
+        return ResultadoLote(fallidos=len(destinatarios))
+    
+    mensajes = [construir_mensaje(d, asunto, html) for d in destinatarios]
+    return await enviar_lote(
+        get_smtp_pool(),
+        mensajes,
+        max_reintentos=SMTP_MAX_REINTENTOS,
+        backoff=SMTP_BACKOFF_SEGUNDOS,
+    )
+
+
 @celery_app.task(name='backend.tasks.email_service.enviar_confirmacion_cita')
 def enviar_confirmacion_cita(cita_id: int):
     """
     Tarea: Envía email de confirmación de cita al paciente
     """
-    return asyncio.run(_enviar_confirmacion_cita_async(cita_id))
+    return run_async(_enviar_confirmacion_cita_async(cita_id))
 
 
 async def _enviar_confirmacion_cita_async(cita_id: int):
     """Versión async de enviar confirmación de cita"""
-    conn = await get_connection()
+    conn = await get_db_connection()
     
     try:
         # Obtener información de la cita
@@ -111,54 +168,11 @@ async def _enviar_confirmacion_cita_async(cita_id: int):
         if not cita or not cita['paciente_email']:
             return {'status': 'error', 'error': 'Cita no encontrada o email no disponible'}
         
-        # Template HTML (inline por simplicidad)
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #366092; color: white; padding: 20px; text-align: center; }}
-                .content {{ background: #f9f9f9; padding: 20px; }}
-                .cita-info {{ background: white; padding: 15px; margin: 15px 0; border-left: 4px solid #366092; }}
-                .footer {{ text-align: center; padding: 20px; color: #666; font-size: 12px; }}
-                .button {{ display: inline-block; padding: 12px 24px; background: #366092; color: white; text-decoration: none; border-radius: 4px; margin: 10px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Confirmación de Cita</h1>
-                    <p>Podoskin Solution</p>
-                </div>
-                <div class="content">
-                    <h2>Hola {cita['paciente_nombre']},</h2>
-                    <p>Su cita ha sido confirmada exitosamente:</p>
-                    
-                    <div class="cita-info">
-                        <p><strong>📅 Fecha:</strong> {cita['fecha_cita'].strftime('%d de %B de %Y')}</p>
-                        <p><strong>🕐 Hora:</strong> {cita['hora_inicio'].strftime('%H:%M')} - {cita['hora_fin'].strftime('%H:%M')}</p>
-                        <p><strong>👨‍⚕️ Podólogo:</strong> {cita['podologo_nombre']}</p>
-                        <p><strong>🔬 Servicio:</strong> {cita['servicio_nombre']}</p>
-                        <p><strong>💰 Precio:</strong> ${cita['precio_base']:,.2f} MXN</p>
-                    </div>
-                    
-                    <p>📞 Para cualquier duda o cambio, contacte al: {cita['podologo_telefono']}</p>
-                    
-                    <p><strong>Importante:</strong> Por favor llegue 10 minutos antes de su cita.</p>
-                </div>
-                <div class="footer">
-                    <p>Este es un correo automático, por favor no responder.</p>
-                    <p>&copy; {datetime.now().year} Podoskin Solution. Todos los derechos reservados.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        html = render('email/confirmacion_cita.html', cita=cita)
         
-        # Enviar email
-        enviado = enviar_email(
+        # Enviar email (smtplib es bloqueante: fuera del loop)
+        enviado = await asyncio.to_thread(
+            enviar_email,
             cita['paciente_email'],
             f"Confirmación de Cita - {cita['fecha_cita'].strftime('%d/%m/%Y')}",
             html
@@ -174,7 +188,7 @@ async def _enviar_confirmacion_cita_async(cita_id: int):
     except Exception as e:
         return {'status': 'error', 'error': str(e)}
     finally:
-        await release_connection(conn)
+        await release_db_connection(conn)
 
 
 @celery_app.task(name='backend.tasks.email_service.enviar_resumen_diario')
@@ -182,12 +196,12 @@ def enviar_resumen_diario():
     """
     Tarea periódica: Envía resumen diario de citas a administradores
     """
-    return asyncio.run(_enviar_resumen_diario_async())
+    return run_async(_enviar_resumen_diario_async())
 
 
 async def _enviar_resumen_diario_async():
     """Versión async de enviar resumen diario"""
-    conn = await get_connection()
+    conn = await get_db_connection()
     
     try:
         hoy = datetime.now().date()
@@ -220,75 +234,28 @@ async def _enviar_resumen_diario_async():
             return {'status': 'error', 'error': 'No hay administradores con email'}
         
         # Generar HTML del resumen
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; }}
-                .container {{ max-width: 800px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #366092; color: white; padding: 20px; text-align: center; }}
-                table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-                th {{ background: #366092; color: white; padding: 10px; text-align: left; }}
-                td {{ border: 1px solid #ddd; padding: 10px; }}
-                tr:nth-child(even) {{ background: #f9f9f9; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Resumen de Citas - {manana.strftime('%d/%m/%Y')}</h1>
-                </div>
-                <p>Total de citas programadas: <strong>{len(citas)}</strong></p>
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Hora</th>
-                            <th>Paciente</th>
-                            <th>Podólogo</th>
-                            <th>Servicio</th>
-                            <th>Estado</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-        """
-        
-        for cita in citas:
-            html += f"""
-                        <tr>
-                            <td>{cita['hora_inicio'].strftime('%H:%M')}</td>
-                            <td>{cita['paciente_nombre']}</td>
-                            <td>{cita['podologo_nombre']}</td>
-                            <td>{cita['servicio_nombre'] or 'N/A'}</td>
-                            <td>{cita['estado']}</td>
-                        </tr>
-            """
-        
-        html += """
-                    </tbody>
-                </table>
-            </div>
-        </body>
-        </html>
-        """
+        html = render('email/resumen_diario.html', fecha=manana, total_citas=len(citas), citas=citas)
         
         # Enviar a todos los administradores
-        enviados = 0
-        for admin in admins:
-            if enviar_email(admin['email'], f"Resumen de Citas - {manana.strftime('%d/%m/%Y')}", html):
-                enviados += 1
+        envio = await enviar_emails(
+            [admin['email'] for admin in admins],
+            f"Resumen de Citas - {manana.strftime('%d/%m/%Y')}",
+            html
+        )
         
         return {
             'status': 'success',
             'total_citas': len(citas),
-            'emails_enviados': enviados,
+            'emails_enviados': envio.enviados,
+            'emails_fallidos': envio.fallidos,
+            'emails_por_segundo': envio.emails_por_segundo,
             'fecha': manana.isoformat()
         }
         
     except Exception as e:
         return {'status': 'error', 'error': str(e)}
     finally:
-        await release_connection(conn)
+        await release_db_connection(conn)
 
 
 @celery_app.task(name='backend.tasks.email_service.enviar_reporte_mensual')
@@ -296,12 +263,12 @@ def enviar_reporte_mensual():
     """
     Tarea periódica: Genera y envía reporte mensual a administradores
     """
-    return asyncio.run(_enviar_reporte_mensual_async())
+    return run_async(_enviar_reporte_mensual_async())
 
 
 async def _enviar_reporte_mensual_async():
     """Versión async de enviar reporte mensual"""
-    conn = await get_connection()
+    conn = await get_db_connection()
     
     try:
         # Calcular mes anterior
@@ -328,55 +295,20 @@ async def _enviar_reporte_mensual_async():
         
         mes_nombre = primer_dia_mes_anterior.strftime('%B %Y')
         
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #366092; color: white; padding: 20px; text-align: center; }}
-                .metric {{ background: #f9f9f9; padding: 15px; margin: 10px 0; border-left: 4px solid #366092; }}
-                .metric h3 {{ margin: 0; color: #366092; }}
-                .metric p {{ font-size: 24px; margin: 10px 0; font-weight: bold; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Reporte Mensual</h1>
-                    <p>{mes_nombre}</p>
-                </div>
-                <div class="metric">
-                    <h3>📅 Citas Realizadas</h3>
-                    <p>{stats['total_citas']}</p>
-                </div>
-                <div class="metric">
-                    <h3>👥 Pacientes Atendidos</h3>
-                    <p>{stats['total_pacientes']}</p>
-                </div>
-                <div class="metric">
-                    <h3>💰 Ingresos Totales</h3>
-                    <p>${stats['total_ingresos']:,.2f} MXN</p>
-                </div>
-                <div class="metric">
-                    <h3>❌ Citas Canceladas</h3>
-                    <p>{stats['citas_canceladas']}</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        html = render('email/reporte_mensual.html', mes=mes_nombre, stats=stats)
         
         # Enviar a administradores
-        enviados = 0
-        for admin in admins:
-            if enviar_email(admin['email'], f"Reporte Mensual - {mes_nombre}", html):
-                enviados += 1
+        envio = await enviar_emails(
+            [admin['email'] for admin in admins],
+            f"Reporte Mensual - {mes_nombre}",
+            html
+        )
         
         return {
             'status': 'success',
-            'emails_enviados': enviados,
+            'emails_enviados': envio.enviados,
+            'emails_fallidos': envio.fallidos,
+            'emails_por_segundo': envio.emails_por_segundo,
             'mes': mes_nombre,
             'metricas': dict(stats)
         }
@@ -384,4 +316,4 @@ async def _enviar_reporte_mensual_async():
     except Exception as e:
         return {'status': 'error', 'error': str(e)}
     finally:
-        await release_connection(conn)
+        await release_db_connection(conn)
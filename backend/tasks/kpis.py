@@ -0,0 +1,39 @@
+"""
+Tareas de mantenimiento de KPIs con Celery
+Refresco periódico del snapshot del dashboard
+"""
+
+from tasks.celery_app import celery_app
+from tasks.runtime import get_db_connection, release_db_connection, run_async
+from datetime import datetime
+
+
+@celery_app.task(name='backend.tasks.kpis.refrescar_kpi_dashboard')
+def refrescar_kpi_dashboard():
+    """
+    Tarea periódica: Recalcula dashboard_kpi_snapshot a partir de los
+    contadores diarios (ver data/migrations/21_dashboard_kpi_snapshot.sql)
+    """
+    return run_async(_refrescar_kpi_dashboard_async())
+
+
+async def _refrescar_kpi_dashboard_async():
+    """Versión async del refresco del snapshot"""
+    conn = await get_db_connection()
+
+    try:
+        actualizado_en = await conn.fetchval("SELECT refrescar_dashboard_kpi_snapshot()")
+
+        return {
+            'status': 'success',
+            'actualizado_en': actualizado_en.isoformat() if actualizado_en else None,
+            'fecha_ejecucion': datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+    finally:
+        await release_db_connection(conn)
@@ -3,126 +3,33 @@ Tareas de notificaciones con Celery
 Envío de recordatorios de citas y alertas
 """
 
+from plantillas import render
 from tasks.celery_app import celery_app
+from tasks.recordatorios import RECORDATORIO_24H, RECORDATORIO_2H, despachar_recordatorios
+from tasks.runtime import get_db_connection, release_db_connection, run_async
 from datetime import datetime, timedelta
-import asyncio
-import asyncpg
-import os
 from typing import List, Dict, Any
 
-# Configuración de base de datos
-DB_CONFIG = {
-    'host': os.getenv('POSTGRES_HOST', 'localhost'),
-    'port': int(os.getenv('POSTGRES_PORT', 5432)),
-    'database': os.getenv('POSTGRES_DB', 'podoskin_db'),
-    'user': os.getenv('POSTGRES_USER', 'podoskin_user'),
-    'password': os.getenv('POSTGRES_PASSWORD') or os.getenv('DB_PASSWORD'),  # Requerido
-}
-
-
-async def get_db_connection():
-    """Obtiene conexión a la base de datos"""
-    return await asyncpg.connect(**DB_CONFIG)
-
 
 @celery_app.task(name='backend.tasks.notifications.enviar_recordatorios_citas')
 def enviar_recordatorios_citas():
     """
     Tarea periódica: Envía recordatorios de citas programadas para las próximas 24 horas
     """
-    return asyncio.run(_enviar_recordatorios_citas_async())
+    return run_async(_enviar_recordatorios_citas_async())
 
 
 async def _enviar_recordatorios_citas_async():
     """Versión async de enviar recordatorios 24h antes"""
+    return await _despachar(RECORDATORIO_24H)
+
+
+async def _despachar(definicion):
+    """Ejecuta el pipeline de recordatorios (ver tasks/recordatorios.py)"""
     conn = await get_db_connection()
     
     try:
-        # Obtener citas de las próximas 24 horas que no tengan recordatorio enviado
-        ahora = datetime.now()
-        manana = ahora + timedelta(hours=24)
-        dos_horas = ahora + timedelta(hours=26)  # Ventana: 24-26 horas adelante
-        
-        citas = await conn.fetch("""
-            SELECT 
-                c.cita_id,
-                c.fecha_cita,
-                c.hora_inicio,
-                p.nombre as paciente_nombre,
-                p.primer_nombre as paciente_primer_nombre,
-                p.telefono as paciente_telefono,
-                p.email as paciente_email,
-                p.paciente_id,
-                pod.nombre as podologo_nombre,
-                cs.nombre as servicio_nombre
-            FROM citas c
-            JOIN pacientes p ON c.paciente_id = p.paciente_id
-            JOIN podologos pod ON c.podologo_id = pod.podologo_id
-            LEFT JOIN catalogo_servicios cs ON c.tratamiento_id = cs.servicio_id
-            WHERE c.fecha_cita BETWEEN $1 AND $2
-              AND c.estado = 'confirmada'
-              AND NOT EXISTS (
-                  SELECT 1 FROM notificaciones n
-                  WHERE n.referencia_id = c.cita_id::text
-                    AND n.tipo = 'recordatorio_cita_24h'
-                    AND n.fecha_envio > NOW() - INTERVAL '26 hours'
-              )
-        """, manana, dos_horas)
-        
-        recordatorios_enviados = 0
-        
-        for cita in citas:
-            # Mensaje natural y humano
-            primer_nombre = cita['paciente_primer_nombre'] or cita['paciente_nombre'].split()[0]
-            dia_semana = cita['fecha_cita'].strftime('%A')
-            dias_es = {'Monday': 'lunes', 'Tuesday': 'martes', 'Wednesday': 'miércoles', 
-                       'Thursday': 'jueves', 'Friday': 'viernes', 'Saturday': 'sábado', 'Sunday': 'domingo'}
-            dia_es = dias_es.get(dia_semana, dia_semana.lower())
-            
-            mensaje = f"Hola {primer_nombre}, ¿qué tal? 😊\n\n"
-            mensaje += f"Solo para recordarte que tenemos tu cita programada para mañana {dia_es} "
-            mensaje += f"{cita['fecha_cita'].strftime('%d/%m/%Y')} a las {cita['hora_inicio'].strftime('%I:%M %p')} "
-            mensaje += f"con {cita['podologo_nombre']}.\n\n"
-            mensaje += f"Si necesitas reagendar o tienes alguna duda, solo avísanos. "
-            mensaje += f"¡Nos vemos pronto! 🦶✨"
-            
-            # Crear notificación en la BD
-            await conn.execute("""
-                INSERT INTO notificaciones 
-                (usuario_id, tipo, titulo, mensaje, referencia_id, referencia_tipo, fecha_envio, leido)
-                VALUES (
-                    (SELECT usuario_id FROM pacientes WHERE paciente_id = $1),
-                    'recordatorio_cita_24h',
-                    'Recordatorio: Cita Mañana',
-                    $2,
-                    $3,
-                    'cita',
-                    NOW(),
-                    FALSE
-                )
-            """, 
-                cita['paciente_id'],
-                mensaje,
-                str(cita['cita_id'])
-            )
-            
-            recordatorios_enviados += 1
-            
-            # TODO FUTURO: Integración con WhatsApp + Maya (LangGraph)
-            # from backend.agents.sub_agent_whatsApp.notification_handler import enviar_notificacion_whatsapp
-            # await enviar_notificacion_whatsapp(
-            #     paciente_id=cita['paciente_id'],
-            #     telefono=cita['paciente_telefono'],
-            #     mensaje=mensaje,
-            #     tipo_notificacion='recordatorio_cita_24h',
-            #     cita_id=cita['cita_id']
-            # )
-        
-        return {
-            'status': 'success',
-            'recordatorios_enviados': recordatorios_enviados,
-            'fecha_ejecucion': ahora.isoformat()
-        }
+        return await despachar_recordatorios(conn, definicion)
         
     except Exception as e:
         return {
@@ -130,7 +37,7 @@ async def _enviar_recordatorios_citas_async():
             'error': str(e)
         }
     finally:
-        await conn.close()
+        await release_db_connection(conn)
 
 
 @celery_app.task(name='backend.tasks.notifications.enviar_recordatorios_2h')
@@ -138,117 +45,12 @@ def enviar_recordatorios_2h():
     """
     Tarea periódica: Envía recordatorios de citas en las próximas 2 horas
     """
-    return asyncio.run(_enviar_recordatorios_2h_async())
+    return run_async(_enviar_recordatorios_2h_async())
 
 
 async def _enviar_recordatorios_2h_async():
     """Versión async de enviar recordatorios 2h antes"""
-    conn = await get_db_connection()
-    
-    try:
-        # Obtener citas de las próximas 2 horas que no tengan recordatorio enviado
-        ahora = datetime.now()
-        dos_horas = ahora + timedelta(hours=2)
-        dos_horas_media = ahora + timedelta(hours=2, minutes=30)  # Ventana: 2-2.5h
-        
-        citas = await conn.fetch("""
-            SELECT 
-                c.cita_id,
-                c.fecha_cita,
-                c.hora_inicio,
-                p.nombre as paciente_nombre,
-                p.primer_nombre as paciente_primer_nombre,
-                p.telefono as paciente_telefono,
-                p.email as paciente_email,
-                p.paciente_id,
-                pod.nombre as podologo_nombre,
-                cs.nombre as servicio_nombre
-            FROM citas c
-            JOIN pacientes p ON c.paciente_id = p.paciente_id
-            JOIN podologos pod ON c.podologo_id = pod.podologo_id
-            LEFT JOIN catalogo_servicios cs ON c.tratamiento_id = cs.servicio_id
-            WHERE c.fecha_cita BETWEEN $1 AND $2
-              AND c.estado = 'confirmada'
-              AND NOT EXISTS (
-                  SELECT 1 FROM notificaciones n
-                  WHERE n.referencia_id = c.cita_id::text
-                    AND n.tipo = 'recordatorio_cita_2h'
-                    AND n.fecha_envio > NOW() - INTERVAL '3 hours'
-              )
-        """, dos_horas, dos_horas_media)
-        
-        recordatorios_enviados = 0
-        
-        for cita in citas:
-            # Mensaje natural y humano - más breve y directo
-            primer_nombre = cita['paciente_primer_nombre'] or cita['paciente_nombre'].split()[0]
-            
-            # Determinar si es "hoy" o calcular tiempo exacto
-            tiempo_hasta_cita = cita['fecha_cita'] - ahora
-            horas_restantes = int(tiempo_hasta_cita.total_seconds() / 3600)
-            minutos_restantes = int((tiempo_hasta_cita.total_seconds() % 3600) / 60)
-            
-            if horas_restantes <= 0:
-                tiempo_texto = f"en {minutos_restantes} minutos"
-            elif horas_restantes == 1:
-                tiempo_texto = f"en 1 hora"
-            else:
-                tiempo_texto = f"en {horas_restantes} horas"
-            
-            mensaje = f"Hola {primer_nombre}! 👋\n\n"
-            mensaje += f"¿Cómo estás? Solo un recordatorio rápido: "
-            mensaje += f"tenemos tu cita {tiempo_texto} "
-            mensaje += f"({cita['hora_inicio'].strftime('%I:%M %p')}) "
-            mensaje += f"con {cita['podologo_nombre']}.\n\n"
-            mensaje += f"¡Te esperamos! 😊"
-            
-            # Crear notificación en la BD
-            await conn.execute("""
-                INSERT INTO notificaciones 
-                (usuario_id, tipo, titulo, mensaje, referencia_id, referencia_tipo, fecha_envio, leido)
-                VALUES (
-                    (SELECT usuario_id FROM pacientes WHERE paciente_id = $1),
-                    'recordatorio_cita_2h',
-                    'Tu cita es pronto',
-                    $2,
-                    $3,
-                    'cita',
-                    NOW(),
-                    FALSE
-                )
-            """, 
-                cita['paciente_id'],
-                mensaje,
-                str(cita['cita_id'])
-            )
-            
-            recordatorios_enviados += 1
-            
-            # TODO FUTURO: Integración con WhatsApp + Maya (LangGraph)
-            # Este recordatorio es más urgente, ideal para WhatsApp
-            # from backend.agents.sub_agent_whatsApp.notification_handler import enviar_notificacion_whatsapp
-            # await enviar_notificacion_whatsapp(
-            #     paciente_id=cita['paciente_id'],
-            #     telefono=cita['paciente_telefono'],
-            #     mensaje=mensaje,
-            #     tipo_notificacion='recordatorio_cita_2h',
-            #     cita_id=cita['cita_id'],
-            #     requiere_respuesta=True  # Maya espera confirmación
-            # )
-        
-        return {
-            'status': 'success',
-            'recordatorios_enviados': recordatorios_enviados,
-            'fecha_ejecucion': ahora.isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            'status': 'error',
-            'error': str(e)
-        }
-    finally:
-        await conn.close()
+    return await _despachar(RECORDATORIO_2H)
 
 
 @celery_app.task(name='backend.tasks.notifications.alertar_productos_criticos')
@@ -256,7 +58,7 @@ def alertar_productos_criticos():
     """
     Tarea periódica: Revisa inventario y envía alertas de productos críticos
     """
-    return asyncio.run(_alertar_productos_criticos_async())
+    return run_async(_alertar_productos_criticos_async())
 
 
 async def _alertar_productos_criticos_async():
@@ -288,10 +90,11 @@ async def _alertar_productos_criticos_async():
             }
         
         # Crear notificación para el administrador
-        mensaje = f"⚠️ {len(productos_criticos)} productos requieren reabastecimiento:\n\n"
-        for p in productos_criticos[:10]:  # Top 10
-            deficit = p['stock_minimo'] - p['stock_actual']
-            mensaje += f"• {p['nombre']}: {p['stock_actual']:.1f} {p['unidad_medida']} (Falta: {deficit:.1f})\n"
+        mensaje = render(
+            'whatsapp/productos_criticos.txt',
+            total=len(productos_criticos),
+            productos=productos_criticos[:10],  # Top 10
+        )
         
         # Insertar notificación para usuarios admin
         await conn.execute("""
@@ -321,7 +124,7 @@ async def _alertar_productos_criticos_async():
             'error': str(e)
         }
     finally:
-        await conn.close()
+        await release_db_connection(conn)
 
 
 @celery_app.task(name='backend.tasks.notifications.enviar_seguimiento_tratamiento')
@@ -333,7 +136,7 @@ def enviar_seguimiento_tratamiento(cita_id: int, dias_despues: int = 7):
         cita_id: ID de la cita
         dias_despues: Días después de la cita para enviar seguimiento
     """
-    return asyncio.run(_enviar_seguimiento_async(cita_id, dias_despues))
+    return run_async(_enviar_seguimiento_async(cita_id, dias_despues))
 
 
 async def _enviar_seguimiento_async(cita_id: int, dias_despues: int):
@@ -411,7 +214,7 @@ async def _enviar_seguimiento_async(cita_id: int, dias_despues: int):
             'error': str(e)
         }
     finally:
-        await conn.close()
+        await release_db_connection(conn)
 
 
 @celery_app.task(name='backend.tasks.notifications.limpiar_notificaciones_antiguas')
@@ -419,7 +222,7 @@ def limpiar_notificaciones_antiguas(dias: int = 90):
     """
     Tarea periódica: Limpia notificaciones leídas antiguas (>90 días)
     """
-    return asyncio.run(_limpiar_notificaciones_async(dias))
+    return run_async(_limpiar_notificaciones_async(dias))
 
 
 async def _limpiar_notificaciones_async(dias: int):
@@ -450,4 +253,4 @@ async def _limpiar_notificaciones_async(dias: int):
             'error': str(e)
         }
     finally:
-        await conn.close()
+        await release_db_connection(conn)
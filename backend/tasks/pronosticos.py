@@ -0,0 +1,41 @@
+"""
+Tareas de pronósticos de demanda con Celery
+Recalcula y guarda los pronósticos que usa /analytics/metricas-predictivas
+"""
+
+from tasks.celery_app import celery_app
+from tasks.runtime import get_db_connection, release_db_connection, run_async
+from datetime import datetime
+
+
+@celery_app.task(name='backend.tasks.pronosticos.generar_pronosticos_demanda')
+def generar_pronosticos_demanda(meses_adelante: int = 3):
+    """
+    Tarea periódica: Pronostica la demanda de todos los servicios y la guarda
+    en pronosticos_demanda (ver analytics/pronosticos.py)
+    """
+    return run_async(_generar_pronosticos_demanda_async(meses_adelante))
+
+
+async def _generar_pronosticos_demanda_async(meses_adelante: int):
+    """Versión async de la generación de pronósticos"""
+    from analytics.pronosticos import generar_pronosticos
+
+    conn = await get_db_connection()
+
+    try:
+        servicios = await generar_pronosticos(conn, meses_adelante)
+
+        return {
+            'status': 'success',
+            'servicios': servicios,
+            'fecha_ejecucion': datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+    finally:
+        await release_db_connection(conn)
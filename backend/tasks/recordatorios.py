@@ -0,0 +1,335 @@
+"""
+Pipeline de recordatorios de citas
+==================================
+Despacho por lotes de los recordatorios 24h y 2h:
+
+1. Selección + reclamo en una sola consulta: las citas confirmadas de la
+   ventana se insertan en ``recordatorios_despachados``; en conflicto solo
+   se vuelven a reclamar las fallidas o atascadas. Solo las filas
+   reclamadas se procesan: la llave (id_cita, tipo) hace el envío
+   idempotente aunque dos workers corran a la vez
+   (data/migrations/24_recordatorios_despachados.sql).
+2. Mensajes renderizados con las plantillas compartidas
+   (plantillas/templates/whatsapp).
+3. Todas las notificaciones se insertan con ``copy_records_to_table``.
+4. Entrega por un canal intercambiable (stub, WhatsApp, email) con
+   concurrencia limitada por semáforo.
+5. El resultado de cada envío se guarda con un solo UPDATE sobre unnest.
+
+Un envío fallido queda en estado 'error' y se reintenta en la siguiente
+corrida hasta RECORDATORIOS_MAX_INTENTOS.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+import asyncpg
+from jinja2 import Template
+
+from plantillas import get_plantilla
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+RECORDATORIOS_CANAL = os.getenv("RECORDATORIOS_CANAL", "stub")
+RECORDATORIOS_CONCURRENCIA = int(os.getenv("RECORDATORIOS_CONCURRENCIA", "20"))
+RECORDATORIOS_MAX_INTENTOS = int(os.getenv("RECORDATORIOS_MAX_INTENTOS", "3"))
+
+_DIAS_ES = ('lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo')
+
+
+@dataclass(frozen=True)
+class TipoRecordatorio:
+    """Definición de un recordatorio: ventana de selección y plantilla."""
+
+    tipo: str
+    titulo: str
+    plantilla: Template
+    desde: timedelta
+    hasta: timedelta
+
+
+RECORDATORIO_24H = TipoRecordatorio(
+    tipo='recordatorio_cita_24h',
+    titulo='Recordatorio: Cita Mañana',
+    plantilla=get_plantilla('whatsapp/recordatorio_24h.txt'),
+    desde=timedelta(hours=24),
+    hasta=timedelta(hours=26),
+)
+
+RECORDATORIO_2H = TipoRecordatorio(
+    tipo='recordatorio_cita_2h',
+    titulo='Tu cita es pronto',
+    plantilla=get_plantilla('whatsapp/recordatorio_2h.txt'),
+    desde=timedelta(hours=2),
+    hasta=timedelta(hours=2, minutes=30),
+)
+
+
+def _tiempo_texto(fecha_cita: datetime, ahora: datetime) -> str:
+    segundos = (fecha_cita - ahora).total_seconds()
+    horas = int(segundos / 3600)
+    if horas <= 0:
+        return f"en {int((segundos % 3600) / 60)} minutos"
+    if horas == 1:
+        return "en 1 hora"
+    return f"en {horas} horas"
+
+
+def contexto_recordatorio(cita: Dict[str, Any], ahora: datetime) -> Dict[str, Any]:
+    """Valores para las plantillas a partir de una fila reclamada."""
+    inicio = cita['fecha_hora_inicio']
+    return {
+        'primer_nombre': cita['primer_nombre'],
+        'dia': _DIAS_ES[inicio.weekday()],
+        'fecha': inicio.strftime('%d/%m/%Y'),
+        'hora': inicio.strftime('%I:%M %p'),
+        'tiempo_texto': _tiempo_texto(inicio, ahora),
+        'podologo': cita['podologo_nombre'],
+    }
+
+
+# ============================================================================
+# CANALES DE ENTREGA
+# ============================================================================
+
+
+@dataclass
+class Recordatorio:
+    """Mensaje listo para entregar."""
+
+    id_cita: int
+    tipo: str
+    titulo: str
+    mensaje: str
+    telefono: Optional[str]
+    email: Optional[str]
+
+
+class CanalRecordatorio(Protocol):
+    """Un canal entrega un recordatorio o lanza excepción."""
+
+    nombre: str
+
+    async def enviar(self, recordatorio: Recordatorio) -> None:
+        ...
+
+
+class CanalStub:
+    """No entrega nada; solo registra. Default mientras no hay canal configurado."""
+
+    nombre = 'stub'
+
+    async def enviar(self, recordatorio: Recordatorio) -> None:
+        logger.debug(f"[stub] recordatorio {recordatorio.tipo} para cita {recordatorio.id_cita}")
+
+
+class CanalWhatsApp:
+    """Entrega por WhatsApp (Twilio)."""
+
+    nombre = 'whatsapp'
+
+    def __init__(self):
+        from services.twilio_service import get_twilio_service
+        self._twilio = get_twilio_service()
+
+    async def enviar(self, recordatorio: Recordatorio) -> None:
+        if not recordatorio.telefono:
+            raise ValueError("Paciente sin teléfono")
+        numero = recordatorio.telefono
+        if not numero.startswith("+"):
+            numero = f"+{numero}"
+        # El cliente de Twilio es síncrono: se ejecuta en un hilo
+        await asyncio.to_thread(
+            self._twilio.client.messages.create,
+            from_=f'whatsapp:{self._twilio.whatsapp_from}',
+            body=recordatorio.mensaje,
+            to=f'whatsapp:{numero}',
+        )
+
+
+class CanalEmail:
+    """Entrega por email."""
+
+    nombre = 'email'
+
+    async def enviar(self, recordatorio: Recordatorio) -> None:
+        from tasks.email_service import enviar_email
+
+        if not recordatorio.email:
+            raise ValueError("Paciente sin email")
+        html = recordatorio.mensaje.replace("\n", "<br>")
+        enviado = await asyncio.to_thread(enviar_email, recordatorio.email, recordatorio.titulo, html)
+        if not enviado:
+            raise RuntimeError("El servidor SMTP rechazó el envío")
+
+
+_CANALES = {
+    'stub': CanalStub,
+    'whatsapp': CanalWhatsApp,
+    'email': CanalEmail,
+}
+
+
+def get_canal(nombre: str = RECORDATORIOS_CANAL) -> CanalRecordatorio:
+    """Instancia el canal configurado (RECORDATORIOS_CANAL)."""
+    try:
+        return _CANALES[nombre]()
+    except KeyError:
+        raise ValueError(f"Canal de recordatorios desconocido: {nombre}")
+
+
+async def entregar(
+    canal: CanalRecordatorio,
+    recordatorios: List[Recordatorio],
+    concurrencia: int = RECORDATORIOS_CONCURRENCIA,
+) -> List[Tuple[int, str, Optional[str]]]:
+    """
+    Entrega los recordatorios con a lo sumo ``concurrencia`` envíos a la vez.
+
+    Returns:
+        Lista de (id_cita, estado, error) con estado 'enviado' o 'error'
+    """
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def uno(recordatorio: Recordatorio):
+        async with semaforo:
+            try:
+                await canal.enviar(recordatorio)
+                return recordatorio.id_cita, 'enviado', None
+            except Exception as e:
+                logger.warning(f"Error enviando recordatorio de cita {recordatorio.id_cita}: {e}")
+                return recordatorio.id_cita, 'error', str(e)
+
+    return await asyncio.gather(*(uno(r) for r in recordatorios))
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+_RECLAMAR_SQL = """
+    WITH candidatas AS (
+        SELECT c.id
+        FROM citas c
+        WHERE c.estado = 'Confirmada'
+          AND c.fecha_hora_inicio >= $1
+          AND c.fecha_hora_inicio < $2
+    ),
+    reclamadas AS (
+        INSERT INTO recordatorios_despachados AS r (id_cita, tipo, canal)
+        SELECT id, $3, $4 FROM candidatas
+        ON CONFLICT (id_cita, tipo) DO UPDATE SET
+            intentos = r.intentos + 1,
+            estado = 'pendiente',
+            error = NULL,
+            canal = EXCLUDED.canal,
+            reclamado_en = CURRENT_TIMESTAMP
+        WHERE (r.estado = 'error' AND r.intentos < $5)
+           OR (r.estado = 'pendiente' AND r.reclamado_en < CURRENT_TIMESTAMP - INTERVAL '15 minutes')
+        RETURNING r.id_cita, r.intentos
+    )
+    SELECT
+        c.id AS id_cita,
+        r.intentos,
+        c.fecha_hora_inicio,
+        p.primer_nombre,
+        p.telefono_principal AS telefono,
+        p.email,
+        pod.nombre_completo AS podologo_nombre,
+        u.nombre_usuario
+    FROM reclamadas r
+    JOIN citas c ON c.id = r.id_cita
+    JOIN pacientes p ON p.id = c.id_paciente
+    JOIN podologos pod ON pod.id = c.id_podologo
+    LEFT JOIN usuarios u ON u.id = pod.id_usuario
+"""
+
+_RESULTADOS_SQL = """
+    UPDATE recordatorios_despachados r SET
+        estado = u.estado,
+        error = u.error,
+        enviado_en = CASE WHEN u.estado = 'enviado' THEN CURRENT_TIMESTAMP END
+    FROM unnest($1::bigint[], $2::text[], $3::text[]) AS u(id_cita, estado, error)
+    WHERE r.id_cita = u.id_cita AND r.tipo = $4
+"""
+
+_COLUMNAS_NOTIFICACION = [
+    'usuario_id', 'tipo', 'titulo', 'mensaje',
+    'referencia_id', 'referencia_tipo', 'fecha_envio', 'leido',
+]
+
+
+async def despachar_recordatorios(
+    conn: asyncpg.Connection,
+    definicion: TipoRecordatorio,
+    canal: Optional[CanalRecordatorio] = None,
+    ahora: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Ejecuta el pipeline completo para un tipo de recordatorio.
+
+    Args:
+        conn: Conexión a la BD
+        definicion: RECORDATORIO_24H o RECORDATORIO_2H
+        canal: Canal de entrega (default: RECORDATORIOS_CANAL)
+        ahora: Momento de referencia (para pruebas)
+
+    Returns:
+        Dict con el conteo de enviados y errores
+    """
+    canal = canal or get_canal()
+    ahora = ahora or datetime.now()
+
+    async with conn.transaction():
+        citas = await conn.fetch(
+            _RECLAMAR_SQL,
+            ahora + definicion.desde,
+            ahora + definicion.hasta,
+            definicion.tipo,
+            canal.nombre,
+            RECORDATORIOS_MAX_INTENTOS,
+        )
+
+        recordatorios = [
+            Recordatorio(
+                id_cita=c['id_cita'],
+                tipo=definicion.tipo,
+                titulo=definicion.titulo,
+                mensaje=definicion.plantilla.render(contexto_recordatorio(c, ahora)),
+                telefono=c['telefono'],
+                email=c['email'],
+            )
+            for c in citas
+        ]
+
+        # Bandeja interna del podólogo (solo si tiene usuario y no es reintento)
+        fecha_envio = datetime.now(timezone.utc)
+        notificaciones = [
+            (c['nombre_usuario'], r.tipo, r.titulo, r.mensaje, r.id_cita, 'cita', fecha_envio, False)
+            for c, r in zip(citas, recordatorios)
+            if c['nombre_usuario'] and c['intentos'] == 1
+        ]
+        if notificaciones:
+            await conn.copy_records_to_table(
+                'notificaciones', records=notificaciones, columns=_COLUMNAS_NOTIFICACION
+            )
+
+    resultados = await entregar(canal, recordatorios)
+
+    if resultados:
+        ids, estados, errores = zip(*resultados)
+        await conn.execute(_RESULTADOS_SQL, list(ids), list(estados), list(errores), definicion.tipo)
+
+    enviados = sum(1 for _, estado, _ in resultados if estado == 'enviado')
+    return {
+        'status': 'success',
+        'canal': canal.nombre,
+        'recordatorios_enviados': enviados,
+        'errores': len(resultados) - enviados,
+        'fecha_ejecucion': ahora.isoformat(),
+    }
@@ -0,0 +1,150 @@
+"""
+Runtime async de los workers de Celery
+======================================
+Un event loop persistente por proceso worker, en un hilo dedicado, con su
+propio pool asyncpg:
+
+- ``worker_process_init``: crea el loop y el pool (una vez por proceso hijo)
+- ``worker_process_shutdown``: cierra el pool y detiene el loop
+- ``run_async(coro)``: ejecuta la corrutina en el loop del worker y espera
+  el resultado (reemplaza a ``asyncio.run`` en las tareas)
+- ``get_db_connection`` / ``release_db_connection``: conexión del pool del
+  worker
+
+Fuera de un worker prefork (tests, scripts, ``task_always_eager`` o pools
+``solo``/``threads``) el runtime no está iniciado: ``run_async`` usa
+``asyncio.run`` y las conexiones se abren y cierran directamente, como antes.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+import asyncpg
+from celery.signals import worker_process_init, worker_process_shutdown
+
+logger = logging.getLogger(__name__)
+
+# Configuración de base de datos
+DB_CONFIG = {
+    'host': os.getenv('POSTGRES_HOST', 'localhost'),
+    'port': int(os.getenv('POSTGRES_PORT', 5432)),
+    'database': os.getenv('POSTGRES_DB', 'podoskin_db'),
+    'user': os.getenv('POSTGRES_USER', 'podoskin_user'),
+    'password': os.getenv('POSTGRES_PASSWORD') or os.getenv('DB_PASSWORD'),  # Requerido
+}
+
+CELERY_DB_POOL_MIN = int(os.getenv("CELERY_DB_POOL_MIN", "1"))
+CELERY_DB_POOL_MAX = int(os.getenv("CELERY_DB_POOL_MAX", "5"))
+
+
+class WorkerRuntime:
+    """Event loop en un hilo propio + pool asyncpg ligado a ese loop."""
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pool: Optional[asyncpg.Pool] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.loop is not None and self.loop.is_running()
+
+    def start(self) -> None:
+        """Arranca el loop y crea el pool. Idempotente."""
+        if self.loop is not None:
+            return
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="celery-async-runtime", daemon=True
+        )
+        self._thread.start()
+
+        try:
+            self.pool = self.submit(_crear_pool())
+            logger.info(f"✅ Runtime async del worker iniciado (pid {os.getpid()})")
+        except Exception as e:
+            # Sin pool las tareas abren conexiones directas
+            logger.error(f"❌ No se pudo crear el pool del worker: {e}")
+
+    def submit(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """Ejecuta ``coro`` en el loop del runtime y bloquea hasta el resultado."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timeout, soft time limit de Celery, etc.: no dejar la corrutina viva
+            future.cancel()
+            raise
+
+    def stop(self) -> None:
+        """Cierra el pool y detiene el loop."""
+        if self.loop is None:
+            return
+
+        if self.pool is not None:
+            try:
+                self.submit(self.pool.close(), timeout=10)
+            except Exception as e:
+                logger.warning(f"Cierre del pool del worker forzado: {e}")
+                self.pool.terminate()
+            self.pool = None
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.loop.close()
+        self.loop = None
+        self._thread = None
+
+
+async def _crear_pool() -> asyncpg.Pool:
+    # El pool debe construirse dentro del loop que lo va a usar
+    return await asyncpg.create_pool(
+        **DB_CONFIG,
+        min_size=CELERY_DB_POOL_MIN,
+        max_size=CELERY_DB_POOL_MAX,
+        command_timeout=60,
+    )
+
+
+# Un runtime por proceso
+runtime = WorkerRuntime()
+
+
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Ejecuta una corrutina desde una tarea síncrona de Celery.
+
+    Usa el loop persistente del worker si está iniciado; si no, ``asyncio.run``.
+    """
+    if runtime.running:
+        return runtime.submit(coro)
+    return asyncio.run(coro)
+
+
+async def get_db_connection():
+    """Obtiene conexión a la base de datos (del pool del worker si existe)"""
+    if runtime.pool is not None and asyncio.get_running_loop() is runtime.loop:
+        return await runtime.pool.acquire()
+    return await asyncpg.connect(**DB_CONFIG)
+
+
+async def release_db_connection(conn) -> None:
+    """Devuelve la conexión al pool o la cierra si era directa"""
+    if isinstance(conn, asyncpg.pool.PoolConnectionProxy):
+        await runtime.pool.release(conn)
+    else:
+        await conn.close()
+
+
+@worker_process_init.connect
+def _iniciar_runtime(**kwargs):
+    runtime.start()
+
+
+@worker_process_shutdown.connect
+def _detener_runtime(**kwargs):
+    runtime.stop()
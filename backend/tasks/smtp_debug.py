@@ -0,0 +1,139 @@
+"""
+Servidor SMTP de depuración
+===========================
+Servidor SMTP mínimo en memoria para desarrollo y pruebas: acepta cualquier
+mensaje y lo guarda en ``mensajes``. No implementa STARTTLS ni AUTH, así que
+el pool se configura con ``starttls=False`` y sin usuario.
+
+Uso local (imprime cada mensaje recibido):
+    python -m tasks.smtp_debug --port 1025
+
+    SMTP_SERVER=localhost SMTP_PORT=1025 SMTP_STARTTLS=false SMTP_REQUIRE_AUTH=false
+
+En pruebas:
+    with ServidorSMTPDebug() as servidor:
+        pool = SMTPPool("127.0.0.1", servidor.port, starttls=False)
+        ...
+        assert len(servidor.mensajes) == 1
+"""
+
+import argparse
+import socketserver
+import threading
+from email import message_from_bytes
+from email.message import Message
+from typing import List, Optional
+
+
+class _Sesion(socketserver.StreamRequestHandler):
+    """Una sesión SMTP (subconjunto de RFC 5321)."""
+
+    def _responder(self, linea: str) -> None:
+        self.wfile.write(f"{linea}\r\n".encode())
+
+    def handle(self):
+        servidor: "ServidorSMTPDebug" = self.server.debug
+        servidor.sesiones += 1
+        self._responder("220 smtp-debug listo")
+        destinatarios = []
+
+        for crudo in self.rfile:
+            linea = crudo.decode(errors="replace").rstrip("\r\n")
+            comando = linea[:4].upper()
+
+            if comando in ("EHLO", "HELO"):
+                self._responder("250 smtp-debug")
+            elif comando == "MAIL":
+                destinatarios = []
+                self._responder("250 OK")
+            elif comando == "RCPT":
+                if servidor.fallos_pendientes > 0:
+                    servidor.fallos_pendientes -= 1
+                    self._responder("451 Intente más tarde")
+                    continue
+                destinatarios.append(linea.split(":", 1)[1].strip())
+                self._responder("250 OK")
+            elif comando == "DATA":
+                self._responder("354 Fin con <CRLF>.<CRLF>")
+                datos = []
+                for crudo_datos in self.rfile:
+                    if crudo_datos in (b".\r\n", b".\n"):
+                        break
+                    datos.append(crudo_datos[1:] if crudo_datos.startswith(b"..") else crudo_datos)
+                mensaje = message_from_bytes(b"".join(datos))
+                servidor.registrar(mensaje)
+                self._responder("250 OK en cola")
+            elif comando in ("RSET", "NOOP"):
+                destinatarios = []
+                self._responder("250 OK")
+            elif comando == "QUIT":
+                self._responder("221 Adiós")
+                return
+            else:
+                self._responder("502 Comando no implementado")
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ServidorSMTPDebug:
+    """
+    Servidor SMTP en un hilo.
+
+    Args:
+        host: Dirección de escucha
+        port: Puerto (0 = libre elegido por el sistema)
+        imprimir: Imprimir cada mensaje recibido
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, imprimir: bool = False):
+        self.imprimir = imprimir
+        self.mensajes: List[Message] = []
+        self.sesiones = 0
+        # Respuestas 451 a devolver en los próximos RCPT (para probar reintentos)
+        self.fallos_pendientes = 0
+        self._lock = threading.Lock()
+        self._servidor = _TCPServer((host, port), _Sesion)
+        self._servidor.debug = self
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._servidor.server_address[1]
+
+    def registrar(self, mensaje: Message) -> None:
+        with self._lock:
+            self.mensajes.append(mensaje)
+        if self.imprimir:
+            print(f"--- {mensaje['To']} | {mensaje['Subject']}")
+
+    def iniciar(self) -> "ServidorSMTPDebug":
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self) -> "ServidorSMTPDebug":
+        return self.iniciar()
+
+    def __exit__(self, *exc) -> None:
+        self.detener()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor SMTP de depuración")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+
+    servidor = ServidorSMTPDebug(args.host, args.port, imprimir=True)
+    print(f"SMTP de depuración escuchando en {args.host}:{servidor.port}")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.detener()
@@ -0,0 +1,263 @@
+"""
+Pool de conexiones SMTP
+=======================
+Conexiones SMTP autenticadas y reutilizables para el envío de emails:
+
+- ``SMTPPool``: hasta ``max_conexiones`` sesiones abiertas (starttls + login
+  una sola vez por sesión). Las sesiones ociosas se verifican con NOOP antes
+  de reutilizarse; una sesión que falla se descarta.
+- ``enviar_mensaje``: envío síncrono con reintentos y backoff exponencial
+  para errores transitorios (desconexión, timeouts, respuestas 4xx).
+- ``enviar_lote``: envío concurrente de muchos mensajes desde async, con
+  concurrencia acotada y métricas de throughput (emails/s).
+
+smtplib es bloqueante: cada envío corre en un hilo (``asyncio.to_thread``).
+"""
+
+import asyncio
+import logging
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.message import Message
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SMTPPoolStats:
+    """Contadores del pool."""
+
+    conexiones_creadas: int = 0
+    reutilizadas: int = 0
+    descartadas: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class SMTPPool:
+    """
+    Pool thread-safe de sesiones SMTP.
+
+    Args:
+        host: Servidor SMTP
+        port: Puerto
+        usuario: Usuario para login (vacío = sin autenticación)
+        password: Password
+        starttls: Ejecutar STARTTLS al conectar
+        max_conexiones: Sesiones simultáneas máximas
+        timeout: Timeout de socket en segundos
+        max_ocioso: Segundos sin uso tras los que se verifica la sesión con NOOP
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        usuario: str = "",
+        password: str = "",
+        starttls: bool = True,
+        max_conexiones: int = 4,
+        timeout: float = 30.0,
+        max_ocioso: float = 60.0,
+    ):
+        self.host = host
+        self.port = port
+        self.usuario = usuario
+        self.password = password
+        self.starttls = starttls
+        self.max_conexiones = max_conexiones
+        self.timeout = timeout
+        self.max_ocioso = max_ocioso
+        self.stats = SMTPPoolStats()
+        self._libres: "queue.LifoQueue" = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(max_conexiones)
+
+    def _conectar(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.usuario:
+                smtp.login(self.usuario, self.password)
+        except BaseException:
+            self._cerrar(smtp)
+            raise
+        self.stats.conexiones_creadas += 1
+        return smtp
+
+    @staticmethod
+    def _cerrar(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _tomar_libre(self) -> Optional[smtplib.SMTP]:
+        while True:
+            try:
+                smtp, ultimo_uso = self._libres.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - ultimo_uso <= self.max_ocioso:
+                return smtp
+            try:
+                smtp.noop()
+                return smtp
+            except Exception:
+                self.stats.descartadas += 1
+                self._cerrar(smtp)
+
+    @contextmanager
+    def conexion(self) -> Iterator[smtplib.SMTP]:
+        """
+        Presta una sesión autenticada.
+
+        Si el bloque lanza excepción la sesión se descarta, porque su estado
+        ya no es confiable.
+        """
+        self._cupos.acquire()
+        smtp = None
+        try:
+            smtp = self._tomar_libre()
+            if smtp is None:
+                smtp = self._conectar()
+            else:
+                self.stats.reutilizadas += 1
+            yield smtp
+            self._libres.put((smtp, time.monotonic()))
+        except BaseException:
+            if smtp is not None:
+                self.stats.descartadas += 1
+                self._cerrar(smtp)
+            raise
+        finally:
+            self._cupos.release()
+
+    def cerrar(self) -> None:
+        """Cierra todas las sesiones ociosas."""
+        while True:
+            try:
+                smtp, _ = self._libres.get_nowait()
+            except queue.Empty:
+                return
+            self._cerrar(smtp)
+
+
+def _es_transitorio(error: Exception) -> bool:
+    """Errores que vale la pena reintentar."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= codigo < 500 for codigo, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # SMTPException hereda de OSError: sin STARTTLS, sin método de
+    # autenticación, etc. son permanentes
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+def enviar_mensaje(
+    pool: SMTPPool,
+    mensaje: Message,
+    max_reintentos: int = 3,
+    backoff: float = 0.5,
+) -> int:
+    """
+    Envía un mensaje con reintentos.
+
+    Args:
+        pool: Pool de sesiones
+        mensaje: Mensaje con From/To/Subject
+        max_reintentos: Reintentos ante errores transitorios
+        backoff: Espera base en segundos (se duplica en cada reintento)
+
+    Returns:
+        Número de reintentos que fueron necesarios
+
+    Raises:
+        La última excepción si el error es permanente o se agotan los reintentos
+    """
+    for intento in range(max_reintentos + 1):
+        try:
+            with pool.conexion() as smtp:
+                smtp.send_message(mensaje)
+            return intento
+        except Exception as e:
+            if intento == max_reintentos or not _es_transitorio(e):
+                raise
+            espera = backoff * (2 ** intento)
+            logger.warning(f"Error SMTP transitorio ({e}); reintento en {espera:.1f}s")
+            time.sleep(espera)
+
+
+@dataclass
+class ResultadoLote:
+    """Resultado y métricas de un envío por lote."""
+
+    enviados: int = 0
+    fallidos: int = 0
+    reintentos: int = 0
+    segundos: float = 0.0
+    errores: List[str] = field(default_factory=list)
+
+    @property
+    def emails_por_segundo(self) -> float:
+        return round(self.enviados / self.segundos, 2) if self.segundos > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            'enviados': self.enviados,
+            'fallidos': self.fallidos,
+            'reintentos': self.reintentos,
+            'segundos': round(self.segundos, 3),
+            'emails_por_segundo': self.emails_por_segundo,
+        }
+
+
+async def enviar_lote(
+    pool: SMTPPool,
+    mensajes: List[Message],
+    concurrencia: Optional[int] = None,
+    max_reintentos: int = 3,
+    backoff: float = 0.5,
+) -> ResultadoLote:
+    """
+    Envía muchos mensajes reutilizando las sesiones del pool.
+
+    Args:
+        pool: Pool de sesiones
+        mensajes: Mensajes a enviar
+        concurrencia: Envíos simultáneos (default: ``pool.max_conexiones``)
+        max_reintentos: Reintentos por mensaje
+        backoff: Espera base de los reintentos
+
+    Returns:
+        ResultadoLote con conteos y emails/s
+    """
+    semaforo = asyncio.Semaphore(concurrencia or pool.max_conexiones)
+    resultado = ResultadoLote()
+
+    async def uno(mensaje: Message):
+        async with semaforo:
+            try:
+                resultado.reintentos += await asyncio.to_thread(
+                    enviar_mensaje, pool, mensaje, max_reintentos, backoff
+                )
+                resultado.enviados += 1
+            except Exception as e:
+                resultado.fallidos += 1
+                resultado.errores.append(f"{mensaje['To']}: {e}")
+                logger.error(f"❌ Error enviando email a {mensaje['To']}: {e}")
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uno(m) for m in mensajes))
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
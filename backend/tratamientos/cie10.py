@@ -0,0 +1,407 @@
+"""
+Búsqueda en el catálogo CIE-10
+==============================
+
+El catálogo es estático (~14k códigos), así que se carga una vez en memoria
+para el selector de diagnósticos, que busca en cada tecla:
+
+- Códigos: trie por carácter del código sin punto (``M72.2`` -> ``M722``);
+  cada nodo guarda sus códigos ya ordenados, así ``m7`` o ``M72.`` es un
+  recorrido de pocos nodos.
+- Descripción: índice invertido de tokens normalizados (sin acentos ni
+  palabras vacías) de descripción, categoría y subcategoría, con el
+  vocabulario ordenado para prefijos y trigramas para errores de tipeo
+  (mismos helpers que pacientes/busqueda.py).
+
+Orden de resultados: prefijo de código, luego todas las palabras como token
+completo, luego como prefijo, luego por similitud de trigramas. Dentro de
+cada grupo van primero las descripciones más cortas (las más específicas
+para lo escrito) y después por código.
+
+Mientras el catálogo no está cargado se busca en la BD con el índice GIN
+``to_tsvector('spanish', descripcion)`` de data/04_citas_tratamientos.sql.
+"""
+
+import asyncio
+import heapq
+import logging
+import re
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import db
+from pacientes.busqueda import UMBRAL_SIMILITUD, normalizar, trigramas
+
+logger = logging.getLogger(__name__)
+
+LIMITE_DEFAULT = 50
+
+COLUMNAS = "id, codigo, descripcion, categoria, subcategoria"
+
+# Palabras que no distinguen un diagnóstico de otro
+PALABRAS_VACIAS = frozenset({
+    "a", "al", "con", "de", "del", "el", "en", "la", "las", "lo", "los",
+    "o", "otra", "otras", "otro", "otros", "para", "por", "sin", "su", "u", "y",
+})
+
+_CODIGO = re.compile(r"^[A-Z][0-9]{0,2}(\.?[0-9]{0,4})$")
+_PALABRA_BD = re.compile(r"\w+")
+
+
+def clave_codigo(texto: str) -> Optional[str]:
+    """``m72.2`` -> ``M722``; None si el texto no puede ser (prefijo de) un código"""
+    compacto = texto.strip().upper().replace(" ", "")
+    if not _CODIGO.match(compacto):
+        return None
+    return compacto.replace(".", "")
+
+
+def _tokens(texto: Optional[str]) -> List[str]:
+    return [t for t in normalizar(texto).split() if t not in PALABRAS_VACIAS]
+
+
+class _Codigo:
+    """Entrada del catálogo"""
+
+    __slots__ = ("id", "codigo", "descripcion", "categoria", "subcategoria", "tokens", "orden")
+
+    def __init__(self, fila: Mapping[str, Any]):
+        self.id = int(fila["id"])
+        self.codigo = fila["codigo"]
+        self.descripcion = fila["descripcion"]
+        self.categoria = fila.get("categoria")
+        self.subcategoria = fila.get("subcategoria")
+        propios = _tokens(self.descripcion)
+        self.tokens: Tuple[str, ...] = tuple(
+            dict.fromkeys(propios + _tokens(self.categoria) + _tokens(self.subcategoria))
+        )
+        self.orden = (len(propios), self.codigo)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "codigo": self.codigo,
+            "descripcion": self.descripcion,
+            "categoria": self.categoria,
+            "subcategoria": self.subcategoria,
+        }
+
+
+class _Nodo:
+    __slots__ = ("hijos", "codigos")
+
+    def __init__(self):
+        self.hijos: Dict[str, "_Nodo"] = {}
+        self.codigos: List[_Codigo] = []
+
+
+@dataclass
+class Coincidencia:
+    """Resultado de una búsqueda"""
+
+    entrada: _Codigo
+    tipo: str  # "codigo", "exacto", "prefijo" o "similar"
+    similitud: float = 1.0
+
+
+class CatalogoCIE10:
+    """Catálogo CIE-10 en memoria."""
+
+    def __init__(self):
+        self.listo = False
+        # Entradas en orden de relevancia; los índices guardan posiciones
+        # en esta lista, así cualquier lista de posiciones ordenada ya está
+        # en el orden de los resultados
+        self._entradas: List[_Codigo] = []
+        self._por_codigo: Dict[str, _Codigo] = {}
+        self._trie = _Nodo()
+        # token -> posiciones ordenadas
+        self._postings: Dict[str, List[int]] = {}
+        self._vocabulario: List[str] = []
+        self._trigramas: Dict[str, Set[str]] = {}
+        self._carga: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def construir(self, filas: Iterable[Mapping[str, Any]]) -> None:
+        """Reemplaza el contenido con ``filas``"""
+        entradas = sorted((_Codigo(f) for f in filas), key=lambda c: c.orden)
+
+        postings: Dict[str, List[int]] = {}
+        for posicion, entrada in enumerate(entradas):
+            for token in entrada.tokens:
+                postings.setdefault(token, []).append(posicion)
+
+        trie = _Nodo()
+        for entrada in sorted(entradas, key=lambda c: c.codigo):
+            nodo = trie
+            for caracter in entrada.codigo.replace(".", ""):
+                nodo = nodo.hijos.setdefault(caracter, _Nodo())
+                nodo.codigos.append(entrada)
+
+        vocabulario = sorted(postings)
+        indice_trigramas: Dict[str, Set[str]] = {}
+        for token in vocabulario:
+            if token.isalpha():
+                for trigrama in trigramas(token):
+                    indice_trigramas.setdefault(trigrama, set()).add(token)
+
+        self._entradas = entradas
+        self._por_codigo = {c.codigo: c for c in entradas}
+        self._trie = trie
+        self._postings = postings
+        self._vocabulario = vocabulario
+        self._trigramas = indice_trigramas
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def por_codigo(self, codigo: str) -> Optional[_Codigo]:
+        return self._por_codigo.get(codigo.strip().upper())
+
+    def _prefijo_codigo(self, clave: str) -> List[_Codigo]:
+        nodo = self._trie
+        for caracter in clave:
+            nodo = nodo.hijos.get(caracter)
+            if nodo is None:
+                return []
+        return nodo.codigos
+
+    def similares(self, token: str, umbral: float = UMBRAL_SIMILITUD) -> Dict[str, float]:
+        """Tokens del vocabulario con similitud de trigramas >= umbral"""
+        propios = trigramas(token)
+        compartidos: Counter = Counter()
+        for trigrama in propios:
+            compartidos.update(self._trigramas.get(trigrama, ()))
+        resultado = {}
+        for candidato, n in compartidos.items():
+            # Un token de n letras tiene n + 1 trigramas
+            similitud = n / (len(propios) + len(candidato) + 1 - n)
+            if similitud >= umbral and candidato != token:
+                resultado[candidato] = similitud
+        return resultado
+
+    def _palabra(self, token: str) -> Optional[Tuple[str, List[str], Optional[Dict[str, float]]]]:
+        """Tokens que empiezan con la palabra o, si no hay, los similares"""
+        inicio = bisect_left(self._vocabulario, token)
+        fin = bisect_left(self._vocabulario, token + "\uffff", lo=inicio)
+        if inicio < fin:
+            return token, self._vocabulario[inicio:fin], None
+        if len(token) < 3 or not token.isalpha():
+            return None
+        parecidos = self.similares(token)
+        if not parecidos:
+            return None
+        return token, list(parecidos), parecidos
+
+    def buscar(self, texto: str, limite: int = LIMITE_DEFAULT) -> List[Coincidencia]:
+        """
+        Top ``limite`` códigos para lo escrito.
+
+        Primero los códigos que empiezan con el texto (si parece un código);
+        después los que contienen todas las palabras, como token completo,
+        como prefijo o por similitud.
+        """
+        if not texto or limite <= 0:
+            return []
+
+        resultados: List[Coincidencia] = []
+        clave = clave_codigo(texto)
+        if clave:
+            resultados = [Coincidencia(c, "codigo") for c in self._prefijo_codigo(clave)[:limite]]
+            if len(resultados) >= limite:
+                return resultados
+
+        # Una palabra vacía sola puede ser el inicio de otra (de -> dermatitis)
+        tokens = list(dict.fromkeys(_tokens(texto) or normalizar(texto).split()))
+        palabras = []
+        for token in tokens:
+            palabra = self._palabra(token)
+            if palabra is None:
+                return resultados
+            palabras.append(palabra)
+        if not palabras:
+            return resultados
+        palabras.sort(key=lambda p: len(p[1]))
+
+        vistos = {id(c.entrada) for c in resultados}
+        if len(palabras) == 1:
+            self._recorrer(palabras[0], resultados, vistos, limite)
+        else:
+            self._intersectar(palabras, resultados, vistos, limite)
+        return resultados
+
+    def _agregar(self, posiciones, tipo, resultados, vistos, limite, similitud=1.0) -> bool:
+        """Agrega en orden hasta llenar el límite; retorna si se llenó"""
+        for posicion in posiciones:
+            entrada = self._entradas[posicion]
+            if id(entrada) in vistos:
+                continue
+            vistos.add(id(entrada))
+            resultados.append(Coincidencia(entrada, tipo, similitud))
+            if len(resultados) >= limite:
+                return True
+        return False
+
+    def _recorrer(self, palabra, resultados, vistos, limite) -> None:
+        """Una palabra: mezcla de listas ya ordenadas, se para al llenar el límite"""
+        token, vocab, parecidos = palabra
+        if parecidos is None:
+            if self._agregar(self._postings.get(token, ()), "exacto", resultados, vistos, limite):
+                return
+            otros = [self._postings[t] for t in vocab if t != token]
+            self._agregar(heapq.merge(*otros), "prefijo", resultados, vistos, limite)
+            return
+
+        # Similares: de mayor a menor similitud; basta el inicio de cada lista
+        faltan = limite - len(resultados)
+        puntuados = heapq.nsmallest(
+            faltan + len(vistos),
+            ((-parecidos[t], posicion) for t in vocab for posicion in self._postings[t][:faltan + len(vistos)]),
+        )
+        for menos_similitud, posicion in puntuados:
+            if self._agregar((posicion,), "similar", resultados, vistos, limite, -menos_similitud):
+                return
+
+    def _intersectar(self, palabras, resultados, vistos, limite) -> None:
+        """Varias palabras: intersección de posiciones, de la más selectiva a la menos"""
+        candidatos: Optional[Set[int]] = None
+        for _, vocab, _ in palabras:
+            conjunto: Set[int] = set()
+            for t in vocab:
+                if candidatos is None:
+                    conjunto.update(self._postings[t])
+                else:
+                    conjunto |= candidatos.intersection(self._postings[t])
+            candidatos = conjunto
+            if not candidatos:
+                return
+
+        similares = [p[2] for p in palabras if p[2] is not None]
+        if similares:
+            # Alguna palabra no existe tal cual: el grupo es "similar"
+            puntuados = []
+            for posicion in candidatos:
+                tokens = self._entradas[posicion].tokens
+                similitud = min(max((p.get(t, 0.0) for t in tokens), default=0.0) for p in similares)
+                puntuados.append((-similitud, posicion))
+            for menos_similitud, posicion in heapq.nsmallest(limite, puntuados):
+                if self._agregar((posicion,), "similar", resultados, vistos, limite, -menos_similitud):
+                    return
+            return
+
+        exactos = candidatos
+        for token, _, _ in palabras:
+            exactos = exactos.intersection(self._postings.get(token, ()))
+        for grupo, tipo in ((exactos, "exacto"), (candidatos - exactos, "prefijo")):
+            faltan = limite - len(resultados)
+            if faltan <= 0 or self._agregar(
+                heapq.nsmallest(faltan + len(vistos), grupo), tipo, resultados, vistos, limite
+            ):
+                return
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    async def cargar(self) -> int:
+        """Carga los códigos activos desde la BD"""
+        filas = await db.fetch_all(f"SELECT {COLUMNAS} FROM catalogo_cie10 WHERE activo = true")
+        nuevo = CatalogoCIE10()
+        # construir es CPU puro (~0.4 s con 14k códigos): en un hilo el loop sigue atendiendo
+        await asyncio.to_thread(nuevo.construir, filas)
+        self._entradas = nuevo._entradas
+        self._por_codigo = nuevo._por_codigo
+        self._trie = nuevo._trie
+        self._postings = nuevo._postings
+        self._vocabulario = nuevo._vocabulario
+        self._trigramas = nuevo._trigramas
+        self.listo = True
+        logger.info(f"[CIE-10] Catálogo en memoria: {len(self)} códigos")
+        return len(self)
+
+    def iniciar(self) -> None:
+        """Carga el catálogo en segundo plano"""
+        if self._carga is not None:
+            return
+
+        async def _cargar():
+            try:
+                await self.cargar()
+            except Exception as e:
+                logger.error(f"[CIE-10] Error cargando catálogo: {e}")
+
+        self._carga = asyncio.get_running_loop().create_task(_cargar())
+
+    async def detener(self) -> None:
+        if self._carga is not None:
+            self._carga.cancel()
+            self._carga = None
+        self.listo = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "listo": self.listo,
+            "codigos": len(self._entradas),
+            "tokens": len(self._vocabulario),
+            "trigramas": len(self._trigramas),
+        }
+
+
+# Instancia compartida por el proceso
+catalogo_cie10 = CatalogoCIE10()
+
+
+# ============================================================================
+# BÚSQUEDA CON RESPALDO EN BD
+# ============================================================================
+
+
+async def buscar_cie10(texto: str, limite: int = LIMITE_DEFAULT) -> List[Dict[str, Any]]:
+    """
+    Códigos CIE-10 activos que coinciden con ``texto`` (ya ordenados).
+
+    Usa el catálogo en memoria si está cargado; si no, el índice de texto
+    completo de la descripción más el prefijo de código.
+    """
+    if catalogo_cie10.listo:
+        return [c.entrada.as_dict() for c in catalogo_cie10.buscar(texto, limite)]
+
+    # Prefijo de código tal como está guardado: M722 -> M72.2%
+    clave = clave_codigo(texto)
+    patron = None
+    if clave:
+        patron = clave[:3] + ("." + clave[3:] if len(clave) > 3 else "") + "%"
+    # Cada palabra de letras como prefijo: fasc:* & plant:* (una sola letra o
+    # un código no pasan al índice de texto: coincidirían con casi todo)
+    palabras = [
+        p for p in _PALABRA_BD.findall(texto.lower())
+        if p.isalpha() and len(p) > 1 and p not in PALABRAS_VACIAS
+    ]
+    consulta_ts = " & ".join(f"{p}:*" for p in palabras)
+    if not consulta_ts and not patron:
+        return []
+    filas = await db.fetch_all(
+        f"""
+        SELECT {COLUMNAS}
+        FROM catalogo_cie10
+        WHERE activo = true
+        AND (
+            codigo LIKE $1
+            OR ($2 <> '' AND to_tsvector('spanish', descripcion) @@ to_tsquery('spanish', $2))
+        )
+        ORDER BY
+            (codigo LIKE $1) IS TRUE DESC,
+            CASE WHEN $2 <> '' THEN ts_rank(to_tsvector('spanish', descripcion), to_tsquery('spanish', $2)) END DESC,
+            codigo
+        LIMIT $3
+        """,
+        patron,
+        consulta_ts,
+        limite,
+    )
+    return filas
@@ -10,7 +10,8 @@ import logging
 from typing import List, Optional, Dict, Any, Tuple
 from decimal import Decimal
 
-from .database import execute_query, execute_mutation
+from .cie10 import buscar_cie10, catalogo_cie10
+from .database import execute_query, execute_query_one, execute_mutation
 
 logger = logging.getLogger(__name__)
 
@@ -417,10 +418,13 @@ async def get_cie10_descripcion(codigo_cie10: str) -> Optional[str]:
     Returns:
         Descripción del código o None si no existe
     """
-    cie10 = await execute_query(
-        "SELECT descripcion FROM catalogo_cie10 WHERE codigo = %s AND activo = true",
-        (codigo_cie10,),
-        fetch_one=True
+    if catalogo_cie10.listo:
+        entrada = catalogo_cie10.por_codigo(codigo_cie10)
+        return entrada.descripcion if entrada else None
+
+    cie10 = await execute_query_one(
+        "SELECT descripcion FROM catalogo_cie10 WHERE codigo = $1 AND activo = true",
+        (codigo_cie10.strip().upper(),)
     )
     
     return cie10["descripcion"] if cie10 else None
@@ -513,29 +517,16 @@ async def create_diagnostico(
 async def search_cie10(search: str, limit: int = 50) -> List[Dict[str, Any]]:
     """
     Busca códigos CIE-10 por código, descripción o categoría.
+
+    Usa el catálogo en memoria de cie10.py (prefijo de código, tokens sin
+    acentos y similitud de trigramas), con respaldo en el índice de texto
+    completo de la BD mientras se carga.
     
     Args:
         search: Término de búsqueda
         limit: Número máximo de resultados
         
     Returns:
-        Lista de códigos CIE-10 coincidentes
+        Lista de códigos CIE-10 coincidentes, los más relevantes primero
     """
-    query = """
-        SELECT id, codigo, descripcion, categoria, subcategoria
-        FROM catalogo_cie10
-        WHERE activo = true
-          AND (
-              codigo ILIKE %s
-              OR descripcion ILIKE %s
-              OR categoria ILIKE %s
-          )
-        ORDER BY codigo
-        LIMIT %s
-    """
-    
-    search_pattern = f"%{search}%"
-    params = (search_pattern, search_pattern, search_pattern, limit)
-    
-    resultados = await execute_query(query, params)
-    return resultados or []
+    return await buscar_cie10(search, limit)
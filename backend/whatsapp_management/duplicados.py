@@ -0,0 +1,343 @@
+"""
+Duplicados en aprendizajes y knowledge base
+===========================================
+
+Muchas entradas de ``aprendizajes_agente``, ``knowledge_base`` y
+``knowledge_base_validated`` son paráfrasis de la misma pregunta; agrandan cada búsqueda por similitud y
+diluyen el top-k. Este módulo:
+
+- Carga los embeddings del modelo actual en una matriz float32 normalizada
+  y calcula la similitud coseno de todos los pares por bloques
+  (``M[i:i+b] @ M[j:j+b].T`` con j >= i), quedándose con los pares
+  >= DUPLICADOS_UMBRAL.
+- Agrupa los pares en clusters (componentes conexas) y sugiere una entrada
+  canónica por cluster: la más usada/validada y, a igualdad, la más
+  cercana al resto del cluster.
+- ``fusionar``: suma los contadores de uso en la canónica, reapunta las
+  referencias y borra las demás.
+- ``DetectorDuplicados``: lo usa el indexador de embeddings para marcar
+  ``duplicado_de`` en las filas nuevas (data/migrations/32_duplicados_aprendizajes.sql).
+
+Endpoints: GET /api/whatsapp/learning/duplicados y
+POST /api/whatsapp/learning/duplicados/fusionar.
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+import db
+from .indexador_embeddings import EMBEDDINGS_MODELO, TABLAS
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+DUPLICADOS_UMBRAL = float(os.getenv("DUPLICADOS_UMBRAL", "0.92"))
+DUPLICADOS_BLOQUE = int(os.getenv("DUPLICADOS_BLOQUE", "2048"))
+DUPLICADOS_AL_INDEXAR = os.getenv("DUPLICADOS_AL_INDEXAR", "true").lower() == "true"
+
+# tabla -> columna con la pregunta (las mismas que indexa el indexador)
+COLUMNAS = TABLAS
+
+# tabla -> criterio de la entrada canónica (mayor gana, en orden)
+USO = {
+    "aprendizajes_agente": (
+        "ARRAY[COALESCE(validado, false)::int, COALESCE(veces_utilizado, 0), COALESCE(efectividad, 0)]::float8[]"
+    ),
+    "knowledge_base": "ARRAY[COALESCE(veces_consultada, 0), COALESCE(confianza, 0)]::float8[]",
+    "knowledge_base_validated": (
+        "ARRAY[COALESCE(aprobado, false)::int, COALESCE(veces_consultada, 0), COALESCE(efectividad_score, 0)]::float8[]"
+    ),
+}
+
+# tabla -> SET de la canónica a partir de las filas fusionadas (alias d)
+_FUSION_SET = {
+    "aprendizajes_agente": """
+        veces_utilizado = COALESCE(t.veces_utilizado, 0) + d.veces_utilizado,
+        validado = COALESCE(t.validado, false) OR d.validado,
+        palabras_clave = d.palabras_clave,
+        tags = d.tags,
+        fecha_ultimo_uso = GREATEST(t.fecha_ultimo_uso, d.fecha_ultimo_uso),
+        fecha_actualizacion = NOW()
+    """,
+    "knowledge_base": """
+        veces_consultada = COALESCE(t.veces_consultada, 0) + d.veces_consultada,
+        confianza = GREATEST(t.confianza, d.confianza),
+        fecha_actualizacion = NOW()
+    """,
+    "knowledge_base_validated": """
+        veces_consultada = COALESCE(t.veces_consultada, 0) + d.veces_consultada,
+        feedback_positivo = COALESCE(t.feedback_positivo, 0) + d.feedback_positivo,
+        feedback_negativo = COALESCE(t.feedback_negativo, 0) + d.feedback_negativo,
+        aprobado = COALESCE(t.aprobado, false) OR d.aprobado,
+        fecha_ultimo_uso = GREATEST(t.fecha_ultimo_uso, d.fecha_ultimo_uso),
+        fecha_actualizacion = NOW()
+    """,
+}
+
+_FUSION_AGREGADOS = {
+    "aprendizajes_agente": """
+        SELECT COALESCE(sum(veces_utilizado) FILTER (WHERE id <> $1), 0) AS veces_utilizado,
+               COALESCE(bool_or(validado) FILTER (WHERE id <> $1), false) AS validado,
+               ARRAY(SELECT DISTINCT unnest(palabras_clave) FROM aprendizajes_agente WHERE id = ANY($2)) AS palabras_clave,
+               ARRAY(SELECT DISTINCT unnest(tags) FROM aprendizajes_agente WHERE id = ANY($2)) AS tags,
+               max(fecha_ultimo_uso) AS fecha_ultimo_uso
+        FROM aprendizajes_agente WHERE id = ANY($2)
+    """,
+    "knowledge_base": """
+        SELECT COALESCE(sum(veces_consultada) FILTER (WHERE id <> $1), 0) AS veces_consultada,
+               max(confianza) AS confianza
+        FROM knowledge_base WHERE id = ANY($2)
+    """,
+    "knowledge_base_validated": """
+        SELECT COALESCE(sum(veces_consultada) FILTER (WHERE id <> $1), 0) AS veces_consultada,
+               COALESCE(sum(feedback_positivo) FILTER (WHERE id <> $1), 0) AS feedback_positivo,
+               COALESCE(sum(feedback_negativo) FILTER (WHERE id <> $1), 0) AS feedback_negativo,
+               COALESCE(bool_or(aprobado) FILTER (WHERE id <> $1), false) AS aprobado,
+               max(fecha_ultimo_uso) AS fecha_ultimo_uso
+        FROM knowledge_base_validated WHERE id = ANY($2)
+    """,
+}
+
+# Otras tablas que apuntan a la fila fusionada: (tabla, columna)
+_REFERENCIAS = {
+    "aprendizajes_agente": [
+        ("aprendizajes_agente", "id_version_anterior"),
+        ("dudas_pendientes", "id_aprendizaje"),
+    ],
+    "knowledge_base": [],
+    "knowledge_base_validated": [],
+}
+
+
+def _validar_tabla(tabla: str) -> str:
+    if tabla not in COLUMNAS:
+        raise ValueError(f"Tabla sin deduplicación: {tabla}")
+    return tabla
+
+
+def matriz_normalizada(vectores: Sequence[Sequence[float]]) -> np.ndarray:
+    """Vectores como filas float32 de norma 1 (similitud coseno = producto punto)"""
+    matriz = np.asarray(vectores, dtype=np.float32)
+    if matriz.ndim != 2:
+        return matriz.reshape(0, 0)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+def pares_similares(
+    matriz: np.ndarray, umbral: float, bloque: int = DUPLICADOS_BLOQUE
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pares (i, j), i < j, con similitud >= umbral.
+
+    Recorre el triángulo superior en bloques de ``bloque`` x ``bloque``: la
+    memoria queda acotada (16 MB con 2048) y cada bloque es un solo matmul.
+    """
+    n = len(matriz)
+    filas, columnas, similitudes = [], [], []
+    for i in range(0, n, bloque):
+        a = matriz[i:i + bloque]
+        for j in range(i, n, bloque):
+            s = a @ matriz[j:j + bloque].T
+            if i == j:
+                # Solo por encima de la diagonal
+                s = np.triu(s, k=1)
+            fi, fj = np.nonzero(s >= umbral)
+            if len(fi):
+                filas.append(fi + i)
+                columnas.append(fj + j)
+                similitudes.append(s[fi, fj])
+    if not filas:
+        vacio = np.empty(0, dtype=np.int64)
+        return vacio, vacio, np.empty(0, dtype=np.float32)
+    return np.concatenate(filas), np.concatenate(columnas), np.concatenate(similitudes)
+
+
+def agrupar(n: int, filas: np.ndarray, columnas: np.ndarray) -> List[np.ndarray]:
+    """Componentes conexas del grafo de pares; solo grupos de 2 o más"""
+    if not len(filas):
+        return []
+    grafo = coo_matrix((np.ones(len(filas), dtype=np.int8), (filas, columnas)), shape=(n, n))
+    _, etiquetas = connected_components(grafo, directed=False)
+    orden = np.argsort(etiquetas, kind="stable")
+    cortes = np.flatnonzero(np.diff(etiquetas[orden])) + 1
+    return [g for g in np.split(orden, cortes) if len(g) > 1]
+
+
+def elegir_canonico(matriz: np.ndarray, miembros: np.ndarray, uso: Sequence[Sequence[float]]) -> Tuple[int, np.ndarray]:
+    """
+    Índice (dentro de ``miembros``) de la entrada canónica y la similitud de
+    cada miembro con ella. Gana el mayor ``uso`` (lexicográfico) y, a
+    igualdad, la similitud media con el resto del cluster.
+    """
+    sub = matriz[miembros]
+    similitud = sub @ sub.T
+    centralidad = (similitud.sum(axis=1) - 1) / max(len(miembros) - 1, 1)
+    mejor = max(range(len(miembros)), key=lambda k: (tuple(uso[k]), centralidad[k]))
+    return mejor, similitud[mejor]
+
+
+def _clusters(
+    filas: List[Dict[str, Any]], matriz: np.ndarray, umbral: float, bloque: int = DUPLICADOS_BLOQUE
+) -> List[Dict[str, Any]]:
+    """Cálculo en CPU (se corre en un hilo)"""
+    i, j, _ = pares_similares(matriz, umbral, bloque)
+    resultado = []
+    for miembros in agrupar(len(filas), i, j):
+        canonico, similitud = elegir_canonico(matriz, miembros, [filas[m]["uso"] for m in miembros])
+        entradas = [
+            {
+                "id": filas[m]["id"],
+                "pregunta": filas[m]["texto"],
+                "duplicado_de": filas[m]["duplicado_de"],
+                "similitud": round(float(s), 4),
+            }
+            for m, s in zip(miembros, similitud)
+        ]
+        entradas.sort(key=lambda e: -e["similitud"])
+        resultado.append({
+            "canonico_id": filas[miembros[canonico]]["id"],
+            "tamano": len(miembros),
+            "similitud_minima": round(float(similitud.min()), 4),
+            "miembros": entradas,
+        })
+    resultado.sort(key=lambda c: -c["tamano"])
+    return resultado
+
+
+async def cargar(tabla: str, conn=None) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """Filas con embedding del modelo actual y su matriz normalizada"""
+    _validar_tabla(tabla)
+    consulta = f"""
+        SELECT id, {COLUMNAS[tabla]} AS texto, duplicado_de, {USO[tabla]} AS uso, pregunta_embedding
+        FROM {tabla}
+        WHERE pregunta_embedding IS NOT NULL AND pregunta_embedding_modelo = $1
+        ORDER BY id
+    """
+    if conn is not None:
+        registros = [dict(r) for r in await conn.fetch(consulta, EMBEDDINGS_MODELO)]
+    else:
+        registros = await db.fetch_all(consulta, EMBEDDINGS_MODELO)
+
+    def _matriz():
+        return matriz_normalizada([pickle.loads(r.pop("pregunta_embedding")) for r in registros])
+
+    return registros, await asyncio.to_thread(_matriz)
+
+
+async def detectar_clusters(tabla: str, umbral: Optional[float] = None) -> Dict[str, Any]:
+    """Clusters de paráfrasis con su entrada canónica sugerida"""
+    umbral = DUPLICADOS_UMBRAL if umbral is None else umbral
+    filas, matriz = await cargar(tabla)
+    clusters = await asyncio.to_thread(_clusters, filas, matriz, umbral) if filas else []
+    return {
+        "tabla": tabla,
+        "modelo": EMBEDDINGS_MODELO,
+        "umbral": umbral,
+        "entradas": len(filas),
+        "duplicadas": sum(c["tamano"] - 1 for c in clusters),
+        "clusters": clusters,
+    }
+
+
+async def fusionar(tabla: str, canonico_id: int, ids: List[int]) -> Dict[str, Any]:
+    """
+    Fusiona ``ids`` en ``canonico_id``: suma sus contadores de uso en la
+    canónica, reapunta las referencias y los borra.
+    """
+    _validar_tabla(tabla)
+    ids = sorted(set(ids) - {canonico_id})
+    if not ids:
+        raise ValueError("No hay entradas para fusionar")
+    todos = [canonico_id, *ids]
+
+    conn = await db.get_connection()
+    try:
+        async with conn.transaction():
+            # Bloquea las filas para que no cambien mientras se fusionan
+            existentes = await conn.fetch(
+                f"SELECT id FROM {tabla} WHERE id = ANY($1::int[]) FOR UPDATE", todos
+            )
+            faltantes = set(todos) - {r["id"] for r in existentes}
+            if faltantes:
+                raise ValueError(f"Entradas inexistentes en {tabla}: {sorted(faltantes)}")
+
+            await conn.execute(
+                f"""
+                UPDATE {tabla} t
+                SET {_FUSION_SET[tabla]}, duplicado_de = NULL
+                FROM ({_FUSION_AGREGADOS[tabla]}) d
+                WHERE t.id = $1
+                """,
+                canonico_id, todos,
+            )
+            for referencia, columna in [*_REFERENCIAS[tabla], (tabla, "duplicado_de")]:
+                await conn.execute(
+                    f"UPDATE {referencia} SET {columna} = $1 WHERE {columna} = ANY($2::int[])",
+                    canonico_id, ids,
+                )
+            estado = await conn.execute(f"DELETE FROM {tabla} WHERE id = ANY($1::int[])", ids)
+    finally:
+        await db.release_connection(conn)
+
+    eliminadas = int(estado.split()[-1])
+    logger.info(f"[Duplicados] {tabla}: {eliminadas} entradas fusionadas en #{canonico_id}")
+    return {"tabla": tabla, "canonico_id": canonico_id, "fusionadas": eliminadas}
+
+
+class DetectorDuplicados:
+    """
+    Marca ``duplicado_de`` en las filas que indexa el indexador de
+    embeddings: compara cada lote contra las entradas ya indexadas y contra
+    las anteriores del mismo lote. Solo se apunta a entradas más antiguas
+    (id menor); si esa ya era duplicado, a su original.
+    """
+
+    def __init__(self, ids: Sequence[int], matriz: np.ndarray, originales: Dict[int, int], umbral: float = DUPLICADOS_UMBRAL):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.matriz = matriz if len(self.ids) else np.empty((0, 0), dtype=np.float32)
+        self.originales = originales
+        self.umbral = umbral
+
+    @classmethod
+    async def crear(cls, conn, tabla: str) -> "DetectorDuplicados":
+        filas, matriz = await cargar(tabla, conn)
+        originales = {f["id"]: f["duplicado_de"] for f in filas if f["duplicado_de"] is not None}
+        return cls([f["id"] for f in filas], matriz, originales)
+
+    def revisar(self, ids: Sequence[int], vectores: Sequence[Sequence[float]]) -> List[Optional[int]]:
+        """``duplicado_de`` de cada fila del lote (None si no se parece a ninguna)"""
+        nuevos = matriz_normalizada(vectores)
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return []
+        # Las filas re-indexadas reemplazan su vector anterior
+        conservar = ~np.isin(self.ids, ids)
+        base_ids = np.concatenate([self.ids[conservar], ids])
+        base = nuevos if not len(self.ids) else np.concatenate([self.matriz[conservar], nuevos])
+
+        similitud = nuevos @ base.T
+        similitud[base_ids[None, :] >= ids[:, None]] = -1.0
+        mejores = similitud.argmax(axis=1)
+
+        resultado = []
+        for k, mejor in enumerate(mejores):
+            duplicado_de = None
+            if similitud[k, mejor] >= self.umbral:
+                candidato = int(base_ids[mejor])
+                duplicado_de = self.originales.get(candidato, candidato)
+                self.originales[int(ids[k])] = duplicado_de
+            else:
+                self.originales.pop(int(ids[k]), None)
+            resultado.append(duplicado_de)
+
+        self.ids, self.matriz = base_ids, base
+        return resultado
@@ -0,0 +1,276 @@
+"""
+Indexador de embeddings
+=======================
+
+Calcula ``pregunta_embedding`` de ``aprendizajes_agente``,
+``knowledge_base`` y ``knowledge_base_validated`` por lotes, en lugar de
+una llamada al modelo por fila:
+
+- Pendientes: filas sin embedding o con ``pregunta_embedding_modelo``
+  distinto de EMBEDDINGS_MODELO (data/migrations/31_embeddings_modelo.sql y
+  34_embeddings_modelo_kb_validada.sql; el trigger borra la versión cuando
+  cambia la pregunta).
+- Se leen EMBEDDINGS_LOTE filas por id (keyset), se codifican en un solo
+  ``encode(batch_size=EMBEDDINGS_BATCH_SIZE)`` en un hilo y se escriben con
+  ``copy_records_to_table`` a una tabla temporal + un ``UPDATE ... FROM``
+  por lote. Si la pregunta cambió mientras se codificaba, esa fila no se
+  escribe y queda pendiente para la siguiente corrida.
+- Reanudable: cada lote se confirma por separado y lo ya escrito deja de
+  estar pendiente, así que una corrida interrumpida sigue donde quedó.
+- Un solo worker a la vez (advisory lock de sesión).
+- Con DUPLICADOS_AL_INDEXAR cada fila indexada se compara contra las ya
+  indexadas y queda ``duplicado_de`` la más antigua con similitud
+  >= DUPLICADOS_UMBRAL (ver duplicados.py).
+
+Se dispara desde POST /api/whatsapp/learning/embeddings/reindexar y al
+arrancar si hay pendientes (p.ej. tras cambiar EMBEDDINGS_MODELO). El
+formato es el de ``EmbeddingsService.embed_to_bytes`` (lista pickleada).
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import db
+
+logger = logging.getLogger(__name__)
+
+# Configuración (mismo modelo que agents/whatsapp_medico/utils/embeddings.py)
+EMBEDDINGS_MODELO = os.getenv("EMBEDDINGS_MODELO", "all-MiniLM-L6-v2")
+EMBEDDINGS_LOTE = int(os.getenv("EMBEDDINGS_LOTE", "512"))
+EMBEDDINGS_BATCH_SIZE = int(os.getenv("EMBEDDINGS_BATCH_SIZE", "64"))
+EMBEDDINGS_INDEXAR_AL_INICIAR = os.getenv("EMBEDDINGS_INDEXAR_AL_INICIAR", "true").lower() == "true"
+
+# tabla -> columna con el texto a codificar
+TABLAS = {
+    "aprendizajes_agente": "pregunta_original",
+    "knowledge_base": "pregunta",
+    "knowledge_base_validated": "pregunta",
+}
+
+_LOCK = "indexador_embeddings"
+
+Codificador = Callable[[List[str], int], Sequence[Sequence[float]]]
+
+
+def _codificar_modelo(textos: List[str], batch_size: int) -> List[List[float]]:
+    """Embeddings con el modelo local (se carga la primera vez)"""
+    from agents.whatsapp_medico.utils.embeddings import get_embeddings_service
+
+    return get_embeddings_service().embed_documents(textos, batch_size=batch_size)
+
+
+def _pendientes_sql(tabla: str, columna: str) -> str:
+    """$1 último id, $2 modelo, $3 límite, $4 forzar (todas las filas)"""
+    return f"""
+        SELECT id, {columna} AS texto
+        FROM {tabla}
+        WHERE id > $1 AND {columna} IS NOT NULL
+          AND ($4 OR pregunta_embedding IS NULL OR pregunta_embedding_modelo IS DISTINCT FROM $2)
+        ORDER BY id
+        LIMIT $3
+    """
+
+
+def _validar_tablas(tablas: Optional[List[str]]) -> List[str]:
+    tablas = tablas or list(TABLAS)
+    desconocidas = set(tablas) - set(TABLAS)
+    if desconocidas:
+        raise ValueError(f"Tablas no indexables: {', '.join(sorted(desconocidas))}")
+    return tablas
+
+
+class IndexadorEmbeddings:
+    """Job de re-indexado; una instancia por proceso"""
+
+    def __init__(self, codificar: Optional[Codificador] = None, detectar_duplicados: Optional[bool] = None):
+        self._codificar = codificar or _codificar_modelo
+        # None: según DUPLICADOS_AL_INDEXAR
+        self._detectar_duplicados = detectar_duplicados
+        self._tarea: Optional[asyncio.Task] = None
+        # Solicitudes llegadas durante una corrida: forzar y tablas acumulados
+        self._pendiente: Optional[Dict[str, Any]] = None
+        self.estado: Dict[str, Any] = {"en_curso": False, "modelo": EMBEDDINGS_MODELO}
+
+    @property
+    def en_curso(self) -> bool:
+        return self._tarea is not None and not self._tarea.done()
+
+    async def pendientes(self) -> Dict[str, int]:
+        """Filas sin embedding o con otro modelo, por tabla"""
+        resultado = {}
+        for tabla in TABLAS:
+            fila = await db.fetch_one(
+                f"""
+                SELECT count(*) AS total FROM {tabla}
+                WHERE pregunta_embedding IS NULL OR pregunta_embedding_modelo IS DISTINCT FROM $1
+                """,
+                EMBEDDINGS_MODELO,
+            )
+            resultado[tabla] = fila["total"]
+        return resultado
+
+    async def _escribir(self, conn, tabla: str, columna: str, filas, vectores, duplicados=None) -> int:
+        """Un lote: COPY a tabla temporal y UPDATE solo si la pregunta no cambió"""
+        registros = [
+            (fila["id"], fila["texto"], pickle.dumps(list(vector)), duplicado_de)
+            for fila, vector, duplicado_de in zip(filas, vectores, duplicados or [None] * len(filas))
+        ]
+        # Sin detector no se toca duplicado_de
+        set_duplicado = ", duplicado_de = l.duplicado_de" if duplicados is not None else ""
+        async with conn.transaction():
+            await conn.execute(
+                "CREATE TEMP TABLE _embeddings_lote "
+                "(id bigint, texto text, embedding bytea, duplicado_de int) ON COMMIT DROP"
+            )
+            await conn.copy_records_to_table(
+                "_embeddings_lote", records=registros,
+                columns=["id", "texto", "embedding", "duplicado_de"],
+            )
+            estado = await conn.execute(
+                f"""
+                UPDATE {tabla} t
+                SET pregunta_embedding = l.embedding, pregunta_embedding_modelo = $1{set_duplicado}
+                FROM _embeddings_lote l
+                WHERE t.id = l.id AND t.{columna} = l.texto
+                """,
+                EMBEDDINGS_MODELO,
+            )
+        return int(estado.split()[-1])
+
+    async def _indexar_tabla(self, conn, tabla: str, forzar: bool, lote: int, batch_size: int) -> Dict[str, Any]:
+        columna = TABLAS[tabla]
+        consulta = _pendientes_sql(tabla, columna)
+        progreso = {"procesadas": 0, "escritas": 0, "duplicadas": 0, "ultimo_id": 0, "filas_por_segundo": 0.0}
+        self.estado["tablas"][tabla] = progreso
+        inicio = time.perf_counter()
+
+        from . import duplicados as modulo_duplicados
+
+        detectar = self._detectar_duplicados
+        if detectar is None:
+            detectar = modulo_duplicados.DUPLICADOS_AL_INDEXAR
+        detector = None
+
+        while True:
+            filas = await conn.fetch(consulta, progreso["ultimo_id"], EMBEDDINGS_MODELO, lote, forzar)
+            if not filas:
+                break
+            textos = [f["texto"] for f in filas]
+            vectores = await asyncio.to_thread(self._codificar, textos, batch_size)
+            duplicados = None
+            if detectar:
+                # Las ya indexadas se cargan una vez por corrida
+                detector = detector or await modulo_duplicados.DetectorDuplicados.crear(conn, tabla)
+                duplicados = await asyncio.to_thread(detector.revisar, [f["id"] for f in filas], vectores)
+                progreso["duplicadas"] += sum(d is not None for d in duplicados)
+            progreso["escritas"] += await self._escribir(conn, tabla, columna, filas, vectores, duplicados)
+            progreso["procesadas"] += len(filas)
+            progreso["ultimo_id"] = filas[-1]["id"]
+            progreso["filas_por_segundo"] = round(progreso["procesadas"] / (time.perf_counter() - inicio), 1)
+            if len(filas) < lote:
+                break
+
+        logger.info(
+            f"[Embeddings] {tabla}: {progreso['escritas']}/{progreso['procesadas']} filas "
+            f"({progreso['filas_por_segundo']} filas/s, {progreso['duplicadas']} duplicadas)"
+        )
+        return progreso
+
+    async def ejecutar(
+        self,
+        forzar: bool = False,
+        tablas: Optional[List[str]] = None,
+        lote: int = EMBEDDINGS_LOTE,
+        batch_size: int = EMBEDDINGS_BATCH_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Indexa las filas pendientes (todas con ``forzar``) y devuelve el estado.
+
+        Si otro worker ya está indexando no hace nada (``omitido``).
+        """
+        tablas = _validar_tablas(tablas)
+        conn = await db.get_connection()
+        try:
+            if not await conn.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", _LOCK):
+                logger.info("[Embeddings] Otro worker está indexando; se omite")
+                return {**self.estado, "omitido": True}
+            try:
+                self.estado = {
+                    "en_curso": True,
+                    "modelo": EMBEDDINGS_MODELO,
+                    "forzar": forzar,
+                    "inicio": datetime.now().isoformat(),
+                    "tablas": {},
+                }
+                for tabla in tablas:
+                    await self._indexar_tabla(conn, tabla, forzar, lote, batch_size)
+                self.estado["fin"] = datetime.now().isoformat()
+            except Exception as e:
+                self.estado["error"] = str(e)
+                raise
+            finally:
+                self.estado["en_curso"] = False
+                await conn.execute("SELECT pg_advisory_unlock(hashtext($1))", _LOCK)
+        finally:
+            await db.release_connection(conn)
+        return self.estado
+
+    def solicitar(self, forzar: bool = False, tablas: Optional[List[str]] = None) -> bool:
+        """
+        Lanza ``ejecutar`` en segundo plano. Si ya hay una corrida en curso
+        se repite al terminar con las tablas pedidas mientras tanto (forzada
+        si alguna solicitud lo fue) y devuelve False.
+        """
+        tablas = _validar_tablas(tablas)
+        if self.en_curso:
+            if self._pendiente is None:
+                self._pendiente = {"forzar": False, "tablas": set()}
+            self._pendiente["forzar"] |= forzar
+            self._pendiente["tablas"].update(tablas)
+            return False
+
+        async def _ejecutar():
+            kwargs = {"forzar": forzar, "tablas": tablas}
+            while kwargs:
+                try:
+                    await self.ejecutar(**kwargs)
+                except Exception as e:
+                    self._pendiente = None
+                    logger.error(f"[Embeddings] Error indexando: {e}", exc_info=True)
+                    return
+                # La repetición cubre lo pedido mientras tanto
+                pendiente, self._pendiente = self._pendiente, None
+                kwargs = pendiente and {
+                    "forzar": pendiente["forzar"],
+                    "tablas": [t for t in TABLAS if t in pendiente["tablas"]],
+                }
+
+        self._tarea = asyncio.get_running_loop().create_task(_ejecutar())
+        return True
+
+    async def iniciar(self) -> None:
+        """Al arrancar: indexa si hay filas nuevas o de otro modelo"""
+        if not EMBEDDINGS_INDEXAR_AL_INICIAR:
+            return
+        pendientes = await self.pendientes()
+        if any(pendientes.values()):
+            logger.info(f"[Embeddings] Pendientes con {EMBEDDINGS_MODELO}: {pendientes}")
+            self.solicitar()
+
+    async def detener(self) -> None:
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+
+# Instancia compartida por el proceso
+indexador_embeddings = IndexadorEmbeddings()
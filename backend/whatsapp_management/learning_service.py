@@ -12,6 +12,7 @@ from datetime import datetime
 import logging
 
 from db import get_pool
+from .indexador_embeddings import indexador_embeddings
 from .models import (
     AprendizajeAvanzadoItem,
     AprendizajeAvanzadoCreate,
@@ -258,6 +259,9 @@ async def create_aprendizaje(
 
         logger.info(f"Aprendizaje creado: {row['id']}")
 
+        # El embedding de la pregunta lo calcula el indexador por lotes
+        indexador_embeddings.solicitar(tablas=["aprendizajes_agente"])
+
         return AprendizajeAvanzadoItem(**dict(row))
 
     except Exception as e:
@@ -0,0 +1,343 @@
+"""
+Resúmenes de conversaciones en segundo plano
+============================================
+
+Saca del camino del agente el resumen, el embedding y las escrituras de
+``conversaciones_embeddings`` (contexto conversacional, prioridad 3):
+
+- Detección: cada RESUMENES_INTERVALO_S segundos busca conversaciones
+  cerradas (Resuelta/Cerrada/Abandonada) o sin actividad desde hace
+  RESUMENES_INACTIVIDAD_MIN minutos cuya ``fecha_ultima_actividad`` es
+  posterior a su resumen (``fecha_actividad_resumida``,
+  data/migrations/33_resumenes_conversaciones.sql).
+- Resumen extractivo de los últimos RESUMENES_MAX_MENSAJES mensajes (lo que
+  escribió el paciente y la última respuesta), sin LLM. Los resúmenes que
+  manda el agente (``guardar_resumen_conversacion``) se encolan y tienen
+  prioridad.
+- Embeddings de RESUMENES_LOTE resúmenes en un solo ``encode`` en un hilo y
+  un solo ``INSERT ... SELECT FROM unnest(...) ON CONFLICT`` por lote.
+- ``fecha_ultima_consulta``: ``buscar_conversaciones_previas`` solo registra
+  las conversaciones usadas en memoria y se escriben todas juntas en un
+  ``UPDATE ... FROM unnest(...)`` por ciclo.
+
+La detección la hace un solo worker a la vez (advisory lock); la cola de
+resúmenes y las consultas son por proceso y se vacían al apagar.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import pickle
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import db
+from .indexador_embeddings import EMBEDDINGS_BATCH_SIZE, Codificador, _codificar_modelo
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+RESUMENES_INTERVALO_S = float(os.getenv("RESUMENES_INTERVALO_S", "30"))
+RESUMENES_INACTIVIDAD_MIN = int(os.getenv("RESUMENES_INACTIVIDAD_MIN", "30"))
+RESUMENES_VENTANA_DIAS = int(os.getenv("RESUMENES_VENTANA_DIAS", "30"))
+RESUMENES_LOTE = int(os.getenv("RESUMENES_LOTE", "64"))
+RESUMENES_MAX_MENSAJES = int(os.getenv("RESUMENES_MAX_MENSAJES", "20"))
+RESUMENES_MAX_CARACTERES = int(os.getenv("RESUMENES_MAX_CARACTERES", "1500"))
+
+ESTADOS_CERRADOS = ["Resuelta", "Cerrada", "Abandonada"]
+
+_LOCK = "resumenes_conversaciones"
+
+# $1 inactividad (min), $2 ventana (días), $3 estados cerrados, $4 límite
+_CANDIDATAS = """
+    SELECT c.id, c.id_contacto, c.estado, c.categoria, c.intencion_detectada,
+           c.fecha_inicio, c.fecha_ultima_actividad
+    FROM conversaciones c
+    LEFT JOIN conversaciones_embeddings ce ON ce.id_conversacion = c.id
+    WHERE c.fecha_ultima_actividad >= NOW() - make_interval(days => $2)
+      AND (c.estado = ANY($3::text[]) OR c.fecha_ultima_actividad < NOW() - make_interval(mins => $1))
+      AND (ce.id IS NULL OR ce.fecha_actividad_resumida IS NULL
+           OR ce.fecha_actividad_resumida < c.fecha_ultima_actividad)
+      AND EXISTS (
+          SELECT 1 FROM mensajes m
+          WHERE m.id_conversacion = c.id AND m.direccion = 'Entrante'
+      )
+    ORDER BY c.fecha_ultima_actividad
+    LIMIT $4
+"""
+
+# Últimos $2 mensajes de cada conversación $1, en orden cronológico
+_MENSAJES = """
+    SELECT id_conversacion, direccion, contenido
+    FROM (
+        SELECT id, id_conversacion, direccion, contenido, fecha_envio,
+               row_number() OVER (PARTITION BY id_conversacion ORDER BY fecha_envio DESC, id DESC) AS n
+        FROM mensajes
+        WHERE id_conversacion = ANY($1::bigint[]) AND contenido <> ''
+    ) m
+    WHERE n <= $2
+    ORDER BY id_conversacion, fecha_envio, id
+"""
+
+# Un lote; la actividad nula (resúmenes del agente) se toma de la conversación
+_UPSERT = """
+    INSERT INTO conversaciones_embeddings
+        (id_contacto, id_conversacion, resumen_conversacion, embedding, metadata, fecha_actividad_resumida)
+    SELECT l.id_contacto, l.id_conversacion, l.resumen, l.embedding, l.metadata::jsonb,
+           COALESCE(l.actividad, c.fecha_ultima_actividad)
+    FROM unnest($1::bigint[], $2::bigint[], $3::text[], $4::bytea[], $5::text[], $6::timestamp[])
+         AS l(id_contacto, id_conversacion, resumen, embedding, metadata, actividad)
+    JOIN conversaciones c ON c.id = l.id_conversacion
+    ON CONFLICT (id_conversacion) DO UPDATE SET
+        resumen_conversacion = EXCLUDED.resumen_conversacion,
+        embedding = EXCLUDED.embedding,
+        metadata = EXCLUDED.metadata,
+        fecha_actividad_resumida = EXCLUDED.fecha_actividad_resumida
+"""
+
+_CONSULTAS = """
+    UPDATE conversaciones_embeddings ce
+    SET fecha_ultima_consulta = GREATEST(ce.fecha_ultima_consulta, l.fecha)
+    FROM unnest($1::bigint[], $2::timestamp[]) AS l(id_conversacion, fecha)
+    WHERE ce.id_conversacion = l.id_conversacion
+"""
+
+# (id_contacto, id_conversacion, resumen, metadata, actividad)
+Resumen = Tuple[int, int, str, Dict[str, Any], Optional[datetime]]
+
+
+def _recortar(texto: str, limite: int) -> str:
+    texto = " ".join(texto.split())
+    return texto if len(texto) <= limite else texto[: limite - 1].rstrip() + "…"
+
+
+def construir_resumen(conversacion: Dict[str, Any], mensajes: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Resumen extractivo: lo que escribió el paciente (lo que se busca con la
+    consulta nueva) y la última respuesta, acotado a RESUMENES_MAX_CARACTERES.
+    """
+    entrantes = [m["contenido"] for m in mensajes if m["direccion"] == "Entrante"]
+    salientes = [m["contenido"] for m in mensajes if m["direccion"] == "Saliente"]
+
+    partes = []
+    if conversacion.get("categoria"):
+        partes.append(f"Consulta: {conversacion['categoria']}.")
+    partes.append("Paciente: " + " | ".join(_recortar(t, 300) for t in entrantes))
+    resumen = " ".join(partes)
+    if salientes:
+        resumen += " Respuesta: " + _recortar(salientes[-1], 300)
+
+    fecha_inicio = conversacion.get("fecha_inicio")
+    metadata = {
+        "origen": "automatico",
+        "mensajes": len(mensajes),
+        "estado": conversacion.get("estado"),
+        "tipo_consulta": conversacion.get("intencion_detectada") or conversacion.get("categoria"),
+        "fecha_conversacion": fecha_inicio.date().isoformat() if fecha_inicio else None,
+    }
+    return _recortar(resumen, RESUMENES_MAX_CARACTERES), metadata
+
+
+class ResumenesConversaciones:
+    """Cola de resúmenes + consultas coalescidas + detección periódica"""
+
+    def __init__(
+        self,
+        codificar: Optional[Codificador] = None,
+        intervalo_s: float = RESUMENES_INTERVALO_S,
+        lote: int = RESUMENES_LOTE,
+    ):
+        self._codificar = codificar or _codificar_modelo
+        self.intervalo = intervalo_s
+        self.lote = lote
+        self._resumenes: Dict[int, Resumen] = {}
+        self._consultas: Dict[int, datetime] = {}
+        self._despertar: Optional[asyncio.Event] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._cerrando = False
+        # Estadísticas
+        self.estado: Dict[str, Any] = {
+            "ciclos": 0,
+            "resumidas": 0,
+            "lotes": 0,
+            "consultas_escritas": 0,
+            "ms_por_lote": 0.0,
+            "ultimo_ciclo": None,
+        }
+
+    # ------------------------------------------------------------------
+    # Camino del agente (sin E/S)
+    # ------------------------------------------------------------------
+
+    def encolar_resumen(
+        self, id_contacto: int, id_conversacion: int, resumen: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Resumen escrito por el agente; se indexa en el siguiente ciclo"""
+        self._resumenes[int(id_conversacion)] = (
+            int(id_contacto), int(id_conversacion), resumen, metadata or {}, None
+        )
+        if len(self._resumenes) >= self.lote and self._despertar is not None:
+            self._despertar.set()
+
+    def registrar_consulta(self, ids_conversacion: Iterable[int]) -> None:
+        """Conversaciones usadas como contexto; ``fecha_ultima_consulta`` se escribe por lotes"""
+        ahora = datetime.now()
+        for id_conversacion in ids_conversacion:
+            self._consultas[int(id_conversacion)] = ahora
+
+    @property
+    def pendientes(self) -> Dict[str, int]:
+        return {"resumenes": len(self._resumenes), "consultas": len(self._consultas)}
+
+    # ------------------------------------------------------------------
+    # Escritura por lotes
+    # ------------------------------------------------------------------
+
+    async def vaciar_consultas(self) -> int:
+        """Un UPDATE para todas las consultas acumuladas"""
+        if not self._consultas:
+            return 0
+        consultas, self._consultas = self._consultas, {}
+        try:
+            await db.execute(_CONSULTAS, list(consultas), list(consultas.values()))
+        except Exception:
+            # Las que llegaron mientras tanto son más recientes
+            for id_conversacion, fecha in consultas.items():
+                self._consultas.setdefault(id_conversacion, fecha)
+            raise
+        self.estado["consultas_escritas"] += len(consultas)
+        return len(consultas)
+
+    async def _escribir(self, conn, resumenes: List[Resumen]) -> int:
+        """Embeddings del lote en un solo encode y un solo upsert"""
+        inicio = time.perf_counter()
+        vectores = await asyncio.to_thread(
+            self._codificar, [r[2] for r in resumenes], EMBEDDINGS_BATCH_SIZE
+        )
+        columnas = list(zip(*(
+            (id_contacto, id_conversacion, resumen, pickle.dumps(list(vector)), json.dumps(metadata, default=str), actividad)
+            for (id_contacto, id_conversacion, resumen, metadata, actividad), vector in zip(resumenes, vectores)
+        )))
+        await conn.execute(_UPSERT, *(list(c) for c in columnas))
+
+        self.estado["lotes"] += 1
+        self.estado["resumidas"] += len(resumenes)
+        ms = (time.perf_counter() - inicio) * 1000
+        self.estado["ms_por_lote"] = round(ms if self.estado["lotes"] == 1 else 0.8 * self.estado["ms_por_lote"] + 0.2 * ms, 1)
+        return len(resumenes)
+
+    async def vaciar_resumenes(self, conn) -> int:
+        """Resúmenes encolados por el agente"""
+        escritos = 0
+        while self._resumenes:
+            ids = list(self._resumenes)[: self.lote]
+            lote = [self._resumenes.pop(i) for i in ids]
+            try:
+                escritos += await self._escribir(conn, lote)
+            except Exception:
+                for r in lote:
+                    self._resumenes.setdefault(r[1], r)
+                raise
+        return escritos
+
+    async def resumir_inactivas(self, conn) -> int:
+        """Conversaciones inactivas o cerradas con resumen pendiente"""
+        escritos = 0
+        while not self._cerrando:
+            candidatas = await conn.fetch(
+                _CANDIDATAS, RESUMENES_INACTIVIDAD_MIN, RESUMENES_VENTANA_DIAS, ESTADOS_CERRADOS, self.lote
+            )
+            if not candidatas:
+                break
+            filas = await conn.fetch(_MENSAJES, [c["id"] for c in candidatas], RESUMENES_MAX_MENSAJES)
+            mensajes: Dict[int, List[Dict[str, Any]]] = {}
+            for fila in filas:
+                mensajes.setdefault(fila["id_conversacion"], []).append(fila)
+
+            lote = []
+            for c in candidatas:
+                resumen, metadata = construir_resumen(dict(c), mensajes.get(c["id"], []))
+                lote.append((c["id_contacto"], c["id"], resumen, metadata, c["fecha_ultima_actividad"]))
+            escritos += await self._escribir(conn, lote)
+            if len(candidatas) < self.lote:
+                break
+        return escritos
+
+    async def procesar(self) -> Dict[str, int]:
+        """Un ciclo: consultas, resúmenes encolados y conversaciones inactivas"""
+        resultado = {"consultas": await self.vaciar_consultas(), "encolados": 0, "inactivas": 0}
+        conn = await db.get_connection()
+        try:
+            resultado["encolados"] = await self.vaciar_resumenes(conn)
+            if await conn.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", _LOCK):
+                try:
+                    resultado["inactivas"] = await self.resumir_inactivas(conn)
+                finally:
+                    await conn.execute("SELECT pg_advisory_unlock(hashtext($1))", _LOCK)
+        finally:
+            await db.release_connection(conn)
+
+        self.estado["ciclos"] += 1
+        self.estado["ultimo_ciclo"] = datetime.now().isoformat()
+        if resultado["encolados"] or resultado["inactivas"]:
+            logger.info(
+                f"[Resúmenes] {resultado['encolados']} del agente, {resultado['inactivas']} inactivas, "
+                f"{resultado['consultas']} consultas ({self.estado['ms_por_lote']} ms/lote)"
+            )
+        return resultado
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    async def _ejecutar(self) -> None:
+        while not self._cerrando:
+            try:
+                await asyncio.wait_for(self._despertar.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._despertar.clear()
+            if self._cerrando:
+                break
+            try:
+                await self.procesar()
+            except Exception as e:
+                logger.error(f"[Resúmenes] Error en el ciclo: {e}", exc_info=True)
+
+    def iniciar(self) -> None:
+        if self._tarea is not None:
+            return
+        self._cerrando = False
+        self._despertar = asyncio.Event()
+        self._tarea = asyncio.get_running_loop().create_task(self._ejecutar())
+        logger.info(
+            f"✅ Resúmenes de conversaciones iniciados (cada {self.intervalo:g}s, "
+            f"inactividad {RESUMENES_INACTIVIDAD_MIN} min, lote {self.lote})"
+        )
+
+    async def detener(self) -> None:
+        """Detiene el ciclo y escribe las consultas y resúmenes encolados"""
+        if self._tarea is not None:
+            self._cerrando = True
+            self._despertar.set()
+            await self._tarea
+            self._tarea = None
+        try:
+            await self.vaciar_consultas()
+            if self._resumenes:
+                conn = await db.get_connection()
+                try:
+                    await self.vaciar_resumenes(conn)
+                finally:
+                    await db.release_connection(conn)
+        except Exception as e:
+            logger.error(f"❌ [Resúmenes] Pendientes sin escribir al cerrar {self.pendientes}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.estado, "pendientes": self.pendientes, "activo": self._tarea is not None}
+
+
+# Instancia compartida por el proceso
+resumenes_conversaciones = ResumenesConversaciones()
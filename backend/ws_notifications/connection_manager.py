@@ -1,16 +1,40 @@
 """
 Gestor de conexiones WebSocket
 Maneja conexiones activas y broadcast de notificaciones
+
+Los envíos a varios sockets corren en paralelo (``asyncio.gather``). Cada
+socket tiene un lock (los mensajes salen en orden) y un límite de envíos en
+espera: un cliente lento que acumula WS_MAX_PENDIENTES mensajes o tarda más
+de WS_SEND_TIMEOUT segundos en recibir uno se desconecta, en vez de frenar
+al resto.
 """
 
-from typing import Dict, Set
+from typing import Dict, Iterable, Set
 from fastapi import WebSocket
+import asyncio
 import logging
 import json
+import os
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+WS_MAX_PENDIENTES = int(os.getenv("WS_MAX_PENDIENTES", "32"))
+
+# Cierre por cliente lento ("try again later")
+_CODIGO_CLIENTE_LENTO = 1013
+
+
+class _EstadoSocket:
+    """Orden y backpressure de los envíos a un socket"""
+
+    __slots__ = ("lock", "pendientes")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pendientes = 0
+
 
 class ConnectionManager:
     """
@@ -20,6 +44,8 @@ class ConnectionManager:
     def __init__(self):
         # Diccionario: usuario_id -> Set de WebSocket connections
         self.active_connections: Dict[int, Set[WebSocket]] = {}
+        # Estado de envío por socket
+        self._estado: Dict[WebSocket, _EstadoSocket] = {}
         # Contador de conexiones totales
         self.total_connections = 0
     
@@ -37,6 +63,7 @@ class ConnectionManager:
             self.active_connections[user_id] = set()
         
         self.active_connections[user_id].add(websocket)
+        self._estado[websocket] = _EstadoSocket()
         self.total_connections += 1
         
         logger.info(
@@ -53,8 +80,9 @@ class ConnectionManager:
             websocket: Conexión WebSocket
             user_id: ID del usuario
         """
-        if user_id in self.active_connections:
+        if websocket in self.active_connections.get(user_id, ()):
             self.active_connections[user_id].discard(websocket)
+            self._estado.pop(websocket, None)
             self.total_connections -= 1
             
             # Limpiar si no quedan conexiones
@@ -67,51 +95,93 @@ class ConnectionManager:
                 f"(Total: {self.total_connections})"
             )
     
-    async def send_personal_message(self, message: dict, user_id: int):
+    @staticmethod
+    def _serializar(message: dict) -> str:
+        # Mensaje con timestamp
+        return json.dumps({
+            **message,
+            "timestamp": datetime.now().isoformat()
+        }, default=str)
+    
+    async def _enviar(self, websocket: WebSocket, user_id: int, message_text: str) -> bool:
+        """Envía a un socket respetando su orden y su límite de pendientes"""
+        estado = self._estado.get(websocket)
+        if estado is None:
+            return False
+        
+        if estado.pendientes >= WS_MAX_PENDIENTES:
+            logger.warning(f"[WebSocket] Cliente lento de usuario {user_id}: desconectado")
+            self._descartar(websocket, user_id)
+            return False
+        
+        estado.pendientes += 1
+        try:
+            async with estado.lock:
+                await asyncio.wait_for(websocket.send_text(message_text), WS_SEND_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.error(f"[WebSocket] Error enviando a usuario {user_id}: {e!r}")
+            self._descartar(websocket, user_id)
+            return False
+        finally:
+            estado.pendientes -= 1
+    
+    def _descartar(self, websocket: WebSocket, user_id: int):
+        """Quita el socket y lo cierra en segundo plano"""
+        if websocket not in self._estado:
+            return
+        self.disconnect(websocket, user_id)
+        
+        async def cerrar():
+            try:
+                await asyncio.wait_for(websocket.close(code=_CODIGO_CLIENTE_LENTO), WS_SEND_TIMEOUT)
+            except Exception:
+                pass
+        
+        asyncio.get_running_loop().create_task(cerrar())
+    
+    async def _enviar_texto(self, message_text: str, user_ids: Iterable[int]) -> int:
+        envios = [
+            self._enviar(connection, user_id, message_text)
+            for user_id in user_ids
+            for connection in list(self.active_connections.get(user_id, ()))
+        ]
+        if not envios:
+            return 0
+        return sum(await asyncio.gather(*envios))
+    
+    async def send_personal_message(self, message: dict, user_id: int) -> int:
         """
         Envía un mensaje a un usuario específico en todas sus conexiones
         
         Args:
             message: Diccionario con el mensaje
             user_id: ID del usuario destinatario
+            
+        Returns:
+            Número de sockets que recibieron el mensaje
         """
         if user_id not in self.active_connections:
-            logger.warning(f"[WebSocket] Usuario {user_id} no tiene conexiones activas")
-            return
-        
-        # Mensaje con timestamp
-        message_with_timestamp = {
-            **message,
-            "timestamp": datetime.now().isoformat()
-        }
+            # Normal con varios workers: el usuario puede estar en otro proceso
+            logger.debug(f"[WebSocket] Usuario {user_id} no tiene conexiones activas")
+            return 0
         
-        message_text = json.dumps(message_with_timestamp)
-        disconnected = set()
-        
-        # Enviar a todas las conexiones del usuario
-        for connection in self.active_connections[user_id]:
-            try:
-                await connection.send_text(message_text)
-            except Exception as e:
-                logger.error(f"[WebSocket] Error enviando a usuario {user_id}: {e}")
-                disconnected.add(connection)
-        
-        # Limpiar conexiones fallidas
-        for connection in disconnected:
-            self.disconnect(connection, user_id)
+        return await self._enviar_texto(self._serializar(message), [user_id])
     
-    async def broadcast_to_users(self, message: dict, user_ids: list[int]):
+    async def broadcast_to_users(self, message: dict, user_ids: list[int]) -> int:
         """
         Envía un mensaje a múltiples usuarios
         
         Args:
             message: Diccionario con el mensaje
             user_ids: Lista de IDs de usuarios destinatarios
+            
+        Returns:
+            Número de sockets que recibieron el mensaje
         """
-        for user_id in user_ids:
-            await self.send_personal_message(message, user_id)
+        return await self._enviar_texto(self._serializar(message), user_ids)
     
-    async def broadcast_all(self, message: dict):
+    async def broadcast_all(self, message: dict) -> int:
         """
         Envía un mensaje a todos los usuarios conectados
         
@@ -119,7 +189,7 @@ class ConnectionManager:
             message: Diccionario con el mensaje
         """
         user_ids = list(self.active_connections.keys())
-        await self.broadcast_to_users(message, user_ids)
+        return await self.broadcast_to_users(message, user_ids)
     
     def get_user_connection_count(self, user_id: int) -> int:
         """
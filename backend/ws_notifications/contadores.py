@@ -0,0 +1,237 @@
+"""
+Contadores de notificaciones no leídas
+======================================
+Caché por proceso del número de no leídas de cada usuario conectado:
+
+- Carga inicial una sola vez por usuario; las cargas de una ventana de
+  WS_CONTADOR_COALESCE_MS (p.ej. una tormenta de reconexiones) se resuelven
+  con una sola consulta.
+- Después solo se ajusta por deltas que llegan por el fan-out: +1 por cada
+  INSERT (NOTIFY del trigger) y -1 por cada ``mark_read``. Los envíos del
+  contador a los sockets también se agrupan por ventana.
+- Cada WS_CONTADOR_RECONCILIAR_S se recalcula todo con una consulta para
+  corregir deriva (escrituras fuera de estos caminos, deltas perdidos
+  durante una reconexión del listener).
+
+Las consultas usan el índice parcial ``idx_notificaciones_no_leidas``
+(data/migrations/26_notificaciones_no_leidas_idx.sql).
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import db
+from ws_notifications.connection_manager import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+WS_CONTADOR_COALESCE_MS = int(os.getenv("WS_CONTADOR_COALESCE_MS", "50"))
+WS_CONTADOR_RECONCILIAR_S = float(os.getenv("WS_CONTADOR_RECONCILIAR_S", "60"))
+
+
+class ContadorNoLeidas:
+    """Contadores en memoria con carga coalescida, deltas y reconciliación."""
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        ventana_ms: int = WS_CONTADOR_COALESCE_MS,
+        reconciliar_s: float = WS_CONTADOR_RECONCILIAR_S,
+    ):
+        self.manager = manager
+        self.ventana = ventana_ms / 1000
+        self.reconciliar_s = reconciliar_s
+        # Estadísticas
+        self.consultas = 0
+        self.aciertos = 0
+        self.correcciones = 0
+        self._cache: Dict[Any, int] = {}
+        self._cargas: Dict[Any, asyncio.Future] = {}
+        self._recalcular: Set[Any] = set()
+        self._enviar: Set[Any] = set()
+        self._vaciado: Optional[asyncio.Task] = None
+        self._reconciliador: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    async def obtener(self, usuario_id: Any) -> int:
+        """No leídas del usuario (de caché, o carga coalescida)"""
+        if usuario_id in self._cache:
+            self.aciertos += 1
+            return self._cache[usuario_id]
+
+        futuro = self._cargas.get(usuario_id)
+        if futuro is None:
+            futuro = asyncio.get_running_loop().create_future()
+            self._cargas[usuario_id] = futuro
+            self._agendar()
+        return await asyncio.shield(futuro)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def aplicar_delta(self, usuario_id: Any, delta: int) -> None:
+        """Ajusta el contador cacheado y agenda su envío"""
+        if usuario_id not in self._cache:
+            # Sin caché (o cargando): la carga/reconciliación lo resuelve
+            return
+        self._cache[usuario_id] = max(0, self._cache[usuario_id] + delta)
+        self._enviar.add(usuario_id)
+        self._agendar()
+
+    def solicitar(self, usuario_id: Any) -> None:
+        """Recalcula desde la BD y envía (sin delta conocido)"""
+        if not self.manager.is_user_connected(usuario_id):
+            return
+        self._recalcular.add(usuario_id)
+        self._agendar()
+
+    def olvidar(self, usuario_id: Any) -> None:
+        """Descarta el contador cuando el usuario ya no tiene sockets aquí"""
+        if not self.manager.is_user_connected(usuario_id):
+            self._cache.pop(usuario_id, None)
+
+    # ------------------------------------------------------------------
+    # Vaciado por ventana
+    # ------------------------------------------------------------------
+
+    def _agendar(self) -> None:
+        if self._vaciado is None or self._vaciado.done():
+            self._vaciado = asyncio.get_running_loop().create_task(self._vaciar())
+
+    async def _vaciar(self) -> None:
+        cargas: Dict[Any, asyncio.Future] = {}
+        cancelado = False
+        try:
+            await asyncio.sleep(self.ventana)
+            cargas, self._cargas = self._cargas, {}
+            recalcular, self._recalcular = self._recalcular, set()
+            enviar, self._enviar = self._enviar, set()
+
+            consultar = set(cargas) | recalcular
+            if consultar:
+                try:
+                    conteos = await self.contar(consultar)
+                except Exception as e:
+                    logger.error(f"[WebSocket] Error cargando contadores: {e}")
+                    for futuro in cargas.values():
+                        if not futuro.done():
+                            futuro.set_exception(e)
+                else:
+                    for usuario_id, valor in conteos.items():
+                        if self.manager.is_user_connected(usuario_id):
+                            self._cache[usuario_id] = valor
+                    for usuario_id, futuro in cargas.items():
+                        if not futuro.done():
+                            futuro.set_result(conteos[usuario_id])
+                    enviar |= recalcular
+
+            await self._enviar_contadores(enviar)
+        except asyncio.CancelledError:
+            cancelado = True
+            raise
+        finally:
+            for futuro in cargas.values():
+                if not futuro.done():
+                    futuro.cancel()
+            if self._vaciado is asyncio.current_task():
+                self._vaciado = None
+                # Lo que llegó durante las esperas (cargas, deltas,
+                # solicitudes) vio esta tarea en curso y no agendó otra
+                if not cancelado and (self._cargas or self._recalcular or self._enviar):
+                    self._agendar()
+
+    async def _enviar_contadores(self, usuarios: Iterable[Any]) -> None:
+        envios = [
+            self.manager.send_personal_message({"type": "count", "count": self._cache[u]}, u)
+            for u in usuarios
+            if u in self._cache
+        ]
+        if envios:
+            await asyncio.gather(*envios)
+
+    # ------------------------------------------------------------------
+    # Reconciliación
+    # ------------------------------------------------------------------
+
+    async def reconciliar(self) -> int:
+        """
+        Recalcula todos los contadores cacheados.
+
+        Returns:
+            Número de contadores corregidos
+        """
+        for usuario_id in list(self._cache):
+            self.olvidar(usuario_id)
+        if not self._cache:
+            return 0
+
+        conteos = await self.contar(list(self._cache))
+        corregidos = [
+            u for u, valor in conteos.items()
+            if u in self._cache and self._cache[u] != valor
+        ]
+        for usuario_id in corregidos:
+            self._cache[usuario_id] = conteos[usuario_id]
+        self.correcciones += len(corregidos)
+        if corregidos:
+            logger.info(f"[WebSocket] {len(corregidos)} contadores corregidos al reconciliar")
+        await self._enviar_contadores(corregidos)
+        return len(corregidos)
+
+    async def _reconciliar_periodicamente(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconciliar_s)
+            try:
+                await self.reconciliar()
+            except Exception as e:
+                logger.error(f"[WebSocket] Error reconciliando contadores: {e}")
+
+    def iniciar(self) -> None:
+        if self._reconciliador is None and self.reconciliar_s > 0:
+            self._reconciliador = asyncio.get_running_loop().create_task(
+                self._reconciliar_periodicamente()
+            )
+
+    def detener(self) -> None:
+        if self._reconciliador is not None:
+            self._reconciliador.cancel()
+            self._reconciliador = None
+
+    # ------------------------------------------------------------------
+    # BD
+    # ------------------------------------------------------------------
+
+    async def contar(self, usuarios: Iterable[Any]) -> Dict[Any, int]:
+        """No leídas de varios usuarios en una consulta"""
+        usuarios: List[Any] = list(usuarios)
+        self.consultas += 1
+        conn = await db.get_connection()
+        try:
+            filas = await conn.fetch(
+                """
+                SELECT usuario_id, COUNT(*) AS count
+                FROM notificaciones
+                WHERE usuario_id = ANY($1::text[]) AND leido = FALSE
+                GROUP BY usuario_id
+                """,
+                [str(u) for u in usuarios],
+            )
+        finally:
+            await db.release_connection(conn)
+        por_texto = {f["usuario_id"]: f["count"] for f in filas}
+        return {u: por_texto.get(str(u), 0) for u in usuarios}
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "usuarios_en_cache": len(self._cache),
+            "consultas": self.consultas,
+            "aciertos": self.aciertos,
+            "correcciones": self.correcciones,
+        }
@@ -0,0 +1,328 @@
+"""
+Fan-out de notificaciones entre workers
+=======================================
+Cada proceso de la API tiene un solo listener suscrito al canal
+``notificaciones`` y entrega lo que recibe a sus sockets locales. Así una
+notificación llega al usuario sin importar en qué worker está conectado.
+
+Backends (WS_FANOUT_BACKEND):
+
+- ``postgres`` (default): LISTEN sobre una conexión dedicada. Cada INSERT en
+  ``notificaciones`` publica solo con el trigger de
+  data/migrations/25_notificaciones_notify.sql, incluidos los de Celery.
+- ``redis``: pub/sub de Redis (REDIS_URL), para despliegues donde LISTEN no
+  es posible (p.ej. pgbouncer en modo transacción). Solo transporta lo que
+  se publica con ``publicar()``.
+- ``local``: sin transporte, entrega directa en el mismo proceso.
+
+Mensajes (JSON):
+
+- ``{"type": "notification", "usuario_id": ..., "data": {...}}``
+- ``{"type": "notification", "usuario_id": ..., "id": ...}`` cuando el
+  contenido no cabe en un NOTIFY; se lee de la BD solo si el usuario está
+  conectado en este proceso.
+- ``{"type": "count", "usuario_id": ..., "delta": -1}``: ajustar el
+  contador (sin ``delta``: recalcularlo desde la BD).
+
+Cada notificación nueva suma 1 al contador cacheado del usuario
+(ws_notifications/contadores.py); los reenvíos (``"reenvio": true``) no.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import asyncpg
+
+import db
+from ws_notifications.connection_manager import ConnectionManager, manager
+from ws_notifications.contadores import ContadorNoLeidas
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+WS_FANOUT_BACKEND = os.getenv("WS_FANOUT_BACKEND", "postgres")
+WS_FANOUT_CANAL = os.getenv("WS_FANOUT_CANAL", "notificaciones")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Límite de payload de NOTIFY es 8000 bytes
+_PG_NOTIFY_MAX_BYTES = 7900
+_RECONEXION_MAX_SEGUNDOS = 30
+
+Callback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+
+class BackendLocal:
+    """Sin transporte: lo publicado se entrega en este proceso."""
+
+    nombre = "local"
+
+    def __init__(self):
+        self._callback: Optional[Callback] = None
+
+    async def iniciar(self, callback: Callback) -> None:
+        self._callback = callback
+
+    async def publicar(self, texto: str, conn=None) -> None:
+        if self._callback is not None:
+            await self._callback(json.loads(texto))
+
+    async def detener(self) -> None:
+        self._callback = None
+
+
+class BackendPostgres:
+    """LISTEN/NOTIFY sobre una conexión dedicada, con reconexión."""
+
+    nombre = "postgres"
+
+    def __init__(self, canal: str = WS_FANOUT_CANAL):
+        self.canal = canal
+        self._callback: Optional[Callback] = None
+        self._conn: Optional[asyncpg.Connection] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._perdida = asyncio.Event()
+        self._entregas: Set[asyncio.Task] = set()
+
+    async def _conectar(self) -> None:
+        self._conn = await asyncpg.connect(
+            host=db.DB_HOST,
+            port=db.DB_PORT,
+            user=db.DB_USER,
+            password=db.DB_PASSWORD,
+            database=db.DB_NAME,
+        )
+        self._conn.add_termination_listener(lambda _: self._perdida.set())
+        await self._conn.add_listener(self.canal, self._on_notify)
+        self._perdida.clear()
+
+    def _on_notify(self, _conn, _pid, _canal, payload: str) -> None:
+        if self._callback is None:
+            return
+        try:
+            mensaje = json.loads(payload)
+        except ValueError:
+            logger.warning(f"[WebSocket] Payload inválido en {self.canal}: {payload[:100]}")
+            return
+        tarea = asyncio.get_running_loop().create_task(self._callback(mensaje))
+        self._entregas.add(tarea)
+        tarea.add_done_callback(self._entregas.discard)
+
+    async def _supervisar(self) -> None:
+        espera = 1
+        while True:
+            await self._perdida.wait()
+            logger.warning("[WebSocket] Conexión LISTEN perdida; reconectando")
+            try:
+                await self._conectar()
+                espera = 1
+            except Exception as e:
+                logger.error(f"[WebSocket] Reconexión LISTEN fallida: {e}")
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, _RECONEXION_MAX_SEGUNDOS)
+
+    async def iniciar(self, callback: Callback) -> None:
+        self._callback = callback
+        await self._conectar()
+        self._supervisor = asyncio.get_running_loop().create_task(self._supervisar())
+
+    async def publicar(self, texto: str, conn=None) -> None:
+        if conn is not None:
+            # Reusar la conexión de quien publica (p.ej. tras su UPDATE)
+            await conn.execute("SELECT pg_notify($1, $2)", self.canal, texto)
+            return
+        conn = await db.get_connection()
+        try:
+            await conn.execute("SELECT pg_notify($1, $2)", self.canal, texto)
+        finally:
+            await db.release_connection(conn)
+
+    async def detener(self) -> None:
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        self._callback = None
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+
+class BackendRedis:
+    """Pub/sub de Redis."""
+
+    nombre = "redis"
+
+    def __init__(self, url: str = REDIS_URL, canal: str = WS_FANOUT_CANAL):
+        import redis.asyncio as redis_async
+
+        self.canal = canal
+        self._redis = redis_async.from_url(url)
+        self._pubsub = None
+        self._lector: Optional[asyncio.Task] = None
+
+    async def iniciar(self, callback: Callback) -> None:
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.canal)
+
+        async def leer():
+            async for mensaje in self._pubsub.listen():
+                try:
+                    await callback(json.loads(mensaje["data"]))
+                except Exception as e:
+                    logger.error(f"[WebSocket] Error entregando mensaje de Redis: {e}")
+
+        self._lector = asyncio.get_running_loop().create_task(leer())
+
+    async def publicar(self, texto: str, conn=None) -> None:
+        await self._redis.publish(self.canal, texto)
+
+    async def detener(self) -> None:
+        if self._lector is not None:
+            self._lector.cancel()
+            self._lector = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        await self._redis.aclose()
+
+
+_BACKENDS = {
+    "local": BackendLocal,
+    "postgres": BackendPostgres,
+    "redis": BackendRedis,
+}
+
+
+# ============================================================================
+# FAN-OUT
+# ============================================================================
+
+
+def _fila_a_data(fila) -> Dict[str, Any]:
+    return {
+        "id": fila["id"],
+        "tipo": fila["tipo"],
+        "titulo": fila["titulo"],
+        "mensaje": fila["mensaje"],
+        "referencia_id": fila["referencia_id"],
+        "referencia_tipo": fila["referencia_tipo"],
+        "fecha_envio": fila["fecha_envio"].isoformat(),
+    }
+
+
+class Fanout:
+    """Listener por proceso + entrega a los sockets locales."""
+
+    def __init__(self, manager: ConnectionManager, backend: Optional[Any] = None):
+        self.manager = manager
+        self.backend = backend
+        self.contadores = ContadorNoLeidas(manager)
+        self.recibidos = 0
+
+    async def iniciar(self, backend: str = WS_FANOUT_BACKEND) -> None:
+        if self.backend is None:
+            self.backend = _BACKENDS[backend]()
+        try:
+            await self.backend.iniciar(self.entregar)
+        except Exception as e:
+            # Sin transporte solo se alcanza a los sockets de este proceso
+            logger.error(f"❌ Fan-out '{self.backend.nombre}' no disponible, usando local: {e}")
+            self.backend = BackendLocal()
+            await self.backend.iniciar(self.entregar)
+        self.contadores.iniciar()
+        logger.info(f"✅ Fan-out de notificaciones iniciado ({self.backend.nombre})")
+
+    async def detener(self) -> None:
+        self.contadores.detener()
+        if self.backend is not None:
+            await self.backend.detener()
+            self.backend = None
+
+    async def publicar(self, mensaje: Dict[str, Any], conn=None) -> None:
+        """
+        Publica un mensaje para todos los workers
+
+        Args:
+            mensaje: Mensaje JSON-serializable
+            conn: Conexión ya tomada del pool (evita tomar otra con postgres)
+        """
+        texto = json.dumps(mensaje, default=str)
+        if len(texto.encode()) > _PG_NOTIFY_MAX_BYTES and mensaje.get("data"):
+            # Demasiado grande para NOTIFY: solo la referencia
+            texto = json.dumps({
+                **{k: v for k, v in mensaje.items() if k != "data"},
+                "id": mensaje["data"]["id"],
+            }, default=str)
+        await self.backend.publicar(texto, conn)
+
+    async def publicar_notificacion(self, fila, reenvio: bool = False) -> None:
+        """
+        Publica una fila de ``notificaciones``
+
+        Los INSERT ya se publican por trigger; ``reenvio=True`` para volver a
+        mandar una existente sin sumarla al contador.
+        """
+        mensaje = {
+            "type": "notification",
+            "usuario_id": fila["usuario_id"],
+            "data": _fila_a_data(fila),
+        }
+        if reenvio:
+            mensaje["reenvio"] = True
+        await self.publicar(mensaje)
+
+    async def publicar_contador(self, usuario_id: Any, delta: Optional[int] = None, conn=None) -> None:
+        """Ajusta (o sin ``delta`` recalcula) el contador en todos los workers"""
+        mensaje = {"type": "count", "usuario_id": usuario_id}
+        if delta is not None:
+            mensaje["delta"] = delta
+        await self.publicar(mensaje, conn)
+
+    async def entregar(self, mensaje: Dict[str, Any]) -> None:
+        """Entrega un mensaje recibido a los sockets de este proceso"""
+        self.recibidos += 1
+        usuario_id = mensaje.get("usuario_id")
+        if not self.manager.is_user_connected(usuario_id):
+            return
+
+        if mensaje.get("type") == "notification":
+            data = mensaje.get("data") or await self._leer_notificacion(mensaje.get("id"))
+            if data is None:
+                return
+            await self.manager.send_personal_message({"type": "notification", "data": data}, usuario_id)
+            if not mensaje.get("reenvio"):
+                self.contadores.aplicar_delta(usuario_id, 1)
+
+        elif mensaje.get("type") == "count":
+            delta = mensaje.get("delta")
+            if delta is None:
+                self.contadores.solicitar(usuario_id)
+            else:
+                self.contadores.aplicar_delta(usuario_id, delta)
+
+    async def _leer_notificacion(self, notification_id) -> Optional[Dict[str, Any]]:
+        conn = await db.get_connection()
+        try:
+            fila = await conn.fetchrow(
+                """
+                SELECT id, usuario_id, tipo, titulo, mensaje,
+                       referencia_id, referencia_tipo, fecha_envio
+                FROM notificaciones
+                WHERE id = $1
+                """,
+                notification_id,
+            )
+        finally:
+            await db.release_connection(conn)
+        return _fila_a_data(fila) if fila else None
+
+
+# Instancia global (una por proceso)
+fanout = Fanout(manager)
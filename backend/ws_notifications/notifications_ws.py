@@ -6,6 +6,7 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query, s
 from fastapi.responses import JSONResponse
 from auth import decode_access_token
 from ws_notifications.connection_manager import manager
+from ws_notifications.fanout import fanout
 from db import get_connection, release_connection
 import logging
 from typing import Optional
@@ -79,19 +80,11 @@ async def websocket_notifications_endpoint(
             "user_id": user_id
         })
         
-        # Enviar contador inicial de notificaciones no leídas
-        conn = await get_connection()
-        try:
-            count = await conn.fetchval(
-                "SELECT COUNT(*) FROM notificaciones WHERE usuario_id = $1 AND leido = FALSE",
-                user_id
-            )
-            await websocket.send_json({
-                "type": "count",
-                "count": count
-            })
-        finally:
-            await release_connection(conn)
+        # Enviar contador inicial de notificaciones no leídas (caché)
+        await websocket.send_json({
+            "type": "count",
+            "count": await fanout.contadores.obtener(user_id)
+        })
         
         # Loop para recibir mensajes del cliente
         while True:
@@ -102,95 +95,29 @@ async def websocket_notifications_endpoint(
                 message = json.loads(data)
                 action = message.get("action")
                 
-                conn = await get_connection()
+                # Marcar notificación como leída
+                if action == "mark_read":
+                    notification_id = message.get("notification_id")
+                    if notification_id:
+                        await _marcar_leida(websocket, user_id, notification_id)
                 
-                try:
-                    # Marcar notificación como leída
-                    if action == "mark_read":
-                        notification_id = message.get("notification_id")
-                        if notification_id:
-                            await conn.execute(
-                                """
-                                UPDATE notificaciones 
-                                SET leido = TRUE, fecha_lectura = NOW()
-                                WHERE id = $1 AND usuario_id = $2
-                                """,
-                                notification_id, user_id
-                            )
-                            
-                            # Enviar confirmación y nuevo contador
-                            new_count = await conn.fetchval(
-                                "SELECT COUNT(*) FROM notificaciones WHERE usuario_id = $1 AND leido = FALSE",
-                                user_id
-                            )
-                            
-                            await websocket.send_json({
-                                "type": "mark_read_success",
-                                "notification_id": notification_id,
-                                "count": new_count
-                            })
-                    
-                    # Obtener contador
-                    elif action == "get_count":
-                        count = await conn.fetchval(
-                            "SELECT COUNT(*) FROM notificaciones WHERE usuario_id = $1 AND leido = FALSE",
-                            user_id
-                        )
-                        await websocket.send_json({
-                            "type": "count",
-                            "count": count
-                        })
-                    
-                    # Obtener notificaciones recientes
-                    elif action == "get_recent":
-                        limit = message.get("limit", 10)
-                        notifications = await conn.fetch(
-                            """
-                            SELECT 
-                                id,
-                                tipo,
-                                titulo,
-                                mensaje,
-                                referencia_id,
-                                referencia_tipo,
-                                fecha_envio,
-                                leido
-                            FROM notificaciones
-                            WHERE usuario_id = $1
-                            ORDER BY fecha_envio DESC
-                            LIMIT $2
-                            """,
-                            user_id, limit
-                        )
-                        
-                        notifications_list = [
-                            {
-                                "id": n["id"],
-                                "tipo": n["tipo"],
-                                "titulo": n["titulo"],
-                                "mensaje": n["mensaje"],
-                                "referencia_id": n["referencia_id"],
-                                "referencia_tipo": n["referencia_tipo"],
-                                "fecha_envio": n["fecha_envio"].isoformat(),
-                                "leido": n["leido"]
-                            }
-                            for n in notifications
-                        ]
-                        
-                        await websocket.send_json({
-                            "type": "recent_notifications",
-                            "notifications": notifications_list
-                        })
-                    
-                    # Acción desconocida
-                    else:
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": f"Acción desconocida: {action}"
-                        })
+                # Obtener contador (sin tocar la BD)
+                elif action == "get_count":
+                    await websocket.send_json({
+                        "type": "count",
+                        "count": await fanout.contadores.obtener(user_id)
+                    })
+                
+                # Obtener notificaciones recientes
+                elif action == "get_recent":
+                    await _enviar_recientes(websocket, user_id, message.get("limit", 10))
                 
-                finally:
-                    await release_connection(conn)
+                # Acción desconocida
+                else:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": f"Acción desconocida: {action}"
+                    })
                     
             except json.JSONDecodeError:
                 await websocket.send_json({
@@ -211,6 +138,84 @@ async def websocket_notifications_endpoint(
     except Exception as e:
         logger.error(f"[WebSocket] Error en conexión de usuario {user_id}: {e}")
         manager.disconnect(websocket, user_id)
+    
+    finally:
+        fanout.contadores.olvidar(user_id)
+
+
+async def _marcar_leida(websocket: WebSocket, user_id: str, notification_id: int):
+    """Marca como leída y ajusta el contador en todos los workers"""
+    count = await fanout.contadores.obtener(user_id)
+    
+    conn = await get_connection()
+    try:
+        # Solo cuenta si estaba sin leer (idempotente ante clics repetidos)
+        actualizada = await conn.fetchval(
+            """
+            UPDATE notificaciones 
+            SET leido = TRUE, fecha_lectura = NOW()
+            WHERE id = $1 AND usuario_id = $2 AND leido = FALSE
+            RETURNING id
+            """,
+            notification_id, user_id
+        )
+        if actualizada:
+            # El delta llega también a este worker por el fan-out
+            await fanout.publicar_contador(user_id, delta=-1, conn=conn)
+            count = max(0, count - 1)
+    finally:
+        await release_connection(conn)
+    
+    # Enviar confirmación y nuevo contador
+    await websocket.send_json({
+        "type": "mark_read_success",
+        "notification_id": notification_id,
+        "count": count
+    })
+
+
+async def _enviar_recientes(websocket: WebSocket, user_id: str, limit: int):
+    conn = await get_connection()
+    try:
+        notifications = await conn.fetch(
+            """
+            SELECT 
+                id,
+                tipo,
+                titulo,
+                mensaje,
+                referencia_id,
+                referencia_tipo,
+                fecha_envio,
+                leido
+            FROM notificaciones
+            WHERE usuario_id = $1
+            ORDER BY fecha_envio DESC
+            LIMIT $2
+            """,
+            user_id, limit
+        )
+    finally:
+        await release_connection(conn)
+    
+    notifications_list = [
+        {
+            "id": n["id"],
+            "tipo": n["tipo"],
+            "titulo": n["titulo"],
+            "mensaje": n["mensaje"],
+            "referencia_id": n["referencia_id"],
+            "referencia_tipo": n["referencia_tipo"],
+            "fecha_envio": n["fecha_envio"].isoformat(),
+            "leido": n["leido"]
+        }
+        for n in notifications
+    ]
+    
+    await websocket.send_json({
+        "type": "recent_notifications",
+        "notifications": notifications_list
+    })
 
 
 @router.get("/ws/stats")
@@ -220,6 +225,11 @@ async def websocket_stats():
     Solo para administradores (agregar verificación de permisos)
     """
     stats = manager.get_stats()
+    stats["fanout"] = {
+        "backend": fanout.backend.nombre if fanout.backend else None,
+        "mensajes_recibidos": fanout.recibidos,
+    }
+    stats["contadores"] = fanout.contadores.get_stats()
     return JSONResponse(content=stats)
 
 
@@ -227,7 +237,12 @@ async def websocket_stats():
 async def broadcast_notification(notification_id: int):
     """
     Endpoint para enviar una notificación a través de WebSocket
-    Llamado internamente después de crear una notificación en BD
+    
+    Publica la notificación en el canal de fan-out: la entrega el worker
+    donde esté conectado el usuario (como reenvío, sin cambiar el contador).
+    Los INSERT en notificaciones ya se publican solos (trigger de
+    data/migrations/25_notificaciones_notify.sql); este endpoint sirve para
+    reenviar una existente.
     
     Args:
         notification_id: ID de la notificación a enviar
@@ -252,50 +267,19 @@ async def broadcast_notification(notification_id: int):
             """,
             notification_id
         )
-        
-        if not notification:
-            return JSONResponse(
-                status_code=404,
-                content={"error": "Notificación no encontrada"}
-            )
-        
-        user_id = notification["usuario_id"]
-        
-        # Enviar por WebSocket si el usuario está conectado
-        if manager.is_user_connected(user_id):
-            await manager.send_personal_message(
-                {
-                    "type": "notification",
-                    "data": {
-                        "id": notification["id"],
-                        "tipo": notification["tipo"],
-                        "titulo": notification["titulo"],
-                        "mensaje": notification["mensaje"],
-                        "referencia_id": notification["referencia_id"],
-                        "referencia_tipo": notification["referencia_tipo"],
-                        "fecha_envio": notification["fecha_envio"].isoformat()
-                    }
-                },
-                user_id
-            )
-            
-            # También enviar contador actualizado
-            count = await conn.fetchval(
-                "SELECT COUNT(*) FROM notificaciones WHERE usuario_id = $1 AND leido = FALSE",
-                user_id
-            )
-            
-            await manager.send_personal_message(
-                {
-                    "type": "count",
-                    "count": count
-                },
-                user_id
-            )
-            
-            return JSONResponse(content={"status": "sent", "user_id": user_id})
-        else:
-            return JSONResponse(content={"status": "user_offline", "user_id": user_id})
-    
     finally:
         await release_connection(conn)
+    
+    if not notification:
+        return JSONResponse(
+            status_code=404,
+            content={"error": "Notificación no encontrada"}
+        )
+    
+    await fanout.publicar_notificacion(notification, reenvio=True)
+    
+    return JSONResponse(content={
+        "status": "published",
+        "user_id": notification["usuario_id"],
+        "backend": fanout.backend.nombre
+    })
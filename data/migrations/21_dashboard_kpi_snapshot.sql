@@ -0,0 +1,220 @@
+-- =====================================================
+-- Migración: Snapshot de KPIs del Dashboard
+-- Fecha: 2026-10-19
+-- Descripción: Contadores diarios mantenidos por triggers
+--              y snapshot pre-agregado para /api/stats/dashboard
+-- =====================================================
+
+-- ============================================================================
+-- CONTADORES DIARIOS (mantenidos incrementalmente por triggers)
+-- ============================================================================
+
+-- Citas por día y estado
+CREATE TABLE IF NOT EXISTS kpi_citas_diarias (
+    fecha DATE NOT NULL,
+    estado VARCHAR(30) NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, estado)
+);
+
+-- Pacientes activos por día de registro
+CREATE TABLE IF NOT EXISTS kpi_pacientes_diarios (
+    fecha DATE PRIMARY KEY,
+    activos INT NOT NULL DEFAULT 0
+);
+
+-- Snapshot completo del dashboard (una sola fila)
+CREATE TABLE IF NOT EXISTS dashboard_kpi_snapshot (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    payload JSONB NOT NULL,
+    fecha_calculo DATE NOT NULL,
+    actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE kpi_citas_diarias IS 'Conteo de citas por día y estado, mantenido por trigger en citas';
+COMMENT ON TABLE kpi_pacientes_diarios IS 'Pacientes activos agrupados por fecha de registro, mantenido por trigger en pacientes';
+COMMENT ON TABLE dashboard_kpi_snapshot IS 'Snapshot pre-agregado del dashboard, refrescado por refrescar_dashboard_kpi_snapshot()';
+
+-- ============================================================================
+-- TRIGGERS DE MANTENIMIENTO INCREMENTAL
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION kpi_ajustar_cita(p_fecha DATE, p_estado VARCHAR, p_delta INT)
+RETURNS VOID AS $$
+BEGIN
+    IF p_fecha IS NULL OR p_estado IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO kpi_citas_diarias (fecha, estado, total)
+    VALUES (p_fecha, p_estado, p_delta)
+    ON CONFLICT (fecha, estado)
+    DO UPDATE SET total = kpi_citas_diarias.total + EXCLUDED.total;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trigger_kpi_citas()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM kpi_ajustar_cita(OLD.fecha_hora_inicio::date, OLD.estado::varchar, -1);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM kpi_ajustar_cita(NEW.fecha_hora_inicio::date, NEW.estado::varchar, 1);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_kpi_citas ON citas;
+CREATE TRIGGER trigger_kpi_citas
+AFTER INSERT OR DELETE OR UPDATE OF fecha_hora_inicio, estado ON citas
+FOR EACH ROW EXECUTE FUNCTION trigger_kpi_citas();
+
+CREATE OR REPLACE FUNCTION trigger_kpi_pacientes()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.activo THEN
+        INSERT INTO kpi_pacientes_diarios (fecha, activos)
+        VALUES (OLD.fecha_registro::date, -1)
+        ON CONFLICT (fecha) DO UPDATE SET activos = kpi_pacientes_diarios.activos - 1;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.activo THEN
+        INSERT INTO kpi_pacientes_diarios (fecha, activos)
+        VALUES (NEW.fecha_registro::date, 1)
+        ON CONFLICT (fecha) DO UPDATE SET activos = kpi_pacientes_diarios.activos + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_kpi_pacientes ON pacientes;
+CREATE TRIGGER trigger_kpi_pacientes
+AFTER INSERT OR DELETE OR UPDATE OF activo, fecha_registro ON pacientes
+FOR EACH ROW EXECUTE FUNCTION trigger_kpi_pacientes();
+
+-- ============================================================================
+-- BACKFILL INICIAL DE CONTADORES
+-- ============================================================================
+
+TRUNCATE kpi_citas_diarias;
+INSERT INTO kpi_citas_diarias (fecha, estado, total)
+SELECT fecha_hora_inicio::date, estado::varchar, COUNT(*)
+FROM citas
+WHERE fecha_hora_inicio IS NOT NULL AND estado IS NOT NULL
+GROUP BY fecha_hora_inicio::date, estado;
+
+TRUNCATE kpi_pacientes_diarios;
+INSERT INTO kpi_pacientes_diarios (fecha, activos)
+SELECT fecha_registro::date, COUNT(*)
+FROM pacientes
+WHERE activo = true
+GROUP BY fecha_registro::date;
+
+-- ============================================================================
+-- REFRESCO DEL SNAPSHOT (Celery beat: tasks.kpis.refrescar_kpi_dashboard)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION refrescar_dashboard_kpi_snapshot()
+RETURNS TIMESTAMP AS $$
+DECLARE
+    v_hoy DATE := CURRENT_DATE;
+    v_inicio_mes DATE := DATE_TRUNC('month', CURRENT_DATE)::date;
+    v_fin_mes DATE := (DATE_TRUNC('month', CURRENT_DATE) + INTERVAL '1 month')::date;
+    v_inicio_semana DATE := DATE_TRUNC('week', CURRENT_DATE)::date;
+    v_payload JSONB;
+BEGIN
+    SELECT jsonb_build_object(
+        'total_patients', (SELECT COALESCE(SUM(activos), 0) FROM kpi_pacientes_diarios),
+        'new_patients_this_month', (
+            SELECT COALESCE(SUM(activos), 0) FROM kpi_pacientes_diarios
+            WHERE fecha >= v_inicio_mes
+        ),
+        'total_appointments_today', (
+            SELECT COALESCE(SUM(total), 0) FROM kpi_citas_diarias WHERE fecha = v_hoy
+        ),
+        'total_appointments_week', (
+            SELECT COALESCE(SUM(total), 0) FROM kpi_citas_diarias
+            WHERE fecha >= v_inicio_semana AND fecha < v_inicio_semana + 7
+        ),
+        'total_appointments_month', (
+            SELECT COALESCE(SUM(total), 0) FROM kpi_citas_diarias
+            WHERE fecha >= v_inicio_mes AND fecha < v_fin_mes
+        ),
+        'appointments_by_status', (
+            SELECT COALESCE(jsonb_object_agg(estado, cantidad), '{}'::jsonb)
+            FROM (
+                SELECT estado, SUM(total) AS cantidad
+                FROM kpi_citas_diarias
+                WHERE fecha >= v_inicio_mes
+                GROUP BY estado
+            ) s
+        ),
+        'upcoming_appointments', (
+            SELECT COALESCE(SUM(total), 0) FROM kpi_citas_diarias
+            WHERE fecha >= v_hoy AND fecha < v_hoy + 7
+            AND estado NOT IN ('cancelada', 'completada')
+        ),
+        'top_treatments', (
+            SELECT COALESCE(jsonb_agg(jsonb_build_object('nombre', nombre_servicio, 'cantidad', cantidad)), '[]'::jsonb)
+            FROM (
+                SELECT t.nombre_servicio, COUNT(dc.id) AS cantidad
+                FROM detalle_cita dc
+                INNER JOIN tratamientos t ON dc.id_tratamiento = t.id
+                INNER JOIN citas c ON dc.id_cita = c.id
+                WHERE c.fecha_hora_inicio >= v_inicio_mes
+                AND c.estado != 'cancelada'
+                GROUP BY t.id, t.nombre_servicio
+                ORDER BY cantidad DESC
+                LIMIT 5
+            ) tt
+        ),
+        'ocupacion', (
+            WITH horarios_disponibles AS (
+                SELECT
+                    dia_semana,
+                    SUM(
+                        EXTRACT(EPOCH FROM (hora_fin - hora_inicio)) /
+                        (duracion_cita_minutos * 60)
+                    ) AS slots_disponibles
+                FROM horarios_trabajo
+                WHERE activo = true
+                AND (fecha_fin_vigencia IS NULL OR fecha_fin_vigencia >= CURRENT_DATE)
+                GROUP BY dia_semana
+            ),
+            citas_semana AS (
+                SELECT
+                    EXTRACT(DOW FROM fecha)::integer AS dia_semana,
+                    SUM(total) AS citas_realizadas
+                FROM kpi_citas_diarias
+                WHERE fecha >= v_inicio_semana AND fecha < v_inicio_semana + 7
+                AND estado NOT IN ('cancelada', 'no_asistio')
+                GROUP BY 1
+            )
+            SELECT jsonb_build_object(
+                'total_citas', COALESCE(SUM(cs.citas_realizadas), 0),
+                'total_slots', COALESCE(SUM(hd.slots_disponibles), 0)
+            )
+            FROM horarios_disponibles hd
+            LEFT JOIN citas_semana cs ON hd.dia_semana = cs.dia_semana
+        )
+    ) INTO v_payload;
+
+    INSERT INTO dashboard_kpi_snapshot (id, payload, fecha_calculo, actualizado_en)
+    VALUES (1, v_payload, v_hoy, CURRENT_TIMESTAMP)
+    ON CONFLICT (id) DO UPDATE SET
+        payload = EXCLUDED.payload,
+        fecha_calculo = EXCLUDED.fecha_calculo,
+        actualizado_en = EXCLUDED.actualizado_en;
+
+    RETURN CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION refrescar_dashboard_kpi_snapshot() IS 'Recalcula el snapshot del dashboard a partir de los contadores diarios';
+
+SELECT refrescar_dashboard_kpi_snapshot();
@@ -0,0 +1,18 @@
+-- =====================================================
+-- Migración: Pronósticos de demanda persistidos
+-- Fecha: 2026-10-19
+-- Descripción: Resultado del pronóstico por lote de todos
+--              los servicios, reutilizado por /analytics/metricas-predictivas
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS pronosticos_demanda (
+    servicio_id INT PRIMARY KEY,
+    meses_adelante SMALLINT NOT NULL,
+    resultado JSONB NOT NULL,
+    generado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_pronosticos_demanda_generado_en
+    ON pronosticos_demanda (generado_en);
+
+COMMENT ON TABLE pronosticos_demanda IS 'Último pronóstico de demanda por servicio, generado por /analytics/predicciones-demanda/lote';
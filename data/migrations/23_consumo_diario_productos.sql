@@ -0,0 +1,81 @@
+-- =====================================================
+-- Migración: Consumo diario de inventario
+-- Fecha: 2026-10-19
+-- Descripción: Salidas de stock agregadas por producto y día,
+--              mantenidas por trigger sobre stock_movements.
+--              /analytics/alertas-reorden lee de aquí en lugar
+--              de recorrer todos los movimientos.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS consumo_diario_productos (
+    producto_id INT NOT NULL,
+    fecha DATE NOT NULL,
+    cantidad NUMERIC(14, 3) NOT NULL DEFAULT 0,
+    PRIMARY KEY (producto_id, fecha)
+);
+
+CREATE INDEX IF NOT EXISTS idx_consumo_diario_fecha
+    ON consumo_diario_productos (fecha);
+
+COMMENT ON TABLE consumo_diario_productos IS 'Salidas de inventario por producto y día, mantenido por trigger en stock_movements';
+
+-- ============================================================================
+-- TRIGGER DE MANTENIMIENTO INCREMENTAL
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION consumo_ajustar(p_producto_id INT, p_fecha DATE, p_cantidad NUMERIC)
+RETURNS VOID AS $$
+BEGIN
+    IF p_producto_id IS NULL OR p_fecha IS NULL OR p_cantidad IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO consumo_diario_productos (producto_id, fecha, cantidad)
+    VALUES (p_producto_id, p_fecha, p_cantidad)
+    ON CONFLICT (producto_id, fecha)
+    DO UPDATE SET cantidad = consumo_diario_productos.cantidad + EXCLUDED.cantidad;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trigger_consumo_diario()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.tipo_movimiento = 'salida' THEN
+        PERFORM consumo_ajustar(
+            OLD.producto_id, OLD.fecha_movimiento::date, -ABS(OLD.cantidad_movimiento)
+        );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.tipo_movimiento = 'salida' THEN
+        PERFORM consumo_ajustar(
+            NEW.producto_id, NEW.fecha_movimiento::date, ABS(NEW.cantidad_movimiento)
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- stock_movements puede no existir en instalaciones sin el módulo de inventario
+DO $$
+BEGIN
+    IF to_regclass('stock_movements') IS NULL THEN
+        RAISE NOTICE 'stock_movements no existe; se omite el trigger de consumo diario';
+        RETURN;
+    END IF;
+
+    DROP TRIGGER IF EXISTS trigger_consumo_diario ON stock_movements;
+    CREATE TRIGGER trigger_consumo_diario
+    AFTER INSERT OR DELETE OR UPDATE OF producto_id, fecha_movimiento, tipo_movimiento, cantidad_movimiento
+    ON stock_movements
+    FOR EACH ROW EXECUTE FUNCTION trigger_consumo_diario();
+
+    -- Backfill inicial
+    TRUNCATE consumo_diario_productos;
+    INSERT INTO consumo_diario_productos (producto_id, fecha, cantidad)
+    SELECT producto_id, fecha_movimiento::date, SUM(ABS(cantidad_movimiento))
+    FROM stock_movements
+    WHERE tipo_movimiento = 'salida'
+    GROUP BY producto_id, fecha_movimiento::date;
+END;
+$$;
@@ -0,0 +1,32 @@
+-- =====================================================
+-- Migración: Despacho idempotente de recordatorios
+-- Fecha: 2026-10-19
+-- Descripción: Registro por (cita, tipo) usado por el pipeline
+--              de recordatorios (backend/tasks/recordatorios.py)
+--              para no enviar dos veces el mismo recordatorio
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS recordatorios_despachados (
+    id_cita BIGINT NOT NULL REFERENCES citas(id) ON DELETE CASCADE,
+    tipo TEXT NOT NULL,
+    canal TEXT,
+    estado TEXT NOT NULL DEFAULT 'pendiente' CHECK (estado IN ('pendiente', 'enviado', 'error')),
+    intentos SMALLINT NOT NULL DEFAULT 1,
+    error TEXT,
+    reclamado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    enviado_en TIMESTAMP,
+    PRIMARY KEY (id_cita, tipo)
+);
+
+-- Reintentos: solo se revisan las filas fallidas o atascadas
+CREATE INDEX IF NOT EXISTS idx_recordatorios_despachados_reintento
+    ON recordatorios_despachados (estado, reclamado_en)
+    WHERE estado <> 'enviado';
+
+-- Selección de citas de la ventana (24h / 2h)
+CREATE INDEX IF NOT EXISTS idx_citas_confirmadas_inicio
+    ON citas (fecha_hora_inicio)
+    WHERE estado = 'Confirmada';
+
+COMMENT ON TABLE recordatorios_despachados IS 'Un registro por (cita, tipo de recordatorio); garantiza envío único';
+COMMENT ON COLUMN recordatorios_despachados.estado IS 'pendiente: reclamado y en envío; enviado; error: se reintenta hasta RECORDATORIOS_MAX_INTENTOS';
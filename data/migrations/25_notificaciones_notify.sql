@@ -0,0 +1,47 @@
+-- =====================================================
+-- Migración: NOTIFY al insertar notificaciones
+-- Fecha: 2026-10-19
+-- Descripción: Publica cada notificación nueva en el canal
+--              'notificaciones' para el fan-out WebSocket entre
+--              workers (backend/ws_notifications/fanout.py).
+--              Si el contenido excede el límite de NOTIFY se
+--              publica solo la referencia (id).
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION notificar_notificacion_nueva()
+RETURNS TRIGGER AS $$
+DECLARE
+    payload TEXT;
+BEGIN
+    payload := json_build_object(
+        'type', 'notification',
+        'usuario_id', NEW.usuario_id,
+        'data', json_build_object(
+            'id', NEW.id,
+            'tipo', NEW.tipo,
+            'titulo', NEW.titulo,
+            'mensaje', NEW.mensaje,
+            'referencia_id', NEW.referencia_id,
+            'referencia_tipo', NEW.referencia_tipo,
+            'fecha_envio', NEW.fecha_envio
+        )
+    )::text;
+
+    IF octet_length(payload) > 7900 THEN
+        payload := json_build_object(
+            'type', 'notification',
+            'usuario_id', NEW.usuario_id,
+            'id', NEW.id
+        )::text;
+    END IF;
+
+    PERFORM pg_notify('notificaciones', payload);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notificaciones_notify ON notificaciones;
+CREATE TRIGGER trg_notificaciones_notify
+    AFTER INSERT ON notificaciones
+    FOR EACH ROW
+    EXECUTE FUNCTION notificar_notificacion_nueva();
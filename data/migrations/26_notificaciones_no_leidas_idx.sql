@@ -0,0 +1,12 @@
+-- =====================================================
+-- Migración: Índice parcial de notificaciones no leídas
+-- Fecha: 2026-10-19
+-- Descripción: Solo indexa las filas con leido = FALSE, que son
+--              las que cuentan los contadores de no leídas
+--              (backend/ws_notifications/contadores.py). Se mantiene
+--              pequeño aunque el historial de leídas crezca.
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_notificaciones_no_leidas
+    ON notificaciones (usuario_id)
+    WHERE leido = FALSE;
@@ -0,0 +1,65 @@
+-- =====================================================
+-- Migración: Búsqueda de pacientes con trigramas
+-- Fecha: 2026-10-19
+-- Descripción: Columna generada pacientes.busqueda (nombres sin
+--              acentos en minúsculas, código sin separadores y
+--              dígitos de teléfonos) con índice GIN de trigramas,
+--              respaldo del índice en memoria de
+--              backend/pacientes/busqueda.py y base del filtro
+--              de GET /pacientes?search=.
+--              El trigger publica en 'pacientes_cambios' cada
+--              alta/cambio/baja para que todos los workers
+--              actualicen su índice.
+-- =====================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() es STABLE; con el diccionario explícito se puede marcar
+-- IMMUTABLE y usar en columnas generadas e índices.
+-- Debe coincidir con normalizar() de backend/pacientes/busqueda.py
+CREATE OR REPLACE FUNCTION texto_busqueda(texto TEXT)
+RETURNS TEXT AS $$
+    SELECT btrim(regexp_replace(
+        lower(public.unaccent('public.unaccent'::regdictionary, COALESCE(texto, ''))),
+        '[^a-z0-9]+', ' ', 'g'
+    ))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+ALTER TABLE pacientes ADD COLUMN IF NOT EXISTS busqueda TEXT GENERATED ALWAYS AS (
+    texto_busqueda(
+        primer_nombre || ' ' || COALESCE(segundo_nombre, '') || ' ' ||
+        primer_apellido || ' ' || COALESCE(segundo_apellido, '')
+    )
+    || ' ' || replace(COALESCE(texto_busqueda(codigo_paciente), ''), ' ', '')
+    || ' ' || regexp_replace(COALESCE(telefono_principal, ''), '\D', '', 'g')
+    || ' ' || regexp_replace(COALESCE(telefono_secundario, ''), '\D', '', 'g')
+) STORED;
+
+-- LIKE '%x%' y los operadores de similitud (%, <%) usan este índice.
+-- No es parcial: GET /pacientes filtra activo con un parámetro (o no lo
+-- filtra) y el planificador no puede usar un índice WHERE activo = TRUE
+CREATE INDEX IF NOT EXISTS idx_pacientes_busqueda_trgm
+    ON pacientes USING GIN (busqueda gin_trgm_ops);
+
+-- Aviso de cambios para el índice en memoria
+CREATE OR REPLACE FUNCTION notificar_paciente_cambio()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('pacientes_cambios', json_build_object('id', OLD.id)::text);
+    ELSE
+        PERFORM pg_notify('pacientes_cambios', json_build_object('id', NEW.id)::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_pacientes_busqueda_notify ON pacientes;
+CREATE TRIGGER trg_pacientes_busqueda_notify
+    AFTER INSERT OR DELETE OR UPDATE OF
+        primer_nombre, segundo_nombre, primer_apellido, segundo_apellido,
+        telefono_principal, telefono_secundario, codigo_paciente, activo
+    ON pacientes
+    FOR EACH ROW
+    EXECUTE FUNCTION notificar_paciente_cambio();
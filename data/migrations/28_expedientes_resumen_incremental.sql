@@ -0,0 +1,183 @@
+-- =====================================================
+-- Migración: Resumen de expedientes mantenido por triggers
+-- Fecha: 2026-10-19
+-- Descripción: Reemplaza la vista materializada
+--              expedientes_medicos_resumen (data/06) por una tabla
+--              con el mismo nombre y columnas. Los cambios en
+--              consultas, diagnosticos, alergias, estilo_vida y
+--              pacientes recalculan solo los pacientes afectados,
+--              en la misma transacción. La definición queda en la
+--              vista normal expedientes_medicos_resumen_calculo,
+--              que usan los triggers, el backfill y el verificador
+--              (backend/medical_records/resumen.py).
+-- =====================================================
+
+-- Cálculo completo del resumen (misma definición que la vista materializada)
+CREATE OR REPLACE VIEW expedientes_medicos_resumen_calculo AS
+SELECT
+    p.id as paciente_id,
+    p.primer_nombre || ' ' || p.primer_apellido || COALESCE(' ' || p.segundo_apellido, '') as paciente_nombre,
+    p.fecha_nacimiento,
+    p.sexo,
+    p.telefono_principal as telefono,
+    p.email,
+    p.fecha_registro,
+    (SELECT MAX(fecha_consulta) FROM consultas WHERE id_paciente = p.id) as ultima_visita,
+    (SELECT COUNT(*) FROM consultas WHERE id_paciente = p.id AND finalizada = true) as total_consultas,
+    (SELECT COUNT(*) > 0 FROM alergias WHERE id_paciente = p.id AND activo = true) as tiene_alergias,
+    (SELECT nombre_diagnostico
+     FROM diagnosticos
+     WHERE id_paciente = p.id AND activo = true
+     ORDER BY fecha_diagnostico DESC
+     LIMIT 1) as diagnostico_reciente,
+    GREATEST(
+        p.fecha_modificacion,
+        (SELECT MAX(fecha_registro) FROM consultas WHERE id_paciente = p.id),
+        (SELECT MAX(fecha_registro) FROM alergias WHERE id_paciente = p.id),
+        (SELECT MAX(fecha_actualizacion) FROM estilo_vida WHERE id_paciente = p.id)
+    ) as fecha_ultima_actualizacion
+FROM pacientes p
+WHERE p.activo = true;
+
+-- Tabla con las mismas columnas que la vista materializada
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_matviews WHERE matviewname = 'expedientes_medicos_resumen') THEN
+        DROP MATERIALIZED VIEW expedientes_medicos_resumen;
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS expedientes_medicos_resumen AS
+SELECT * FROM expedientes_medicos_resumen_calculo
+WITH NO DATA;
+
+ALTER TABLE expedientes_medicos_resumen
+    DROP CONSTRAINT IF EXISTS expedientes_medicos_resumen_pkey;
+ALTER TABLE expedientes_medicos_resumen
+    ADD CONSTRAINT expedientes_medicos_resumen_pkey PRIMARY KEY (paciente_id);
+
+-- La subconsulta de estilo_vida no tenía índice
+CREATE INDEX IF NOT EXISTS idx_estilo_vida_paciente ON estilo_vida USING btree (id_paciente);
+
+-- Recalcula el resumen de los pacientes indicados
+CREATE OR REPLACE FUNCTION recalcular_expedientes_resumen(ids BIGINT[])
+RETURNS INTEGER AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    -- Serializa por paciente: quien espera el bloqueo calcula después con
+    -- los datos ya confirmados (cada sentencia toma un snapshot nuevo).
+    -- Se bloquean filas y no advisory locks para no llenar la tabla de
+    -- bloqueos con sentencias que tocan miles de pacientes.
+    PERFORM 1 FROM expedientes_medicos_resumen
+    WHERE paciente_id = ANY(ids)
+    ORDER BY paciente_id
+    FOR UPDATE;
+
+    -- Pacientes borrados o inactivos salen del resumen
+    DELETE FROM expedientes_medicos_resumen r
+    WHERE r.paciente_id = ANY(ids)
+    AND NOT EXISTS (
+        SELECT 1 FROM pacientes p WHERE p.id = r.paciente_id AND p.activo = true
+    );
+
+    INSERT INTO expedientes_medicos_resumen
+    SELECT * FROM expedientes_medicos_resumen_calculo
+    WHERE paciente_id = ANY(ids)
+    ON CONFLICT (paciente_id) DO UPDATE SET
+        paciente_nombre = EXCLUDED.paciente_nombre,
+        fecha_nacimiento = EXCLUDED.fecha_nacimiento,
+        sexo = EXCLUDED.sexo,
+        telefono = EXCLUDED.telefono,
+        email = EXCLUDED.email,
+        fecha_registro = EXCLUDED.fecha_registro,
+        ultima_visita = EXCLUDED.ultima_visita,
+        total_consultas = EXCLUDED.total_consultas,
+        tiene_alergias = EXCLUDED.tiene_alergias,
+        diagnostico_reciente = EXCLUDED.diagnostico_reciente,
+        fecha_ultima_actualizacion = EXCLUDED.fecha_ultima_actualizacion;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger por sentencia: junta los pacientes afectados (TG_ARGV[0] es la
+-- columna con el id del paciente) y los recalcula una sola vez
+CREATE OR REPLACE FUNCTION expedientes_resumen_cambios()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids BIGINT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        EXECUTE format('SELECT array_agg(DISTINCT %I) FROM nuevas', TG_ARGV[0]) INTO ids;
+    ELSIF TG_OP = 'DELETE' THEN
+        EXECUTE format('SELECT array_agg(DISTINCT %I) FROM viejas', TG_ARGV[0]) INTO ids;
+    ELSE
+        EXECUTE format(
+            'SELECT array_agg(x) FROM (SELECT %1$I AS x FROM nuevas UNION SELECT %1$I FROM viejas) t',
+            TG_ARGV[0]
+        ) INTO ids;
+    END IF;
+
+    IF ids IS NOT NULL THEN
+        PERFORM recalcular_expedientes_resumen(ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Las tablas de transición solo admiten un evento por trigger: tres por tabla
+DO $$
+DECLARE
+    t RECORD;
+    evento TEXT;
+    referencias TEXT;
+BEGIN
+    FOR t IN
+        SELECT * FROM (VALUES
+            ('consultas', 'id_paciente'),
+            ('diagnosticos', 'id_paciente'),
+            ('alergias', 'id_paciente'),
+            ('estilo_vida', 'id_paciente'),
+            ('pacientes', 'id')
+        ) AS v(tabla, columna)
+    LOOP
+        FOREACH evento IN ARRAY ARRAY['INSERT', 'UPDATE', 'DELETE'] LOOP
+            referencias := CASE evento
+                WHEN 'INSERT' THEN 'NEW TABLE AS nuevas'
+                WHEN 'DELETE' THEN 'OLD TABLE AS viejas'
+                ELSE 'OLD TABLE AS viejas NEW TABLE AS nuevas'
+            END;
+            EXECUTE format(
+                'DROP TRIGGER IF EXISTS %I ON %I',
+                'trg_resumen_' || t.tabla || '_' || lower(evento), t.tabla
+            );
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER %s ON %I REFERENCING %s '
+                'FOR EACH STATEMENT EXECUTE FUNCTION expedientes_resumen_cambios(%L)',
+                'trg_resumen_' || t.tabla || '_' || lower(evento), evento, t.tabla,
+                referencias, t.columna
+            );
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- Compatibilidad: recálculo completo (antes REFRESH MATERIALIZED VIEW)
+CREATE OR REPLACE FUNCTION refrescar_expedientes_resumen()
+RETURNS void AS $$
+BEGIN
+    PERFORM recalcular_expedientes_resumen(
+        ARRAY(SELECT paciente_id FROM expedientes_medicos_resumen
+              UNION SELECT id FROM pacientes WHERE activo = true)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Carga inicial (para tablas grandes usar el backfill por lotes:
+-- python scripts/expedientes_resumen.py backfill)
+INSERT INTO expedientes_medicos_resumen
+SELECT * FROM expedientes_medicos_resumen_calculo
+ON CONFLICT (paciente_id) DO NOTHING;
+
+COMMENT ON TABLE expedientes_medicos_resumen IS 'Resumen rápido de expedientes para listados (mantenido por triggers)';
+COMMENT ON VIEW expedientes_medicos_resumen_calculo IS 'Cálculo completo del resumen de expedientes';
@@ -0,0 +1,58 @@
+-- =====================================================
+-- Migración: Avisos de cambios en expedientes médicos
+-- Fecha: 2026-10-19
+-- Descripción: NOTIFY en el canal expedientes_cambios con el id
+--              del paciente cuando cambia cualquier tabla que arma
+--              el expediente (pacientes, alergias, antecedentes,
+--              estilo de vida, historia ginecológica, consultas y
+--              diagnósticos). Cada worker invalida con esto su
+--              caché de expedientes
+--              (backend/medical_records/expediente.py).
+--              NOTIFY se entrega al confirmar la transacción y
+--              descarta los avisos repetidos dentro de ella.
+-- =====================================================
+
+-- TG_ARGV[0] es la columna con el id del paciente
+CREATE OR REPLACE FUNCTION notificar_cambio_expediente()
+RETURNS TRIGGER AS $$
+DECLARE
+    viejo TEXT;
+    nuevo TEXT;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        viejo := to_jsonb(OLD) ->> TG_ARGV[0];
+        PERFORM pg_notify('expedientes_cambios', json_build_object('id', viejo::bigint)::text);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        nuevo := to_jsonb(NEW) ->> TG_ARGV[0];
+        IF viejo IS DISTINCT FROM nuevo THEN
+            PERFORM pg_notify('expedientes_cambios', json_build_object('id', nuevo::bigint)::text);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN
+        SELECT * FROM (VALUES
+            ('pacientes', 'id'),
+            ('alergias', 'id_paciente'),
+            ('antecedentes_medicos', 'id_paciente'),
+            ('estilo_vida', 'id_paciente'),
+            ('historia_ginecologica', 'id_paciente'),
+            ('consultas', 'id_paciente'),
+            ('diagnosticos', 'id_paciente')
+        ) AS v(tabla, columna)
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_notificar_expediente_' || t.tabla, t.tabla);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE ON %I '
+            'FOR EACH ROW EXECUTE FUNCTION notificar_cambio_expediente(%L)',
+            'trg_notificar_expediente_' || t.tabla, t.tabla, t.columna
+        );
+    END LOOP;
+END $$;
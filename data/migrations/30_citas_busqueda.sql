@@ -0,0 +1,57 @@
+-- =====================================================
+-- Migración: Búsqueda de citas con texto completo y trigramas
+-- Fecha: 2026-10-19
+-- Descripción: Columna generada citas.busqueda (tsvector de
+--              motivo_consulta y notas_recepcion con la
+--              configuración spanish_unaccent) con índice GIN,
+--              columna podologos.busqueda con índice de
+--              trigramas. Las citas de pacientes dados de baja
+--              también se buscan con el índice (no parcial) de
+--              pacientes.busqueda de la migración 27.
+--              Base de backend/citas/busqueda.py
+--              (GET /citas/buscar). Requiere la migración 27
+--              (texto_busqueda, pg_trgm y unaccent).
+-- =====================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- Configuración 'spanish' que además quita acentos antes de lematizar:
+-- "micosis" encuentra "Micósis" y "uña" encuentra "una"
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'spanish_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION spanish_unaccent (COPY = spanish);
+        ALTER TEXT SEARCH CONFIGURATION spanish_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END $$;
+
+-- El motivo pesa más que las notas de recepción en el ranking
+ALTER TABLE citas ADD COLUMN IF NOT EXISTS busqueda TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('spanish_unaccent'::regconfig, COALESCE(motivo_consulta, '')), 'A')
+    || setweight(to_tsvector('spanish_unaccent'::regconfig, COALESCE(notas_recepcion, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_citas_busqueda
+    ON citas USING GIN (busqueda);
+
+-- Reemplazado por idx_citas_busqueda (cubre también las notas)
+DROP INDEX IF EXISTS idx_citas_motivo_consulta_gin;
+
+-- Nombre del podólogo normalizado igual que pacientes.busqueda
+ALTER TABLE podologos ADD COLUMN IF NOT EXISTS busqueda TEXT GENERATED ALWAYS AS (
+    texto_busqueda(nombre_completo)
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_podologos_busqueda_trgm
+    ON podologos USING GIN (busqueda gin_trgm_ops);
+
+-- Citas de los podólogos que coinciden (idx_citas_fecha_podologo
+-- empieza por la fecha y no sirve para esto)
+CREATE INDEX IF NOT EXISTS idx_citas_podologo
+    ON citas (id_podologo, fecha_hora_inicio);
+
+ANALYZE citas;
+ANALYZE podologos;
+ANALYZE pacientes;
@@ -0,0 +1,50 @@
+-- =====================================================
+-- Migración: Versión del modelo de embeddings
+-- Fecha: 2026-10-19
+-- Descripción: Columna pregunta_embedding_modelo en
+--              aprendizajes_agente y knowledge_base con el
+--              modelo que generó pregunta_embedding. El
+--              indexador de backend/whatsapp_management/
+--              indexador_embeddings.py recalcula las filas sin
+--              embedding o con otro modelo. Si cambia la
+--              pregunta, el trigger borra la versión para que
+--              el embedding se vuelva a calcular.
+-- =====================================================
+
+ALTER TABLE aprendizajes_agente ADD COLUMN IF NOT EXISTS pregunta_embedding_modelo TEXT;
+ALTER TABLE knowledge_base ADD COLUMN IF NOT EXISTS pregunta_embedding_modelo TEXT;
+
+COMMENT ON COLUMN aprendizajes_agente.pregunta_embedding_modelo IS 'Modelo que generó pregunta_embedding (NULL = pendiente)';
+COMMENT ON COLUMN knowledge_base.pregunta_embedding_modelo IS 'Modelo que generó pregunta_embedding (NULL = pendiente)';
+
+-- Los embeddings existentes son del modelo que se usaba hasta ahora
+UPDATE aprendizajes_agente SET pregunta_embedding_modelo = 'all-MiniLM-L6-v2'
+WHERE pregunta_embedding IS NOT NULL AND pregunta_embedding_modelo IS NULL;
+UPDATE knowledge_base SET pregunta_embedding_modelo = 'all-MiniLM-L6-v2'
+WHERE pregunta_embedding IS NOT NULL AND pregunta_embedding_modelo IS NULL;
+
+-- Pregunta nueva con el embedding anterior: queda pendiente. Si el mismo
+-- UPDATE trae el embedding nuevo se respeta.
+CREATE OR REPLACE FUNCTION invalidar_embedding_pregunta()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.pregunta_embedding IS NOT DISTINCT FROM OLD.pregunta_embedding THEN
+        NEW.pregunta_embedding_modelo := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_aprendizajes_embedding_obsoleto ON aprendizajes_agente;
+CREATE TRIGGER trg_aprendizajes_embedding_obsoleto
+    BEFORE UPDATE OF pregunta_original ON aprendizajes_agente
+    FOR EACH ROW
+    WHEN (OLD.pregunta_original IS DISTINCT FROM NEW.pregunta_original)
+    EXECUTE FUNCTION invalidar_embedding_pregunta();
+
+DROP TRIGGER IF EXISTS trg_knowledge_base_embedding_obsoleto ON knowledge_base;
+CREATE TRIGGER trg_knowledge_base_embedding_obsoleto
+    BEFORE UPDATE OF pregunta ON knowledge_base
+    FOR EACH ROW
+    WHEN (OLD.pregunta IS DISTINCT FROM NEW.pregunta)
+    EXECUTE FUNCTION invalidar_embedding_pregunta();
@@ -0,0 +1,32 @@
+-- =====================================================
+-- Migración: Duplicados en aprendizajes y knowledge base
+-- Fecha: 2026-10-19
+-- Descripción: Columna duplicado_de en aprendizajes_agente,
+--              knowledge_base y knowledge_base_validated: la
+--              entrada existente de la que una pregunta nueva
+--              es paráfrasis (similitud de embeddings >=
+--              DUPLICADOS_UMBRAL). La llena el indexador de
+--              embeddings al procesar filas nuevas
+--              (knowledge_base_validated no pasa por el
+--              indexador: solo se agrupa y fusiona) y la
+--              resuelve la fusión de clusters de
+--              backend/whatsapp_management/duplicados.py.
+-- =====================================================
+
+ALTER TABLE aprendizajes_agente ADD COLUMN IF NOT EXISTS duplicado_de INT
+    REFERENCES aprendizajes_agente(id) ON DELETE SET NULL;
+ALTER TABLE knowledge_base ADD COLUMN IF NOT EXISTS duplicado_de INT
+    REFERENCES knowledge_base(id) ON DELETE SET NULL;
+ALTER TABLE knowledge_base_validated ADD COLUMN IF NOT EXISTS duplicado_de INT
+    REFERENCES knowledge_base_validated(id) ON DELETE SET NULL;
+
+COMMENT ON COLUMN aprendizajes_agente.duplicado_de IS 'Entrada existente de la que esta pregunta es paráfrasis (pendiente de fusionar)';
+COMMENT ON COLUMN knowledge_base.duplicado_de IS 'Entrada existente de la que esta pregunta es paráfrasis (pendiente de fusionar)';
+COMMENT ON COLUMN knowledge_base_validated.duplicado_de IS 'Entrada existente de la que esta pregunta es paráfrasis (pendiente de fusionar)';
+
+CREATE INDEX IF NOT EXISTS idx_aprendizajes_duplicado_de
+    ON aprendizajes_agente (duplicado_de) WHERE duplicado_de IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_knowledge_base_duplicado_de
+    ON knowledge_base (duplicado_de) WHERE duplicado_de IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_kb_validated_duplicado_de
+    ON knowledge_base_validated (duplicado_de) WHERE duplicado_de IS NOT NULL;
@@ -0,0 +1,24 @@
+-- =====================================================
+-- Migración: Resúmenes de conversaciones en segundo plano
+-- Fecha: 2026-10-19
+-- Descripción: Columna fecha_actividad_resumida en
+--              conversaciones_embeddings: la
+--              fecha_ultima_actividad de la conversación que
+--              cubre el resumen. El pipeline de
+--              backend/whatsapp_management/
+--              resumenes_conversaciones.py vuelve a resumir las
+--              conversaciones inactivas o cerradas cuya
+--              actividad es posterior al resumen.
+-- =====================================================
+
+ALTER TABLE conversaciones_embeddings ADD COLUMN IF NOT EXISTS fecha_actividad_resumida TIMESTAMP;
+
+COMMENT ON COLUMN conversaciones_embeddings.fecha_actividad_resumida IS 'fecha_ultima_actividad de la conversación al generar el resumen (NULL = desconocida)';
+
+-- Los resúmenes existentes cubren la conversación hasta su creación
+UPDATE conversaciones_embeddings SET fecha_actividad_resumida = fecha_creacion
+WHERE fecha_actividad_resumida IS NULL;
+
+-- Búsqueda de conversaciones inactivas por ventana de actividad
+CREATE INDEX IF NOT EXISTS idx_conversaciones_ultima_actividad
+    ON conversaciones (fecha_ultima_actividad);
@@ -0,0 +1,33 @@
+-- =====================================================
+-- Migración: Versión del modelo de embeddings en la KB validada
+-- Fecha: 2026-10-19
+-- Descripción: Lo mismo que la migración 31 para
+--              knowledge_base_validated, que es la que consulta
+--              el agente (tools/kb_tools.py). El indexador de
+--              backend/whatsapp_management/indexador_embeddings.py
+--              la recalcula al cambiar EMBEDDINGS_MODELO y la
+--              búsqueda solo compara contra filas del modelo
+--              actual.
+-- =====================================================
+
+ALTER TABLE knowledge_base_validated ADD COLUMN IF NOT EXISTS pregunta_embedding_modelo TEXT;
+
+COMMENT ON COLUMN knowledge_base_validated.pregunta_embedding_modelo IS 'Modelo que generó pregunta_embedding (NULL = pendiente)';
+
+-- Los embeddings existentes son del modelo que se usaba hasta ahora
+UPDATE knowledge_base_validated SET pregunta_embedding_modelo = 'all-MiniLM-L6-v2'
+WHERE pregunta_embedding IS NOT NULL AND pregunta_embedding_modelo IS NULL;
+
+-- Búsqueda del agente: aprobadas del modelo actual
+CREATE INDEX IF NOT EXISTS idx_kb_validated_modelo
+    ON knowledge_base_validated (pregunta_embedding_modelo, fecha_creacion DESC)
+    WHERE aprobado = true;
+
+-- Pregunta nueva con el embedding anterior: queda pendiente
+-- (invalidar_embedding_pregunta() es de la migración 31)
+DROP TRIGGER IF EXISTS trg_kb_validated_embedding_obsoleto ON knowledge_base_validated;
+CREATE TRIGGER trg_kb_validated_embedding_obsoleto
+    BEFORE UPDATE OF pregunta ON knowledge_base_validated
+    FOR EACH ROW
+    WHEN (OLD.pregunta IS DISTINCT FROM NEW.pregunta)
+    EXECUTE FUNCTION invalidar_embedding_pregunta();
@@ -38,6 +38,14 @@ def check_and_refresh():
         else:
             print("⚠️  No se encontraron las tablas de expedientes médicos")
         
+        # Verificar resumen de expedientes (tabla desde la migración 28)
+        cursor.execute("""
+            SELECT tablename 
+            FROM pg_tables 
+            WHERE tablename = 'expedientes_medicos_resumen'
+        """)
+        tabla_resumen = cursor.fetchone()
+
         # Verificar vista materializada
         print("\nVerificando vista materializada...")
         cursor.execute("""
@@ -47,7 +55,14 @@ def check_and_refresh():
         """)
         view = cursor.fetchone()
         
-        if view:
+        if tabla_resumen:
+            print("✅ Resumen mantenido por triggers (migración 28)")
+            cursor.execute("SELECT COUNT(*) FROM expedientes_medicos_resumen")
+            count = cursor.fetchone()[0]
+            print(f"📊 Total de pacientes en resumen: {count}")
+            print("   Verificar consistencia: python backend/scripts/expedientes_resumen.py verificar")
+
+        elif view:
             print(f"✅ Vista materializada encontrada: {view[0]}")
             
             # Refrescar vista materializada
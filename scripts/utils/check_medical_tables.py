@@ -30,7 +30,16 @@ for tabla in tablas_necesarias:
     status = "✅ EXISTE" if existe else "❌ NO EXISTE"
     print(f"  - {tabla}: {status}")
 
-print("\n=== VERIFICANDO VISTA MATERIALIZADA ===\n")
+print("\n=== VERIFICANDO RESUMEN DE EXPEDIENTES ===\n")
+# Tabla mantenida por triggers desde la migración 28; antes, vista materializada
+cur.execute("""
+    SELECT EXISTS (
+        SELECT FROM pg_tables 
+        WHERE schemaname = 'public' 
+        AND tablename = 'expedientes_medicos_resumen'
+    )
+""")
+existe_tabla = cur.fetchone()[0]
 cur.execute("""
     SELECT EXISTS (
         SELECT FROM pg_matviews 
@@ -39,8 +48,13 @@ cur.execute("""
     )
 """)
 existe_vista = cur.fetchone()[0]
-status_vista = "✅ EXISTE" if existe_vista else "❌ NO EXISTE"
-print(f"  - expedientes_medicos_resumen: {status_vista}")
+if existe_tabla:
+    status_resumen = "✅ EXISTE (tabla con triggers)"
+elif existe_vista:
+    status_resumen = "⚠️  VISTA MATERIALIZADA (falta la migración 28)"
+else:
+    status_resumen = "❌ NO EXISTE"
+print(f"  - expedientes_medicos_resumen: {status_resumen}")
 
 print("\n=== VERIFICANDO EXTENSIÓN pg_trgm ===\n")
 cur.execute("""
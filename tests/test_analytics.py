@@ -0,0 +1,145 @@
+"""
+Tests for analytics forecasting
+===============================
+
+Tests for backend/analytics/predictor.py and pronosticos.py
+"""
+from datetime import datetime
+
+import asyncpg
+import pandas as pd
+import pytest
+
+from backend.analytics import predictor, pronosticos
+
+
+def _serie(base: int, meses: int):
+    return [
+        {'fecha': datetime(2025 + m // 12, m % 12 + 1, 1), 'cantidad': base + (m * 7) % 11}
+        for m in range(meses)
+    ]
+
+
+@pytest.mark.unit
+class TestDemandForecastBatch:
+    """Tests for the vectorized batch forecast"""
+
+    def test_batch_matches_single_series(self):
+        """Each series in a batch gets the same forecast as when fitted alone"""
+        series = {1: _serie(20, 12), 2: _serie(5, 14), 3: _serie(40, 4)}
+        registros = [{'clave': k, **fila} for k, datos in series.items() for fila in datos]
+
+        lote = predictor._pronosticar_lote(registros, 6)
+
+        for clave, datos in series.items():
+            individual = predictor._predecir_demanda(
+                predictor._entrenar_modelos_demanda(datos), 6
+            )
+            assert lote[clave] == individual
+
+    def test_short_series_is_reported_not_fitted(self):
+        """Series with fewer than 3 months return an error and no forecast"""
+        registros = [{'clave': 'x', **fila} for fila in _serie(10, 2)]
+
+        resultado = predictor._pronosticar_lote(registros, 3)
+
+        assert resultado['x']['predicciones'] == []
+        assert 'error' in resultado['x']
+
+
+def _producto(producto_id, stock_actual, **extra):
+    return {
+        'producto_id': producto_id,
+        'codigo_producto': f"P{producto_id}",
+        'nombre': f"Producto {producto_id}",
+        'stock_actual': stock_actual,
+        'stock_minimo': 10.0,
+        'stock_maximo': 50.0,
+        'tiempo_reposicion_dias': 4,
+        'costo_unitario': 2.0,
+        **extra,
+    }
+
+
+@pytest.mark.unit
+class TestReorderAnalysis:
+    """Tests for the vectorized reorder-point evaluation"""
+
+    def test_daily_aggregation(self):
+        """Movements are summed per day before computing totals and squares"""
+        hoy = datetime.now()
+        consumo = predictor.consumo_desde_movimientos([
+            {'producto_id': 1, 'fecha': hoy, 'cantidad': 2.0},
+            {'producto_id': 1, 'fecha': hoy, 'cantidad': 3.0},
+            {'producto_id': 2, 'fecha': hoy, 'cantidad': 1.0},
+        ])
+
+        assert consumo.loc[1, 'total'] == 5.0
+        assert consumo.loc[1, 'suma_cuadrados'] == 25.0
+        assert consumo.loc[2, 'total'] == 1.0
+
+    def test_levels_without_consumption(self):
+        """Without history the reorder point is stock_minimo * 1.2"""
+        analyzer = predictor.InventoryAnalyzer()
+        productos = [_producto(1, 5.0), _producto(2, 11.0), _producto(3, 30.0), _producto(4, 80.0)]
+
+        resultado = analyzer.evaluar_reorden(productos, predictor.consumo_desde_movimientos([]))
+
+        assert [a['producto_id'] for a in resultado['alertas_criticas']] == [1]
+        assert [a['producto_id'] for a in resultado['alertas_advertencia']] == [2]
+        assert resultado['alertas_advertencia'][0]['punto_reorden'] == 12.0
+        assert resultado['alertas_criticas'][0]['dias_restantes'] == 'N/A'
+        assert [r['producto_id'] for r in resultado['recomendaciones']] == [4]
+        assert resultado['recomendaciones'][0]['costo_oportunidad'] == 60.0
+
+    def test_safety_stock_raises_reorder_point(self):
+        """Volatile consumption moves the reorder point above the static rule"""
+        analyzer = predictor.InventoryAnalyzer()
+        consumo = pd.DataFrame(
+            {'total': [60.0], 'suma_cuadrados': [1800.0]},
+            index=pd.Index([1], name='producto_id'),
+        )
+
+        resultado = analyzer.evaluar_reorden([_producto(1, 20.0)], consumo)
+
+        alerta = resultado['alertas_advertencia'][0]
+        assert alerta['consumo_diario'] == 2.0
+        assert alerta['stock_seguridad'] > 0
+        assert alerta['punto_reorden'] > 12.0
+
+
+class ConexionPronosticos:
+    def __init__(self, filas):
+        self.filas = filas
+        self.guardadas = []
+
+    async def fetch(self, query, *params):
+        return self.filas
+
+    async def executemany(self, query, filas):
+        self.guardadas.extend(filas)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestPronosticosLote:
+    """Tests for backend/analytics/pronosticos.py"""
+
+    async def test_periodic_job_persists_every_forecast(self):
+        filas = [
+            {'servicio_id': clave, 'fecha': fila['fecha'], 'cantidad': fila['cantidad']}
+            for clave, base in ((1, 20), (2, 5))
+            for fila in _serie(base, 12)
+        ]
+        conn = ConexionPronosticos(filas)
+
+        assert await pronosticos.generar_pronosticos(conn, 3) == 2
+        assert [servicio_id for servicio_id, *_ in conn.guardadas] == [1, 2]
+        assert all(meses == 3 for _, meses, _ in conn.guardadas)
+
+    async def test_missing_catalog_omits_names(self):
+        class SinCatalogo:
+            async def fetch(self, query, *params):
+                raise asyncpg.UndefinedTableError('relation "catalogo_servicios" does not exist')
+
+        assert await pronosticos._info_servicios(SinCatalogo(), [1]) == {}
@@ -0,0 +1,131 @@
+"""
+Tests for the batched audit writer
+==================================
+
+Tests for backend/audit/writer.py
+"""
+import asyncio
+
+import asyncpg
+import pytest
+
+from backend.audit import writer as writer_mod
+from backend.audit.writer import AuditWriter, crear_registro
+
+
+class FakeConnection:
+    """Records COPY batches; rejects rows for unknown users"""
+
+    def __init__(self, usuarios_validos=None, caida=False):
+        self.usuarios_validos = usuarios_validos
+        self.caida = caida
+        self.lotes = []
+
+    async def copy_records_to_table(self, tabla, records, columns):
+        if self.caida:
+            raise ConnectionResetError("conexión perdida")
+        if self.usuarios_validos is not None and any(
+            r[0] not in self.usuarios_validos for r in records
+        ):
+            raise asyncpg.ForeignKeyViolationError("usuario inexistente")
+        self.lotes.append(list(records))
+
+
+@pytest.fixture
+def conexion(monkeypatch):
+    conn = FakeConnection()
+
+    async def get_connection():
+        return conn
+
+    async def release_connection(_conn):
+        pass
+
+    monkeypatch.setattr(writer_mod.db, "get_connection", get_connection)
+    monkeypatch.setattr(writer_mod.db, "release_connection", release_connection)
+    return conn
+
+
+def _registro(i, usuario_id=1):
+    return crear_registro(usuario_id, "crear", "pagos", f"Pago {i}", datos_nuevos={"i": i})
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestAuditWriter:
+    """Tests for batching, drop policy and shutdown flush"""
+
+    async def test_flushes_by_size_then_by_time(self, conexion):
+        """A full batch is written at once; the remainder after the interval"""
+        writer = AuditWriter(tamano_lote=10, intervalo_ms=100)
+        writer.iniciar()
+
+        for i in range(10):
+            writer.encolar(_registro(i))
+        await asyncio.sleep(0.02)
+        assert writer.escritos == 10
+
+        for i in range(10, 13):
+            writer.encolar(_registro(i))
+        await asyncio.sleep(0.02)
+        assert writer.escritos == 10
+
+        await asyncio.sleep(0.15)
+        assert writer.escritos == 13
+        await writer.detener()
+
+        assert [len(l) for l in conexion.lotes] == [10, 3]
+        assert [r[3] for l in conexion.lotes for r in l] == [f"Pago {i}" for i in range(13)]
+
+    async def test_drop_policy_when_full(self, conexion):
+        """With the queue full new records are dropped (or the oldest, by policy)"""
+        nuevos = AuditWriter(max_cola=3, politica="descartar_nuevos")
+        resultados = [nuevos.encolar(_registro(i)) for i in range(5)]
+        antiguos = AuditWriter(max_cola=3, politica="descartar_antiguos")
+        for i in range(5):
+            antiguos.encolar(_registro(i))
+
+        assert resultados == [True, True, True, False, False]
+        assert [r[3] for r in nuevos._cola] == ["Pago 0", "Pago 1", "Pago 2"]
+        assert [r[3] for r in antiguos._cola] == ["Pago 2", "Pago 3", "Pago 4"]
+        assert nuevos.descartados == antiguos.descartados == 2
+
+    async def test_bad_rows_are_rejected_individually(self, conexion):
+        """A constraint violation only loses the offending row"""
+        conexion.usuarios_validos = {1}
+        writer = AuditWriter()
+        for i in range(4):
+            writer.encolar(_registro(i, usuario_id=99 if i == 2 else 1))
+
+        await writer.detener()
+
+        assert writer.escritos == 3
+        assert writer.rechazados == 1
+
+    async def test_connection_failure_requeues_batch(self, conexion):
+        """If the database is unreachable the batch goes back to the queue in order"""
+        conexion.caida = True
+        writer = AuditWriter(tamano_lote=2)
+        for i in range(3):
+            writer.encolar(_registro(i))
+
+        with pytest.raises(ConnectionResetError):
+            await writer.vaciar()
+        assert [r[3] for r in writer._cola] == ["Pago 0", "Pago 1", "Pago 2"]
+
+        conexion.caida = False
+        assert await writer.vaciar() == 3
+
+    async def test_enqueue_async_waits_for_space(self, conexion):
+        """Async enqueue wakes the writer and waits instead of dropping"""
+        writer = AuditWriter(max_cola=2, tamano_lote=2, intervalo_ms=10_000, espera_ms=1000)
+        writer.iniciar()
+        writer.encolar(_registro(0))
+        writer.encolar(_registro(1))
+
+        aceptado = await writer.encolar_async(_registro(2))
+        await writer.detener()
+
+        assert aceptado
+        assert writer.descartados == 0
+        assert writer.escritos == 3
@@ -0,0 +1,432 @@
+"""
+Tests for blocking database calls on the event loop
+===================================================
+
+Tests for backend/horarios, backend/cortes_caja and
+backend/auth/permissions_router.py, plus a repo-wide check:
+
+- Static: no ``async def`` under backend/ opens psycopg connections, uses a
+  synchronous cursor, or calls a synchronous function that does (the old
+  ``def get_by_id`` + ``get_db_connection()`` pattern).
+- Runtime: the ported routes run with asyncio debug mode and
+  ``slow_callback_duration``; any step that holds the loop longer than the
+  threshold fails the test.
+"""
+import ast
+import asyncio
+import logging
+import time
+from datetime import date, time as dtime
+from decimal import Decimal
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import db
+from auth.middleware import get_current_user
+from auth.permissions_router import router as permissions_router
+from cortes_caja.router import router as cortes_router
+from horarios.router import router as horarios_router
+
+RAIZ = Path(__file__).resolve().parent.parent / "backend"
+EXCLUIR = {"scripts", "__pycache__", "venv"}
+METODOS_CURSOR = {"execute", "executemany", "fetchone", "fetchall", "fetchmany", "commit", "rollback"}
+UMBRAL_SEGUNDOS = 0.05
+# Las rutas reales (validación, serialización) tienen más margen que el control
+UMBRAL_RUTAS_SEGUNDOS = 0.1
+
+# Pendientes de migrar: los tools del agente operador siguen usando cursores
+# psycopg2 de agents/sub_agent_operator/utils/database.py (deprecado). Cuando
+# un archivo quede limpio hay que quitarlo de aquí (lo exige un test).
+PENDIENTES = {
+    "agents/sub_agent_operator/nodes/cancel_appointment.py",
+    "agents/sub_agent_operator/nodes/complex_search.py",
+    "agents/sub_agent_operator/nodes/create_appointment.py",
+    "agents/sub_agent_operator/nodes/generate_report.py",
+    "agents/sub_agent_operator/nodes/query_appointments.py",
+    "agents/sub_agent_operator/nodes/query_patients.py",
+    "agents/sub_agent_operator/nodes/reschedule_appointment.py",
+    "agents/sub_agent_operator/nodes/update_patient.py",
+}
+
+
+# ============================================================================
+# ESCANEO ESTÁTICO
+# ============================================================================
+
+
+def _raiz_atributo(nodo):
+    while isinstance(nodo, ast.Attribute):
+        nodo = nodo.value
+    return nodo.id if isinstance(nodo, ast.Name) else None
+
+
+def _nombre(call: ast.Call):
+    if isinstance(call.func, ast.Attribute):
+        return call.func.attr
+    if isinstance(call.func, ast.Name):
+        return call.func.id
+    return None
+
+
+def _nodos_propios(funcion):
+    """Nodos del cuerpo sin entrar en funciones anidadas"""
+    pendientes = list(funcion.body)
+    while pendientes:
+        nodo = pendientes.pop()
+        if isinstance(nodo, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        yield nodo
+        pendientes.extend(ast.iter_child_nodes(nodo))
+
+
+def _llamadas(funcion):
+    """(llamada, esperada con await) del cuerpo de la función"""
+    esperadas = {
+        id(n.value) for n in _nodos_propios(funcion)
+        if isinstance(n, ast.Await) and isinstance(n.value, ast.Call)
+    }
+    for nodo in _nodos_propios(funcion):
+        if isinstance(nodo, ast.Call):
+            yield nodo, id(nodo) in esperadas
+
+
+def _es_psycopg(call: ast.Call) -> bool:
+    return _nombre(call) == "connect" and _raiz_atributo(call.func) in {"psycopg", "psycopg2"}
+
+
+def _es_bloqueante_sincrona(funcion) -> bool:
+    """Función síncrona que hace I/O de BD bloqueante"""
+    return any(
+        _es_psycopg(call) or _nombre(call) in {"cursor", "commit", "get_db_connection"}
+        for call, _ in _llamadas(funcion)
+    )
+
+
+def _arboles():
+    for path in sorted(RAIZ.rglob("*.py")):
+        if EXCLUIR & set(path.relative_to(RAIZ).parts):
+            continue
+        yield path.relative_to(RAIZ), ast.parse(path.read_text(encoding="utf-8"))
+
+
+def escanear_bloqueos(arboles=None):
+    """
+    Busca I/O de BD bloqueante alcanzable desde ``async def``.
+
+    Returns:
+        Lista de "archivo:línea función: motivo"
+    """
+    arboles = list(arboles if arboles is not None else _arboles())
+    sincronas_bloqueantes = {
+        funcion.name
+        for _, arbol in arboles
+        for funcion in ast.walk(arbol)
+        if isinstance(funcion, ast.FunctionDef) and _es_bloqueante_sincrona(funcion)
+    }
+
+    hallazgos = []
+    for ruta, arbol in arboles:
+        for funcion in ast.walk(arbol):
+            if not isinstance(funcion, ast.AsyncFunctionDef):
+                continue
+            for call, esperada in _llamadas(funcion):
+                nombre = _nombre(call)
+                motivo = None
+                if _es_psycopg(call):
+                    motivo = "conexión psycopg fuera del pool"
+                elif esperada:
+                    continue
+                elif nombre in METODOS_CURSOR and isinstance(call.func, ast.Attribute):
+                    motivo = f".{nombre}() síncrono"
+                elif nombre == "sleep" and _raiz_atributo(call.func) == "time":
+                    motivo = "time.sleep()"
+                elif nombre in sincronas_bloqueantes:
+                    motivo = f"llama a {nombre}() (BD síncrona)"
+                if motivo:
+                    hallazgos.append(f"{ruta}:{call.lineno} {funcion.name}: {motivo}")
+    return hallazgos
+
+
+@pytest.mark.unit
+class TestBlockingScan:
+    """Static detection of blocking DB I/O reachable from async code"""
+
+    def test_backend_has_no_blocking_db_calls(self):
+        """No async function in backend/ does synchronous DB I/O"""
+        hallazgos = escanear_bloqueos()
+        nuevos = [h for h in hallazgos if h.split(":", 1)[0] not in PENDIENTES]
+        resueltos = PENDIENTES - {h.split(":", 1)[0] for h in hallazgos}
+
+        assert nuevos == []
+        assert resueltos == set(), "Quitar de PENDIENTES"
+
+    def test_scan_detects_legacy_patterns(self):
+        """The scan flags the patterns the ported services used to have"""
+        codigo = '''
+import psycopg
+
+class Servicio:
+    def get_by_id(self, id):
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            return cur.fetchone()
+
+async def ruta(id):
+    return servicio.get_by_id(id)
+
+async def otra():
+    conn = await psycopg.AsyncConnection.connect("")
+    cur.execute("SELECT 1")
+    await conn.execute("SELECT 1")
+'''
+        hallazgos = escanear_bloqueos([(Path("legacy.py"), ast.parse(codigo))])
+
+        assert sorted(h.split(": ", 1)[1] for h in hallazgos) == [
+            ".execute() síncrono",
+            "conexión psycopg fuera del pool",
+            "llama a get_by_id() (BD síncrona)",
+        ]
+
+
+# ============================================================================
+# DETECCIÓN EN EJECUCIÓN (asyncio debug)
+# ============================================================================
+
+
+class FakeConnection:
+    """asyncpg-like connection: every query yields to the loop; answers by SQL fragment"""
+
+    def __init__(self, respuestas):
+        self.respuestas = respuestas
+        self.consultas = []
+
+    async def _responder(self, query, defecto=None):
+        await asyncio.sleep(0.001)
+        self.consultas.append(query)
+        for fragmento, valor in self.respuestas.items():
+            if fragmento in query:
+                return valor
+        return defecto
+
+    async def fetch(self, query, *args):
+        filas = await self._responder(query, [])
+        return [filas] if isinstance(filas, dict) else filas
+
+    async def fetchrow(self, query, *args):
+        return await self._responder(query)
+
+    async def fetchval(self, query, *args):
+        return await self._responder(query)
+
+    async def execute(self, query, *args):
+        return await self._responder(query, "OK")
+
+    def transaction(self):
+        return _Transaccion()
+
+
+class _Transaccion:
+    async def __aenter__(self):
+        await asyncio.sleep(0)
+
+    async def __aexit__(self, *exc):
+        await asyncio.sleep(0)
+
+
+class FakePool:
+    """Supports both ``await pool.acquire()`` and ``async with pool.acquire()``"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.tomadas = 0
+
+    def acquire(self):
+        pool = self
+
+        class _Adquisicion:
+            def __await__(self):
+                pool.tomadas += 1
+                yield from asyncio.sleep(0).__await__()
+                return pool.conn
+
+            async def __aenter__(self):
+                return await self
+
+            async def __aexit__(self, *exc):
+                await pool.release(pool.conn)
+
+        return _Adquisicion()
+
+    async def release(self, conn):
+        self.tomadas -= 1
+
+
+class _Usuario(dict):
+    """Current user usable both as dict (horarios) and as User (permissions)"""
+
+    __getattr__ = dict.__getitem__
+
+
+class DetectorBloqueos(logging.Handler):
+    """Collects asyncio debug 'Executing ... took N seconds' warnings"""
+
+    def __init__(self, umbral=UMBRAL_SEGUNDOS):
+        super().__init__(logging.WARNING)
+        self.umbral = umbral
+        self.lentos = []
+
+    def emit(self, record):
+        mensaje = record.getMessage()
+        if mensaje.startswith("Executing"):
+            self.lentos.append(mensaje)
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        self._debug = loop.get_debug()
+        self._umbral_previo = loop.slow_callback_duration
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.umbral
+        logging.getLogger("asyncio").addHandler(self)
+        # El loop decide si mide un paso antes de ejecutarlo
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc):
+        # Ceder una vez para que el loop mida el paso en curso
+        await asyncio.sleep(0)
+        loop = asyncio.get_running_loop()
+        loop.set_debug(self._debug)
+        loop.slow_callback_duration = self._umbral_previo
+        logging.getLogger("asyncio").removeHandler(self)
+
+
+HORARIO = {
+    "id": 7, "id_podologo": 1, "dia_semana": 1,
+    "hora_inicio": dtime(9, 0), "hora_fin": dtime(14, 0),
+    "duracion_cita_minutos": 30, "tiempo_buffer_minutos": 5,
+    "max_citas_simultaneas": 1, "activo": True,
+    "fecha_inicio_vigencia": date(2026, 1, 1), "fecha_fin_vigencia": None,
+    "nombre_podologo": "Dra. Prueba",
+}
+
+CORTE = {
+    "id": 3, "fecha_corte": date(2026, 10, 19),
+    "ingresos_efectivo": Decimal("100.00"), "ingresos_tarjeta": Decimal("50.00"),
+    "ingresos_transferencia": Decimal("0"), "total_ingresos": Decimal("150.00"),
+    "gastos_dia": Decimal("20.00"), "saldo_final": Decimal("130.00"),
+    "realizado_por": 1, "notas": None, "fecha_registro": None,
+}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    conn = FakeConnection({
+        # Orden: fragmentos más específicos primero
+        "SELECT id FROM podologos": 1,
+        "INSERT INTO horarios_trabajo": 7,
+        "UPDATE horarios_trabajo": 7,
+        "FROM horarios_trabajo h": HORARIO,
+        "SELECT 1 FROM cortes_caja": None,
+        "FROM pagos": {
+            "efectivo": Decimal("100.00"), "tarjeta": Decimal("50.00"),
+            "transferencia": Decimal("0"), "total_ingresos": Decimal("150.00"),
+            "gastos_dia": Decimal("20.00"),
+        },
+        "cortes_caja": CORTE,
+        "FROM usuarios": {"rol": "Podologo"},
+    })
+    pool = FakePool(conn)
+    monkeypatch.setattr(db, "_pool", pool)
+
+    aplicacion = FastAPI()
+    for router in (horarios_router, cortes_router, permissions_router):
+        aplicacion.include_router(router)
+    usuario = _Usuario(
+        id=1, rol="Admin", nombre_usuario="admin", nombre_completo="Admin",
+        email="admin@example.com", activo=True,
+    )
+    aplicacion.dependency_overrides[get_current_user] = lambda: usuario
+
+    @aplicacion.get("/bloqueante")
+    async def bloqueante():
+        time.sleep(UMBRAL_SEGUNDOS * 3)
+        return {}
+
+    aplicacion.state.pool = pool
+    return aplicacion
+
+
+async def _solicitar(app, peticiones):
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+        respuestas = []
+        for metodo, url, cuerpo in peticiones:
+            respuestas.append(await cliente.request(metodo, url, json=cuerpo))
+        return respuestas
+
+
+async def _medir(app, peticiones):
+    """
+    Hace las peticiones una vez sin medir (la primera llamada arma esquemas
+    e importa perezosamente) y luego otra con el detector.
+    """
+    await _solicitar(app, peticiones)
+    async with DetectorBloqueos(UMBRAL_RUTAS_SEGUNDOS) as detector:
+        respuestas = await _solicitar(app, peticiones)
+    return respuestas, detector
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRoutesDoNotBlock:
+    """Ported routes never hold the event loop past the threshold"""
+
+    async def test_detector_flags_blocking_route(self, app):
+        """Control: a handler that sleeps synchronously is reported"""
+        async with DetectorBloqueos() as detector:
+            await _solicitar(app, [("GET", "/bloqueante", None)])
+
+        assert len(detector.lentos) == 1
+
+    async def test_horarios_routes(self, app):
+        """CRUD de horarios over the pool without stalling the loop"""
+        nuevo = {"id_podologo": 1, "dia_semana": 1, "hora_inicio": "09:00", "hora_fin": "14:00"}
+        respuestas, detector = await _medir(app, [
+            ("GET", "/horarios", None),
+            ("GET", "/horarios/7", None),
+            ("POST", "/horarios", nuevo),
+            ("PUT", "/horarios/7", {"activo": False}),
+            ("DELETE", "/horarios/7", None),
+        ])
+
+        assert [r.status_code for r in respuestas] == [200, 200, 201, 200, 204]
+        assert respuestas[1].json()["dia_semana_nombre"] == "Lunes"
+        assert detector.lentos == []
+        assert app.state.pool.tomadas == 0
+
+    async def test_cortes_caja_routes(self, app):
+        """The daily cut is computed and inserted in one pooled transaction"""
+        respuestas, detector = await _medir(app, [
+            ("POST", "/cortes-caja", {"fecha": "2026-10-19", "realizado_por": 1}),
+            ("GET", "/cortes-caja", None),
+        ])
+
+        assert [r.status_code for r in respuestas] == [201, 200]
+        assert respuestas[0].json()["saldo_final"] == 130.0
+        assert detector.lentos == []
+        assert app.state.pool.tomadas == 0
+
+    async def test_permissions_routes(self, app):
+        """Permission endpoints borrow a pooled connection instead of opening one"""
+        respuestas, detector = await _medir(app, [
+            ("GET", "/permissions/me", None),
+            ("GET", "/permissions/user/5", None),
+        ])
+
+        assert [r.status_code for r in respuestas] == [200, 200]
+        assert detector.lentos == []
+        assert app.state.pool.tomadas == 0
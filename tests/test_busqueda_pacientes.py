@@ -0,0 +1,134 @@
+"""
+Tests for patient search index
+==============================
+
+Tests for backend/pacientes/busqueda.py
+"""
+import pytest
+
+from backend.pacientes import busqueda
+from backend.pacientes.busqueda import IndicePacientes, normalizar, normalizar_like
+
+
+def _fila(id, nombre, apellido1, apellido2=None, telefono="5512345678", codigo=None, **extra):
+    return {
+        "id": id,
+        "codigo_paciente": codigo or f"P{id:05d}",
+        "primer_nombre": nombre,
+        "segundo_nombre": extra.get("segundo_nombre"),
+        "primer_apellido": apellido1,
+        "segundo_apellido": apellido2,
+        "telefono_principal": telefono,
+        "telefono_secundario": extra.get("telefono_secundario"),
+    }
+
+
+@pytest.fixture
+def indice():
+    indice = IndicePacientes()
+    indice.construir([
+        _fila(1, "José", "Peña", "Núñez", telefono="55 1234 5678", codigo="JOPE-001"),
+        _fila(2, "María", "Hernández", "López", telefono="+52 55 8765 4321"),
+        _fila(3, "Josefina", "Álvarez", "Peña", telefono="3312345678"),
+        _fila(4, "Juan", "Penagos", "Ruiz", telefono="8112345678"),
+        _fila(5, "Marisol", "Hernández", "García", telefono="5598765432"),
+    ])
+    return indice
+
+
+def _ids(resultados):
+    return [c.paciente.id for c in resultados]
+
+
+@pytest.mark.unit
+class TestIndicePacientes:
+    """Tests for the in-memory typeahead index"""
+
+    def test_accents_and_case_are_folded(self, indice):
+        """Queries match regardless of accents and case, in both directions"""
+        assert normalizar("  JOSÉ  Peña-Núñez ") == "jose pena nunez"
+        assert _ids(indice.buscar("pena")) == _ids(indice.buscar("PEÑA"))
+        assert 1 in _ids(indice.buscar("nuñez"))
+        assert _ids(indice.buscar("álvarez")) == [3]
+
+    def test_exact_tokens_rank_before_prefixes(self, indice):
+        """Whole-word matches come first, then prefix matches, each by surname"""
+        resultados = indice.buscar("pena")
+
+        assert _ids(resultados) == [3, 1, 4]
+        assert [c.tipo for c in resultados] == ["exacto", "exacto", "prefijo"]
+        assert _ids(indice.buscar("pena", limite=1)) == [3]
+
+    def test_every_word_must_match(self, indice):
+        """Multi-word queries intersect, each word as a prefix"""
+        assert _ids(indice.buscar("jos pen")) == [3, 1]
+        assert _ids(indice.buscar("maria hernandez")) == [2]
+        assert _ids(indice.buscar("mar her gar")) == [5]
+        assert indice.buscar("jose hernandez") == []
+
+    def test_typos_fall_back_to_trigram_similarity(self, indice):
+        """A word that is not a prefix of anything is matched by trigrams"""
+        resultados = indice.buscar("hernandes")
+
+        assert set(_ids(resultados)) == {2, 5}
+        assert all(c.tipo == "similar" and c.similitud >= 0.3 for c in resultados)
+        assert _ids(indice.buscar("marai hernandez")) == [2]
+
+    def test_phone_code_and_id_lookup(self, indice):
+        """Phones (with or without country code), codes and ids are searchable"""
+        assert _ids(indice.buscar("55 1234")) == [1]
+        assert _ids(indice.buscar("5587654321")) == [2]
+        assert _ids(indice.buscar("jope001")) == [1]
+        assert _ids(indice.buscar("4"))[0] == 4
+
+    def test_incremental_changes(self, indice):
+        """Updates re-index the patient; inactive or removed patients disappear"""
+        indice.agregar(_fila(1, "José", "Zamora", "Núñez"))
+        assert 1 not in _ids(indice.buscar("pena"))
+        assert _ids(indice.buscar("zamora")) == [1]
+
+        indice.aplicar({**_fila(3, "Josefina", "Álvarez", "Peña"), "activo": False}, 3)
+        indice.aplicar(None, 4)
+        assert indice.buscar("pena") == []
+        assert "penagos" not in indice._vocabulario
+        assert len(indice) == 3
+
+
+class ConexionFalsa:
+    def __init__(self, filas_por_id, filas_trigramas):
+        self.respuestas = [filas_por_id, filas_trigramas]
+        self.consultas = []
+
+    async def fetch(self, consulta, *params):
+        self.consultas.append((consulta, params))
+        if "id = $1::int" in consulta:
+            return self.respuestas[0]
+        return self.respuestas[1]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestBuscarPacientesBD:
+    """Tests for the database fallback of buscar_pacientes"""
+
+    async def test_separators_between_digits_are_removed(self, monkeypatch):
+        assert normalizar_like("555-1234") == "5551234"
+        assert normalizar_like("55 1234 5678") == "5512345678"
+        assert normalizar_like("José 55") == "jose 55"
+
+        monkeypatch.setattr(busqueda.indice_pacientes, "listo", False)
+        conn = ConexionFalsa([], [_fila(2, "María", "Hernández")])
+        assert [p["id"] for p in await busqueda.buscar_pacientes("555-1234", 10, conn)] == [2]
+        assert conn.consultas[-1][1] == ("5551234", 10)
+
+    async def test_id_lookup_is_a_separate_query(self, monkeypatch):
+        monkeypatch.setattr(busqueda.indice_pacientes, "listo", False)
+        conn = ConexionFalsa([_fila(12, "Ana", "Ruiz")], [_fila(7, "Juan", "Pérez"), _fila(12, "Ana", "Ruiz")])
+
+        assert [p["id"] for p in await busqueda.buscar_pacientes("12", 10, conn)] == [12, 7]
+        assert conn.consultas[0][1] == (12,)
+        assert all("id::text" not in consulta for consulta, _ in conn.consultas)
+
+        conn = ConexionFalsa([], [])
+        await busqueda.buscar_pacientes("juan", 10, conn)
+        assert len(conn.consultas) == 1
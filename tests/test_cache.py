@@ -0,0 +1,159 @@
+"""
+Tests for the single-flight read cache
+======================================
+
+Tests for backend/cache/single_flight.py
+"""
+import asyncio
+
+import pytest
+
+from backend.cache.single_flight import SingleFlightCache, cached
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestSingleFlightCache:
+    """Tests for SingleFlightCache"""
+
+    async def test_concurrent_calls_are_coalesced(self):
+        """Concurrent identical calls run the computation once"""
+        cache = SingleFlightCache()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"valor": 42}
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("k", compute, ttl=60) for _ in range(10))
+        )
+
+        assert calls == 1
+        assert all(r == {"valor": 42} for r in results)
+        assert cache.stats.misses == 1
+        assert cache.stats.coalesced == 9
+
+    async def test_hit_within_ttl(self):
+        """A fresh value is served from the cache"""
+        cache = SingleFlightCache()
+
+        async def compute():
+            return 1
+
+        await cache.get_or_compute("k", compute, ttl=60)
+        await cache.get_or_compute("k", compute, ttl=60)
+
+        assert cache.stats.misses == 1
+        assert cache.stats.hits == 1
+
+    async def test_stale_while_revalidate(self):
+        """An expired value inside stale_ttl is served while it is recomputed"""
+        cache = SingleFlightCache()
+        valores = iter([1, 2])
+
+        async def compute():
+            return next(valores)
+
+        assert await cache.get_or_compute("k", compute, ttl=0, stale_ttl=60) == 1
+        assert await cache.get_or_compute("k", compute, ttl=0, stale_ttl=60) == 1
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        assert cache.stats.stale_served == 1
+        assert cache.stats.refreshes == 1
+        assert cache._entries["k"].value == 2
+
+    async def test_invalidate_tags(self):
+        """Writes invalidate every key that carries the tag"""
+        cache = SingleFlightCache()
+
+        async def compute():
+            return "x"
+
+        await cache.get_or_compute("a", compute, ttl=60, tags=("citas",))
+        await cache.get_or_compute("b", compute, ttl=60, tags=("pagos",))
+
+        assert cache.invalidate_tags("citas") == 1
+        assert "a" not in cache._entries
+        assert "b" in cache._entries
+
+    async def test_read_after_invalidate_does_not_join_old_compute(self):
+        """A read after a write starts a new computation"""
+        cache = SingleFlightCache()
+        version = 1
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def compute():
+            value = version
+            started.set()
+            await release.wait()
+            return value
+
+        before = asyncio.create_task(cache.get_or_compute("k", compute, ttl=60, tags=("expediente",)))
+        await started.wait()
+
+        version = 2
+        cache.invalidate_tags("expediente")
+        after = asyncio.create_task(cache.get_or_compute("k", compute, ttl=60, tags=("expediente",)))
+        release.set()
+
+        assert await before == 1
+        assert await after == 2
+        assert cache._entries["k"].value == 2
+
+    async def test_invalidating_one_key_keeps_other_computes(self):
+        """Other keys in flight still store their results"""
+        cache = SingleFlightCache()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return "x"
+
+        pending = asyncio.create_task(cache.get_or_compute("b", compute, ttl=60, tags=("pagos",)))
+        await asyncio.sleep(0)
+        cache.invalidate("a")
+        cache.invalidate_tags("citas")
+        release.set()
+
+        assert await pending == "x"
+        assert "b" in cache._entries
+
+    async def test_errors_are_not_cached(self):
+        """A failed computation is propagated and retried on the next call"""
+        cache = SingleFlightCache()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            raise ValueError("boom")
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await cache.get_or_compute("k", compute, ttl=60)
+
+        assert calls == 2
+        assert cache.stats.errors == 2
+
+    async def test_decorator_key_includes_role(self):
+        """The decorator keys on normalized params plus the user's role"""
+        cache = SingleFlightCache()
+        calls = 0
+
+        @cached("test.endpoint", ttl=60, cache=cache)
+        async def endpoint(days: int = 30, current_user=None):
+            nonlocal calls
+            calls += 1
+            return days
+
+        await endpoint(30, current_user={"id": 1, "rol": "Admin"})
+        await endpoint(days=30, current_user={"id": 2, "rol": "Admin"})
+        await endpoint(30, current_user={"id": 3, "rol": "Recepcionista"})
+        await endpoint(7, current_user={"id": 1, "rol": "Admin"})
+
+        assert calls == 3
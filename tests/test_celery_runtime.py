@@ -0,0 +1,43 @@
+"""
+Tests for the Celery worker async runtime
+=========================================
+
+Tests for backend/tasks/runtime.py
+"""
+import asyncio
+
+import pytest
+
+from backend.tasks import runtime as runtime_mod
+
+
+@pytest.mark.unit
+class TestWorkerRuntime:
+    """Tests for WorkerRuntime"""
+
+    def test_tasks_share_one_loop(self, monkeypatch):
+        """Coroutines submitted to a started runtime all run on the same loop"""
+        async def sin_pool():
+            return None
+
+        monkeypatch.setattr(runtime_mod, "_crear_pool", sin_pool)
+        rt = runtime_mod.WorkerRuntime()
+        rt.start()
+        try:
+            async def loop_actual():
+                return asyncio.get_running_loop()
+
+            loops = {rt.submit(loop_actual()) for _ in range(5)}
+            assert loops == {rt.loop}
+        finally:
+            rt.stop()
+
+        assert rt.loop is None
+
+    def test_run_async_without_runtime(self):
+        """Outside a worker run_async falls back to asyncio.run"""
+        async def suma():
+            return 1 + 1
+
+        assert not runtime_mod.runtime.running
+        assert runtime_mod.run_async(suma()) == 2
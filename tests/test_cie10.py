@@ -0,0 +1,110 @@
+"""
+Tests for CIE-10 catalog search
+===============================
+
+Tests for backend/tratamientos/cie10.py
+"""
+import pytest
+
+from backend.tratamientos.cie10 import CatalogoCIE10, clave_codigo
+
+CATALOGO = [
+    ("M72.2", "Fibromatosis de la aponeurosis plantar", "Trastornos de tejidos blandos"),
+    ("M72", "Trastornos fibroblásticos", "Trastornos de tejidos blandos"),
+    ("B35.1", "Onicomicosis por dermatofitos", "Infecciones fúngicas"),
+    ("B35.3", "Tiña del pie", "Infecciones fúngicas"),
+    ("L60.0", "Uña encarnada", "Trastornos de uñas"),
+    ("L84", "Callos y callosidades", "Trastornos de queratinización"),
+    ("L85.1", "Callosidad adquirida", "Trastornos de queratinización"),
+    ("M77.3", "Espolón calcáneo", "Entesopatías"),
+    ("L30.4", "Dermatitis del pie", "Dermatitis"),
+    ("D23.7", "Tumor benigno de la piel del miembro inferior, incluida la cadera", "Tumores"),
+]
+
+
+@pytest.fixture
+def catalogo():
+    catalogo = CatalogoCIE10()
+    catalogo.construir(
+        {"id": i, "codigo": codigo, "descripcion": descripcion, "categoria": categoria}
+        for i, (codigo, descripcion, categoria) in enumerate(CATALOGO, 1)
+    )
+    return catalogo
+
+
+def _codigos(resultados):
+    return [c.entrada.codigo for c in resultados]
+
+
+@pytest.mark.unit
+class TestCatalogoCIE10:
+    """Tests for the in-memory CIE-10 lookup"""
+
+    def test_code_prefix_with_or_without_dot(self, catalogo):
+        """Code prefixes come first, in code order, regardless of case and dot"""
+        assert clave_codigo(" m72.2 ") == "M722"
+        assert clave_codigo("fascitis") is None
+        assert _codigos(catalogo.buscar("m72")) == ["M72", "M72.2"]
+        assert _codigos(catalogo.buscar("B35.")) == ["B35.1", "B35.3"]
+        assert _codigos(catalogo.buscar("M722")) == ["M72.2"]
+        assert [c.tipo for c in catalogo.buscar("L")] == ["codigo"] * 4
+
+    def test_accent_folded_tokens(self, catalogo):
+        """Descriptions match without accents and ignore stop words"""
+        assert _codigos(catalogo.buscar("una encarnada")) == ["L60.0"]
+        assert _codigos(catalogo.buscar("tina del pie")) == ["B35.3"]
+        assert _codigos(catalogo.buscar("espolon calcaneo")) == ["M77.3"]
+        assert _codigos(catalogo.buscar("fungicas")) == ["B35.1", "B35.3"]
+
+    def test_exact_tokens_then_prefixes_shortest_first(self, catalogo):
+        """Whole words rank before prefixes; shorter descriptions first"""
+        resultados = catalogo.buscar("pie")
+        assert _codigos(resultados) == ["B35.3", "L30.4", "D23.7"]
+        assert [c.tipo for c in resultados] == ["exacto", "exacto", "prefijo"]
+
+        assert _codigos(catalogo.buscar("callo")) == ["L84", "L85.1"]
+        assert [c.tipo for c in catalogo.buscar("callos")] == ["exacto", "prefijo"]
+
+    def test_typos_fall_back_to_trigrams(self, catalogo):
+        """A word that is not a prefix of anything matches by similarity"""
+        resultados = catalogo.buscar("onicomicsis")
+        assert _codigos(resultados) == ["B35.1"]
+        assert resultados[0].tipo == "similar" and resultados[0].similitud >= 0.3
+        assert _codigos(catalogo.buscar("dermatitsi pie")) == ["L30.4"]
+        assert catalogo.buscar("xyzxyz") == []
+
+    def test_limit_and_lookup_by_code(self, catalogo):
+        assert len(catalogo.buscar("trastornos", limite=2)) == 2
+        assert catalogo.por_codigo("l60.0").descripcion == "Uña encarnada"
+        assert catalogo.buscar("", 10) == []
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestDescripcionCIE10:
+    """Tests for get_cie10_descripcion in backend/tratamientos/service.py"""
+
+    async def test_loaded_catalog_answers_without_db(self, catalogo, monkeypatch):
+        from backend.tratamientos import service
+
+        async def sin_bd(*args):
+            raise AssertionError("no debe consultar la BD")
+
+        catalogo.listo = True
+        monkeypatch.setattr(service, "catalogo_cie10", catalogo)
+        monkeypatch.setattr(service, "execute_query_one", sin_bd)
+        assert await service.get_cie10_descripcion("l60.0") == "Uña encarnada"
+        assert await service.get_cie10_descripcion("Z99") is None
+
+    async def test_db_fallback_uses_positional_parameter(self, monkeypatch):
+        from backend.tratamientos import service
+        consultas = []
+
+        async def execute_query_one(query, params=()):
+            consultas.append((query, params))
+            return {"descripcion": "Uña encarnada"}
+
+        monkeypatch.setattr(service, "catalogo_cie10", CatalogoCIE10())
+        monkeypatch.setattr(service, "execute_query_one", execute_query_one)
+        assert await service.get_cie10_descripcion("l60.0") == "Uña encarnada"
+        assert "codigo = $1" in consultas[0][0] and consultas[0][1] == ("L60.0",)
@@ -0,0 +1,65 @@
+"""
+Tests for appointment search
+============================
+
+Tests for backend/citas/busqueda.py
+"""
+from datetime import datetime
+
+import pytest
+
+from backend.citas import busqueda
+
+
+def _cita(i):
+    return {"id": i, "relevancia": 1.0 - i / 100, "fecha_hora_inicio": datetime(2026, 1, 1, 9, i)}
+
+
+@pytest.fixture
+def consultas(monkeypatch):
+    """Reemplaza db.fetch_all y devuelve las llamadas hechas"""
+    llamadas = []
+
+    async def fetch_all(query, *params):
+        llamadas.append(params)
+        return [_cita(i) for i in range(1, params[-1] + 1)]
+
+    monkeypatch.setattr(busqueda.db, "fetch_all", fetch_all)
+    return llamadas
+
+
+@pytest.mark.unit
+class TestBusquedaCitas:
+    """Tests for the ranked, cursor-paginated appointment search"""
+
+    def test_text_query_is_normalized_prefix_and(self):
+        assert busqueda.consulta_texto("dolor talon") == "dolor:* & talon:*"
+
+    def test_cursor_round_trip(self):
+        cita = {"id": 42, "relevancia": 0.1 + 0.2, "fecha_hora_inicio": datetime(2026, 1, 15, 10, 30)}
+        cursor = busqueda.codificar_cursor(cita)
+
+        assert "=" not in cursor
+        assert busqueda.decodificar_cursor(cursor) == (0.1 + 0.2, datetime(2026, 1, 15, 10, 30), 42)
+
+    @pytest.mark.parametrize("cursor", ["xyz", "bm8", "WzFd"])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(ValueError, match="Cursor"):
+            busqueda.decodificar_cursor(cursor)
+
+    @pytest.mark.asyncio
+    async def test_page_and_next_cursor(self, consultas):
+        """Asks for one extra row to know whether there is a next page"""
+        citas, siguiente = await busqueda.buscar_citas("Dolor del TALÓN", limite=3)
+
+        assert [c["id"] for c in citas] == [1, 2, 3]
+        assert consultas[0] == ("dolor del talon", "dolor:* & del:* & talon:*", None, None, None, 4)
+        assert busqueda.decodificar_cursor(siguiente)[2] == 3
+
+        await busqueda.buscar_citas("Dolor del TALÓN", limite=3, cursor=siguiente)
+        assert consultas[1][2:5] == (0.97, datetime(2026, 1, 1, 9, 3), 3)
+
+    @pytest.mark.asyncio
+    async def test_empty_text_skips_database(self, consultas):
+        assert await busqueda.buscar_citas(" ¿? ") == ([], None)
+        assert consultas == []
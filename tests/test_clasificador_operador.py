@@ -0,0 +1,113 @@
+"""
+Tests for the operator intent classifier
+========================================
+
+Tests for backend/agents/sub_agent_operator/utils/local_classifier.py,
+utils/entity_extractor.py and nodes/classify_intent.py
+"""
+import json
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+# El paquete del agente importa su grafo al cargarse
+pytest.importorskip("langgraph")
+
+from backend.agents.sub_agent_operator.nodes import classify_intent as nodo
+from backend.agents.sub_agent_operator.utils.entity_extractor import extract_entities, merge_entities
+from backend.agents.sub_agent_operator.utils.local_classifier import get_local_classifier
+
+LUNES = date(2026, 10, 19)
+
+
+class LLMFalso:
+    def __init__(self, respuesta):
+        self.respuesta = respuesta
+        self.llamadas = 0
+
+    async def ainvoke(self, messages):
+        self.llamadas += 1
+        return SimpleNamespace(content=json.dumps(self.respuesta))
+
+
+@pytest.mark.unit
+class TestExtractEntities:
+    """Tests for the regex entity extractor"""
+
+    def test_relative_date_time_and_name(self):
+        entities = extract_entities("Agenda a Juan Pérez para mañana a las 3pm", LUNES)
+        assert entities == {"date": "2026-10-20", "time": "15:00", "patient_name": "Juan Pérez"}
+
+    def test_weekday_and_afternoon_hour(self):
+        entities = extract_entities("agenda a la paciente Karla Ortiz el viernes a las 4 de la tarde", LUNES)
+        assert entities["date"] == "2026-10-23" and entities["time"] == "16:00"
+
+    def test_past_day_month_rolls_to_next_year(self):
+        entities = extract_entities("reagendar cita #152 para el 20 de enero", LUNES)
+        assert entities == {"date": "2027-01-20", "appointment_id": 152}
+
+    def test_status_treatment_and_range(self):
+        entities = extract_entities("citas de onicomicosis canceladas la semana pasada", LUNES)
+        assert entities["status"] == "Cancelada"
+        assert entities["treatment"] == "Onicomicosis"
+        assert (entities["start_date"], entities["end_date"]) == ("2026-10-12", "2026-10-18")
+
+    def test_local_dates_win_over_llm(self):
+        merged = merge_entities({"date": "2026-10-20"}, {"date": "2024-12-23", "patient_name": "Juan"})
+        assert merged == {"date": "2026-10-20", "patient_name": "Juan"}
+
+    def test_explicit_ranges_replace_the_date(self):
+        assert extract_entities("Reporte de citas del 1 al 15 de marzo", date(2026, 4, 20)) == {
+            "start_date": "2026-03-01", "end_date": "2026-03-15",
+        }
+        assert extract_entities("Dame las estadísticas del 01/09 al 30/09", LUNES) == {
+            "start_date": "2026-09-01", "end_date": "2026-09-30",
+        }
+        entities = extract_entities("citas entre el 3 y el 10 de noviembre", LUNES)
+        assert (entities["start_date"], entities["end_date"]) == ("2026-11-03", "2026-11-10")
+        entities = extract_entities("reporte del 20 de diciembre al 10 de enero", LUNES)
+        assert (entities["start_date"], entities["end_date"]) == ("2026-12-20", "2027-01-10")
+
+    def test_year_is_the_nearest_for_dates_and_months(self):
+        assert extract_entities("citas del 15/09", LUNES)["date"] == "2026-09-15"
+        entities = extract_entities("citas en diciembre", LUNES)
+        assert (entities["start_date"], entities["end_date"]) == ("2026-12-01", "2026-12-31")
+
+    def test_ambiguous_year_defers_to_llm(self):
+        ambiguas = set()
+        local = extract_entities("Reporte de citas del 1 al 15 de marzo", LUNES, ambiguas)
+        assert ambiguas == {"start_date", "end_date"}
+
+        llm = {"start_date": "2026-03-01", "end_date": "2026-03-15", "date": "2026-03-15"}
+        assert merge_entities(local, llm, ambiguas) == {"start_date": "2026-03-01", "end_date": "2026-03-15"}
+        assert merge_entities(local, {}, ambiguas) == local
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestClassifyIntent:
+    """Tests for the two-stage classification"""
+
+    def test_local_classifier_on_clear_messages(self):
+        classifier = get_local_classifier()
+        assert classifier.predict("cancela la cita de Pedro de las 3pm")[0] == "cancelar"
+        assert classifier.predict("muchas gracias")[0] == "otro"
+
+    async def test_confident_local_prediction_skips_llm(self, monkeypatch):
+        llm = LLMFalso({"intent": "otro", "confidence": 0.9})
+        monkeypatch.setattr(nodo, "llm_classifier", llm)
+        monkeypatch.setattr(nodo.config, "local_classifier_threshold", 0.0)
+
+        state = await nodo.classify_intent_node({"current_message": "cancela la cita #12"})
+        assert (state["intent"], state["intent_source"], llm.llamadas) == ("cancelar", "local", 0)
+        assert state["entities"]["appointment_id"] == 12
+
+    async def test_low_confidence_falls_back_to_llm(self, monkeypatch):
+        llm = LLMFalso({"intent": "reporte", "confidence": 0.9, "entities": {"patient_name": "Ana"}})
+        monkeypatch.setattr(nodo, "llm_classifier", llm)
+        monkeypatch.setattr(nodo.config, "local_classifier_threshold", 1.01)
+
+        state = await nodo.classify_intent_node({"current_message": "lo de hoy"})
+        assert (state["intent"], state["intent_source"], llm.llamadas) == ("reporte", "llm", 1)
+        assert state["entities"]["patient_name"] == "Ana" and "date" in state["entities"]
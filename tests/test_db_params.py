@@ -0,0 +1,61 @@
+"""
+Tests for named-parameter compilation
+=====================================
+
+Tests for backend/db.py (compilar_query and DatabaseWrapper._convert_query)
+"""
+import pytest
+
+from backend.db import DatabaseWrapper, compilar_query
+
+
+def _convert(query, values):
+    return DatabaseWrapper()._convert_query(query, values)
+
+
+@pytest.mark.unit
+class TestCompilarQuery:
+    """Tests for the compile-once :param -> $n compiler"""
+
+    def test_prefix_names_do_not_collide(self):
+        """:id and :id_paciente are different parameters in any order"""
+        sql, params = _convert(
+            "SELECT * FROM consultas WHERE id_paciente = :id_paciente AND id = :id",
+            {"id": 5, "id_paciente": 9},
+        )
+        assert sql == "SELECT * FROM consultas WHERE id_paciente = $1 AND id = $2"
+        assert params == [9, 5]
+
+        sql, params = _convert("SELECT :a, :ab, :abc, :a", {"abc": 3, "ab": 2, "a": 1})
+        assert sql == "SELECT $1, $2, $3, $1"
+        assert params == [1, 2, 3]
+
+    def test_casts_strings_and_comments_are_skipped(self):
+        """Only real placeholders are rewritten"""
+        query = (
+            "SELECT :fecha::date, '10:30', E'it\\'s :x', \"col:x\", $$ :x $$, $f$ :x $f$ "
+            "-- :x\n/* :x /* :x */ :x */ FROM t WHERE h = :hora"
+        )
+        sql, nombres = compilar_query(query)
+
+        assert nombres == ("fecha", "hora")
+        assert sql.startswith("SELECT $1::date, '10:30', E'it\\'s :x'")
+        assert sql.endswith("FROM t WHERE h = $2")
+        assert "$f$ :x $f$" in sql and "/* :x /* :x */ :x */" in sql
+
+    def test_compiled_once(self):
+        """Repeated calls hit the LRU instead of re-parsing"""
+        compilar_query.cache_clear()
+        query = "UPDATE t SET a = :a WHERE id = :id"
+        for i in range(3):
+            _convert(query, {"a": i, "id": 1})
+
+        info = compilar_query.cache_info()
+        assert (info.misses, info.hits) == (1, 2)
+
+    def test_missing_and_extra_values(self):
+        """Extra values are ignored; a missing value is an explicit error"""
+        assert _convert("SELECT :a", {"a": 1, "b": 2}) == ("SELECT $1", [1])
+        assert _convert("SELECT 1", {}) == ("SELECT 1", [])
+        with pytest.raises(KeyError, match=":b"):
+            _convert("SELECT :a, :b", {"a": 1})
@@ -0,0 +1,155 @@
+"""
+Tests for duplicate detection
+=============================
+
+Tests for backend/whatsapp_management/duplicados.py
+"""
+import contextlib
+import pickle
+
+import numpy as np
+import pytest
+
+from backend.whatsapp_management import duplicados as modulo
+
+
+def vectores():
+    # 0, 2 y 4 son paráfrasis; 1 y 3 también; 5 no se parece a nada
+    return modulo.matriz_normalizada([
+        [1.0, 0.0, 0.0, 0.0],
+        [0.0, 1.0, 0.0, 0.0],
+        [1.0, 0.1, 0.0, 0.0],
+        [0.0, 1.0, 0.1, 0.0],
+        [1.0, 0.0, 0.1, 0.0],
+        [0.0, 0.0, 0.0, 1.0],
+    ])
+
+
+@pytest.mark.unit
+class TestDuplicados:
+    """Tests for the blocked all-pairs similarity and clustering"""
+
+    @pytest.mark.parametrize("bloque", [1, 4, 2048])
+    def test_blocked_pairs_match_full_matrix(self, bloque):
+        matriz = vectores()
+        i, j, s = modulo.pares_similares(matriz, 0.9, bloque)
+
+        completa = np.triu(matriz @ matriz.T, k=1)
+        esperados = set(zip(*np.nonzero(completa >= 0.9)))
+        assert set(zip(i.tolist(), j.tolist())) == esperados
+        assert np.allclose(s, completa[i, j])
+
+    def test_clusters_and_canonical_entry(self):
+        matriz = vectores()
+        i, j, _ = modulo.pares_similares(matriz, 0.9)
+        grupos = modulo.agrupar(len(matriz), i, j)
+        assert sorted(g.tolist() for g in grupos) == [[0, 2, 4], [1, 3]]
+
+        # Gana el más usado aunque no sea el más central
+        canonico, similitud = modulo.elegir_canonico(matriz, np.array([0, 2, 4]), [(0,), (3,), (1,)])
+        assert canonico == 1 and similitud[1] == pytest.approx(1.0)
+        # A igualdad de uso, el más cercano al resto
+        canonico, _ = modulo.elegir_canonico(matriz, np.array([0, 2, 4]), [(0,)] * 3)
+        assert canonico == 0
+
+    def test_detector_points_to_oldest_original(self):
+        matriz = vectores()
+        detector = modulo.DetectorDuplicados([10, 11], matriz[:2], {}, umbral=0.9)
+
+        # 12 y 14 apuntan a 10; 13 a 11; 15 a nadie
+        assert detector.revisar([12, 13, 14, 15], matriz[2:]) == [10, 11, 10, None]
+        # Una paráfrasis de 14 (duplicado de 10) apunta al original
+        assert detector.revisar([16], [[1.0, 0.0, 0.12, 0.0]]) == [10]
+
+    def test_unknown_table(self):
+        with pytest.raises(ValueError, match="pacientes"):
+            modulo._validar_tabla("pacientes")
+
+
+class ConexionFalsa:
+    """Registra las sentencias de la fusión"""
+
+    def __init__(self, existentes):
+        self.existentes = existentes
+        self.sentencias = []
+
+    async def fetch(self, query, ids):
+        return [{"id": i} for i in ids if i in self.existentes]
+
+    async def execute(self, query, *params):
+        self.sentencias.append((" ".join(query.split()), params))
+        return f"DELETE {len(params[0])}" if query.strip().startswith("DELETE") else "UPDATE 1"
+
+    def transaction(self):
+        return contextlib.nullcontext()
+
+
+@pytest.fixture
+def conexion(monkeypatch):
+    conn = ConexionFalsa({7, 8, 9})
+
+    async def get_connection():
+        return conn
+
+    async def release_connection(c):
+        pass
+
+    monkeypatch.setattr(modulo.db, "get_connection", get_connection)
+    monkeypatch.setattr(modulo.db, "release_connection", release_connection)
+    return conn
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestKnowledgeBaseValidada:
+    """Tests for clustering and merging knowledge_base_validated"""
+
+    async def test_canonical_prefers_approved_entry(self, monkeypatch):
+        consultas = []
+        # uso = [aprobado, veces_consultada, efectividad_score]
+        filas = [
+            (7, [1.0, 0.0], [0.0, 40.0, 1.0]),
+            (8, [1.0, 0.05], [1.0, 2.0, 0.5]),
+            (9, [0.0, 1.0], [1.0, 0.0, 1.0]),
+        ]
+
+        async def fetch_all(query, *params):
+            consultas.append((query, params))
+            return [
+                {"id": i, "texto": f"pregunta {i}", "duplicado_de": None, "uso": uso, "pregunta_embedding": pickle.dumps(v)}
+                for i, v, uso in filas
+            ]
+
+        monkeypatch.setattr(modulo.db, "fetch_all", fetch_all)
+        resultado = await modulo.detectar_clusters("knowledge_base_validated", 0.9)
+
+        query, params = consultas[0]
+        assert "FROM knowledge_base_validated" in query and "pregunta_embedding_modelo = $1" in query
+        assert params == (modulo.EMBEDDINGS_MODELO,)
+        # La aprobada gana aunque la otra se haya consultado más
+        assert [c["canonico_id"] for c in resultado["clusters"]] == [8]
+        assert {m["id"] for m in resultado["clusters"][0]["miembros"]} == {7, 8}
+
+    async def test_merge_adds_counters_and_feedback(self, conexion):
+        resultado = await modulo.fusionar("knowledge_base_validated", 8, [7, 9, 8])
+
+        (fusion, params), (duplicados, params_dup), (borrado, params_del) = conexion.sentencias
+        assert fusion.startswith("UPDATE knowledge_base_validated t SET")
+        for asignacion in (
+            "veces_consultada = COALESCE(t.veces_consultada, 0) + d.veces_consultada",
+            "feedback_positivo = COALESCE(t.feedback_positivo, 0) + d.feedback_positivo",
+            "feedback_negativo = COALESCE(t.feedback_negativo, 0) + d.feedback_negativo",
+            "aprobado = COALESCE(t.aprobado, false) OR d.aprobado",
+            "duplicado_de = NULL",
+        ):
+            assert asignacion in fusion
+        assert params == (8, [8, 7, 9])
+        assert duplicados.startswith("UPDATE knowledge_base_validated SET duplicado_de = $1")
+        assert params_dup == (8, [7, 9])
+        assert borrado.startswith("DELETE FROM knowledge_base_validated") and params_del == ([7, 9],)
+        assert resultado == {"tabla": "knowledge_base_validated", "canonico_id": 8, "fusionadas": 2}
+
+    async def test_merge_rejects_missing_entries(self, conexion):
+        with pytest.raises(ValueError, match="10"):
+            await modulo.fusionar("knowledge_base_validated", 8, [10])
+        assert conexion.sentencias == []
@@ -0,0 +1,71 @@
+"""
+Tests for medical record cache
+==============================
+
+Tests for backend/medical_records/expediente.py
+"""
+import asyncio
+
+import pytest
+
+from backend.medical_records import expediente
+
+
+@pytest.fixture
+def cargas(monkeypatch):
+    """Listener simulado y una carga que cuenta llamadas por paciente"""
+    llamadas = []
+
+    async def falsa(patient_id):
+        llamadas.append(patient_id)
+        await asyncio.sleep(0.01)
+        return {"paciente_id": patient_id, "version": len(llamadas)}
+
+    monkeypatch.setattr(expediente, "cargar_expediente", falsa)
+    monkeypatch.setattr(expediente, "expedientes", expediente.SingleFlightCache())
+    monkeypatch.setattr(expediente, "_listener", object())
+    return llamadas
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestExpedienteCache:
+    """Tests for the per-patient medical record cache"""
+
+    async def test_concurrent_opens_share_one_load(self, cargas):
+        """Simultaneous opens of the same record run a single query"""
+        resultados = await asyncio.gather(*(expediente.obtener_expediente(7) for _ in range(5)))
+
+        assert cargas == [7]
+        assert all(r is resultados[0] for r in resultados)
+        assert (await expediente.obtener_expediente(7))["version"] == 1
+
+    async def test_writes_and_notifications_invalidate(self, cargas):
+        """Handlers and NOTIFY messages drop only the affected patient"""
+        await expediente.obtener_expediente(1)
+        await expediente.obtener_expediente(2)
+
+        expediente.invalidar_expediente(1)
+        assert (await expediente.obtener_expediente(1))["version"] == 3
+        assert (await expediente.obtener_expediente(2))["version"] == 2
+
+        await expediente._on_cambio({"id": "2"})
+        await expediente._on_cambio({"otro": 1})
+        assert (await expediente.obtener_expediente(2))["version"] == 4
+
+    async def test_write_during_load_is_not_cached(self, cargas):
+        """A load that started before a write does not stay in the cache"""
+        en_curso = asyncio.ensure_future(expediente.obtener_expediente(3))
+        await asyncio.sleep(0)
+        expediente.invalidar_expediente(3)
+        await en_curso
+
+        assert (await expediente.obtener_expediente(3))["version"] == 2
+
+    async def test_without_listener_always_queries(self, cargas, monkeypatch):
+        """Without LISTEN other workers' writes are unseen: no caching"""
+        monkeypatch.setattr(expediente, "_listener", None)
+        await expediente.obtener_expediente(5)
+        await expediente.obtener_expediente(5)
+
+        assert cargas == [5, 5]
@@ -0,0 +1,132 @@
+"""
+Tests for the embeddings indexer
+================================
+
+Tests for backend/whatsapp_management/indexador_embeddings.py
+"""
+import asyncio
+import contextlib
+import pickle
+
+import pytest
+
+from backend.whatsapp_management import indexador_embeddings as modulo
+
+
+class ConexionFalsa:
+    """Conexión con una tabla de pendientes en memoria"""
+
+    def __init__(self, ids, lock=True):
+        self.filas = [{"id": i, "texto": f"pregunta {i}"} for i in ids]
+        self.lock = lock
+        self.lecturas = []
+        self.copias = []
+
+    async def fetchval(self, query, *params):
+        return self.lock
+
+    async def fetch(self, query, ultimo_id, modelo=None, limite=None, forzar=None):
+        if modelo is None:
+            # Carga de los ya indexados para detectar duplicados: ninguno
+            return []
+        self.lecturas.append(ultimo_id)
+        return [f for f in self.filas if f["id"] > ultimo_id][:limite]
+
+    async def execute(self, query, *params):
+        return f"UPDATE {len(self.copias[-1])}" if query.strip().startswith("UPDATE") else "OK"
+
+    async def copy_records_to_table(self, tabla, records, columns):
+        self.copias.append(records)
+
+    def transaction(self):
+        return contextlib.nullcontext()
+
+
+@pytest.fixture
+def conexion(monkeypatch):
+    conn = ConexionFalsa(range(1, 8))
+
+    async def get_connection():
+        return conn
+
+    async def release_connection(c):
+        pass
+
+    monkeypatch.setattr(modulo.db, "get_connection", get_connection)
+    monkeypatch.setattr(modulo.db, "release_connection", release_connection)
+    return conn
+
+
+def codificar(textos, batch_size):
+    return [[float(len(t)), float(batch_size)] for t in textos]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestIndexadorEmbeddings:
+    """Tests for the batched, resumable embedding backfill"""
+
+    async def test_batches_by_id_and_reports_rate(self, conexion):
+        indexador = modulo.IndexadorEmbeddings(codificar)
+        estado = await indexador.ejecutar(tablas=["knowledge_base"], lote=3, batch_size=16)
+
+        assert conexion.lecturas == [0, 3, 6]
+        assert [len(c) for c in conexion.copias] == [3, 3, 1]
+        id_, texto, embedding, duplicado_de = conexion.copias[0][0]
+        assert (id_, texto, pickle.loads(embedding), duplicado_de) == (1, "pregunta 1", [10.0, 16.0], None)
+        # Mismo vector: todas las demás son duplicadas de la primera
+        assert [r[3] for c in conexion.copias for r in c] == [None] + [1] * 6
+
+        progreso = estado["tablas"]["knowledge_base"]
+        assert (progreso["procesadas"], progreso["escritas"], progreso["ultimo_id"]) == (7, 7, 7)
+        assert progreso["duplicadas"] == 6
+        assert progreso["filas_por_segundo"] > 0 and estado["en_curso"] is False
+
+    async def test_skips_when_another_worker_holds_the_lock(self, conexion):
+        conexion.lock = False
+        estado = await modulo.IndexadorEmbeddings(codificar).ejecutar()
+
+        assert estado["omitido"] is True
+        assert conexion.lecturas == []
+
+    async def test_unknown_table(self):
+        with pytest.raises(ValueError, match="pacientes"):
+            modulo.IndexadorEmbeddings(codificar).solicitar(tablas=["pacientes"])
+
+    async def test_request_while_running_repeats_once(self, conexion):
+        indexador = modulo.IndexadorEmbeddings(codificar)
+        llamadas = []
+
+        async def ejecutar(**kwargs):
+            llamadas.append(kwargs)
+            await asyncio.sleep(0.01)
+
+        indexador.ejecutar = ejecutar
+        assert indexador.solicitar(forzar=True) is True
+        await asyncio.sleep(0)
+        assert indexador.solicitar() is False
+        assert indexador.solicitar() is False
+        await indexador._tarea
+
+        tablas = ["aprendizajes_agente", "knowledge_base", "knowledge_base_validated"]
+        assert llamadas == [{"forzar": True, "tablas": tablas}, {"forzar": False, "tablas": tablas}]
+
+    async def test_forced_request_while_running_is_kept(self, conexion):
+        indexador = modulo.IndexadorEmbeddings(codificar)
+        llamadas = []
+
+        async def ejecutar(**kwargs):
+            llamadas.append(kwargs)
+            await asyncio.sleep(0.01)
+
+        indexador.ejecutar = ejecutar
+        assert indexador.solicitar(tablas=["aprendizajes_agente"]) is True
+        await asyncio.sleep(0)
+        assert indexador.solicitar(tablas=["knowledge_base_validated"]) is False
+        assert indexador.solicitar(forzar=True, tablas=["knowledge_base"]) is False
+        await indexador._tarea
+
+        assert llamadas == [
+            {"forzar": False, "tablas": ["aprendizajes_agente"]},
+            {"forzar": True, "tablas": ["knowledge_base", "knowledge_base_validated"]},
+        ]
@@ -0,0 +1,130 @@
+"""
+Tests for the event loop monitor
+================================
+
+Tests for backend/monitoring/loop_monitor.py and
+backend/middleware/route_timing.py
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from backend.middleware.route_timing import RouteTimingMiddleware
+from backend.monitoring.loop_monitor import LoopMonitor
+
+
+def _bloquear(segundos):
+    time.sleep(segundos)
+
+
+def _quemar_cpu(segundos):
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        pass
+
+
+@pytest.fixture
+async def monitor():
+    instancia = LoopMonitor(intervalo_ms=10, lento_ms=40, log_s=0)
+    instancia.iniciar()
+    yield instancia
+    await instancia.detener()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestLoopMonitor:
+    """Tests for lag sampling and slow-callback attribution"""
+
+    async def test_slow_step_is_attributed_to_blocking_frame(self, monitor):
+        """A blocking call is reported with the stack captured during the stall"""
+
+        async def handler_con_bloqueo():
+            await asyncio.sleep(0)
+            _bloquear(0.12)
+
+        await asyncio.sleep(0.03)
+        await asyncio.create_task(handler_con_bloqueo())
+        await asyncio.sleep(0.03)
+
+        reporte = monitor.reporte()
+        infractor = reporte["infractores"][0]
+        assert infractor["veces"] == 1
+        assert infractor["max_ms"] >= 100
+        assert "handler_con_bloqueo" in infractor["callback"]
+        assert "_bloquear" in infractor["ubicacion"]
+        assert reporte["lag"]["max_ms"] >= 60
+        assert reporte["lag"]["bloqueos"] >= 1
+
+    async def test_stop_restores_handle(self):
+        """Stopping removes the Handle patch, so the monitor costs nothing when off"""
+        original = asyncio.Handle._run
+        instancia = LoopMonitor(log_s=0)
+        instancia.iniciar()
+        assert asyncio.Handle._run is not original
+
+        await instancia.detener()
+
+        assert asyncio.Handle._run is original
+        assert not instancia.activo
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRouteTiming:
+    """Tests for per-route wall vs loop CPU"""
+
+    async def test_cpu_bound_route_stands_out(self, monitor):
+        """Sync CPU work in a handler shows up as loop CPU; awaiting does not"""
+        app = FastAPI()
+
+        @app.get("/items/{item_id}/sincrono")
+        async def sincrono(item_id: int):
+            _quemar_cpu(0.05)
+            return {}
+
+        @app.get("/items/{item_id}/asincrono")
+        async def asincrono(item_id: int):
+            await asyncio.sleep(0.05)
+            return {}
+
+        app.add_middleware(RouteTimingMiddleware, monitor=monitor)
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            # Como en uvicorn, cada petición corre en su propio task
+            for i in range(2):
+                await asyncio.create_task(cliente.get(f"/items/{i}/sincrono"))
+                await asyncio.create_task(cliente.get(f"/items/{i}/asincrono"))
+
+        rutas = {r["ruta"]: r for r in monitor.reporte()["rutas"]}
+        ruta_cpu, ruta_espera = rutas["GET /items/{item_id}/sincrono"], rutas["GET /items/{item_id}/asincrono"]
+        assert ruta_cpu["peticiones"] == ruta_espera["peticiones"] == 2
+        # El vigía comparte el GIL con el loop, así que la CPU medida queda algo por debajo
+        assert ruta_cpu["fraccion_cpu"] > 0.5
+        assert ruta_espera["fraccion_cpu"] < 0.2
+        assert ruta_cpu["pasos_lentos"] == 2
+        atribuidas = {}
+        for infractor in monitor.reporte()["infractores"]:
+            for ruta, veces in infractor["rutas"].items():
+                atribuidas[ruta] = atribuidas.get(ruta, 0) + veces
+        assert atribuidas == {"GET /items/{item_id}/sincrono": 2}
+
+    async def test_disabled_monitor_is_passthrough(self):
+        """With the monitor off requests are not measured"""
+        apagado = LoopMonitor()
+        app = FastAPI()
+
+        @app.get("/ping")
+        async def ping():
+            return {"ok": True}
+
+        app.add_middleware(RouteTimingMiddleware, monitor=apagado)
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            respuesta = await cliente.get("/ping")
+
+        assert respuesta.json() == {"ok": True}
+        assert apagado.rutas == {}
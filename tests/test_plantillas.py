@@ -0,0 +1,68 @@
+"""
+Tests for the shared template renderer
+======================================
+
+Tests for backend/plantillas/renderer.py
+"""
+from datetime import date, time
+from decimal import Decimal
+
+import pytest
+from jinja2 import UndefinedError
+
+from backend.plantillas import get_plantilla, precompilar, render, render_stream
+
+
+def _citas(n: int):
+    for i in range(n):
+        yield {
+            'hora_inicio': time(9 + i % 8, 0),
+            'paciente_nombre': f'Paciente {i}',
+            'podologo_nombre': 'Dra. Pérez',
+            'servicio_nombre': None,
+            'estado': 'Confirmada',
+        }
+
+
+@pytest.mark.unit
+class TestRender:
+    """Tests for render / render_stream"""
+
+    def test_all_templates_precompile(self):
+        """Every channel's templates load and stay cached"""
+        nombres = precompilar()
+
+        assert {'email/resumen_diario.html', 'whatsapp/recordatorio_24h.txt', 'pdf/pie.xml'} <= set(nombres)
+        assert get_plantilla('pdf/pie.xml') is get_plantilla('pdf/pie.xml')
+
+    def test_html_is_escaped_text_is_not(self):
+        """Email and PDF markup are autoescaped, WhatsApp text is not"""
+        assert '&lt;b&gt;' in render('pdf/periodo.xml', periodo='<b>')
+        assert render('whatsapp/recordatorio_2h.txt', primer_nombre='<Ana>', tiempo_texto='en 1 hora',
+                      hora='10:00 AM', podologo='Dr. X').startswith('Hola <Ana>!')
+
+    def test_missing_value_raises(self):
+        """Templates fail loudly on missing context"""
+        with pytest.raises(UndefinedError):
+            render('pdf/periodo.xml')
+
+    def test_stream_matches_render(self):
+        """Streaming a large table yields the same HTML as a full render"""
+        contexto = {'fecha': date(2026, 10, 20), 'total_citas': 500}
+
+        completo = render('email/resumen_diario.html', contexto, citas=list(_citas(500)))
+        fragmentos = list(render_stream('email/resumen_diario.html', contexto, citas=_citas(500)))
+
+        assert len(fragmentos) > 1
+        assert ''.join(fragmentos) == completo
+        assert completo.count('<td>N/A</td>') == 500
+        assert 'Resumen de Citas - 20/10/2026' in completo
+
+    def test_inventory_alert_text(self):
+        """The critical stock alert keeps its previous format"""
+        texto = render('whatsapp/productos_criticos.txt', total=1, productos=[{
+            'nombre': 'Gasas', 'stock_actual': Decimal('2'), 'stock_minimo': Decimal('5'),
+            'unidad_medida': 'pzas',
+        }])
+
+        assert texto == "⚠️ 1 productos requieren reabastecimiento:\n\n• Gasas: 2.0 pzas (Falta: 3.0)\n"
@@ -0,0 +1,72 @@
+"""
+Tests for the reminder dispatch pipeline
+========================================
+
+Tests for backend/tasks/recordatorios.py
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.tasks.recordatorios import (
+    RECORDATORIO_2H,
+    RECORDATORIO_24H,
+    Recordatorio,
+    contexto_recordatorio,
+    entregar,
+)
+
+
+def _recordatorio(id_cita: int) -> Recordatorio:
+    return Recordatorio(
+        id_cita=id_cita, tipo='recordatorio_cita_24h', titulo='t',
+        mensaje='m', telefono='+521', email=None,
+    )
+
+
+@pytest.mark.unit
+class TestPlantillas:
+    """Tests for the reminder templates"""
+
+    def test_reminder_context(self):
+        """Both reminder templates render from a claimed row"""
+        ahora = datetime(2026, 10, 19, 8, 0)
+        cita = {
+            'fecha_hora_inicio': ahora + timedelta(hours=2, minutes=10),
+            'primer_nombre': 'Ana',
+            'podologo_nombre': 'Dra. Pérez',
+        }
+        contexto = contexto_recordatorio(cita, ahora)
+
+        assert "mañana lunes 19/10/2026 a las 10:10 AM" in RECORDATORIO_24H.plantilla.render(contexto)
+        assert "tu cita en 2 horas (10:10 AM)" in RECORDATORIO_2H.plantilla.render(contexto)
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestEntregar:
+    """Tests for the concurrency-limited sender"""
+
+    async def test_concurrency_limit_and_errors(self):
+        """At most N sends run at once and failures are reported per cita"""
+        en_vuelo = 0
+        maximo = 0
+
+        class Canal:
+            nombre = 'test'
+
+            async def enviar(self, recordatorio):
+                nonlocal en_vuelo, maximo
+                en_vuelo += 1
+                maximo = max(maximo, en_vuelo)
+                await asyncio.sleep(0.001)
+                en_vuelo -= 1
+                if recordatorio.id_cita == 3:
+                    raise RuntimeError("sin servicio")
+
+        resultados = await entregar(Canal(), [_recordatorio(i) for i in range(20)], concurrencia=4)
+
+        assert maximo == 4
+        assert (3, 'error', 'sin servicio') in resultados
+        assert sum(1 for _, estado, _ in resultados if estado == 'enviado') == 19
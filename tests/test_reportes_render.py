@@ -0,0 +1,115 @@
+"""
+Tests for report rendering
+==========================
+
+Tests for backend/reportes/render.py, excel_generator.py and csv_generator.py
+"""
+import asyncio
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from openpyxl import load_workbook
+
+from backend.reportes import render
+from backend.reportes.csv_generator import filas_csv_gastos, stream_csv
+from backend.reportes.excel_generator import generar_excel_gastos
+
+
+def _reporte(total=1000.0):
+    return {
+        'periodo': 'Marzo 2026',
+        'fecha_inicio': '2026-03-01',
+        'fecha_fin': '2026-03-31',
+        'total_gastos': total,
+        'total_gastos_mes_anterior': 800.0,
+        'variacion_porcentual': 25.0,
+        'gastos_por_categoria': [
+            {'categoria': f'CAT{i}', 'total': 100.0 + i, 'cantidad': i + 1,
+             'porcentaje': 12.5, 'variacion_mes_anterior': -4.0}
+            for i in range(3)
+        ],
+        'top_10_gastos': [
+            {'concepto': f'Gasto {i}', 'monto': 50.0, 'fecha': '2026-03-02',
+             'metodo_pago': 'efectivo', 'categoria': 'CAT1'}
+            for i in range(2)
+        ],
+        'tendencia_6_meses': [],
+        'productos_comprados': [],
+    }
+
+
+@pytest.fixture
+def renderizados(monkeypatch):
+    """Pool de hilos en lugar de procesos y un renderizador que cuenta llamadas"""
+    llamadas = []
+
+    def falso(reporte):
+        llamadas.append(reporte['total_gastos'])
+        return io.BytesIO(f"PDF {reporte['total_gastos']}".encode())
+
+    monkeypatch.setitem(render._RENDERIZADORES, ("gastos", "pdf"), falso)
+    monkeypatch.setattr(render, "artefactos", render.SingleFlightCache())
+    monkeypatch.setattr(render, "_render_executor", ThreadPoolExecutor(max_workers=2))
+    yield llamadas
+    render.shutdown_render_executor()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRenderCache:
+    """Tests for the rendered artifact cache"""
+
+    async def test_concurrent_requests_render_once(self, renderizados):
+        """Identical concurrent requests share a single render"""
+        reporte = _reporte()
+        resultados = await asyncio.gather(
+            *(render.renderizar("gastos", "pdf", "2026-03", reporte) for _ in range(5))
+        )
+
+        assert resultados == [b"PDF 1000.0"] * 5
+        assert renderizados == [1000.0]
+
+    async def test_data_version_changes_key(self, renderizados):
+        """New data renders again; volatile fields and repeated calls do not"""
+        await render.renderizar("gastos", "pdf", "2026-03", _reporte())
+        await render.renderizar("gastos", "pdf", "2026-03", {**_reporte(), 'fecha_generacion': 'x'})
+        nuevo = await render.renderizar("gastos", "pdf", "2026-03", _reporte(total=1500.0))
+
+        assert nuevo == b"PDF 1500.0"
+        assert renderizados == [1000.0, 1500.0]
+
+    async def test_unknown_format_raises(self, renderizados):
+        """Formats without a renderer are rejected before touching the pool"""
+        with pytest.raises(ValueError):
+            await render.renderizar("gastos", "csv", "2026-03", _reporte())
+
+
+@pytest.mark.unit
+class TestExportFormats:
+    """Tests for write-only Excel and streamed CSV output"""
+
+    def test_excel_write_only_keeps_layout(self):
+        """The write-only workbook keeps the previous cell layout and styles"""
+        ws = load_workbook(generar_excel_gastos(_reporte())).active
+
+        assert ws.title == "Reporte Gastos"
+        assert "A1:E1" in {str(r) for r in ws.merged_cells.ranges}
+        assert ws['A1'].font.b and ws['A1'].font.sz == 14
+        assert ws['A7'].value == 'Categoría' and ws['A7'].fill.start_color.rgb.endswith('366092')
+        assert ws['B8'].value == 100 and ws['B8'].number_format == '$#,##0.00'
+        assert ws['E8'].number_format == '+0.00%;-0.00%'
+        # Dos filas en blanco tras las categorías, como antes
+        assert ws['A13'].value == 'TOP 10 GASTOS MAYORES'
+        assert ws.column_dimensions['A'].width == 30
+
+    def test_csv_is_streamed_in_chunks(self):
+        """CSV output is emitted in blocks and decodes to the full report"""
+        filas = list(filas_csv_gastos(_reporte()))
+        bloques = list(stream_csv(iter(filas), filas_por_bloque=4))
+
+        assert bloques[0] == '\ufeff'.encode('utf-8')
+        assert len(bloques) == 1 + -(-len(filas) // 4)
+        contenido = b"".join(bloques).decode('utf-8-sig')
+        assert list(csv.reader(io.StringIO(contenido))) == [[str(v) for v in f] for f in filas]
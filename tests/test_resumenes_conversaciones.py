@@ -0,0 +1,111 @@
+"""
+Tests for the conversation summary pipeline
+===========================================
+
+Tests for backend/whatsapp_management/resumenes_conversaciones.py
+"""
+import json
+import pickle
+from datetime import datetime
+
+import pytest
+
+from backend.whatsapp_management import resumenes_conversaciones as modulo
+
+
+def codificar(textos, batch_size):
+    return [[float(len(t))] for t in textos]
+
+
+class ConexionFalsa:
+    def __init__(self):
+        self.ejecutadas = []
+
+    async def execute(self, query, *params):
+        self.ejecutadas.append((query, params))
+        return "INSERT 0 0"
+
+
+@pytest.mark.unit
+class TestConstruirResumen:
+    """Tests for the extractive summary"""
+
+    def test_keeps_patient_messages_and_last_reply(self):
+        conversacion = {
+            "categoria": "Agendar_Cita",
+            "estado": "Cerrada",
+            "intencion_detectada": None,
+            "fecha_inicio": datetime(2026, 10, 1, 9, 30),
+        }
+        mensajes = [
+            {"direccion": "Entrante", "contenido": "Hola, ¿tienen cita   el martes?"},
+            {"direccion": "Saliente", "contenido": "Sí, a las 10:00"},
+            {"direccion": "Entrante", "contenido": "Perfecto"},
+            {"direccion": "Saliente", "contenido": "Agendada para el martes 10:00"},
+        ]
+        resumen, metadata = modulo.construir_resumen(conversacion, mensajes)
+
+        assert resumen == (
+            "Consulta: Agendar_Cita. Paciente: Hola, ¿tienen cita el martes? | Perfecto "
+            "Respuesta: Agendada para el martes 10:00"
+        )
+        assert metadata["mensajes"] == 4
+        assert metadata["tipo_consulta"] == "Agendar_Cita"
+        assert metadata["fecha_conversacion"] == "2026-10-01"
+
+    def test_truncates_long_summaries(self, monkeypatch):
+        monkeypatch.setattr(modulo, "RESUMENES_MAX_CARACTERES", 50)
+        resumen, _ = modulo.construir_resumen({}, [{"direccion": "Entrante", "contenido": "a " * 200}])
+        assert len(resumen) == 50 and resumen.endswith("…")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestResumenesConversaciones:
+    """Tests for the queued writes"""
+
+    async def test_queued_summaries_are_written_in_one_statement(self):
+        pipeline = modulo.ResumenesConversaciones(codificar, lote=64)
+        pipeline.encolar_resumen(1, 10, "primero", {"a": 1})
+        pipeline.encolar_resumen(2, 20, "otro")
+        # El último resumen de una conversación reemplaza al anterior
+        pipeline.encolar_resumen(1, 10, "corregido", {"a": 2})
+
+        conn = ConexionFalsa()
+        assert await pipeline.vaciar_resumenes(conn) == 2
+        assert len(conn.ejecutadas) == 1
+
+        contactos, conversaciones, resumenes, embeddings, metadata, actividad = conn.ejecutadas[0][1]
+        assert (contactos, conversaciones, resumenes) == ([1, 2], [10, 20], ["corregido", "otro"])
+        assert pickle.loads(embeddings[0]) == [9.0]
+        assert json.loads(metadata[0]) == {"a": 2} and actividad == [None, None]
+        assert pipeline.pendientes["resumenes"] == 0
+
+    async def test_failed_batch_goes_back_to_the_queue(self):
+        pipeline = modulo.ResumenesConversaciones(codificar)
+        pipeline.encolar_resumen(1, 10, "resumen")
+
+        class ConexionCaida:
+            async def execute(self, query, *params):
+                raise ConnectionError("sin conexión")
+
+        with pytest.raises(ConnectionError):
+            await pipeline.vaciar_resumenes(ConexionCaida())
+        assert pipeline.pendientes["resumenes"] == 1
+
+    async def test_last_access_updates_are_coalesced(self, monkeypatch):
+        ejecutadas = []
+
+        async def execute(query, *params):
+            ejecutadas.append(params)
+
+        monkeypatch.setattr(modulo.db, "execute", execute)
+        pipeline = modulo.ResumenesConversaciones(codificar)
+        pipeline.registrar_consulta([10, 20, 30])
+        pipeline.registrar_consulta([20])
+
+        assert await pipeline.vaciar_consultas() == 3
+        assert await pipeline.vaciar_consultas() == 0
+        assert len(ejecutadas) == 1
+        ids, fechas = ejecutadas[0]
+        assert ids == [10, 20, 30] and fechas[1] >= fechas[0]
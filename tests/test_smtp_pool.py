@@ -0,0 +1,107 @@
+"""
+Tests for the pooled SMTP sender
+================================
+
+Tests for backend/tasks/smtp_pool.py, using the local debugging server in
+backend/tasks/smtp_debug.py
+"""
+import smtplib
+from email.message import EmailMessage
+
+import pytest
+
+from backend.tasks.smtp_debug import ServidorSMTPDebug
+from backend.tasks.smtp_pool import SMTPPool, enviar_lote, enviar_mensaje
+
+
+def _mensaje(destinatario: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg['From'] = 'noreply@podoskin.com'
+    msg['To'] = destinatario
+    msg['Subject'] = 'Prueba'
+    msg.set_content('hola')
+    return msg
+
+
+@pytest.fixture
+def servidor():
+    with ServidorSMTPDebug() as srv:
+        yield srv
+
+
+@pytest.mark.unit
+class TestSMTPPool:
+    """Tests for SMTPPool and enviar_mensaje"""
+
+    def test_sessions_are_reused(self, servidor):
+        """Sequential sends share one SMTP session"""
+        pool = SMTPPool("127.0.0.1", servidor.port, starttls=False)
+        for i in range(5):
+            enviar_mensaje(pool, _mensaje(f"a{i}@test.com"))
+        pool.cerrar()
+
+        assert len(servidor.mensajes) == 5
+        assert servidor.sesiones == 1
+        assert pool.stats.conexiones_creadas == 1
+        assert pool.stats.reutilizadas == 4
+
+    def test_transient_error_is_retried(self, servidor):
+        """A 4xx response is retried with backoff on a fresh session"""
+        servidor.fallos_pendientes = 2
+        pool = SMTPPool("127.0.0.1", servidor.port, starttls=False)
+
+        reintentos = enviar_mensaje(pool, _mensaje("a@test.com"), backoff=0.01)
+        pool.cerrar()
+
+        assert reintentos == 2
+        assert len(servidor.mensajes) == 1
+
+    def test_retries_exhausted_raises(self, servidor):
+        """Once retries run out the last error is raised"""
+        servidor.fallos_pendientes = 10
+        pool = SMTPPool("127.0.0.1", servidor.port, starttls=False)
+
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            enviar_mensaje(pool, _mensaje("a@test.com"), max_reintentos=1, backoff=0.01)
+        pool.cerrar()
+
+        assert servidor.mensajes == []
+
+    def test_permanent_smtp_exception_is_not_retried(self, servidor):
+        """Missing STARTTLS support fails at once instead of backing off"""
+        pool = SMTPPool("127.0.0.1", servidor.port, starttls=True)
+
+        with pytest.raises(smtplib.SMTPNotSupportedError):
+            enviar_mensaje(pool, _mensaje("a@test.com"), backoff=0.01)
+        pool.cerrar()
+
+        assert servidor.sesiones == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestEnviarLote:
+    """Tests for enviar_lote"""
+
+    async def test_batch_bounded_by_pool(self, servidor):
+        """A batch is delivered over at most max_conexiones sessions"""
+        pool = SMTPPool("127.0.0.1", servidor.port, starttls=False, max_conexiones=3)
+
+        resultado = await enviar_lote(pool, [_mensaje(f"a{i}@test.com") for i in range(30)])
+        pool.cerrar()
+
+        assert resultado.enviados == 30
+        assert resultado.fallidos == 0
+        assert resultado.emails_por_segundo > 0
+        assert servidor.sesiones <= 3
+        assert {m['To'] for m in servidor.mensajes} == {f"a{i}@test.com" for i in range(30)}
+
+    async def test_batch_reports_failures(self):
+        """Unreachable server: every message is counted as failed"""
+        pool = SMTPPool("127.0.0.1", 1, starttls=False, timeout=1)
+
+        resultado = await enviar_lote(pool, [_mensaje("a@test.com")], max_reintentos=0)
+
+        assert resultado.enviados == 0
+        assert resultado.fallidos == 1
+        assert len(resultado.errores) == 1
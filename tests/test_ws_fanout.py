@@ -0,0 +1,227 @@
+"""
+Tests for WebSocket notification fan-out
+========================================
+
+Tests for backend/ws_notifications/connection_manager.py,
+backend/ws_notifications/contadores.py and backend/ws_notifications/fanout.py
+"""
+import asyncio
+import json
+
+import pytest
+
+from backend.ws_notifications import connection_manager as cm_mod
+from backend.ws_notifications.connection_manager import ConnectionManager
+from backend.ws_notifications.contadores import ContadorNoLeidas
+from backend.ws_notifications.fanout import BackendLocal, Fanout
+
+
+class FakeWebSocket:
+    """Minimal WebSocket double recording what it receives"""
+
+    def __init__(self, retraso: float = 0.0):
+        self.retraso = retraso
+        self.recibidos = []
+        self.cerrado = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, texto):
+        await asyncio.sleep(self.retraso)
+        self.recibidos.append(json.loads(texto))
+
+    async def close(self, code=None):
+        self.cerrado = code
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestConnectionManager:
+    """Tests for concurrent sends and backpressure"""
+
+    async def test_sends_run_concurrently(self):
+        """Fan-out time is bounded by the slowest socket, not the sum"""
+        manager = ConnectionManager()
+        sockets = [FakeWebSocket(retraso=0.05) for _ in range(20)]
+        for i, ws in enumerate(sockets):
+            await manager.connect(ws, f"user{i}")
+
+        inicio = asyncio.get_running_loop().time()
+        enviados = await manager.broadcast_all({"type": "ping"})
+        segundos = asyncio.get_running_loop().time() - inicio
+
+        assert enviados == 20
+        assert segundos < 0.5
+        assert all(ws.recibidos[0]["type"] == "ping" for ws in sockets)
+
+    async def test_slow_consumer_is_dropped(self, monkeypatch):
+        """A socket that piles up pending sends is disconnected"""
+        monkeypatch.setattr(cm_mod, "WS_MAX_PENDIENTES", 2)
+        manager = ConnectionManager()
+        lento, rapido = FakeWebSocket(retraso=0.2), FakeWebSocket()
+        await manager.connect(lento, "lento")
+        await manager.connect(rapido, "rapido")
+
+        envios = []
+        for i in range(4):
+            envios.append(asyncio.create_task(
+                manager.broadcast_to_users({"type": "n", "i": i}, ["lento", "rapido"])
+            ))
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*envios)
+        await asyncio.sleep(0)
+
+        assert [m["i"] for m in rapido.recibidos] == [0, 1, 2, 3]
+        assert not manager.is_user_connected("lento")
+        assert lento.cerrado == 1013
+        assert manager.total_connections == 1
+
+    async def test_disconnect_twice_keeps_count(self):
+        """Disconnecting an already removed socket does not skew totals"""
+        manager = ConnectionManager()
+        ws = FakeWebSocket()
+        await manager.connect(ws, "ana")
+
+        manager.disconnect(ws, "ana")
+        manager.disconnect(ws, "ana")
+
+        assert manager.total_connections == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestFanout:
+    """Tests for Fanout delivery and count coalescing"""
+
+    async def test_delivers_to_local_sockets_and_applies_deltas(self):
+        """Only connected users get messages; new notifications bump the cached count"""
+        manager = ConnectionManager()
+        fanout = Fanout(manager, BackendLocal())
+        fanout.contadores.ventana = 0.01
+        fanout.contadores.contar = _contar_fijo({"ana": 3, "beto": 0})
+        await fanout.iniciar()
+        ana, beto = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(ana, "ana")
+        await manager.connect(beto, "beto")
+        await asyncio.gather(fanout.contadores.obtener("ana"), fanout.contadores.obtener("beto"))
+
+        for usuario in ["ana", "ana", "beto", "offline"]:
+            await fanout.publicar({"type": "notification", "usuario_id": usuario, "data": {"id": 1}})
+        await fanout.publicar({"type": "notification", "usuario_id": "ana", "data": {"id": 1}, "reenvio": True})
+        await fanout.publicar_contador("beto", delta=-1)
+        await asyncio.sleep(0.05)
+        await fanout.detener()
+
+        assert len(fanout.contadores.contar.llamadas) == 1
+        assert [m["type"] for m in ana.recibidos] == ["notification"] * 3 + ["count"]
+        assert ana.recibidos[-1]["count"] == 5
+        assert beto.recibidos[-1]["count"] == 0
+        assert fanout.recibidos == 6
+
+
+def _contar_fijo(valores):
+    llamadas = []
+
+    async def contar(usuarios):
+        usuarios = list(usuarios)
+        llamadas.append(sorted(usuarios))
+        return {u: valores.get(u, 0) for u in usuarios}
+
+    contar.llamadas = llamadas
+    return contar
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestContadorNoLeidas:
+    """Tests for the cached unread counters"""
+
+    async def test_connect_storm_is_one_query(self):
+        """500 concurrent first reads share one query, later reads hit the cache"""
+        manager = ConnectionManager()
+        contadores = ContadorNoLeidas(manager, ventana_ms=10)
+        contadores.contar = _contar_fijo({f"u{i}": i for i in range(500)})
+        for i in range(500):
+            await manager.connect(FakeWebSocket(), f"u{i}")
+
+        valores = await asyncio.gather(*(contadores.obtener(f"u{i}") for i in range(500)))
+        otra = await contadores.obtener("u7")
+
+        assert valores == list(range(500))
+        assert otra == 7
+        assert len(contadores.contar.llamadas) == 1
+        assert contadores.aciertos == 1
+
+    async def test_load_arriving_during_query_is_not_lost(self):
+        """A first read that arrives while contar is blocked gets its own flush"""
+        manager = ConnectionManager()
+        contadores = ContadorNoLeidas(manager, ventana_ms=1)
+        await manager.connect(FakeWebSocket(), "ana")
+        await manager.connect(FakeWebSocket(), "beto")
+        bloqueada = asyncio.Event()
+        soltar = asyncio.Event()
+        llamadas = []
+
+        async def contar(usuarios):
+            llamadas.append(sorted(usuarios))
+            if len(llamadas) == 1:
+                bloqueada.set()
+                await soltar.wait()
+            return {u: 3 for u in usuarios}
+
+        contadores.contar = contar
+        ana = asyncio.create_task(contadores.obtener("ana"))
+        await bloqueada.wait()
+        beto = asyncio.create_task(contadores.obtener("beto"))
+        await asyncio.sleep(0)
+        soltar.set()
+
+        assert await asyncio.wait_for(asyncio.gather(ana, beto), timeout=1) == [3, 3]
+        assert llamadas == [["ana"], ["beto"]]
+
+    async def test_failed_query_still_flushes_later_work(self):
+        """After a failed load, requests queued meanwhile are still served"""
+        manager = ConnectionManager()
+        contadores = ContadorNoLeidas(manager, ventana_ms=1)
+        await manager.connect(FakeWebSocket(), "ana")
+        await manager.connect(FakeWebSocket(), "beto")
+        bloqueada = asyncio.Event()
+        soltar = asyncio.Event()
+
+        async def contar(usuarios):
+            if "ana" in usuarios:
+                bloqueada.set()
+                await soltar.wait()
+                raise ConnectionError("sin conexión")
+            return {u: 1 for u in usuarios}
+
+        contadores.contar = contar
+        ana = asyncio.create_task(contadores.obtener("ana"))
+        await bloqueada.wait()
+        beto = asyncio.create_task(contadores.obtener("beto"))
+        await asyncio.sleep(0)
+        soltar.set()
+
+        with pytest.raises(ConnectionError):
+            await ana
+        assert await asyncio.wait_for(beto, timeout=1) == 1
+
+    async def test_reconcile_fixes_drift_and_forgets_offline(self):
+        """Reconciliation corrects counters and drops users without sockets"""
+        manager = ConnectionManager()
+        contadores = ContadorNoLeidas(manager, ventana_ms=1)
+        ana, beto = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(ana, "ana")
+        await manager.connect(beto, "beto")
+        contadores.contar = _contar_fijo({"ana": 2, "beto": 1})
+        await asyncio.gather(contadores.obtener("ana"), contadores.obtener("beto"))
+
+        manager.disconnect(beto, "beto")
+        contadores.contar = _contar_fijo({"ana": 4})
+        corregidos = await contadores.reconciliar()
+
+        assert corregidos == 1
+        assert contadores.contar.llamadas == [["ana"]]
+        assert ana.recibidos[-1]["count"] == 4
+        assert contadores.get_stats()["usuarios_en_cache"] == 1